@@ -238,18 +238,19 @@ def open_report_in_browser(report_path='', is_cloud_path=False):
 
 
 def get_run_json_path(output_dir: str, input=None):
+    from piperider_cli.runjson import RUN_JSON, find_run_json
     console = Console()
     if input:
         if not os.path.exists(input):
             console.print(f'[bold red]Error: {input} not found[/bold red]')
             return
         if os.path.isdir(input):
-            run_json = os.path.join(input, 'run.json')
+            run_json = find_run_json(input) or os.path.join(input, RUN_JSON)
         else:
             run_json = input
     else:
         latest = os.path.join(output_dir, 'latest')
-        run_json = os.path.join(latest, 'run.json')
+        run_json = find_run_json(latest) or os.path.join(latest, RUN_JSON)
         if not os.path.isfile(run_json) and os.path.exists(output_dir):
             latest_report_dir_ctime = 0
             latest_report_dir = ''
@@ -259,5 +260,6 @@ def get_run_json_path(output_dir: str, input=None):
                 if os.path.getctime(de) > latest_report_dir_ctime:
                     latest_report_dir_ctime = os.path.getctime(de)
                     latest_report_dir = de.path
-            run_json = os.path.join(output_dir, latest_report_dir, 'run.json')
+            latest_report_dir = os.path.join(output_dir, latest_report_dir)
+            run_json = find_run_json(latest_report_dir) or os.path.join(latest_report_dir, RUN_JSON)
     return os.path.abspath(run_json)
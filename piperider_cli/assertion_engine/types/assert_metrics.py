@@ -3,6 +3,7 @@ from typing import Union, List
 
 from piperider_cli.assertion_engine import AssertionContext, ValidationResult
 from piperider_cli.assertion_engine.types.base import BaseAssertionType
+from piperider_cli.profiler.column_metrics import get_column_metrics
 
 
 class AssertMetric(BaseAssertionType):
@@ -24,6 +25,9 @@ class AssertMetric(BaseAssertionType):
 
         if not target_metrics:
             return context.result.fail_with_metric_not_found_error(context.table, context.column)
+        if column and context.metric not in target_metrics and context.metric in (target_metrics.get('metrics') or {}):
+            # the user-defined column metric
+            target_metrics = dict(target_metrics.get('metrics'), type=target_metrics.get('type'))
 
         context.result.name = self.mapping.get(context.metric, target_metrics.get('type'))
         context.result.expected = self.to_interval_notation(context.asserts)
@@ -202,6 +206,9 @@ class MetricName:
         self._add('p95', '95th percentile', ['integer', 'numeric'])
         self._add('max', 'max', ['integer', 'numeric'])
 
+        for metric in get_column_metrics():
+            self._add(metric.name, metric.description or metric.name, metric.types)
+
     def _add(self, field, name, col_types: List[str] = None):
         if col_types is None or len(col_types) == 0:
             if self.all_type not in self.mapping:
@@ -7,6 +7,7 @@ from piperider_cli import raise_exception_when_directory_not_writable, get_run_j
 from piperider_cli.assertion_engine import AssertionEngine
 from piperider_cli.configuration import Configuration
 from piperider_cli.error import PipeRiderNoProfilingResultError
+from piperider_cli.runjson import open_run_json
 
 console = Console()
 
@@ -31,7 +32,7 @@ class AssertionGenerator():
         if not os.path.isfile(run_json_path):
             raise PipeRiderNoProfilingResultError(run_json_path)
 
-        with open(run_json_path) as f:
+        with open_run_json(run_json_path) as f:
             profiling_result = json.loads(f.read())
         if not _validate_input_result(profiling_result):
             console.print(f'[bold red]Error: {run_json_path} is invalid[/bold red]')
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from piperider_cli.error import PipeRiderBlobNotFoundError
+from piperider_cli.runarrow import get_run_arrow_path, load_run_arrow, write_run_arrow
+from piperider_cli.runjson import RawJsonFile, open_run_json, write_run_json
+
+BLOB_DIR = '.blobs'
+BLOB_REF = '$blob'
+_CHUNK_SIZE = 1 << 20
+
+
+def default_blob_dir(output_dir: str) -> str:
+    return os.path.join(output_dir, BLOB_DIR)
+
+
+def blob_ref(digest: str) -> dict:
+    return {BLOB_REF: digest}
+
+
+def is_blob_ref(value) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(BLOB_REF), str)
+
+
+class BlobStore:
+    """
+    BlobStore keeps the files by the sha256 of their content, so a file shared by many runs, e.g. the dbt manifest,
+    is stored once. A run refers to a blob by {"$blob": "<sha256>"}.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @staticmethod
+    def of_run(run_json_path: str) -> 'BlobStore':
+        # <outputs>/<run>/run.json, and the run could be found by the 'latest' symlink
+        run_dir = os.path.dirname(os.path.realpath(run_json_path))
+        return BlobStore(default_blob_dir(os.path.dirname(run_dir)))
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest)
+
+    def put(self, path: str) -> str:
+        """
+        Store a file unless the same content is stored.
+
+        :return: the sha256 of the file
+        """
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+
+        if not os.path.exists(self.path(digest)):
+            os.makedirs(self.root, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as dst, open(path, 'rb') as src:
+                    shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+                os.replace(tmp_path, self.path(digest))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return digest
+
+    def get(self, digest: str) -> RawJsonFile:
+        path = self.path(digest)
+        if not os.path.exists(path):
+            raise PipeRiderBlobNotFoundError(digest, self.root)
+        return RawJsonFile(path)
+
+    def link(self, digest: str, dest: str):
+        """
+        Place a blob at the destination by a hard link, or by a copy if the file system does not support it.
+        """
+        path = self.get(digest).path
+        if os.path.exists(dest):
+            os.remove(dest)
+        try:
+            os.link(path, dest)
+        except OSError:
+            shutil.copyfile(path, dest)
+
+
+def resolve_blob_refs(run_result: dict, blob_store: BlobStore, load: bool = True) -> dict:
+    """
+    Replace the blob references of the dbt artifacts in a run result by their documents, or by the raw JSON files if
+    load is False, which are copied by write_run_json.
+    """
+    dbt = run_result.get('dbt')
+    if not isinstance(dbt, dict):
+        return run_result
+    for key, value in dbt.items():
+        if is_blob_ref(value):
+            blob = blob_store.get(value[BLOB_REF])
+            dbt[key] = blob.load() if load else blob
+    return run_result
+
+
+def export_run_json(run_json_path: str, dest: str):
+    """
+    Write a run.json with the dbt artifacts inlined, which could be read without the blob store of the run. The
+    destination is compressed by its suffix, e.g. run.json.zst.
+    """
+    with open_run_json(run_json_path) as f:
+        run_result = json.load(f)
+    resolve_blob_refs(run_result, BlobStore.of_run(run_json_path), load=False)
+    # keep the suffix of the destination for its compression
+    tmp_path = os.path.join(os.path.dirname(dest), f'.tmp-{os.path.basename(dest)}')
+    with open_run_json(tmp_path, 'w') as f:
+        write_run_json(f, run_result)
+    os.replace(tmp_path, dest)
+
+
+def export_run_arrow(run_json_path: str, dest: str):
+    """
+    Write the run.arrow of a run with the dbt artifacts inlined, like the run.json written by export_run_json.
+    """
+    run_result = load_run_arrow(get_run_arrow_path(run_json_path))
+    resolve_blob_refs(run_result, BlobStore.of_run(run_json_path))
+    write_run_arrow(dest, run_result)
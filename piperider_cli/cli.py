@@ -18,10 +18,14 @@ from piperider_cli.exitcode import EC_ERR_TEST_FAILED
 from piperider_cli.feedback import Feedback
 from piperider_cli.generate_report import GenerateReport
 from piperider_cli.guide import Guide
+from piperider_cli.history import History
 from piperider_cli.initializer import Initializer
+from piperider_cli.profiler.coordinator import WorkerRunner, DEFAULT_LEASE_SECONDS
 from piperider_cli.recipe_executor import RecipeExecutor
 from piperider_cli.recipes import RecipeConfiguration, configure_recipe_execution_flags, is_recipe_dry_run
+from piperider_cli.runindex import RunIndexCommand
 from piperider_cli.runner import Runner
+from piperider_cli.tracing import Tracer
 from piperider_cli.validator import Validator
 
 release_version = __version__ if sentry_env != 'development' else None
@@ -189,6 +193,26 @@ def diagnose(**kwargs):
 @click.option('--project', default=None, type=click.STRING, help='Specify the project name to upload.')
 @click.option('--share', default=False, is_flag=True, help='Enable public share of the report to PipeRider Cloud.')
 @click.option('--open', is_flag=True, help='Opens the generated report in the system\'s default browser')
+@click.option('--coordinator', is_flag=True, help='Distribute the tables to the workers by a work queue.')
+@click.option('--queue', default=None, type=click.STRING,
+              help='Path of the work queue file. Default is ".coordinator.sqlite" in the outputs directory.')
+@click.option('--explain', is_flag=True, help='Estimate the bytes scanned by the profiling queries without running them.')
+@click.option('--estimate', is_flag=True,
+              help='Estimate the metrics from the catalog statistics without scanning the tables.')
+@click.option('--max-bytes-per-table', default=None, type=click.INT,
+              help='Downgrade or skip the tables estimated to scan more bytes than the budget.')
+@click.option('--max-bytes-total', default=None, type=click.INT,
+              help='Downgrade or skip the tables once the estimated bytes of the run exceed the budget.')
+@click.option('--max-seconds-per-table', default=None, type=click.FLOAT,
+              help='Skip the remaining columns of a table once its profiling exceeds the seconds.')
+@click.option('--max-seconds-total', default=None, type=click.FLOAT,
+              help='Skip the remaining columns once the profiling of the run exceeds the seconds.')
+@click.option('--resume', default=None, type=click.STRING, metavar='RUN_ID',
+              help='Resume an interrupted run from its checkpoint without profiling the completed tables again.')
+@click.option('--compress', default=None, type=click.Choice(['zstd', 'gzip']),
+              help='Write the compressed run.json, e.g. "run.json.zst" by zstd.')
+@click.option('--arrow', is_flag=True, default=False,
+              help='Also write the run as a columnar "run.arrow" file, which requires pyarrow.')
 @add_options([
     dbt_select_option_builder(),
     click.option('--state', default=None,
@@ -259,7 +283,20 @@ def run(**kwargs):
                       dbt_resources=dbt_resources,
                       dbt_select=select,
                       dbt_state=state,
-                      report_dir=kwargs.get('report_dir'))
+                      report_dir=kwargs.get('report_dir'),
+                      coordinator=kwargs.get('coordinator'),
+                      queue=kwargs.get('queue'),
+                      explain=kwargs.get('explain'),
+                      estimate=kwargs.get('estimate'),
+                      max_bytes_per_table=kwargs.get('max_bytes_per_table'),
+                      max_bytes_total=kwargs.get('max_bytes_total'),
+                      max_seconds_per_table=kwargs.get('max_seconds_per_table'),
+                      max_seconds_total=kwargs.get('max_seconds_total'),
+                      resume=kwargs.get('resume'),
+                      compression=kwargs.get('compress'),
+                      arrow=kwargs.get('arrow'))
+    if kwargs.get('explain'):
+        return ret
     if ret in (0, EC_ERR_TEST_FAILED):
         if enable_share:
             force_upload = True
@@ -267,22 +304,44 @@ def run(**kwargs):
         auto_upload = CloudConnector.is_auto_upload()
         is_cloud_view = (force_upload or auto_upload)
 
+        tracer = Tracer()
         if not skip_report:
-            GenerateReport.exec(None, kwargs.get('report_dir'), output, open_report, is_cloud_view)
+            with tracer.span('report'):
+                GenerateReport.exec(None, kwargs.get('report_dir'), output, open_report, is_cloud_view)
 
         if CloudConnector.is_login() and is_cloud_view:
-            ret = CloudConnector.upload_latest_report(report_dir=kwargs.get('report_dir'), debug=kwargs.get('debug'),
-                                                      open_report=open_report, enable_share=enable_share,
-                                                      project_name=project_name)
+            with tracer.span('upload'):
+                ret = CloudConnector.upload_latest_report(report_dir=kwargs.get('report_dir'),
+                                                          debug=kwargs.get('debug'), open_report=open_report,
+                                                          enable_share=enable_share, project_name=project_name)
         elif not CloudConnector.is_login() and is_cloud_view:
             console = Console()
             console.print('[bold yellow]Warning: [/bold yellow]The report is not uploaded due to not logged in.')
+        # include the report and upload spans
+        tracer.write()
 
     if ret != 0:
         sys.exit(ret)
     return ret
 
 
+@cli.command(short_help='Profile the tables of a coordinator run.', cls=TrackCommand)
+@click.option('--queue', default=None, type=click.STRING,
+              help='Path of the work queue file. Default is ".coordinator.sqlite" in the outputs directory.')
+@click.option('--report-dir', default=None, type=click.STRING, help='Use a different report directory.')
+@click.option('--lease-seconds', default=DEFAULT_LEASE_SECONDS, type=click.INT,
+              help='Seconds before the claimed table is retried by other workers.')
+@add_options(debug_option)
+def worker(**kwargs):
+    'Claim the tables from the work queue of "piperider run --coordinator" and profile them. The workers on other hosts should share the queue file.'
+    ret = WorkerRunner.exec(queue_path=kwargs.get('queue'),
+                            report_dir=kwargs.get('report_dir'),
+                            lease_seconds=kwargs.get('lease_seconds'))
+    if ret != 0:
+        sys.exit(ret)
+    return ret
+
+
 @cli.command(short_help='Generate recommended assertions. - Deprecated', cls=TrackCommand)
 @click.option('--input', default=None, type=click.Path(exists=True), help='Specify the raw result file.')
 @click.option('--no-recommend', is_flag=True, help='Generate assertions templates only.')
@@ -358,6 +417,64 @@ def compare_reports(**kwargs):
                        show_progress=True)
 
 
+@cli.command(short_help='Query a metric across the runs.', cls=TrackCommand)
+@click.option('--table', required=True, type=click.STRING, help='The table of the metric.', metavar='TABLE_NAME')
+@click.option('--column', default=None, type=click.STRING, help='The column of the metric.', metavar='COLUMN_NAME')
+@click.option('--metric', default=None, type=click.STRING,
+              help='The metric, e.g. "nulls_p". List the metrics of the table or the column if not specified.')
+@click.option('--last', default=None, type=click.IntRange(min=1), help='Query the last runs only.')
+@click.option('--datasource', default=None, type=click.STRING, help='Query the runs of the datasource.',
+              metavar='DATASOURCE_NAME')
+@click.option('--json', 'output_json', is_flag=True, help='Output the values as JSON.')
+@click.option('--report-dir', default=None, type=click.STRING, help='Use a different report directory.')
+@add_options(debug_option)
+def history(**kwargs):
+    'Query a metric of a table or a column across the runs from the history store, e.g. the null rate of a column.'
+    return History.exec(kwargs.get('metric'), kwargs.get('table'), column=kwargs.get('column'),
+                        datasource=kwargs.get('datasource'), last=kwargs.get('last'),
+                        report_dir=kwargs.get('report_dir'), output_json=kwargs.get('output_json'))
+
+
+@cli.group('runs', short_help='Manage the runs of the outputs directory.')
+def runs(**kwargs):
+    pass
+
+
+@runs.command(name='list', short_help='List the runs.', cls=TrackCommand)
+@click.option('--datasource', default=None, type=click.STRING, help='List the runs of the datasource.',
+              metavar='DATASOURCE_NAME')
+@click.option('--report-dir', default=None, type=click.STRING, help='Use a different report directory.')
+@add_options(debug_option)
+def runs_list(**kwargs):
+    'List the runs by the run index without loading the run.json files.'
+    return RunIndexCommand.list(report_dir=kwargs.get('report_dir'), datasource=kwargs.get('datasource'))
+
+
+@runs.command(name='rebuild-index', short_help='Rebuild the run index.', cls=TrackCommand)
+@click.option('--report-dir', default=None, type=click.STRING, help='Use a different report directory.')
+@add_options(debug_option)
+def runs_rebuild_index(**kwargs):
+    'Rebuild the run index from the run.json files of the outputs directory.'
+    return RunIndexCommand.rebuild(report_dir=kwargs.get('report_dir'))
+
+
+@runs.command(name='prune', short_help='Remove the old runs.', cls=TrackCommand)
+@click.option('--keep-last', default=None, type=click.IntRange(min=1),
+              help='Keep the last runs of each datasource.')
+@click.option('--older-than', default=None, type=click.FLOAT, metavar='DAYS',
+              help='Remove the runs created before the days.')
+@click.option('--datasource', default=None, type=click.STRING, help='Remove the runs of the datasource only.',
+              metavar='DATASOURCE_NAME')
+@click.option('--dry-run', is_flag=True, help='List the runs to remove without removing them.')
+@click.option('--report-dir', default=None, type=click.STRING, help='Use a different report directory.')
+@add_options(debug_option)
+def runs_prune(**kwargs):
+    'Remove the old runs and the dbt artifacts no longer referred by any run. The latest run is always kept.'
+    return RunIndexCommand.prune(report_dir=kwargs.get('report_dir'), keep_last=kwargs.get('keep_last'),
+                                 older_than=kwargs.get('older_than'), datasource=kwargs.get('datasource'),
+                                 dry_run=kwargs.get('dry_run'))
+
+
 @cli.group('config', short_help='Manage the PipeRider configurations.')
 def config(**kwargs):
     pass
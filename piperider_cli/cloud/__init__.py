@@ -1,5 +1,8 @@
 import json
 import os
+import shutil
+import tempfile
+from contextlib import contextmanager
 from typing import List
 
 import requests
@@ -11,6 +14,7 @@ from piperider_cli import __version__
 from piperider_cli.configuration import Configuration, FileSystem
 from piperider_cli.error import PipeRiderNoDefaultProjectError, CloudReportError, PipeRiderConfigError
 from piperider_cli.event import load_user_profile, update_user_profile
+from piperider_cli.runjson import get_compression, open_run_json
 
 PIPERIDER_CLOUD_SERVICE = 'https://cloud.piperider.io/'
 
@@ -114,6 +118,19 @@ class CloudServiceHelper:
         return False, None
 
 
+@contextmanager
+def _open_run_file(file_path):
+    # the service accepts the plain run.json, so a compressed one is uploaded from a decompressed temporary file
+    if get_compression(file_path) is None:
+        with open(file_path, 'rb') as file:
+            yield file
+        return
+    with tempfile.TemporaryFile() as file, open_run_json(file_path, 'rb') as src:
+        shutil.copyfileobj(src, file)
+        file.seek(0)
+        yield file
+
+
 class PipeRiderCloud:
 
     def __init__(self):
@@ -282,7 +299,7 @@ class PipeRiderCloud:
             if show_progress and upload_progress:
                 upload_progress.update(task_id, completed=monitor.bytes_read)
 
-        with open(file_path, 'rb') as file:
+        with _open_run_file(file_path) as file:
             encoder = MultipartEncoder(
                 fields={'file': ('run.json', file)},
             )
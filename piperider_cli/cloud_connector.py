@@ -1,6 +1,7 @@
 import json
 import os
 import sys
+import tempfile
 import webbrowser
 from typing import List, Optional
 
@@ -12,6 +13,9 @@ from rich.prompt import Prompt
 from rich.table import Table
 
 from piperider_cli import datetime_to_str, open_report_in_browser, str_to_datetime, get_run_json_path
+from piperider_cli.blobstore import export_run_json
+from piperider_cli.runarrow import find_run_arrow, write_run_arrow
+from piperider_cli.runjson import RUN_JSON, open_run_json
 from piperider_cli.cloud import PipeRiderCloud, PipeRiderProject
 from piperider_cli.compare_report import CompareReport, RunOutput
 from piperider_cli.configuration import Configuration
@@ -228,19 +232,26 @@ def select_cloud_report_ids(datasource=None, project: PipeRiderProject = None, t
 
 
 def upload_to_cloud(run: RunOutput, debug=False, project: PipeRiderProject = None, show_progress=True) -> dict:
-    response = piperider_cloud.upload_run(run.path, project=project, show_progress=show_progress)
+    # upload the run with the dbt artifacts inlined from the blob store
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        upload_path = os.path.join(tmp_dir, RUN_JSON)
+        export_run_json(run.path, upload_path)
+        response = piperider_cloud.upload_run(upload_path, project=project, show_progress=show_progress)
 
     # TODO refine the output when API is ready
 
     def _patch_cloud_upload_response(run_path, project: PipeRiderProject, run_id):
-        with open(run_path, 'r') as f:
+        arrow_path = find_run_arrow(run_path)
+        with open_run_json(run_path) as f:
             report = json.load(f)
         report['cloud'] = {
             'run_id': run_id,
             'project_name': f'{project.workspace_name}/{project.name}'
         }
-        with open(run_path, 'w') as f:
+        with open_run_json(run_path, 'w') as f:
             f.write(json.dumps(report, separators=(',', ':')))
+        if arrow_path is not None:
+            write_run_arrow(arrow_path, report)
 
     if response.get('success') is True:
         run_id = response.get('id')
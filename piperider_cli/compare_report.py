@@ -2,9 +2,10 @@ import io
 import json
 import os
 import shutil
+import sqlite3
 import sys
 from datetime import date, datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 import inquirer
 import readchar
@@ -13,52 +14,57 @@ from rich.console import Console
 import piperider_cli.hack.inquirer as inquirer_hack
 from piperider_cli import clone_directory, datetime_to_str, open_report_in_browser, \
     raise_exception_when_directory_not_writable, str_to_datetime
+from piperider_cli.blobstore import BlobStore, resolve_blob_refs
 from piperider_cli.configuration import Configuration, ReportDirectory
+from piperider_cli.runarrow import find_run_arrow, load_run_arrow
+from piperider_cli.runindex import RunIndex, summarize_run
+from piperider_cli.runjson import open_run_json
 from piperider_cli.generate_report import setup_report_variables
 from piperider_cli.dbt.changeset import SummaryChangeSet
 from piperider_cli.dbt.utils import ChangeType
 
 
 class RunOutput(object):
-    def __init__(self, path):
+    def __init__(self, path, summary: dict = None):
         self.path = path
-        self.name = None
-        self.created_at = None
 
-        self.table_count = 0
-        self.pass_count = 0
-        self.fail_count = 0
-        self.cloud = None
-
-        try:
-            with open(path, 'r') as f:
-                run_result = json.load(f)
-                self.name = run_result['datasource']['name']
-                self.created_at = run_result['created_at']
+        if summary is None:
+            try:
+                with open_run_json(path) as f:
+                    summary = summarize_run(json.load(f))
+            except Exception as e:
+                if isinstance(e, json.decoder.JSONDecodeError):
+                    raise json.decoder.JSONDecodeError(
+                        f'Invalid JSON in file "{path}"', e.doc, e.pos)
+                raise e
 
-                tables = run_result.get('tables', {})
-                self.table_count = len(tables.keys())
-
-                for test in run_result.get('tests', []):
-                    if test.get('status') == 'passed':
-                        self.pass_count += 1
-                    else:
-                        self.fail_count += 1
-                self.cloud = run_result.get('cloud')
-        except Exception as e:
-            if isinstance(e, json.decoder.JSONDecodeError):
-                raise json.decoder.JSONDecodeError(
-                    f'Invalid JSON in file "{path}"', e.doc, e.pos)
-            raise e
+        self.name = summary['name']
+        self.created_at = summary['created_at']
+        self.table_count = summary['table_count']
+        self.pass_count = summary['pass_count']
+        self.fail_count = summary['fail_count']
+        self.cloud = summary['cloud']
 
     def verify(self) -> bool:
         # TODO: add some verification logic
         return True
 
-    def load(self):
-        with open(self.path, 'r') as f:
-            data = json.load(f)
-        return data
+    def load(self, tables: Iterable[str] = None):
+        """
+        Load the run. Only the given tables are loaded if 'tables' is given, which reads the rows of the tables from
+        the run.arrow if the run has one.
+        """
+        arrow_path = find_run_arrow(self.path) if tables is not None else None
+        if arrow_path is not None:
+            data = load_run_arrow(arrow_path, tables=tables)
+        else:
+            with open_run_json(self.path) as f:
+                data = json.load(f)
+            if tables is not None:
+                tables = set(tables)
+                data['tables'] = {name: table for name, table in data.get('tables', {}).items() if name in tables}
+        # the dbt artifacts are resolved on loading a run instead of listing the runs
+        return resolve_blob_refs(data, BlobStore.of_run(self.path))
 
     def refresh(self):
         self.__init__(self.path)
@@ -680,26 +686,15 @@ class CompareReport(object):
         List existing profiler outputs.
         """
 
-        def _walk_throw_runs(path):
-            outputs = []
-            for root, dirs, _ in os.walk(path):
-                for dir in dirs:
-                    if dir == 'latest':
-                        continue
-                    run_json = os.path.join(root, dir, 'run.json')
-                    if not os.path.exists(run_json):
-                        continue
-                    output = RunOutput(run_json)
-                    if self.datasource and output.name != self.datasource:
-                        continue
-                    outputs.append(output)
-            outputs.sort(key=lambda x: (x.name, x.created_at), reverse=True)
-            return outputs
-
         if output_search_path is None:
             output_search_path = self.profiler_output_path
 
-        return _walk_throw_runs(output_search_path)
+        try:
+            entries = RunIndex(output_search_path).list(self.datasource)
+        except sqlite3.Error:
+            # the outputs directory is not writable, e.g. a read-only mount
+            entries = RunIndex(output_search_path, path=':memory:').list(self.datasource)
+        return [RunOutput(entry['path'], summary=entry) for entry in entries]
 
     def get_the_last_two_reports(self):
         outputs = self.list_existing_outputs()
@@ -797,7 +792,16 @@ class CompareReport(object):
         if self.a is None or self.b is None:
             raise Exception("Please select reports to compare first.")
 
-        return ComparisonData(self.a.load(), self.b.load(), tables_from)
+        # the other run only loads the tables to compare
+        if tables_from == 'target-only':
+            target = self.b.load()
+            base = self.a.load(tables=target.get('tables', {}).keys())
+        elif tables_from == 'base-only':
+            base = self.a.load()
+            target = self.b.load(tables=base.get('tables', {}).keys())
+        else:
+            base, target = self.a.load(), self.b.load()
+        return ComparisonData(base, target, tables_from)
 
     @staticmethod
     def exec(*, a=None, b=None, last=None, datasource=None, report_dir=None, output=None, tables_from='all',
@@ -1,4 +1,3 @@
-import json
 import os
 import shlex
 import subprocess
@@ -7,7 +6,7 @@ import time
 import uuid
 from pathlib import Path
 from subprocess import Popen
-from typing import Callable, Dict, List, Optional, Union
+from typing import Callable, List, Optional, Union
 
 import inquirer
 from rich.console import Console
@@ -199,24 +198,9 @@ class TelemetryIdResolver:
             return
         output_dir = configuration.report_directory_filesystem.get_output_dir()
 
-        def _extract_id(run_json_file: str):
-            with open(run_json_file) as fh:
-                content: Dict = json.loads(fh.read())
-                project_id = content.get('project_id')
-                if project_id:
-                    return project_id
-
-        def _resolve_id_from_report_dir(directory):
-            target_file = 'run.json'
-
-            for root, dirs, files in os.walk(directory):
-                if target_file in files:
-                    file_path = os.path.join(root, target_file)
-                    telemetry_id = _extract_id(file_path)
-                    if telemetry_id:
-                        return telemetry_id
-
-        return _resolve_id_from_report_dir(output_dir)
+        # read the project id from the run index without writing it or scanning the run.json files
+        from piperider_cli.runindex import RunIndex
+        return RunIndex(output_dir).find_project_id()
 
     @staticmethod
     def resolve_from_cloud_state(configuration: "Configuration"):
@@ -310,6 +294,45 @@ class Configuration(object):
             if not isinstance(duplicate_rows, bool):
                 raise PipeRiderConfigTypeError("profiler 'duplicateRows' should be an boolean")
 
+            engine = self.profiler_config.get('engine', 'sql')
+            if engine not in ['sql', 'arrow']:
+                raise PipeRiderConfigTypeError("profiler 'engine' should be one of 'sql' or 'arrow'")
+
+            mode = self.profiler_config.get('mode', 'full')
+            if mode not in ['full', 'estimate']:
+                raise PipeRiderConfigTypeError("profiler 'mode' should be one of 'full' or 'estimate'")
+
+            budget = self.profiler_config.get('budget', {}) or {}
+            for key in ['maxBytesPerTable', 'maxBytesTotal']:
+                if not isinstance(budget.get(key, 0), int):
+                    raise PipeRiderConfigTypeError(f"profiler budget '{key}' should be an integer")
+            for key in ['maxSecondsPerTable', 'maxSecondsTotal']:
+                if not isinstance(budget.get(key, 0), (int, float)):
+                    raise PipeRiderConfigTypeError(f"profiler budget '{key}' should be a number")
+
+            batch = self.profiler_config.get('batch', {}) or {}
+            for key in ['size', 'waitMilli']:
+                if not isinstance(batch.get(key, 0), int):
+                    raise PipeRiderConfigTypeError(f"profiler batch '{key}' should be an integer")
+
+            query = self.profiler_config.get('query', {}) or {}
+            for key in ['approxDistinct', 'groupingSets']:
+                if not isinstance(query.get(key, False), bool):
+                    raise PipeRiderConfigTypeError(f"profiler query '{key}' should be a boolean")
+            if not isinstance(query.get('samplePercent', 100), (int, float)):
+                raise PipeRiderConfigTypeError("profiler query 'samplePercent' should be a number")
+
+            metrics = self.profiler_config.get('metrics', {}) or {}
+            if metrics.get('select', 'all') not in ['all', 'auto']:
+                raise PipeRiderConfigTypeError("profiler metrics 'select' should be one of 'all' or 'auto'")
+            if not isinstance(metrics.get('report', []), list):
+                raise PipeRiderConfigTypeError("profiler metrics 'report' should be a list")
+            for table_name, table_metrics in (metrics.get('tables', {}) or {}).items():
+                table_metrics = table_metrics or {}
+                if not isinstance(table_metrics.get('metrics', []), list) or \
+                        not all(isinstance(v, list) for v in (table_metrics.get('columns', {}) or {}).values()):
+                    raise PipeRiderConfigTypeError(f"profiler metrics of the table '{table_name}' should be lists")
+
         if self.includes is not None:
             if not isinstance(self.includes, List):
                 raise PipeRiderConfigTypeError("'includes' should be a list of tables' name")
@@ -3,17 +3,26 @@ import re
 import sys
 import threading
 from abc import ABCMeta, abstractmethod
-from typing import List, Dict, Callable
+from typing import List, Dict, Callable, Optional
 
 import inquirer
 import readchar
 from rich.console import Console
 from rich.prompt import Prompt
-from sqlalchemy import create_engine, select, text
-from sqlalchemy.pool import SingletonThreadPool
+from sqlalchemy import create_engine, select, text, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import SingletonThreadPool, QueuePool
 
 import piperider_cli.hack.datasource_inquirer_prompt as datasource_prompt
+from piperider_cli.error import PipeRiderConnectorError
+from piperider_cli.tracing import Tracer
+from .cancellation import QueryRegistry
+from .concurrency import AdaptiveConcurrencyLimiter
+from .cost import CostTracker
 from .field import DataSourceField
+from .pool import PoolStatistics, timed_pool_class, listen_pool_connect, warm_up_pool
+
+DEFAULT_THREADS = 5
 
 
 def _should_use_fancy_user_input() -> bool:
@@ -43,6 +52,10 @@ class DataSource(metaclass=ABCMeta):
         self.credential_source = 'credentials'
         self._cached_engine = {}
         self._cached_lock = threading.Lock()
+        self.pool_statistics = PoolStatistics()
+        self._limiter = None
+        self.query_registry = QueryRegistry(self.cancel_query)
+        self.cost_tracker = CostTracker(self.query_cost, self.resolve_query_costs, self.label_queries)
 
     def _validate_required_fields(self):
         reasons = []
@@ -90,7 +103,113 @@ class DataSource(metaclass=ABCMeta):
         return
 
     def create_engine(self, database=None):
-        return create_engine(self.to_database_url(database=database), **self.engine_args())
+        url = make_url(self.to_database_url(database=database))
+        args = self.engine_args()
+        pool_class = args.get('poolclass') or url.get_dialect().get_pool_class(url)
+        if issubclass(pool_class, QueuePool):
+            # keep a pooled connection for each profiler or metric thread
+            args.setdefault('pool_size', max(self.credential.get('threads') or DEFAULT_THREADS,
+                                             self.credential.get('max_threads') or 0))
+            args.update(self.pool_args())
+            if self.credential.get('pool_pre_ping') is not None:
+                args['pool_pre_ping'] = bool(self.credential.get('pool_pre_ping'))
+            if self.credential.get('pool_recycle') is not None:
+                args['pool_recycle'] = int(self.credential.get('pool_recycle'))
+        args['poolclass'] = timed_pool_class(pool_class, self.pool_statistics)
+
+        engine = create_engine(url, **args)
+        listen_pool_connect(engine, self.pool_statistics)
+        self.query_registry.track(engine, timeout=self.statement_timeout)
+        self.cost_tracker.track(engine)
+        Tracer().track(engine)
+        if self.statement_timeout:
+            event.listen(engine, 'connect', lambda dbapi_connection, connection_record: self.set_statement_timeout(
+                dbapi_connection, self.statement_timeout))
+        return engine
+
+    @property
+    def statement_timeout(self) -> Optional[float]:
+        """
+        the timeout in seconds of a single query. It is set by the 'statement_timeout' field
+        """
+        return self.credential.get('statement_timeout')
+
+    def set_statement_timeout(self, dbapi_connection, seconds: float):
+        """
+        set the timeout of the warehouse session. The data sources without one rely on cancelling the query
+        """
+        pass
+
+    def cancel_query(self, dbapi_connection, cursor):
+        """
+        cancel the in-flight query by the driver
+        """
+        if hasattr(dbapi_connection, 'cancel'):
+            # psycopg2
+            dbapi_connection.cancel()
+        elif hasattr(dbapi_connection, 'interrupt'):
+            # sqlite3 and duckdb
+            dbapi_connection.interrupt()
+
+    def query_cost(self, dbapi_connection, cursor) -> dict:
+        """
+        the native cost counters of the executed query, e.g. 'bytes_billed', or the 'query_id' to resolve them from
+        the query history
+        """
+        return {}
+
+    def label_queries(self, dbapi_connection, label: Optional[str]) -> bool:
+        """
+        label the following queries of the session in the query history, or clear the label if it is None. The
+        queries without their own query id are resolved by the label
+
+        :return: whether the queries are labeled
+        """
+        return False
+
+    def resolve_query_costs(self, conn, query_ids: List[str]) -> Dict[str, dict]:
+        """
+        the native cost counters of each query by its 'query_id', from the query history of the warehouse
+        """
+        return {}
+
+    def pool_args(self):
+        """
+        the default pool settings of the data source. They could be overridden by the 'pool_pre_ping' and
+        'pool_recycle' fields
+        """
+        return dict(pool_pre_ping=False, pool_recycle=-1)
+
+    def warm_up_pool(self, database=None) -> int:
+        """
+        open the pooled connections in parallel before profiling
+        :return: the number of opened connections
+        """
+        return warm_up_pool(self.get_engine_by_database(database))
+
+    def to_async_database_url(self, database):
+        """
+        build a database url for sqlalchemy create_async_engine method
+        :return: None if the data source has no asyncio driver
+        """
+        return None
+
+    def create_async_engine(self, database=None):
+        from sqlalchemy.ext.asyncio import create_async_engine
+        try:
+            engine = create_async_engine(self.to_async_database_url(database=database), **self.async_engine_args())
+            self.cost_tracker.track(engine.sync_engine)
+            Tracer().track(engine.sync_engine)
+            return engine
+        except ImportError as e:
+            raise PipeRiderConnectorError(str(e), 'async')
+
+    @property
+    def use_async(self) -> bool:
+        """
+        whether to run the queries by the asyncio driver. It is enabled by the 'async' field of the data source
+        """
+        return bool(self.credential.get('async')) and self.to_async_database_url(None) is not None
 
     def get_engine_by_database(self, database=None):
         engine = self._cached_engine.get(database)
@@ -108,13 +227,38 @@ class DataSource(metaclass=ABCMeta):
         if self.credential.get('threads'):
             return self.credential.get('threads')
         elif not isinstance(self.get_engine_by_database().pool, SingletonThreadPool):
-            return 5
+            return DEFAULT_THREADS
         else:
             return 1
 
+    @property
+    def max_threads(self):
+        """
+        the upper bound of the concurrent queries. It is 'max_threads' if the adaptive concurrency is enabled
+        """
+        return max(self.threads, self.credential.get('max_threads') or 0)
+
+    def get_limiter(self) -> Optional[AdaptiveConcurrencyLimiter]:
+        """
+        the adaptive concurrency limiter shared by the profiler and the metric engine. It is enabled by the
+        'max_threads' field, and the concurrency starts from 'threads'
+        """
+        if not self.credential.get('max_threads'):
+            return None
+        if self._limiter is None:
+            self._limiter = AdaptiveConcurrencyLimiter(self.threads,
+                                                       min_limit=self.credential.get('min_threads', 1),
+                                                       max_limit=self.max_threads)
+            # the latency is sampled per statement by the cursor hooks of the cost tracker
+            self.cost_tracker.on_statement = self._limiter.on_success
+        return self._limiter
+
     def engine_args(self):
         return dict()
 
+    def async_engine_args(self):
+        return self.engine_args()
+
     def show_installation_information(self):
         from rich.markup import escape
         err = self.verify_connector()
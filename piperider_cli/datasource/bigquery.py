@@ -224,6 +224,31 @@ class BigQueryDataSource(DataSource):
             args['credentials_info'] = self.credential.get('keyfile_json', {})
         return args
 
+    def set_statement_timeout(self, dbapi_connection, seconds: float):
+        from google.cloud.bigquery import QueryJobConfig
+        client = dbapi_connection._client
+        job_config = client.default_query_job_config or QueryJobConfig()
+        job_config.job_timeout_ms = int(seconds * 1000)
+        client.default_query_job_config = job_config
+
+    def cancel_query(self, dbapi_connection, cursor):
+        query_job = getattr(cursor, '_query_job', None)
+        if query_job is not None:
+            query_job.cancel()
+
+    def query_cost(self, dbapi_connection, cursor) -> dict:
+        query_job = getattr(cursor, '_query_job', None)
+        if query_job is None:
+            return {}
+        # the records read by the input stages of the query plan
+        rows = [stage.records_read for stage in query_job.query_plan or [] if stage.name.endswith('Input')]
+        return {
+            'rows': sum(rows) if rows else None,
+            'bytes_scanned': query_job.total_bytes_processed,
+            'bytes_billed': query_job.total_bytes_billed,
+            'slot_milli': query_job.slot_millis,
+        }
+
     def verify_connector(self):
         try:
             import sqlalchemy_bigquery
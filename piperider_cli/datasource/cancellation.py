@@ -0,0 +1,215 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+# the errors of the statement timeouts and the cancelled queries by the drivers
+TIMEOUT_PATTERNS = [
+    # postgres and redshift
+    'canceling statement due to statement timeout',
+    'canceling statement due to user request',
+    'querycanceled',
+    # snowflake
+    'reached its statement or warehouse timeout',
+    'sql execution canceled',
+    # bigquery
+    'job execution was cancelled',
+]
+
+# set on the errors of the queries cancelled by the registry
+CANCELLED_ATTR = 'piperider_cancelled'
+
+
+def is_timeout_error(e: BaseException) -> bool:
+    """
+    Whether the query is timed out by the client, cancelled by the registry or stopped by the statement timeout of
+    the warehouse.
+    """
+    if isinstance(e, asyncio.TimeoutError):
+        return True
+    if getattr(e, CANCELLED_ATTR, False) or getattr(getattr(e, 'orig', None), CANCELLED_ATTR, False):
+        return True
+    message = f'{type(e).__name__} {e}'.lower()
+    return any(pattern in message for pattern in TIMEOUT_PATTERNS)
+
+
+class _Watchdog:
+    """
+    A single thread expiring the statements by a heap of their deadlines, instead of a timer thread per statement.
+    The thread exits when there is no deadline to wait for. The deadlines are of time.perf_counter().
+    """
+
+    def __init__(self, on_expired: Callable[[any, any], None]):
+        self._on_expired = on_expired
+        self._deadlines = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, deadline: float, fairy, cursor):
+        with self._condition:
+            heapq.heappush(self._deadlines, (deadline, next(self._sequence), fairy, cursor))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='piperider-watchdog', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._deadlines and self._deadlines[0][0] > time.perf_counter():
+                    self._condition.wait(self._deadlines[0][0] - time.perf_counter())
+                if not self._deadlines:
+                    self._thread = None
+                    return
+                _, _, fairy, cursor = heapq.heappop(self._deadlines)
+            # the finished statements are skipped by the callback
+            self._on_expired(fairy, cursor)
+
+
+class QueryRegistry:
+    """
+    QueryRegistry tracks the in-flight queries of the engines, so they could be cancelled by the driver when a query
+    is timed out or the run is interrupted. The errors of the cancelled queries are marked for 'is_timeout_error'.
+    """
+
+    def __init__(self, cancel_query: Callable[[any, any], None]):
+        self._cancel_query = cancel_query
+        self._running: Dict[any, Tuple[any, any]] = {}
+        self._deadlines: Dict[any, float] = {}
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._watchdog = _Watchdog(self._on_timeout)
+
+    def track(self, engine: Engine, timeout: Optional[float] = None):
+        """
+        :param timeout: cancel the statements running longer than it in seconds. It is timed from the start of each
+            statement on its thread, on top of the statement timeout of the warehouse session
+        """
+
+        def _on_execute(conn, cursor, statement, parameters, context, executemany):
+            self._on_execute(conn, cursor, timeout)
+
+        event.listen(engine, 'before_cursor_execute', _on_execute)
+        event.listen(engine, 'after_cursor_execute', self._on_executed)
+        event.listen(engine, 'handle_error', self._on_error)
+
+    def _on_execute(self, conn, cursor, timeout: Optional[float]):
+        # keyed by the pooled connection, which is shared by the connections branched by execution options
+        fairy = conn.connection
+        dbapi_connection = getattr(fairy, 'dbapi_connection', None) or fairy.connection
+        deadlines = [time.perf_counter() + timeout] if timeout else []
+        with self._lock:
+            self._running[fairy] = (dbapi_connection, cursor)
+            self._cancelled.discard(fairy)
+            if fairy in self._deadlines:
+                deadlines.append(self._deadlines[fairy])
+        if deadlines:
+            self._watchdog.watch(min(deadlines), fairy, cursor)
+
+    def _on_executed(self, conn, cursor, statement, parameters, context, executemany):
+        self._finish(conn.connection)
+
+    def _on_error(self, exception_context):
+        if exception_context.connection is None:
+            return
+        if self._finish(exception_context.connection.connection):
+            for e in (exception_context.sqlalchemy_exception, exception_context.original_exception):
+                if e is not None:
+                    setattr(e, CANCELLED_ATTR, True)
+
+    def _finish(self, fairy) -> bool:
+        """
+        Untrack the finished query.
+
+        :return: whether it was cancelled by the registry
+        """
+        with self._lock:
+            self._running.pop(fairy, None)
+            cancelled = fairy in self._cancelled
+            self._cancelled.discard(fairy)
+        return cancelled
+
+    def _on_timeout(self, fairy, cursor):
+        with self._lock:
+            query = self._running.get(fairy)
+            if query is None or query[1] is not cursor:
+                # the statement is finished in the meantime
+                return
+        self._cancel(fairy)
+
+    def _cancel(self, fairy) -> bool:
+        with self._lock:
+            query = self._running.pop(fairy, None)
+            if query is None:
+                return False
+            self._cancelled.add(fairy)
+        try:
+            self._cancel_query(*query)
+        except Exception:
+            # the query could be finished in the meantime
+            pass
+        return True
+
+    def running(self) -> int:
+        with self._lock:
+            return len(self._running)
+
+    def cancel(self, conn: Connection) -> bool:
+        """
+        Cancel the in-flight query of the connection.
+
+        :return: whether there is a query to cancel
+        """
+        try:
+            fairy = conn.connection
+        except Exception:
+            # the connection is closed
+            return False
+        return self._cancel(fairy)
+
+    def cancel_all(self) -> int:
+        """
+        Cancel all the in-flight queries.
+
+        :return: the number of cancelled queries
+        """
+        with self._lock:
+            fairies = list(self._running.keys())
+        return len([fairy for fairy in fairies if self._cancel(fairy)])
+
+    @contextmanager
+    def deadline(self, conn: Connection, deadline: Optional[float]):
+        """
+        Cancel the statements of the connection which are still running at the deadline of time.perf_counter(), e.g.
+        the time budget of the table.
+        """
+        if deadline is None:
+            yield
+            return
+
+        fairy = conn.connection
+        with self._lock:
+            self._deadlines[fairy] = deadline
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._deadlines.pop(fairy, None)
+
+    @contextmanager
+    def cancel_on_interrupt(self):
+        """
+        Cancel all the in-flight queries when the run is interrupted, so they don't keep running after exit.
+        """
+        try:
+            yield
+        except KeyboardInterrupt:
+            self.cancel_all()
+            raise
@@ -0,0 +1,142 @@
+import asyncio
+import statistics
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
+MIN_WINDOW = 5
+MAX_THROTTLED_RETRIES = 3
+
+THROTTLING_PATTERNS = [
+    'ratelimitexceeded',
+    'quotaexceeded',
+    'resources exceeded',
+    'too many connections',
+    'too many requests',
+    'toomanyrequests',
+    'concurrency limit',
+    'queued',
+    'wlm',
+    'throttl',
+]
+
+
+def is_throttling_error(e: BaseException) -> bool:
+    """
+    Whether the error is raised because the warehouse is overloaded, e.g. the BigQuery rateLimitExceeded, the
+    Snowflake queued statements or the Redshift WLM queue timeout.
+    """
+    message = f'{type(e).__name__} {e}'.lower()
+    return any(pattern in message for pattern in THROTTLING_PATTERNS)
+
+
+@dataclass
+class LimitDecision:
+    timestamp: float
+    old_limit: int
+    new_limit: int
+    reason: str
+
+    def __str__(self):
+        return f'{self.old_limit} -> {self.new_limit}: {self.reason}'
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AdaptiveConcurrencyLimiter limits the in-flight queries by AIMD. The limit increases by one while the median query
+    latency stays flat, and it is multiplied by the backoff factor on a latency spike or a throttling error.
+
+    The latency is sampled per statement by the cursor hooks of the data source, not per job, since a job runs a
+    different number of statements by its column type.
+    """
+
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: int = None, tolerance: float = 2.0,
+                 backoff: float = 0.5, retry_delay: float = 1.0):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(max_limit or initial, self.min_limit)
+        self.limit = min(max(initial, self.min_limit), self.max_limit)
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.retry_delay = retry_delay
+        self.in_flight = 0
+        self.decisions: List[LimitDecision] = []
+        self._baseline: Optional[float] = None
+        self._latencies: List[float] = []
+        self._loop = None
+        self._condition = None
+        # the statements are sampled in the executor threads
+        self._lock = threading.Lock()
+
+    def _get_condition(self) -> asyncio.Condition:
+        # the profiler and the metric engine run in their own event loops
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _set_limit(self, limit: int, reason: str):
+        limit = min(max(limit, self.min_limit), self.max_limit)
+        if limit != self.limit:
+            self.decisions.append(LimitDecision(time.time(), self.limit, limit, reason))
+            self.limit = limit
+        self._latencies = []
+
+    def on_success(self, latency: float):
+        """
+        Sample the latency of an executed statement.
+        """
+        with self._lock:
+            self._latencies.append(latency)
+            if len(self._latencies) < max(self.limit, MIN_WINDOW):
+                return
+
+            median = statistics.median(self._latencies)
+            if self._baseline is None or median < self._baseline:
+                self._baseline = median
+            if median > self._baseline * self.tolerance:
+                self._set_limit(int(self.limit * self.backoff),
+                                f'latency spike (median {median:.3f}s, baseline {self._baseline:.3f}s)')
+            else:
+                self._set_limit(self.limit + 1, f'latency flat (median {median:.3f}s)')
+
+    def on_throttled(self, e: BaseException):
+        with self._lock:
+            self._set_limit(int(self.limit * self.backoff), f'throttled ({type(e).__name__}: {e})')
+
+    async def acquire(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self):
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    async def run(self, func: Callable[[], Awaitable]):
+        """
+        Run the job within the limit. The throttled job is retried after backing off.
+        """
+        attempt = 0
+        while True:
+            await self.acquire()
+            try:
+                return await func()
+            except Exception as e:
+                if attempt >= MAX_THROTTLED_RETRIES or not is_throttling_error(e):
+                    raise
+                self.on_throttled(e)
+            finally:
+                await self.release()
+            attempt += 1
+            await asyncio.sleep(self.retry_delay * attempt)
+
+    def __str__(self):
+        increases = len([d for d in self.decisions if d.new_limit > d.old_limit])
+        decreases = len(self.decisions) - increases
+        return f'limit={self.limit} (min={self.min_limit}, max={self.max_limit}), ' \
+               f'increases={increases}, decreases={decreases}'
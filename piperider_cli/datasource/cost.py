@@ -0,0 +1,158 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+# the native counters of the warehouses, summed over the queries
+COST_COUNTERS = ['rows', 'bytes_scanned', 'bytes_billed', 'slot_milli']
+
+
+class QueryCost:
+    """
+    QueryCost accumulates the number, the duration and the native cost counters of the executed queries.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.elapsed_milli = 0
+        self.counters: Dict[str, int] = {}
+        self.query_ids: List[str] = []
+        self._lock = threading.Lock()
+
+    def add(self, cost: dict):
+        """
+        Add the cost of a query or the aggregated cost of the 'to_dict' format.
+        """
+        with self._lock:
+            self.queries += cost.get('queries', 0)
+            self.elapsed_milli += cost.get('elapsed_milli', 0)
+            for counter in COST_COUNTERS:
+                if cost.get(counter) is not None:
+                    self.counters[counter] = self.counters.get(counter, 0) + int(cost.get(counter))
+            if cost.get('query_id'):
+                self.query_ids.append(cost.get('query_id'))
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return dict(queries=self.queries, elapsed_milli=self.elapsed_milli, **self.counters)
+
+    @staticmethod
+    def sum(costs: List[Optional[dict]]) -> dict:
+        total = QueryCost()
+        for cost in costs:
+            if cost:
+                total.add(cost)
+        return total.to_dict()
+
+
+def cost_rank(cost: dict) -> tuple:
+    """
+    The sort key of the most expensive first. The billed bytes come first, then the scanned bytes and the duration.
+    """
+    return cost.get('bytes_billed') or 0, cost.get('bytes_scanned') or 0, cost.get('elapsed_milli') or 0
+
+
+class CostTracker:
+    """
+    CostTracker records the duration and the native cost counters of the queries executed by the tracked engines.
+    The queries are attributed to the QueryCost of their connection scope.
+    """
+
+    def __init__(self, query_cost: Callable[[any, any], dict],
+                 resolve_query_costs: Callable[[Connection, List[str]], Dict[str, dict]],
+                 label_queries: Callable[[any, Optional[str]], bool] = None):
+        self._query_cost = query_cost
+        self._resolve_query_costs = resolve_query_costs
+        self._label_queries = label_queries
+        self._started: Dict[Connection, float] = {}
+        self._scopes: Dict[any, QueryCost] = {}
+        self._lock = threading.Lock()
+        # called with the latency of every executed statement, e.g. by the concurrency limiter
+        self.on_statement: Optional[Callable[[float], None]] = None
+
+    def track(self, engine: Engine):
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+        event.listen(engine, 'after_cursor_execute', self._on_executed)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self._started[conn] = time.perf_counter()
+
+    def _on_executed(self, conn, cursor, statement, parameters, context, executemany):
+        # the scopes are keyed by the pooled connection, which is shared by the connections branched by execution
+        # options
+        fairy = conn.connection
+        with self._lock:
+            started = self._started.pop(conn, None)
+            cost = self._scopes.get(fairy)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if self.on_statement is not None:
+            self.on_statement(elapsed)
+        if cost is None:
+            return
+
+        query = {'queries': 1, 'elapsed_milli': int(elapsed * 1000)}
+        try:
+            dbapi_connection = getattr(fairy, 'dbapi_connection', None) or fairy.connection
+            query.update(self._query_cost(dbapi_connection, cursor) or {})
+        except Exception:
+            # the cost counters are optional
+            pass
+        cost.add(query)
+
+    @contextmanager
+    def scope(self, conn: Connection, cost: Optional[QueryCost]):
+        """
+        Attribute the queries executed by the connection to the cost. The counters only available from the query
+        history of the warehouse are added later by 'resolve'. If the data source labels the queries, the label of the
+        scope is the query id of its queries.
+        """
+        if cost is None:
+            yield
+            return
+
+        fairy = conn.connection
+        dbapi_connection = getattr(fairy, 'dbapi_connection', None) or fairy.connection
+        label = self._label(dbapi_connection, f'pr{uuid.uuid4().hex[:12]}')
+        with self._lock:
+            self._scopes[fairy] = cost
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._scopes.pop(fairy, None)
+            if label is not None:
+                self._label(dbapi_connection, None)
+                cost.add({'query_id': label})
+
+    def _label(self, dbapi_connection, label: Optional[str]) -> Optional[str]:
+        if self._label_queries is None:
+            return None
+        try:
+            return label if self._label_queries(dbapi_connection, label) else None
+        except Exception:
+            # the cost counters are optional
+            return None
+
+    def resolve(self, conn: Connection, costs: List[QueryCost]):
+        """
+        Add the counters only available from the query history of the warehouse to the costs, by a single lookup of
+        all their queries, e.g. once per table instead of once per column.
+        """
+        query_ids = [query_id for cost in costs for query_id in cost.query_ids]
+        if not query_ids:
+            return
+        try:
+            resolved = self._resolve_query_costs(conn, query_ids) or {}
+        except Exception:
+            # the cost counters are optional
+            resolved = {}
+        for cost in costs:
+            query_ids, cost.query_ids = cost.query_ids, []
+            cost.add(QueryCost.sum([resolved.get(query_id) for query_id in query_ids]))
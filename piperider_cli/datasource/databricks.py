@@ -1,3 +1,7 @@
+from typing import Dict, List
+
+import requests
+
 from . import DataSource
 from .field import TextField
 from ..error import PipeRiderConnectorError
@@ -43,6 +47,28 @@ class DataBricksDataSource(DataSource):
 
         return dict(connect_args=args)
 
+    def pool_args(self):
+        return dict(pool_pre_ping=False, pool_recycle=1800)
+
+    def query_cost(self, dbapi_connection, cursor) -> dict:
+        return {'query_id': getattr(cursor, 'query_id', None)}
+
+    def resolve_query_costs(self, conn, query_ids: List[str]) -> Dict[str, dict]:
+        # the query metrics are only available from the query history API of the workspace
+        credential = self.credential
+        response = requests.get(f"https://{credential.get('host')}/api/2.0/sql/history/queries",
+                                headers={'Authorization': f"Bearer {credential.get('token')}"},
+                                json={'filter_by': {'statement_ids': query_ids}, 'include_metrics': True,
+                                      'max_results': len(query_ids)},
+                                timeout=10)
+        response.raise_for_status()
+        costs = {}
+        for query in response.json().get('res', []):
+            metrics = query.get('metrics', {})
+            costs[query.get('query_id')] = {'rows': metrics.get('rows_read_count'),
+                                            'bytes_scanned': metrics.get('read_bytes')}
+        return costs
+
     def _get_display_description(self):
         cred = self.credential
         return f"type={self.type_name}, database={cred.get('catalog')}, schema={cred.get('schema')}"
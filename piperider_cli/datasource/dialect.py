@@ -0,0 +1,202 @@
+import math
+import sqlite3
+from typing import Dict, List, Optional
+
+from sqlalchemy import Float, func, literal_column, text
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.expression import FromClause
+
+
+class Dialect:
+    """
+    Dialect declares the fast primitives supported by a backend and builds the SQL expressions of them. The profiler
+    and the metrics engine pick the query plan by the declared capabilities instead of the backend names.
+    """
+
+    # the approximate distinct count function, e.g. approx_count_distinct(c)
+    approx_distinct: Optional[str] = None
+    # the equal-width bucket function, width_bucket(c, lower, upper, n)
+    width_bucket = False
+    # the quantiles are aggregated by the backend, otherwise they are queried by the window functions or one by one
+    native_quantiles = True
+    window_functions = True
+    # the sampling method and the unit of the sample size of the TABLESAMPLE clause
+    tablesample: Optional[str] = None
+    tablesample_unit = ''
+    # the 64-bit hash function of multiple values, e.g. hash(c1, c2, c3). The duplicate rows are counted by the
+    # hashes, so a narrower hash would count its collisions as duplicates
+    hash_function: Optional[str] = None
+    grouping_sets = False
+    native_stddev = True
+    # the number of the small aggregate queries combined into a round trip, for the backends with high query latency
+    batch_size = 1
+
+    def stddev(self, column) -> ColumnElement:
+        """
+        The sample standard deviation. Without the native stddev, it is the sample variance, which is converted by
+        'stddev_value' after fetched.
+        """
+        if self.native_stddev:
+            return func.stddev(func.cast(column, Float))
+        return (func.count(column) * func.sum(func.cast(column, Float) * func.cast(column, Float)) - func.sum(
+            column) * func.sum(column)) / ((func.count(column) - 1) * func.count(column))
+
+    def stddev_value(self, value):
+        if self.native_stddev or value is None:
+            return value
+        return math.sqrt(value)
+
+    def quantiles(self, column, percentiles: List[float]) -> List[ColumnElement]:
+        # select percentile_disc(0.05) within group (order by column), ... from table
+        return [func.percentile_disc(percentile).within_group(column) for percentile in percentiles]
+
+    def bucket(self, column, lower, upper, num_buckets: int) -> ColumnElement:
+        """
+        The zero-based bucket of the equal-width buckets. The upper bound belongs to the last bucket.
+        """
+        bucket = func.width_bucket(func.cast(column, Float), lower, upper, num_buckets)
+        return func.least(bucket, num_buckets) - 1
+
+    def approx_count_distinct(self, column) -> ColumnElement:
+        return getattr(func, self.approx_distinct)(column)
+
+    def row_hash(self, *columns) -> ColumnElement:
+        return getattr(func, self.hash_function)(*columns)
+
+    def sample(self, table: FromClause, percent: float) -> FromClause:
+        sampling = getattr(func, self.tablesample)(literal_column(f'{percent}{self.tablesample_unit}'))
+        return table.tablesample(sampling)
+
+    def date_trunc(self, date_part: str, date_expression) -> ColumnElement:
+        return func.date_trunc(date_part, date_expression)
+
+    def interval(self, grain: str, n: int):
+        if grain == 'quarter':
+            return text(f"interval '{n * 3} months'")
+        return text(f"interval '{n} {grain}s'")
+
+
+class SqliteDialect(Dialect):
+    native_quantiles = False
+    native_stddev = False
+
+    def __init__(self):
+        # window functions are supported since sqlite 3.25.0, see https://www.sqlite.org/windowfunctions.html
+        version = sqlite3.sqlite_version.split(".")
+        major = int(version[0]) if len(version) >= 2 else 0
+        minor = int(version[1]) if len(version) >= 2 else 0
+        self.window_functions = major > 3 or (major == 3 and minor >= 25)
+
+    def date_trunc(self, date_part: str, date_expression) -> ColumnElement:
+        if date_part.upper() == "YEAR":
+            return func.strftime("%Y-01-01", date_expression)
+        elif date_part.upper() == "MONTH":
+            return func.strftime("%Y-%m-01", date_expression)
+        else:
+            return func.strftime("%Y-%m-%d", date_expression)
+
+
+class DuckDBDialect(Dialect):
+    approx_distinct = 'approx_count_distinct'
+    tablesample = 'bernoulli'
+    tablesample_unit = '%'
+    hash_function = 'hash'
+    grouping_sets = True
+
+    def quantiles(self, column, percentiles: List[float]) -> List[ColumnElement]:
+        return [func.approx_quantile(column, literal_column(f"{percentile}")) for percentile in percentiles]
+
+
+class BigQueryDialect(Dialect):
+    approx_distinct = 'approx_count_distinct'
+    tablesample = 'system'
+    tablesample_unit = ' PERCENT'
+    grouping_sets = True
+
+    def quantiles(self, column, percentiles: List[float]) -> List[ColumnElement]:
+        # BigQuery does not support WITHIN, change to use over
+        #   Ref: https://github.com/great-expectations/great_expectations/blob/develop/great_expectations/dataset/sqlalchemy_dataset.py#L1019:9
+        return [func.percentile_disc(column, percentile).over() for percentile in percentiles]
+
+    def date_trunc(self, date_part: str, date_expression) -> ColumnElement:
+        return func.date_trunc(date_expression, text(date_part))
+
+    def interval(self, grain: str, n: int):
+        return text(f"interval {n} {grain}")
+
+
+class SnowflakeDialect(Dialect):
+    approx_distinct = 'approx_count_distinct'
+    width_bucket = True
+    tablesample = 'system'
+    hash_function = 'hash'
+    grouping_sets = True
+    batch_size = 10
+
+
+class PostgresDialect(Dialect):
+    width_bucket = True
+    tablesample = 'system'
+    grouping_sets = True
+
+
+class RedshiftDialect(Dialect):
+    grouping_sets = True
+
+    def quantiles(self, column, percentiles: List[float]) -> List[ColumnElement]:
+        # ref: https://docs.aws.amazon.com/redshift/latest/dg/r_APPROXIMATE_PERCENTILE_DISC.html
+        return [func.approximate_percentile_disc(percentile).within_group(column) for percentile in percentiles]
+
+
+class AthenaDialect(Dialect):
+    approx_distinct = 'approx_distinct'
+    width_bucket = True
+    tablesample = 'bernoulli'
+    grouping_sets = True
+
+    def quantiles(self, column, percentiles: List[float]) -> List[ColumnElement]:
+        return [func.approx_percentile(column, percentile) for percentile in percentiles]
+
+    def interval(self, grain: str, n: int):
+        if grain == 'week':
+            return text(f"interval '{n * 7}' day")
+        elif grain == 'quarter':
+            return text(f"interval '{n * 3}' month")
+        return text(f"interval '{n}' {grain}")
+
+
+class DatabricksDialect(Dialect):
+    approx_distinct = 'approx_count_distinct'
+    width_bucket = True
+    # hash() is 32-bit on Databricks
+    hash_function = 'xxhash64'
+    grouping_sets = True
+    batch_size = 10
+
+
+_dialects: Dict[str, Dialect] = {}
+_default_dialect = Dialect()
+
+
+def register_dialect(name: str, dialect: Dialect):
+    """
+    Register the dialect of a backend. The name is the backend name of the sqlalchemy url or the type of the data
+    source.
+    """
+    _dialects[name] = dialect
+
+
+def get_dialect(name: str) -> Dialect:
+    return _dialects.get(name, _default_dialect)
+
+
+register_dialect('sqlite', SqliteDialect())
+register_dialect('duckdb', DuckDBDialect())
+register_dialect('bigquery', BigQueryDialect())
+register_dialect('snowflake', SnowflakeDialect())
+register_dialect('postgresql', PostgresDialect())
+register_dialect('postgres', get_dialect('postgresql'))
+register_dialect('redshift', RedshiftDialect())
+register_dialect('awsathena', AthenaDialect())
+register_dialect('athena', get_dialect('awsathena'))
+register_dialect('databricks', DatabricksDialect())
@@ -212,14 +212,55 @@ class ParquetDataSource(DuckDBDataSource):
 
         return 'file', os.path.abspath(parquet_path)
 
+    def _fetch_from_cache(self, type, parquet_path):
+        """
+        Fetch the remote parquet file into the local block cache
+
+        :return: the local path of the cached file, or None to read the remote file by httpfs
+        """
+        credential = self.credential
+        if credential.get('cache', True) is False:
+            return None
+
+        from .remote_cache import RemoteBlockCache, HttpRemoteObject, S3RemoteObject, DEFAULT_CACHE_SIZE_LIMIT_MB
+        cache = RemoteBlockCache(cache_dir=credential.get('cache_dir'),
+                                 size_limit_mb=credential.get('cache_size_limit', DEFAULT_CACHE_SIZE_LIMIT_MB))
+        try:
+            if type == 'http':
+                return cache.fetch(HttpRemoteObject(parquet_path))
+
+            try:
+                import boto3
+            except ImportError:
+                return None
+            aws_access_key_id, aws_secret_access_key = get_aws_credentials()
+            client = boto3.client('s3',
+                                  aws_access_key_id=aws_access_key_id,
+                                  aws_secret_access_key=aws_secret_access_key,
+                                  region_name=get_s3_bucket_region(urlparse(parquet_path).netloc) or None)
+            return cache.fetch(S3RemoteObject(parquet_path, client=client))
+        except Exception as e:
+            console = Console()
+            console.print(f'[[bold yellow]WARNING[/bold yellow]] Skip the parquet cache: {str(e)}')
+            return None
+
     def create_engine(self, database=None):
         type, parquet_path = self._extract_parquet_path()
         engine = super().create_engine(database)
 
+        cached_path = None
+        if type in ['http', 's3']:
+            cached_path = self._fetch_from_cache(type, parquet_path)
+
         with engine.connect() as conn:
             trans = conn.begin()
 
-            if type == 'http':
+            if cached_path:
+                # Remote file served by the local cache
+                url = urlparse(parquet_path)
+                table_name = self._formalize_table_name(splitext(os.path.basename(url.path))[0])
+                parquet_path = cached_path
+            elif type == 'http':
                 # HTTP
                 conn.execute(text('INSTALL httpfs'))
                 conn.execute(text('LOAD httpfs'))
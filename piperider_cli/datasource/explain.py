@@ -0,0 +1,99 @@
+import json
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import visitors
+from sqlalchemy.sql.expression import TableClause
+
+
+@dataclass
+class QueryEstimate:
+    """
+    The estimated bytes and rows scanned by a query. None if the backend could not estimate it.
+    """
+    bytes: Optional[int] = None
+    rows: Optional[int] = None
+
+
+def sum_estimates(values: List[Optional[int]]) -> Optional[int]:
+    """
+    Sum the known estimates. None if none of them is known.
+    """
+    values = [value for value in values if value is not None]
+    return sum(values) if values else None
+
+
+def _compile(conn: Connection, stmt) -> str:
+    return str(stmt.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+
+
+def _explain_bigquery(conn: Connection, stmt) -> QueryEstimate:
+    from google.cloud.bigquery import QueryJobConfig
+    fairy = conn.connection
+    dbapi_connection = getattr(fairy, 'dbapi_connection', None) or fairy.connection
+    job = dbapi_connection._client.query(_compile(conn, stmt),
+                                         job_config=QueryJobConfig(dry_run=True, use_query_cache=False))
+    return QueryEstimate(bytes=job.total_bytes_processed)
+
+
+def _explain_snowflake(conn: Connection, stmt) -> QueryEstimate:
+    plan, = conn.exec_driver_sql(f'EXPLAIN USING JSON {_compile(conn, stmt)}').fetchone()
+    stats = json.loads(plan).get('GlobalStats', {})
+    return QueryEstimate(bytes=stats.get('bytesAssigned'))
+
+
+def _explain_postgres(conn: Connection, stmt) -> QueryEstimate:
+    # e.g. "Seq Scan on orders  (cost=0.00..35.50 rows=2550 width=4)"
+    rows = bytes = None
+    plan = [line for line, in conn.exec_driver_sql(f'EXPLAIN {_compile(conn, stmt)}').fetchall()]
+    for line in plan:
+        m = re.search(r'rows=(\d+) width=(\d+)', line)
+        if m is None or 'Scan' not in line:
+            continue
+        scan_rows, width = int(m.group(1)), int(m.group(2))
+        rows = max(rows or 0, scan_rows)
+        bytes = (bytes or 0) + scan_rows * width
+    return QueryEstimate(bytes=bytes, rows=rows)
+
+
+def _explain_duckdb(conn: Connection, stmt) -> QueryEstimate:
+    # the estimated cardinality of each operator, e.g. "EC: 1000"
+    plan = '\n'.join(row[-1] for row in conn.exec_driver_sql(f'EXPLAIN {_compile(conn, stmt)}').fetchall())
+    cardinalities = [int(n) for n in re.findall(r'EC: (\d+)', plan)]
+    return QueryEstimate(rows=max(cardinalities) if cardinalities else None)
+
+
+def _explain_sqlite(conn: Connection, stmt) -> QueryEstimate:
+    # sqlite has no estimate, but a row store scans the whole pages of the tables
+    tables = {element.name for element in visitors.iterate(stmt) if isinstance(element, TableClause)}
+    if not tables:
+        return QueryEstimate()
+    names = ', '.join(f"'{name}'" for name in sorted(tables))
+    size, = conn.exec_driver_sql(f'SELECT sum(pgsize) FROM dbstat WHERE name IN ({names})').fetchone()
+    return QueryEstimate(bytes=size)
+
+
+EXPLAIN_BACKENDS = {
+    'bigquery': _explain_bigquery,
+    'snowflake': _explain_snowflake,
+    'postgresql': _explain_postgres,
+    'redshift': _explain_postgres,
+    'duckdb': _explain_duckdb,
+    'sqlite': _explain_sqlite,
+}
+
+
+def explain_query(conn: Connection, stmt) -> QueryEstimate:
+    """
+    Estimate the query by the dry run or the EXPLAIN of the backend without executing it.
+    """
+    explain = EXPLAIN_BACKENDS.get(conn.engine.url.get_backend_name())
+    if explain is None:
+        return QueryEstimate()
+    try:
+        return explain(conn, stmt)
+    except Exception:
+        # the estimate is optional
+        return QueryEstimate()
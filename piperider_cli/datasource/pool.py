@@ -0,0 +1,91 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Type
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+
+
+class PoolStatistics:
+    """
+    PoolStatistics records how long the queries wait for a pooled connection and how many connections are opened.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'total_wait': self.total_wait,
+                'avg_wait': self.total_wait / self.checkouts if self.checkouts else 0.0,
+                'max_wait': self.max_wait,
+            }
+
+    def __str__(self):
+        stats = self.to_dict()
+        return f"checkouts={stats['checkouts']}, connects={stats['connects']}, " \
+               f"wait avg={stats['avg_wait']:.3f}s, max={stats['max_wait']:.3f}s"
+
+
+def timed_pool_class(pool_class: Type[Pool], statistics: PoolStatistics) -> Type[Pool]:
+    """
+    Subclass the pool class to record the checkout wait time. The subclass is kept when the pool is recreated.
+    """
+
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                statistics.record_checkout(time.perf_counter() - start)
+
+    TimedPool.__name__ = f'Timed{pool_class.__name__}'
+    return TimedPool
+
+
+def listen_pool_connect(engine: Engine, statistics: PoolStatistics):
+    event.listen(engine, 'connect', lambda dbapi_connection, connection_record: statistics.record_connect())
+
+
+def warm_up_pool(engine: Engine, size: int = None) -> int:
+    """
+    Open the pooled connections in parallel, so the handshakes are not paid by the first queries.
+
+    :return: the number of opened connections
+    """
+    if not isinstance(engine.pool, QueuePool):
+        return 0
+    size = size or engine.pool.size()
+
+    def _connect(_):
+        try:
+            return engine.connect()
+        except Exception:
+            # the queries report the connection error
+            return None
+
+    with ThreadPoolExecutor(max_workers=size) as executor:
+        connections = [conn for conn in executor.map(_connect, range(size)) if conn is not None]
+    for conn in connections:
+        conn.close()
+    return len(connections)
@@ -20,7 +20,7 @@ class PostgresDataSource(DataSource):
             raise ValueError('type name should be snowflake')
         return self._validate_required_fields()
 
-    def to_database_url(self, database):
+    def _to_database_url(self, driver, database):
         credential = self.credential
         host = credential.get('host')
         port = credential.get('port')
@@ -30,13 +30,40 @@ class PostgresDataSource(DataSource):
             database = credential.get('dbname')
         if database is None:
             database = credential.get('database')
-        return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}"
+        return f"postgresql+{driver}://{user}:{password}@{host}:{port}/{database}"
+
+    def to_database_url(self, database):
+        return self._to_database_url('psycopg2', database)
+
+    def to_async_database_url(self, database):
+        return self._to_database_url('asyncpg', database)
 
     def engine_args(self):
         credential = self.credential
         schema = credential.get('schema')
         return dict(connect_args={'connect_timeout': 5, 'options': '-csearch_path={}'.format(schema)})
 
+    def pool_args(self):
+        # the idle connections could be closed by the server or a proxy
+        return dict(pool_pre_ping=True, pool_recycle=-1)
+
+    def async_engine_args(self):
+        credential = self.credential
+        schema = credential.get('schema')
+        server_settings = {'search_path': schema} if schema else {}
+        if self.statement_timeout:
+            server_settings['statement_timeout'] = str(int(self.statement_timeout * 1000))
+        # the in-flight queries wait for a pooled connection instead of timing out
+        return dict(connect_args={'timeout': 5, 'server_settings': server_settings},
+                    pool_size=self.max_threads, max_overflow=0, pool_timeout=None)
+
+    def set_statement_timeout(self, dbapi_connection, seconds: float):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'SET statement_timeout = {int(seconds * 1000)}')
+        cursor.close()
+        # keep the setting when the pool rolls back the connection
+        dbapi_connection.commit()
+
     def verify_connector(self):
         try:
             import psycopg2
@@ -1,5 +1,6 @@
 import re
 from ipaddress import ip_network, ip_address
+from typing import Dict, List, Optional
 
 import requests
 from sqlalchemy import text
@@ -161,6 +162,36 @@ class RedshiftDataSource(DataSource):
         args = dict(connect_args={'connect_timeout': 5})
         return args
 
+    def pool_args(self):
+        return dict(pool_pre_ping=True, pool_recycle=3600)
+
+    def set_statement_timeout(self, dbapi_connection, seconds: float):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'SET statement_timeout = {int(seconds * 1000)}')
+        cursor.close()
+        # keep the setting when the pool rolls back the connection
+        dbapi_connection.commit()
+
+    def label_queries(self, dbapi_connection, label: Optional[str]) -> bool:
+        # the label is the query group of the session, which is recorded by stl_query
+        cursor = dbapi_connection.cursor()
+        if label is None:
+            cursor.execute('RESET query_group')
+        else:
+            cursor.execute(f"SET query_group TO '{label}'")
+        cursor.close()
+        return True
+
+    def resolve_query_costs(self, conn, query_ids: List[str]) -> Dict[str, dict]:
+        labels = ', '.join(f"'{label}'" for label in query_ids)
+        rows = conn.execute(text(
+            f"SELECT trim(q.label), sum(s.rows), sum(s.bytes) "
+            f"FROM stl_query q JOIN svl_query_summary s ON s.query = q.query "
+            f"WHERE trim(q.label) IN ({labels}) AND s.label LIKE 'scan%' "
+            f"GROUP BY trim(q.label)")).fetchall()
+        return {label: {'rows': rows_scanned, 'bytes_scanned': bytes_scanned}
+                for label, rows_scanned, bytes_scanned in rows}
+
     def verify_connector(self):
         try:
             import psycopg2
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from piperider_cli import PIPERIDER_USER_HOME
+
+DEFAULT_CACHE_DIR = os.path.join(PIPERIDER_USER_HOME, 'cache', 'parquet')
+DEFAULT_CACHE_SIZE_LIMIT_MB = 1024
+DEFAULT_BLOCK_SIZE = 8 * 1024 * 1024
+DEFAULT_MAX_WORKERS = 8
+# the seconds to connect to the server and to wait for the response of a request
+DEFAULT_TIMEOUT = 30
+
+
+class RemoteObject:
+    """
+    The remote object which supports the byte-range read.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def stat(self) -> Tuple[Optional[int], str]:
+        """
+        Get the size and the etag of the remote object
+
+        :return: (size, etag). The size is None if it is unknown without downloading the object
+        """
+        raise NotImplementedError
+
+    def download(self, size_limit: int) -> Optional[int]:
+        """
+        Download the whole object of the unknown size, which serves the following reads
+
+        :return: the size, or None if the object is larger than the limit
+        """
+        raise NotImplementedError
+
+    def read_range(self, start: int, end: int) -> bytes:
+        """
+        Read the bytes between start and end (inclusive)
+        """
+        raise NotImplementedError
+
+
+class HttpRemoteObject(RemoteObject):
+
+    def __init__(self, url: str, timeout: float = DEFAULT_TIMEOUT):
+        super().__init__(url)
+        self.timeout = timeout
+        # the whole content, if the server cannot serve the range requests
+        self._content: Optional[bytes] = None
+        self._ranged = False
+        self._lock = threading.Lock()
+
+    def _get(self, start: int = None, end: int = None) -> bytes:
+        headers = {'Range': f'bytes={start}-{end}'} if start is not None else {}
+        response = requests.get(self.url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        if response.status_code == 200:
+            # the whole content is returned, so it is kept to serve the other blocks
+            self._content = response.content
+            return self._content if start is None else self._content[start:end + 1]
+        return response.content
+
+    def stat(self):
+        response = requests.head(self.url, allow_redirects=True, timeout=self.timeout)
+        response.raise_for_status()
+        etag = response.headers.get('ETag') or response.headers.get('Last-Modified') or ''
+        size = response.headers.get('Content-Length')
+        # the server ignoring the range requests is detected by the first read, which keeps the whole content
+        return int(size) if size is not None else None, etag
+
+    def download(self, size_limit: int) -> Optional[int]:
+        chunks = []
+        size = 0
+        with requests.get(self.url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                size += len(chunk)
+                if size > size_limit:
+                    return None
+                chunks.append(chunk)
+        self._content = b''.join(chunks)
+        return size
+
+    def read_range(self, start: int, end: int) -> bytes:
+        if self._content is None and not self._ranged:
+            # the first request tells whether the server honors the range header, and the others wait for it
+            with self._lock:
+                if self._content is None and not self._ranged:
+                    content = self._get(start, end)
+                    self._ranged = self._content is None
+                    return content
+        if self._content is not None:
+            return self._content[start:end + 1]
+        return self._get(start, end)
+
+
+class S3RemoteObject(RemoteObject):
+
+    def __init__(self, url: str, client=None):
+        super().__init__(url)
+        s3_uri = urlparse(url)
+        self.bucket = s3_uri.netloc
+        self.key = s3_uri.path.lstrip('/')
+        self.client = client
+
+    def stat(self):
+        response = self.client.head_object(Bucket=self.bucket, Key=self.key)
+        return int(response['ContentLength']), response.get('ETag', '').strip('"')
+
+    def read_range(self, start: int, end: int) -> bytes:
+        response = self.client.get_object(Bucket=self.bucket, Key=self.key, Range=f'bytes={start}-{end}')
+        return response['Body'].read()
+
+
+class RemoteBlockCache:
+    """
+    RemoteBlockCache keeps the remote parquet files on the local disk, so the following runs read the footers and the
+    column chunks from the local file instead of downloading the whole object again.
+
+    A cache entry is keyed by the url and the etag of the remote object. The object is fetched as fixed size blocks by
+    parallel range requests, and the fetched byte ranges are recorded in the manifest of the entry. A partially
+    fetched entry is completed by the next fetch, and a changed etag invalidates the entry.
+    """
+
+    def __init__(self, cache_dir: str = None, size_limit_mb: int = DEFAULT_CACHE_SIZE_LIMIT_MB,
+                 block_size: int = DEFAULT_BLOCK_SIZE, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir or DEFAULT_CACHE_DIR))
+        self.size_limit = int(float(size_limit_mb) * 1024 * 1024)
+        self.block_size = block_size
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+
+    def _entry_paths(self, url: str, etag: str) -> Tuple[str, str, str]:
+        url_key = hashlib.sha256(url.encode()).hexdigest()
+        etag_key = hashlib.sha256(etag.encode()).hexdigest()[:16]
+        entry_dir = os.path.join(self.cache_dir, url_key)
+        return entry_dir, os.path.join(entry_dir, f'{etag_key}.parquet'), os.path.join(entry_dir, f'{etag_key}.json')
+
+    @staticmethod
+    def _load_manifest(manifest_path: str, etag: str, size: int) -> List[List[int]]:
+        if not os.path.exists(manifest_path):
+            return []
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except Exception:
+            return []
+        if manifest.get('etag') != etag or manifest.get('size') != size:
+            return []
+        return manifest.get('ranges', [])
+
+    @staticmethod
+    def _save_manifest(manifest_path: str, url: str, etag: str, size: int, ranges: List[List[int]]):
+        tmp_path = f'{manifest_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(dict(url=url, etag=etag, size=size, ranges=sorted(ranges)), f)
+        os.replace(tmp_path, manifest_path)
+
+    def _blocks(self, size: int) -> List[Tuple[int, int]]:
+        return [(start, min(start + self.block_size, size) - 1) for start in range(0, size, self.block_size)]
+
+    def fetch(self, remote: RemoteObject) -> Optional[str]:
+        """
+        Fetch the remote object into the cache
+
+        :return: the local path of the cached object, or None if the object cannot be cached
+        """
+        size, etag = remote.stat()
+        if not etag:
+            # the changed object could not be told from the cached one
+            return None
+        if size is None:
+            size = remote.download(self.size_limit)
+        if size is None or size > self.size_limit:
+            return None
+
+        entry_dir, data_path, manifest_path = self._entry_paths(remote.url, etag)
+        os.makedirs(entry_dir, exist_ok=True)
+
+        with self._lock:
+            fetched = {tuple(r) for r in self._load_manifest(manifest_path, etag, size)}
+            if not fetched and os.path.exists(data_path):
+                os.remove(data_path)
+            if not os.path.exists(data_path):
+                with open(data_path, 'wb') as f:
+                    f.truncate(size)
+
+            missing = [block for block in self._blocks(size) if block not in fetched]
+            if missing:
+                def _fetch_block(block):
+                    start, end = block
+                    content = remote.read_range(start, end)
+                    with open(data_path, 'r+b') as fh:
+                        fh.seek(start)
+                        fh.write(content)
+                    return block
+
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    try:
+                        for block in executor.map(_fetch_block, missing):
+                            fetched.add(block)
+                    finally:
+                        # keep the fetched blocks even if some of them failed
+                        self._save_manifest(manifest_path, remote.url, etag, size, [list(b) for b in fetched])
+            elif os.path.exists(manifest_path):
+                # touch the manifest to mark the entry as recently used
+                os.utime(manifest_path)
+            else:
+                # an empty object has no blocks
+                self._save_manifest(manifest_path, remote.url, etag, size, [])
+
+            self._evict(keep=manifest_path)
+        return data_path
+
+    def _evict(self, keep: str = None):
+        entries = []
+        total = 0
+        if not os.path.isdir(self.cache_dir):
+            return
+        for url_key in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, url_key)
+            if not os.path.isdir(entry_dir):
+                continue
+            for name in os.listdir(entry_dir):
+                if not name.endswith('.json'):
+                    continue
+                manifest_path = os.path.join(entry_dir, name)
+                data_path = manifest_path[:-len('.json')] + '.parquet'
+                data_size = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+                entries.append((os.path.getmtime(manifest_path), manifest_path, data_path, data_size))
+                total += data_size
+
+        # evict the least recently used entries
+        for _, manifest_path, data_path, data_size in sorted(entries):
+            if total <= self.size_limit:
+                break
+            if manifest_path == keep:
+                continue
+            for path in [manifest_path, data_path]:
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= data_size
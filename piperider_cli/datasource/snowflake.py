@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 import inquirer
 
 from piperider_cli.error import PipeRiderConnectorError, PipeRiderCredentialFieldError
@@ -80,6 +82,33 @@ class SnowflakeDataSource(DataSource):
             'private_key': self._get_private_key(),
         })
 
+    def pool_args(self):
+        # the session expires after hours of inactivity, and the handshake is too costly to ping every checkout
+        return dict(pool_pre_ping=False, pool_recycle=3600)
+
+    def set_statement_timeout(self, dbapi_connection, seconds: float):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'ALTER SESSION SET STATEMENT_TIMEOUT_IN_SECONDS = {max(1, int(seconds))}')
+        cursor.close()
+
+    def cancel_query(self, dbapi_connection, cursor):
+        # the running queries of the session are cancelled from another cursor
+        cancel_cursor = dbapi_connection.cursor()
+        cancel_cursor.execute(f'SELECT SYSTEM$CANCEL_ALL_QUERIES({dbapi_connection.session_id})')
+        cancel_cursor.close()
+
+    def query_cost(self, dbapi_connection, cursor) -> dict:
+        return {'query_id': cursor.sfqid}
+
+    def resolve_query_costs(self, conn, query_ids: List[str]) -> Dict[str, dict]:
+        # the queries run by the sessions of the pooled connections, so they are looked up by the user
+        ids = ', '.join(f"'{query_id}'" for query_id in query_ids)
+        rows = conn.exec_driver_sql(
+            f'SELECT query_id, bytes_scanned '
+            f'FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY_BY_USER(RESULT_LIMIT => 10000)) '
+            f'WHERE query_id IN ({ids})').fetchall()
+        return {query_id: {'bytes_scanned': bytes_scanned} for query_id, bytes_scanned in rows}
+
     def _get_private_key(self):
         private_key_path = self.credential.get('private_key_path')
         private_key_passphrase = self.credential.get('private_key_passphrase')
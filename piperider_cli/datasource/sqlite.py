@@ -29,20 +29,32 @@ class SqliteDataSource(DataSource):
             raise ValueError('type name should be sqlite')
         return self._validate_required_fields()
 
-    def to_database_url(self, database):
-        credential = self.credential
+    def _get_sqlite_file(self):
         from piperider_cli.configuration import FileSystem
-        dbpath = credential.get('dbpath')
+        dbpath = self.credential.get('dbpath')
         if dbpath is None:
+            return None
+        if os.path.isabs(dbpath) is False:
+            dbpath = os.path.join(FileSystem.WORKING_DIRECTORY, dbpath)
+        sqlite_file = os.path.abspath(dbpath)
+        if not os.path.exists(sqlite_file):
+            raise ValueError(f'Cannot find the sqlite at {sqlite_file}')
+        return sqlite_file
+
+    def to_database_url(self, database):
+        sqlite_file = self._get_sqlite_file()
+        if sqlite_file is None:
             return "sqlite://"
         else:
-            if os.path.isabs(dbpath) is False:
-                dbpath = os.path.join(FileSystem.WORKING_DIRECTORY, dbpath)
-            sqlite_file = os.path.abspath(dbpath)
-            if not os.path.exists(sqlite_file):
-                raise ValueError(f'Cannot find the sqlite at {sqlite_file}')
             return f"sqlite:///{sqlite_file}"
 
+    def to_async_database_url(self, database):
+        # the in-memory database could not be shared with the aiosqlite connections
+        sqlite_file = self._get_sqlite_file()
+        if sqlite_file is None:
+            return None
+        return f"sqlite+aiosqlite:///{sqlite_file}"
+
     def engine_args(self):
         return {
             'isolation_level': 'AUTOCOMMIT',
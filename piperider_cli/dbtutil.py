@@ -18,6 +18,7 @@ from piperider_cli.error import \
     DbtProfileInvalidError, \
     DbtProfileBigQueryAuthWithTokenUnsupportedError, DbtRunTimeError
 from piperider_cli.metrics_engine import Metric
+from piperider_cli.runjson import RawJsonFile
 from piperider_cli.statistics import Statistics
 
 console = Console()
@@ -132,11 +133,16 @@ def _get_state_run_results(dbt_state_dir: str):
     return run_results
 
 
-def _get_state_manifest(dbt_state_dir: str):
+def _get_state_manifest_path(dbt_state_dir: str):
     path = os.path.join(dbt_state_dir, 'manifest.json')
     if os.path.isabs(path) is False:
         from piperider_cli.configuration import FileSystem
         path = os.path.join(FileSystem.WORKING_DIRECTORY, path)
+    return path
+
+
+def _get_state_manifest(dbt_state_dir: str):
+    path = _get_state_manifest_path(dbt_state_dir)
     with open(path) as f:
         manifest = json.load(f)
 
@@ -152,16 +158,19 @@ def append_descriptions(profile_result, dbt_state_dir):
         model_desc = node.get('description')
         if model not in profile_result['tables']:
             continue
+        # the tables could be spooled, so the modified one is stored back
+        table_result = profile_result['tables'][model]
         if model_desc:
-            profile_result['tables'][model]['description'] = f"{model_desc}"
+            table_result['description'] = f"{model_desc}"
 
         columns = node.get('columns', {})
         for column, v in columns.items():
-            if column not in profile_result['tables'][model]['columns']:
+            if column not in table_result['columns']:
                 continue
             column_desc = v.get('description')
             if column_desc:
-                profile_result['tables'][model]['columns'][column]['description'] = f"{column_desc}"
+                table_result['columns'][column]['description'] = f"{column_desc}"
+        profile_result['tables'][model] = table_result
 
 
 def get_dbt_state_candidate(dbt_state_dir: str, options: dict, *, select_for_metadata: bool = False):
@@ -373,6 +382,19 @@ def get_dbt_run_results(dbt_state_dir: str):
     return _get_state_run_results(dbt_state_dir) if is_dbt_run_results_ready(dbt_state_dir) else None
 
 
+def get_dbt_manifest_file(dbt_state_dir: str) -> RawJsonFile:
+    """
+    Get the manifest to embed in run.json without loading it.
+    """
+    return RawJsonFile(_get_state_manifest_path(dbt_state_dir))
+
+
+def get_dbt_run_results_file(dbt_state_dir: str) -> Optional[RawJsonFile]:
+    if not is_dbt_run_results_ready(dbt_state_dir):
+        return None
+    return RawJsonFile(os.path.join(dbt_state_dir, 'run_results.json'))
+
+
 def load_dbt_project(path: str):
     """
     Load dbt project file and return the content of 'profile' and 'target-path' fields
@@ -32,6 +32,27 @@ class PipeRiderConfigTypeError(PipeRiderError):
     hint = "Please check your input configuration in config.yml"
 
 
+class PipeRiderProfilerEngineError(PipeRiderError):
+    def __init__(self, engine, reason):
+        self.message = f"Profiler engine '{engine}' is not available: {reason}"
+
+    hint = "Please install the required packages by 'pip install pyarrow numpy'"
+
+
+class PipeRiderCompressionError(PipeRiderError):
+    def __init__(self, compression, reason):
+        self.message = f"Compression '{compression}' is not available: {reason}"
+
+    hint = "Please install the required packages by 'pip install zstandard'"
+
+
+class PipeRiderProfilerModeError(PipeRiderError):
+    def __init__(self, mode, reason):
+        self.message = f"Profiler mode '{mode}' is not available: {reason}"
+
+    hint = "Please profile the data source with the 'full' mode"
+
+
 class PipeRiderCredentialFieldError(PipeRiderError):
     def __init__(self, field, message):
         self.message = message
@@ -222,3 +243,18 @@ class PipeRiderConflictOptionsError(PipeRiderError):
         self.message = error_msg
         self.hint = hint
         pass
+
+
+class PipeRiderBlobNotFoundError(PipeRiderError):
+    hint = 'The dbt artifacts of a run are stored in the ".blobs" directory beside the run. ' \
+           'Please copy the run with "piperider run --output" or keep the outputs directory together.'
+
+    def __init__(self, digest, blob_dir):
+        self.message = f'The blob "{digest}" is not found in "{blob_dir}"'
+
+
+class PipeRiderRunFormatError(PipeRiderError):
+    def __init__(self, run_format, reason):
+        self.message = f"Run format '{run_format}' is not available: {reason}"
+
+    hint = "Please install the required packages by 'pip install pyarrow'"
@@ -9,8 +9,10 @@ from rich.console import Console
 
 from piperider_cli import __version__, open_report_in_browser, sentry_dns, sentry_env, event, get_run_json_path
 from piperider_cli import clone_directory, raise_exception_when_directory_not_writable
+from piperider_cli.blobstore import BlobStore, export_run_json, resolve_blob_refs
 from piperider_cli.configuration import Configuration
 from piperider_cli.error import PipeRiderNoProfilingResultError
+from piperider_cli.runjson import open_run_json
 
 
 def prepare_piperider_metadata():
@@ -85,8 +87,9 @@ class GenerateReport:
             print(os.path.abspath(run_json_path))
             raise PipeRiderNoProfilingResultError(run_json_path)
 
-        with open(run_json_path) as f:
+        with open_run_json(run_json_path) as f:
             result = json.loads(f.read())
+        resolve_blob_refs(result, BlobStore.of_run(run_json_path))
         if not _validate_input_result(result):
             console.print(f'[bold red]Error: {run_json_path} is invalid[/bold red]')
             return
@@ -104,7 +107,7 @@ class GenerateReport:
 
         if output:
             output_report(output)
-            shutil.copyfile(run_json_path, os.path.join(output, os.path.basename(run_json_path)))
+            export_run_json(run_json_path, os.path.join(output, os.path.basename(run_json_path)))
             console.print(
                 f"Report generated in: {os.path.join(output, 'index.html')}", soft_wrap=True)
         else:
@@ -0,0 +1,248 @@
+import json
+import os
+import sqlite3
+from typing import Iterable, List, Optional
+
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
+from piperider_cli import datetime_to_str, str_to_datetime
+from piperider_cli.configuration import Configuration
+from piperider_cli.runarrow import find_run_arrow, read_run_scalars
+from piperider_cli.runindex import RunIndex
+from piperider_cli.runjson import open_run_json
+
+HISTORY_FILE = '.history.sqlite'
+
+
+def default_history_path(output_dir: str) -> str:
+    return os.path.join(output_dir, HISTORY_FILE)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_scalar(value) -> bool:
+    return isinstance(value, (bool, int, float, str))
+
+
+def _iter_scalars(run_result: dict) -> Iterable[tuple]:
+    """
+    The scalars of the tables and the columns, as (table, column, metric, value). The column is None for the table
+    scalars.
+    """
+    for table_name, table in (run_result.get('tables') or {}).items():
+        if not isinstance(table, dict):
+            continue
+        for metric, value in table.items():
+            if _is_scalar(value):
+                yield table_name, None, metric, value
+        for column_name, column in (table.get('columns') or {}).items():
+            if not isinstance(column, dict):
+                continue
+            for metric, value in column.items():
+                if _is_scalar(value):
+                    yield table_name, column_name, metric, value
+
+
+class HistoryStore:
+    """
+    HistoryStore keeps the numeric metrics of the runs in a sqlite file of the outputs directory, so a metric could be
+    queried across the runs without loading the run.json files. The runs are normalized into the runs, tables,
+    columns and metrics tables. The store follows the run index: the runs are ingested when they are added to the
+    index or found by it, and removed when they are pruned.
+    """
+
+    def __init__(self, output_dir: str, path: str = None):
+        self.output_dir = output_dir
+        self.path = path or default_history_path(output_dir)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS runs (
+                run_key INTEGER PRIMARY KEY,
+                dir TEXT NOT NULL UNIQUE,
+                mtime REAL NOT NULL,
+                run_id TEXT,
+                datasource TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tables (
+                run_key INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                row_count INTEGER,
+                col_count INTEGER,
+                PRIMARY KEY (run_key, name)
+            );
+            CREATE TABLE IF NOT EXISTS columns (
+                run_key INTEGER NOT NULL,
+                table_name TEXT NOT NULL,
+                name TEXT NOT NULL,
+                type TEXT,
+                schema_type TEXT,
+                PRIMARY KEY (run_key, table_name, name)
+            );
+            CREATE TABLE IF NOT EXISTS metrics (
+                run_key INTEGER NOT NULL,
+                table_name TEXT NOT NULL,
+                column_name TEXT,
+                metric TEXT NOT NULL,
+                value REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS metrics_by_name ON metrics (table_name, column_name, metric, run_key);
+            CREATE INDEX IF NOT EXISTS runs_by_created_at ON runs (datasource, created_at);
+            ''')
+        return conn
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, run_key: int):
+        for table in ['metrics', 'columns', 'tables', 'runs']:
+            conn.execute(f'DELETE FROM {table} WHERE run_key = ?', (run_key,))
+
+    def _ingest(self, conn: sqlite3.Connection, run_json_path: str, run: dict, scalars: Iterable[tuple]):
+        run_dir = os.path.basename(os.path.dirname(run_json_path))
+        for run_key, in conn.execute('SELECT run_key FROM runs WHERE dir = ?', (run_dir,)).fetchall():
+            self._delete(conn, run_key)
+        cursor = conn.execute('INSERT INTO runs (dir, mtime, run_id, datasource, created_at) VALUES (?, ?, ?, ?, ?)',
+                              (run_dir, os.stat(run_json_path).st_mtime, run.get('id'),
+                               run['datasource']['name'], run['created_at']))
+        run_key = cursor.lastrowid
+
+        tables = {}
+        columns = {}
+        metrics = []
+        for table_name, column_name, metric, value in scalars:
+            if column_name is None:
+                tables.setdefault(table_name, {})[metric] = value
+            else:
+                columns.setdefault((table_name, column_name), {})[metric] = value
+            if _is_number(value):
+                metrics.append((run_key, table_name, column_name, metric, value))
+        conn.executemany('INSERT INTO tables VALUES (?, ?, ?, ?)',
+                         [(run_key, name, table.get('row_count'), table.get('col_count'))
+                          for name, table in tables.items()])
+        conn.executemany('INSERT INTO columns VALUES (?, ?, ?, ?, ?)',
+                         [(run_key, table_name, name, column.get('type'), column.get('schema_type'))
+                          for (table_name, name), column in columns.items()])
+        conn.executemany('INSERT INTO metrics VALUES (?, ?, ?, ?, ?)', metrics)
+
+    def add(self, run_json_path: str, run_result: dict):
+        """
+        Ingest a run of the outputs directory, which is written by 'piperider run'.
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            self._ingest(conn, run_json_path, run_result, _iter_scalars(run_result))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def sync(self):
+        """
+        Ingest the indexed runs which are new or modified, and remove the runs no longer indexed. The scalars are read
+        from the run.arrow if the run has one, without loading the whole run.
+        """
+        entries = {entry['dir']: entry for entry in RunIndex(self.output_dir).list()}
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            ingested = {d: (run_key, mtime) for run_key, d, mtime in conn.execute('SELECT run_key, dir, mtime FROM runs')}
+            for d, (run_key, _) in ingested.items():
+                if d not in entries:
+                    self._delete(conn, run_key)
+            for d, entry in entries.items():
+                if d in ingested and ingested[d][1] == entry['mtime']:
+                    continue
+                arrow_path = find_run_arrow(entry['path'])
+                if arrow_path is not None:
+                    self._ingest(conn, entry['path'], *read_run_scalars(arrow_path))
+                    continue
+                with open_run_json(entry['path']) as f:
+                    run_result = json.load(f)
+                self._ingest(conn, entry['path'], run_result, _iter_scalars(run_result))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def query(self, metric: str, table: str, column: str = None, datasource: str = None,
+              last: int = None) -> List[dict]:
+        """
+        Query a metric of a table, or of a column, across the runs. The values are ordered by the created time of the
+        runs, and the last runs are returned if 'last' is given.
+        """
+        if not os.path.isdir(self.output_dir):
+            return []
+        self.sync()
+        sql = '''
+            SELECT r.run_id, r.dir, r.datasource, r.created_at, m.value
+            FROM metrics m JOIN runs r ON m.run_key = r.run_key
+            WHERE m.table_name = ? AND m.metric = ? AND m.column_name IS ?'''
+        params = [table, metric, column]
+        if datasource:
+            sql += ' AND r.datasource = ?'
+            params.append(datasource)
+        sql += ' ORDER BY r.created_at DESC'
+        if last is not None:
+            sql += ' LIMIT ?'
+            params.append(last)
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [dict(run_id=run_id, dir=d, datasource=name, created_at=created_at, value=value)
+                for run_id, d, name, created_at, value in reversed(rows)]
+
+    def list_metrics(self, table: str, column: str = None) -> List[str]:
+        if not os.path.isdir(self.output_dir):
+            return []
+        self.sync()
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT DISTINCT metric FROM metrics WHERE table_name = ? AND column_name IS ? '
+                                'ORDER BY metric', (table, column)).fetchall()
+        finally:
+            conn.close()
+        return [metric for metric, in rows]
+
+
+class History:
+    @staticmethod
+    def exec(metric: Optional[str], table: str, column: str = None, datasource: str = None, last: int = None,
+             report_dir: str = None, output_json: bool = False):
+        console = Console()
+        filesystem = Configuration.instance().activate_report_directory(report_dir=report_dir)
+        store = HistoryStore(filesystem.get_output_dir())
+        subject = f'{table}.{column}' if column else table
+
+        if metric is None:
+            metrics = store.list_metrics(table, column)
+            if not metrics:
+                console.print(f'[bold yellow]No metrics of {subject} in the history[/bold yellow]')
+                return 1
+            console.print(f'Metrics of {subject}: {", ".join(metrics)}')
+            return 0
+
+        values = store.query(metric, table, column=column, datasource=datasource, last=last)
+        if output_json:
+            console.print_json(json.dumps(values))
+            return 0
+        if not values:
+            console.print(f'[bold yellow]No {metric} of {subject} in the history[/bold yellow]')
+            return 1
+
+        ascii_table = Table(title=f'{metric} of {subject}', show_header=True, show_edge=True,
+                            header_style="bold magenta", box=box.SIMPLE)
+        ascii_table.add_column('Datasource', justify='left', style='cyan')
+        ascii_table.add_column('Run', justify='left')
+        ascii_table.add_column('Created At', justify='left')
+        ascii_table.add_column(metric, justify='right')
+        for value in values:
+            created_at = datetime_to_str(str_to_datetime(value['created_at']), to_tzlocal=True)
+            ascii_table.add_row(value['datasource'], value['dir'], created_at, f"{value['value']:g}")
+        console.print(ascii_table)
+        return 0
@@ -5,12 +5,16 @@ from concurrent.futures import ThreadPoolExecutor
 from typing import List, Union
 
 from sqlalchemy import select, func, distinct, literal_column, join, outerjoin, Column, Date
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection
 from sqlalchemy.sql.expression import text, union_all, case
 from sqlalchemy.sql.selectable import CTE
 
 from piperider_cli.datasource import DataSource
 from piperider_cli.metrics_engine.event import MetricEventHandler, DefaultMetricEventHandler
+from piperider_cli.tracing import Tracer
+from piperider_cli.datasource.cost import QueryCost
+from piperider_cli.datasource.dialect import get_dialect
+from piperider_cli.datasource.explain import explain_query
 
 
 def dtof(value: Union[int, float, decimal.Decimal]) -> Union[int, float]:
@@ -72,8 +76,12 @@ class MetricEngine:
         self.data_source = data_source
         self.metrics = metrics
         self.event_handler = event_handler
-        if self.data_source.threads > 1:
-            self.executor = ThreadPoolExecutor(max_workers=self.data_source.threads)
+        self.cost = QueryCost()
+        self._async_engines = {}
+        if self.data_source.use_async:
+            self.executor = None
+        elif self.data_source.max_threads > 1:
+            self.executor = ThreadPoolExecutor(max_workers=self.data_source.max_threads)
         else:
             self.executor = None
 
@@ -206,20 +214,7 @@ class MetricEngine:
             )
 
     def _interval(self, grain: str, n):
-        if self.data_source.type_name == 'bigquery':
-            return text(f"interval {n} {grain}")
-        elif self.data_source.type_name == 'athena':
-            if grain == 'week':
-                return text(f"interval '{n * 7}' day")
-            elif grain == 'quarter':
-                return text(f"interval '{n * 3}' month")
-            else:
-                return text(f"interval '{n}' {grain}")
-        else:
-            if grain == 'quarter':
-                return text(f"interval '{n * 3} months'")
-            else:
-                return text(f"interval '{n} {grain}s'")
+        return get_dialect(self.data_source.type_name).interval(grain, n)
 
     def _slot_count_by_grain(self, grain: str):
         if grain == 'year':
@@ -253,7 +248,7 @@ class MetricEngine:
 
         return union_all(*dates, current_date)
 
-    def _query_metric(self, engine: Engine, metric: Metric, grain: str, dimension: List[str]) -> dict:
+    def _query_metric(self, conn: Connection, metric: Metric, grain: str, dimension: List[str]) -> dict:
         '''
         Query a metric with given parameter. Just implement the behavior of 'metrics.calculate'
         ref: https://docs.getdbt.com/docs/build/metrics#querying-your-metric
@@ -276,20 +271,43 @@ class MetricEngine:
             'data': []
         }
 
-        with engine.connect() as conn:
-            date_spine_model = self._date_spine(grain).cte(name="date_spine_model")
-            stmt = self._get_query_stmt(metric, grain, dimension, date_spine_model)
+        date_spine_model = self._date_spine(grain).cte(name="date_spine_model")
+        stmt = self._get_query_stmt(metric, grain, dimension, date_spine_model)
 
-            result = conn.execute(stmt)
+        result = conn.execute(stmt)
 
-            for row in result:
-                row = list(row)
-                row[0] = str(row[0])
-                row[-1] = dtof(row[-1])
-                query_result['data'].append(row)
+        for row in result:
+            row = list(row)
+            row[0] = str(row[0])
+            row[-1] = dtof(row[-1])
+            query_result['data'].append(row)
 
         return self._compose_query_name(grain, dimension), query_result
 
+    async def _run_query_metric(self, metric: Metric, grain: str, dimension: List[str]):
+        limiter = self.data_source.get_limiter()
+        with Tracer().span(f'{metric.name}_{self._compose_query_name(grain, dimension)}', 'metric'):
+            if limiter is not None:
+                return await limiter.run(lambda: self._execute_query_metric(metric, grain, dimension))
+            return await self._execute_query_metric(metric, grain, dimension)
+
+    async def _execute_query_metric(self, metric: Metric, grain: str, dimension: List[str]):
+        if self.data_source.use_async:
+            async_engine = self._async_engines.get(metric.database)
+            if async_engine is None:
+                async_engine = self.data_source.create_async_engine(metric.database)
+                self._async_engines[metric.database] = async_engine
+            async with async_engine.connect() as conn:
+                with self.data_source.cost_tracker.scope(conn.sync_connection, self.cost):
+                    return await conn.run_sync(self._query_metric, metric, grain, dimension)
+
+        def _run():
+            engine = self.data_source.get_engine_by_database(metric.database)
+            with engine.connect() as conn, self.data_source.cost_tracker.scope(conn, self.cost):
+                return self._query_metric(conn, metric, grain, dimension)
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, _run)
+
     async def _execute(self) -> List[dict]:
         metrics = self.metrics
         results = []
@@ -304,17 +322,15 @@ class MetricEngine:
 
             total_param = len(list(self._get_query_param(metric)))
             completed_param = 0
-            engine = self.data_source.get_engine_by_database(metric.database)
 
             query_results = {}
             futures = []
-            loop = asyncio.get_running_loop()
             for grain, dimension in self._get_query_param(metric):
                 # to keep the order
                 query_param = self._compose_query_name(grain, dimension)
                 query_results[query_param] = None
 
-                future = loop.run_in_executor(self.executor, self._query_metric, engine, metric, grain, dimension)
+                future = asyncio.create_task(self._run_query_metric(metric, grain, dimension))
                 futures.append(future)
 
             for future in asyncio.as_completed(futures):
@@ -330,26 +346,57 @@ class MetricEngine:
 
             self.event_handler.handle_metric_end(metric.label)
             completed_metric += 1
+
+        if self.cost.query_ids:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._resolve_cost)
         self.event_handler.handle_run_end()
         return results
 
+    def _resolve_cost(self):
+        # a single lookup of the query history for the queries of the run
+        with self.data_source.get_engine_by_database().connect() as conn:
+            self.data_source.cost_tracker.resolve(conn, [self.cost])
+
+    async def _execute_and_dispose(self) -> List[dict]:
+        try:
+            return await self._execute()
+        finally:
+            engines = self._async_engines.values()
+            self._async_engines = {}
+            for engine in engines:
+                await engine.dispose()
+
+    def explain(self) -> List[dict]:
+        """
+        Estimate the bytes and rows scanned by the metric queries without executing them.
+        """
+        results = []
+        for metric in self.metrics:
+            engine = self.data_source.get_engine_by_database(metric.database)
+            with engine.connect() as conn:
+                for grain, dimension in self._get_query_param(metric):
+                    date_spine_model = self._date_spine(grain).cte(name="date_spine_model")
+                    stmt = self._get_query_stmt(metric, grain, dimension, date_spine_model)
+                    if stmt is None:
+                        continue
+                    estimate = explain_query(conn, stmt)
+                    results.append({
+                        'name': f'{metric.name}_{self._compose_query_name(grain, dimension)}',
+                        'bytes': estimate.bytes,
+                        'rows': estimate.rows,
+                    })
+        return results
+
     def execute(self) -> List[dict]:
+        def job():
+            with Tracer().span('metrics'), self.data_source.query_registry.cancel_on_interrupt():
+                return asyncio.run(self._execute_and_dispose())
+
         if self.executor:
             with self.executor:
-                return asyncio.run(self._execute())
+                return job()
         else:
-            return asyncio.run(self._execute())
+            return job()
 
     def date_trunc(self, date_part, date_expression) -> Column:
-        type_name = self.data_source.type_name
-        if type_name == 'sqlite':
-            if date_part == "YEAR":
-                return func.strftime("%Y-01-01", date_expression)
-            elif date_part == "MONTH":
-                return func.strftime("%Y-%m-01", date_expression)
-            else:
-                return func.strftime("%Y-%m-%d", date_expression)
-        elif type_name == 'bigquery':
-            return func.date_trunc(date_expression, text(date_part))
-        else:
-            return func.date_trunc(date_part, date_expression)
+        return get_dialect(self.data_source.type_name).date_trunc(date_part, date_expression)
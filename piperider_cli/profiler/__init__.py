@@ -1,2 +1,3 @@
 from .profiler import Profiler, ProfileSubject
 from .event import ProfilerEventHandler, DefaultProfilerEventHandler
+from .column_metrics import register_column_metric
@@ -0,0 +1,405 @@
+import math
+from datetime import datetime, timezone
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import Column, Table, Date, select, func
+from sqlalchemy.engine import Engine, Connection
+from sqlalchemy.sql.util import ClauseAdapter
+
+from .profiler import BaseColumnProfiler, percentage, histogram_bins, datetime_histogram_bins, _get_sample_percent
+
+ARROW_BATCH_SIZE = 100000
+ARROW_COMPACT_SIZE = 1000000
+ARROW_SUPPORTED_BACKENDS = ['duckdb', 'sqlite']
+ARROW_SUPPORTED_TYPES = ['string', 'integer', 'numeric', 'datetime', 'boolean']
+
+
+class _ValueCounter:
+    """
+    Merge the value counts of the record batches. The memory is bounded by the number of distinct values instead of
+    the number of rows.
+    """
+
+    def __init__(self):
+        self.values: List[pa.Array] = []
+        self.counts: List[pa.Array] = []
+        self.pending = 0
+
+    def update(self, array: pa.Array):
+        if len(array) == 0:
+            return
+        value_counts = pc.value_counts(array)
+        self.values.append(value_counts.field('values'))
+        self.counts.append(value_counts.field('counts'))
+        self.pending += len(value_counts)
+        if self.pending > ARROW_COMPACT_SIZE:
+            self._compact()
+
+    def _compact(self):
+        if len(self.values) > 1:
+            merged = pa.table({
+                'v': pa.concat_arrays(self.values),
+                'c': pa.concat_arrays(self.counts),
+            }).group_by('v').aggregate([('c', 'sum')])
+            self.values = [merged['v'].combine_chunks()]
+            self.counts = [merged['c_sum'].combine_chunks()]
+        self.pending = len(self.values[0]) if self.values else 0
+
+    def result(self, value_type: pa.DataType) -> Tuple[pa.Array, np.ndarray]:
+        """
+        :return: the distinct values in ascending order and their counts
+        """
+        self._compact()
+        if not self.values:
+            return pa.array([], type=value_type), np.array([], dtype=np.int64)
+        indices = pc.sort_indices(self.values[0])
+        values = pc.take(self.values[0], indices)
+        counts = np.asarray(pc.take(self.counts[0], indices), dtype=np.int64)
+        return values, counts
+
+
+class ArrowColumnProfiler(BaseColumnProfiler):
+    """
+    The column profiler which fetches the column as arrow record batches and computes the metrics in process. The
+    metrics are derived from the value counts collected in a single streaming pass, and the result has the same schema
+    as the sql column profilers.
+    """
+
+    def __init__(self, engine: Engine, config: dict, table: Table, column: Column, generic_type: str):
+        super().__init__(engine, config, table, column)
+        self.generic_type = generic_type
+
+    def _get_value_type(self, array: pa.Array = None) -> pa.DataType:
+        if self.generic_type == 'string':
+            return pa.string()
+        elif self.generic_type == 'integer':
+            return pa.int64()
+        elif self.generic_type == 'numeric':
+            return pa.float64()
+        elif self.generic_type == 'boolean':
+            return pa.bool_()
+        elif isinstance(self.column.type, Date):
+            return pa.date32()
+        elif array is not None and pa.types.is_temporal(array.type):
+            return array.type
+        return pa.timestamp('us')
+
+    def _get_select_sql(self, *columns) -> str:
+        table = self.table
+        percent = _get_sample_percent(self._get_dialect(), self.config)
+        if percent is not None:
+            table = self._get_dialect().sample(table, percent)
+            columns = [ClauseAdapter(table).traverse(column) for column in columns]
+        stmt = select(*columns).select_from(table)
+        limit = self.config.get('table', {}).get('limit', 0) if self.config else 0
+        if limit > 0:
+            stmt = stmt.limit(limit)
+        return str(stmt.compile(self.engine, compile_kwargs={'literal_binds': True}))
+
+    def _iter_batches(self, conn: Connection) -> Iterator[Tuple[int, int, pa.Array]]:
+        """
+        :return: the iterator of (total, non_nulls, valid values) of each batch
+        """
+        if self._get_database_backend() == 'duckdb':
+            yield from self._iter_batches_duckdb(conn)
+        else:
+            yield from self._iter_batches_sqlite(conn)
+
+    def _iter_batches_duckdb(self, conn: Connection):
+        dbapi_conn = conn.connection.connection
+        dbapi_conn.execute(self._get_select_sql(self.column))
+        reader = dbapi_conn.fetch_record_batch(ARROW_BATCH_SIZE)
+        for batch in reader:
+            array = batch.column(0)
+            total = len(array)
+            array = array.drop_null()
+            yield total, len(array), pc.cast(array, self._get_value_type(array), safe=False)
+
+    def _iter_batches_sqlite(self, conn: Connection):
+        # the value is valid only if the sqlite storage class matches the column type
+        def _to_string(value, storage):
+            return str(value) if storage != 'blob' else None
+
+        def _to_number(value, storage):
+            return value if storage in ['integer', 'real'] else None
+
+        def _to_datetime(value, storage):
+            try:
+                if storage == 'text':
+                    value = datetime.fromisoformat(value)
+                    if value.tzinfo is not None:
+                        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+                elif storage in ['integer', 'real']:
+                    value = datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+                else:
+                    return None
+            except (ValueError, OverflowError, OSError):
+                return None
+            value = value.replace(microsecond=0)
+            return value.date() if isinstance(self.column.type, Date) else value
+
+        def _to_boolean(value, storage):
+            if storage in ['integer', 'real'] and value in [0, 1]:
+                return value == 1
+            return None
+
+        convert = {
+            'string': _to_string,
+            'integer': _to_number,
+            'numeric': _to_number,
+            'datetime': _to_datetime,
+            'boolean': _to_boolean,
+        }[self.generic_type]
+
+        value_type = self._get_value_type()
+        result = conn.exec_driver_sql(self._get_select_sql(self.column, func.typeof(self.column)))
+        for rows in result.partitions(ARROW_BATCH_SIZE):
+            non_nulls = 0
+            valids = []
+            for value, storage in rows:
+                if value is None:
+                    continue
+                non_nulls += 1
+                value = convert(value, storage)
+                if value is not None:
+                    valids.append(value)
+            yield len(rows), non_nulls, pc.cast(pa.array(valids), value_type, safe=False)
+
+    def run(self, conn: Connection) -> dict:
+        # the column is fetched by its own statements instead of the templates
+        return self._profile(conn)
+
+    def _profile(self, conn: Connection) -> dict:
+        total = non_nulls = 0
+        value_type = None
+        counter = _ValueCounter()
+        for batch_total, batch_non_nulls, array in self._iter_batches(conn):
+            total += batch_total
+            non_nulls += batch_non_nulls
+            value_type = array.type
+            counter.update(array)
+
+        values, counts = counter.result(value_type or self._get_value_type())
+        valids = int(counts.sum())
+        result = {
+            'total': None,
+            'samples': total,
+            'samples_p': None,
+            'non_nulls': non_nulls,
+            'non_nulls_p': percentage(non_nulls, total),
+            'nulls': total - non_nulls,
+            'nulls_p': percentage(total - non_nulls, total),
+            'valids': valids,
+            'valids_p': percentage(valids, total),
+            'invalids': non_nulls - valids,
+            'invalids_p': percentage(non_nulls - valids, total),
+        }
+
+        if self.generic_type == 'string':
+            self._profile_string(result, values, counts)
+        elif self.generic_type in ['integer', 'numeric']:
+            self._profile_numeric(result, values, counts)
+        elif self.generic_type == 'datetime':
+            self._profile_datetime(result, values, counts)
+        elif self.generic_type == 'boolean':
+            self._profile_boolean(result, values, counts)
+        return result
+
+    @staticmethod
+    def _profile_duplicates(result: dict, counts: np.ndarray):
+        valids = result['valids']
+        non_duplicates = int((counts == 1).sum())
+        duplicates = valids - non_duplicates
+        result.update({
+            "duplicates": duplicates,
+            "duplicates_p": percentage(duplicates, valids),
+            "non_duplicates": non_duplicates,
+            "non_duplicates_p": percentage(non_duplicates, valids),
+        })
+
+    @staticmethod
+    def _profile_topk(values: pa.Array, counts: np.ndarray, k=50) -> dict:
+        # order by count desc, and keep the value order for the same count
+        indices = np.argsort(-counts, kind='stable')[:k]
+        return {
+            "values": [str(v) for v in pc.take(values, pa.array(indices)).to_pylist()],
+            "counts": [int(c) for c in counts[indices]],
+        }
+
+    @staticmethod
+    def _profile_histogram(values: np.ndarray, counts: np.ndarray, min, max, is_integer: bool) -> dict:
+        interval, num_buckets, labels, bin_edges = histogram_bins(min, max, is_integer)
+        bounds = np.array([min + interval * (i + 1) for i in range(num_buckets)], dtype=np.float64)
+        bounds[-1] += interval / 100
+
+        # the bucket is the first one whose upper bound is greater than the value
+        buckets = np.searchsorted(bounds, values, side='right')
+        in_range = buckets < num_buckets
+        bucket_counts = np.bincount(buckets[in_range], weights=counts[in_range], minlength=num_buckets)
+        return {
+            "labels": labels,
+            "counts": [int(c) for c in bucket_counts],
+            "bin_edges": bin_edges,
+        }
+
+    @staticmethod
+    def _weighted_stats(values: np.ndarray, counts: np.ndarray) -> Tuple[float, float, float]:
+        """
+        :return: (sum, avg, stddev) of the values weighted by the counts
+        """
+        n = int(counts.sum())
+        if n == 0:
+            return None, None, None
+        _sum = float((values * counts).sum())
+        _avg = _sum / n
+        _stddev = None
+        if n > 1:
+            _stddev = math.sqrt(float((((values - _avg) ** 2) * counts).sum()) / (n - 1))
+        return _sum, _avg, _stddev
+
+    def _profile_string(self, result: dict, values: pa.Array, counts: np.ndarray):
+        total = result['samples']
+        valids = result['valids']
+        lengths = np.asarray(pc.utf8_length(values), dtype=np.int64)
+        zero_length = int(counts[lengths == 0].sum())
+        non_zero_length = valids - zero_length
+        _, _avg, _stddev = self._weighted_stats(lengths.astype(np.float64), counts)
+        _min = int(lengths.min()) if valids > 0 else None
+        _max = int(lengths.max()) if valids > 0 else None
+
+        result.update({
+            'zero_length': zero_length,
+            'zero_length_p': percentage(zero_length, total),
+            'non_zero_length': non_zero_length,
+            'non_zero_length_p': percentage(non_zero_length, total),
+
+            'distinct': len(values),
+            'distinct_p': percentage(len(values), valids),
+            'min': _min,
+            'min_length': _min,
+            'max': _max,
+            'max_length': _max,
+            'avg': _avg,
+            'avg_length': _avg,
+            'stddev': _stddev,
+            'stddev_length': _stddev,
+        })
+        self._profile_duplicates(result, counts)
+
+        topk = None
+        histogram = None
+        if valids > 0:
+            topk = self._profile_topk(values, counts)
+            histogram = self._profile_histogram(lengths, counts, _min, _max, True)
+        result['topk'] = topk
+        result['histogram'] = histogram
+        result['histogram_length'] = histogram
+
+    def _profile_numeric(self, result: dict, values: pa.Array, counts: np.ndarray):
+        is_integer = self.generic_type == 'integer'
+        total = result['samples']
+        valids = result['valids']
+        numbers = np.asarray(pc.cast(values, pa.float64()), dtype=np.float64)
+        zeros = int(counts[numbers == 0].sum())
+        negatives = int(counts[numbers < 0].sum())
+        positives = valids - zeros - negatives
+        _sum, _avg, _stddev = self._weighted_stats(numbers, counts)
+        _min = values[0].as_py() if valids > 0 else None
+        _max = values[-1].as_py() if valids > 0 else None
+
+        result.update({
+            'zeros': zeros,
+            'zeros_p': percentage(zeros, total),
+            'negatives': negatives,
+            'negatives_p': percentage(negatives, total),
+            'positives': positives,
+            'positives_p': percentage(positives, total),
+
+            'distinct': len(values),
+            'distinct_p': percentage(len(values), valids),
+            'min': _min,
+            'max': _max,
+            'sum': _sum,
+            'avg': _avg,
+            'stddev': _stddev,
+        })
+        self._profile_duplicates(result, counts)
+
+        histogram = None
+        quantile = {}
+        if valids > 0 and math.isfinite(_min) and math.isfinite(_max):
+            histogram = self._profile_histogram(numbers, counts, _min, _max, is_integer)
+
+            # the value at the offset of the sorted values
+            cumulative = np.cumsum(counts)
+            for p in [5, 25, 50, 75, 95]:
+                index = int(np.searchsorted(cumulative, p * valids // 100, side='right'))
+                quantile[f'p{p}'] = values[index].as_py()
+        result['histogram'] = histogram
+        result.update({
+            'p5': quantile.get('p5'),
+            'p25': quantile.get('p25'),
+            'p50': quantile.get('p50'),
+            'p75': quantile.get('p75'),
+            'p95': quantile.get('p95'),
+        })
+
+        if is_integer:
+            topk = None
+            if valids > 0:
+                topk = self._profile_topk(values, counts)
+            result["topk"] = topk
+
+    def _profile_datetime(self, result: dict, values: pa.Array, counts: np.ndarray):
+        valids = result['valids']
+        _min = values[0].as_py() if valids > 0 else None
+        _max = values[-1].as_py() if valids > 0 else None
+
+        result.update({
+            'distinct': len(values),
+            'distinct_p': percentage(len(values), valids),
+            'min': _min.isoformat() if _min is not None else None,
+            'max': _max.isoformat() if _max is not None else None,
+        })
+        self._profile_duplicates(result, counts)
+
+        histogram = None
+        if _min and _max:
+            _type, num_buckets, labels, bin_edges = datetime_histogram_bins(_min, _max)
+            if pa.types.is_timestamp(values.type):
+                values = pc.floor_temporal(values, unit='day')
+            days = np.asarray(pc.cast(pc.cast(values, pa.date32()), pa.int32())).astype('datetime64[D]')
+            if _type == 'yearly':
+                days = days.astype('datetime64[Y]').astype('datetime64[D]')
+            elif _type == 'monthly':
+                days = days.astype('datetime64[M]').astype('datetime64[D]')
+
+            # the bucket is the first one whose upper edge is greater than the truncated date
+            edges = np.array(bin_edges[1:], dtype='datetime64[D]')
+            buckets = np.searchsorted(edges, days, side='right')
+            in_range = buckets < num_buckets
+            bucket_counts = np.bincount(buckets[in_range], weights=counts[in_range], minlength=num_buckets)
+            histogram = {
+                "labels": labels,
+                "counts": [int(c) for c in bucket_counts],
+                "bin_edges": bin_edges,
+            }
+        result['histogram'] = histogram
+
+    def _profile_boolean(self, result: dict, values: pa.Array, counts: np.ndarray):
+        total = result['samples']
+        valids = result['valids']
+        trues = int(counts[np.asarray(values.to_pylist(), dtype=bool)].sum()) if valids > 0 else 0
+        falses = valids - trues
+
+        result.update({
+            'trues': trues,
+            'trues_p': percentage(trues, total),
+            'falses': falses,
+            'falses_p': percentage(falses, total),
+            'distinct': len(values),
+            'distinct_p': percentage(len(values), valids),
+        })
@@ -0,0 +1,302 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from sqlalchemy import String, and_, case, cast, func, literal, literal_column, or_, select, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import FromClause, Select
+from sqlalchemy.sql.elements import ColumnClause, ColumnElement, Label
+from sqlalchemy.sql.expression import CTE
+from sqlalchemy.sql.visitors import replacement_traverse
+
+BATCH_TAG = 'piperider_batch'
+
+
+def render_statement(conn: Connection, stmt: Select) -> str:
+    """
+    Render the statement with the literal values and the column source bound to the connection.
+    """
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    source = conn.get_execution_options().get('template_source')
+    if source is not None:
+        sql = source.bind(sql, conn.dialect)
+    return sql
+
+
+class _BatchedQuery:
+
+    def __init__(self, conn: Connection, stmt: Select):
+        self.columns = list(stmt.selected_columns)
+        # the order of the rows is not kept by the UNION ALL
+        labeled = stmt.with_only_columns(*[c.label(f'c{i}') for i, c in enumerate(self.columns)]).order_by(None)
+        self.sql = render_statement(conn, labeled)
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.rows: List[tuple] = []
+        # execute the query by itself, i.e. the batch is failed or it is the only query of the batch
+        self.unbatched = True
+
+
+def batch_statement(queries: List[_BatchedQuery]) -> str:
+    """
+    Combine the queries into a UNION ALL of the rows tagged by the index of the query. Each query has its own slots of
+    the columns, which are null in the rows of the other queries.
+
+        SELECT 0 AS piperider_batch, q.c0 AS b0, q.c1 AS b1, NULL AS b2 FROM (...) AS q
+        UNION ALL
+        SELECT 1 AS piperider_batch, NULL AS b0, NULL AS b1, q.c0 AS b2 FROM (...) AS q
+    """
+    total = sum(len(query.columns) for query in queries)
+    branches = []
+    offset = 0
+    for index, query in enumerate(queries):
+        slots = ['NULL'] * total
+        for i in range(len(query.columns)):
+            slots[offset + i] = f'q.c{i}'
+        columns = ', '.join(f'{slot} AS b{j}' for j, slot in enumerate(slots))
+        branches.append(f'SELECT {index} AS {BATCH_TAG}, {columns} FROM ({query.sql}) AS q')
+        offset += len(query.columns)
+    return '\nUNION ALL\n'.join(branches)
+
+
+class QueryBatcher:
+    """
+    QueryBatcher combines the small aggregate queries of the columns profiled concurrently into a single statement,
+    and demultiplexes the rows back to the waiting column profilers. A batch is sent when it is full, when all the
+    participating columns are waiting, or when a query has waited for the window.
+    """
+
+    def __init__(self, size: int, wait: float):
+        self.size = size
+        self.wait = wait
+        self.batches = 0
+        self._pending: List[_BatchedQuery] = []
+        self._participants = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def participate(self):
+        with self._lock:
+            self._participants += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._participants -= 1
+
+    def _take(self, query: _BatchedQuery) -> List[_BatchedQuery]:
+        if query.done.is_set() or not self._pending:
+            return []
+        if len(self._pending) >= min(self.size, self._participants) or \
+                time.perf_counter() - query.submitted >= self.wait:
+            batch, self._pending = self._pending[:self.size], self._pending[self.size:]
+            return batch
+        return []
+
+    def fetchall(self, conn: Connection, stmt: Select) -> list:
+        try:
+            query = _BatchedQuery(conn, stmt)
+        except Exception:
+            # e.g. the literal values could not be rendered
+            return conn.execute(stmt).fetchall()
+
+        with self._lock:
+            self._pending.append(query)
+        while not query.done.is_set():
+            with self._lock:
+                batch = self._take(query)
+            if batch:
+                self._execute(conn, batch)
+            else:
+                query.done.wait(self.wait)
+
+        if query.unbatched:
+            return conn.execute(stmt).fetchall()
+        return query.rows
+
+    def _execute(self, conn: Connection, batch: List[_BatchedQuery]):
+        try:
+            if len(batch) == 1:
+                return
+            result = conn.execution_options(template_source=None).exec_driver_sql(batch_statement(batch))
+            processors = self._get_processors(conn, batch, result.cursor.description)
+            for row in result.fetchall():
+                offset, column_processors = processors[row[0]]
+                values = row[1 + offset:1 + offset + len(column_processors)]
+                batch[row[0]].rows.append(tuple(processor(value) if processor else value for processor, value in
+                                                zip(column_processors, values)))
+            for query in batch:
+                query.unbatched = False
+            with self._lock:
+                self.batches += 1
+        except Exception:
+            # the queries fall back to be executed by themselves, which reports the errors of the columns
+            pass
+        finally:
+            for query in batch:
+                query.done.set()
+
+    @staticmethod
+    def _get_processors(conn: Connection, batch: List[_BatchedQuery], description) -> List[tuple]:
+        # the result processors of the column types, since the rows of the driver SQL are not processed
+        processors = []
+        offset = 0
+        for query in batch:
+            column_processors = []
+            for i, column in enumerate(query.columns):
+                try:
+                    coltype = description[1 + offset + i][1] if description else None
+                    column_processors.append(column.type._cached_result_processor(conn.dialect, coltype))
+                except Exception:
+                    column_processors.append(None)
+            processors.append((offset, column_processors))
+            offset += len(query.columns)
+        return processors
+
+
+def _is_row_wise(stmt: Select) -> bool:
+    # the select only transforms the rows of its single source
+    return len(stmt.get_final_froms()) <= 1 and stmt._where_criteria == () and stmt._group_by_clauses == () and \
+        stmt._having_criteria == () and stmt._limit_clause is None and stmt._offset_clause is None and \
+        not stmt._distinct
+
+
+def _inline(expr: ColumnElement, source: ColumnElement, template_table: str) -> Optional[ColumnElement]:
+    """
+    Replace the columns of the CTE chain in the expression by their definitions, down to the column of the template
+    table replaced by the source column. It returns None if any CTE is not a row-wise transform.
+    """
+    fusable = True
+
+    def _replace(element):
+        nonlocal fusable
+        if not isinstance(element, ColumnClause) or element.table is None:
+            return None
+        table = element.table
+        if getattr(table, 'name', None) == template_table:
+            return source
+        if isinstance(table, CTE):
+            if not isinstance(table.element, Select) or not _is_row_wise(table.element):
+                fusable = False
+                return element
+            definition = table.element.selected_columns[element.key]
+            if isinstance(definition, Label):
+                definition = definition.element
+            inlined = _inline(definition, source, template_table)
+            if inlined is None:
+                fusable = False
+                return element
+            return inlined
+        return None
+
+    inlined = replacement_traverse(expr, {}, _replace)
+    return inlined if fusable else None
+
+
+def fuse_statements(statements: List[Select], sources: List[ColumnElement], from_: FromClause,
+                    template_table: str) -> Optional[Select]:
+    """
+    Fuse the single row aggregate statements of the columns on the same source into one statement, so the source is
+    scanned once. Each statement is on the CTE chain of its template table, which is inlined with the source column.
+
+        SELECT count(*) AS f0_0, count(c1) AS f0_1, count(*) AS f1_0, count(c2) AS f1_1 FROM source
+
+    :return: the fused statement, or None if any statement is not a single row aggregate of row-wise transforms
+    """
+    columns = []
+    for i, (stmt, source) in enumerate(zip(statements, sources)):
+        if not _is_row_wise(stmt) or stmt._order_by_clauses != ():
+            return None
+        if isinstance(source, Label):
+            source = source.element
+        for j, column in enumerate(stmt.selected_columns):
+            if isinstance(column, Label):
+                column = column.element
+            inlined = _inline(column, source, template_table)
+            if inlined is None:
+                return None
+            columns.append(inlined.label(f'f{i}_{j}'))
+    return select(*columns).select_from(from_)
+
+
+def fuse_non_duplicates(columns: List[ColumnElement], sources: List[ColumnElement], from_: FromClause,
+                        template_table: str, grouping_sets: bool = False) -> Optional[Select]:
+    """
+    Fuse the uniqueness queries of the columns on the same source into one statement, so the source is scanned once.
+    The columns are unpivoted by their keys and compared as strings, and the values appearing once are counted by key.
+
+        SELECT k, count(*) FROM (
+            SELECT keys.k, CASE WHEN keys.k = 0 THEN CAST(c1 AS VARCHAR) WHEN keys.k = 1 THEN ... END AS v
+            FROM source, keys) AS t
+        WHERE v IS NOT NULL GROUP BY k, v HAVING count(*) = 1 ...
+
+    With 'grouping_sets', each column is a grouping set of its own, so the values are compared by their types.
+
+        SELECT k, count(*) FROM (
+            SELECT CASE WHEN grouping(c1) = 0 THEN 0 WHEN grouping(c2) = 0 THEN 1 ... END AS k
+            FROM source GROUP BY GROUPING SETS (c1, c2, ...)
+            HAVING count(*) = 1 AND (grouping(c1) = 0 AND c1 IS NOT NULL OR ...)) AS t
+        GROUP BY k
+
+    :return: the fused statement, or None if any column is not a row-wise transform of its source
+    """
+    values = []
+    for i, (column, source) in enumerate(zip(columns, sources)):
+        if isinstance(source, Label):
+            source = source.element
+        inlined = _inline(column, source, template_table)
+        if inlined is None:
+            return None
+        values.append((i, inlined if grouping_sets else cast(inlined, String)))
+
+    if grouping_sets:
+        # the keys are literals, so the grouping expressions are matched without the bound parameters
+        uniques = select(
+            case(*[(func.grouping(value) == 0, literal_column(str(i))) for i, value in values]).label('k'),
+        ).select_from(from_).group_by(func.grouping_sets(*[value for _, value in values])).having(and_(
+            func.count() == 1,
+            or_(*[and_(func.grouping(value) == 0, value.isnot(None)) for _, value in values]),
+        )).subquery()
+        return select(uniques.c.k, func.count().label('non_duplicates')).group_by(uniques.c.k)
+
+    keys = union_all(*[select(literal(i).label('k')) for i, _ in values]).subquery('keys')
+    unpivoted = select(
+        keys.c.k,
+        case(*[(keys.c.k == i, value) for i, value in values]).label('v'),
+    ).select_from(from_, keys).subquery()
+    uniques = select(unpivoted.c.k).where(unpivoted.c.v.isnot(None)).group_by(
+        unpivoted.c.k, unpivoted.c.v).having(func.count() == 1).subquery()
+    return select(uniques.c.k, func.count().label('non_duplicates')).group_by(uniques.c.k)
+
+
+def split_fused_row(row, statements: List[Select]) -> List[tuple]:
+    rows = []
+    offset = 0
+    for stmt in statements:
+        size = len(stmt.selected_columns)
+        rows.append(tuple(row[offset:offset + size]))
+        offset += size
+    return rows
+
+
+def fetchall(conn: Connection, stmt: Select) -> list:
+    """
+    Fetch the rows of the statement in any order. It is batched with the statements of the other columns if the
+    connection has a query batcher.
+    """
+    batcher: Optional[QueryBatcher] = conn.get_execution_options().get('query_batcher')
+    if batcher is None:
+        return conn.execute(stmt).fetchall()
+    return batcher.fetchall(conn, stmt)
+
+
+def fetchone(conn: Connection, stmt: Select):
+    """
+    Fetch the single row of an aggregate statement, which could be batched.
+    """
+    batcher: Optional[QueryBatcher] = conn.get_execution_options().get('query_batcher')
+    if batcher is None:
+        return conn.execute(stmt).fetchone()
+    rows = batcher.fetchall(conn, stmt)
+    return rows[0] if rows else None
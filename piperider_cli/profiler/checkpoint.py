@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+from collections.abc import Mapping
+from typing import Dict, List, Optional
+
+CHECKPOINT_DIR = '.checkpoints'
+
+
+def default_checkpoint_path(output_dir: str, run_id: str) -> str:
+    return os.path.join(output_dir, CHECKPOINT_DIR, f'{run_id}.jsonl')
+
+
+class CheckpointTables(Mapping):
+    """
+    The completed tables of a checkpoint by the offsets of their lines. A table is loaded from the file when it is
+    read, so the results are not kept in memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets: Dict[str, int] = {}
+
+    def __getitem__(self, name: str) -> dict:
+        offset = self.offsets[name]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())['result']
+
+    def __contains__(self, name) -> bool:
+        return name in self.offsets
+
+    def __iter__(self):
+        return iter(self.offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+
+class RunCheckpoint:
+    """
+    RunCheckpoint appends the completed table profiles of a run to a JSONL file, so an interrupted run could be resumed
+    without profiling the completed tables again. The first line is the run, and each following line is a table.
+
+        {"type": "run", "id": "...", "created_at": "...", "datasource": "..."}
+        {"type": "table", "name": "orders", "result": {...}}
+    """
+
+    def __init__(self, path: str, run_id: str, created_at: str, datasource: str):
+        self.path = path
+        self.run_id = run_id
+        self.created_at = created_at
+        self.datasource = datasource
+        self.tables = CheckpointTables(path)
+        self._created = True
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def create(path: str, run_id: str, created_at: str, datasource: str) -> 'RunCheckpoint':
+        """
+        Create the checkpoint of a new run. The file is written by the first completed table, so a run exiting before
+        that leaves no checkpoint.
+        """
+        checkpoint = RunCheckpoint(path, run_id, created_at, datasource)
+        checkpoint._created = False
+        return checkpoint
+
+    @staticmethod
+    def load(path: str) -> Optional['RunCheckpoint']:
+        """
+        Load the checkpoint of a run. The last line could be torn by a crash, and it is ignored.
+
+        :return: the checkpoint, or None if the file does not exist or has no run
+        """
+        if not os.path.exists(path):
+            return None
+        checkpoint = None
+        with open(path, 'rb') as f:
+            offset = 0
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry.get('type') == 'run':
+                    checkpoint = RunCheckpoint(path, entry.get('id'), entry.get('created_at'), entry.get('datasource'))
+                elif entry.get('type') == 'table' and checkpoint is not None:
+                    checkpoint.tables.offsets[entry.get('name')] = offset
+                offset += len(line)
+        if checkpoint is not None:
+            # drop the torn line, so the appended tables start from a new line
+            checkpoint._rewrite()
+        return checkpoint
+
+    def _rewrite(self):
+        tmp_path = f'{self.path}.tmp'
+        offsets = {}
+        with open(tmp_path, 'wb') as f:
+            f.write(self._encode(dict(type='run', id=self.run_id, created_at=self.created_at,
+                                      datasource=self.datasource)))
+            for name, result in self.tables.items():
+                offsets[name] = f.tell()
+                f.write(self._encode(dict(type='table', name=name, result=result)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.tables.offsets = offsets
+
+    @staticmethod
+    def _encode(entry: dict) -> bytes:
+        return (json.dumps(entry) + '\n').encode('ascii')
+
+    def append(self, name: str, result: dict):
+        """
+        Append the result of a completed table, which is synced to the disk before returning.
+        """
+        line = self._encode(dict(type='table', name=name, result=result))
+        with self._lock:
+            header = b''
+            if not self._created:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                header = self._encode(dict(type='run', id=self.run_id, created_at=self.created_at,
+                                           datasource=self.datasource))
+            with open(self.path, 'ab' if self._created else 'wb') as f:
+                offset = f.seek(0, os.SEEK_END) + len(header)
+                f.write(header + line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._created = True
+            self.tables.offsets[name] = offset
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def list_checkpoints(output_dir: str) -> List[dict]:
+    """
+    List the runs of the checkpoints in the outputs directory, without loading their tables.
+
+    :return: the run entries with the 'path' of the checkpoint
+    """
+    checkpoint_dir = os.path.join(output_dir, CHECKPOINT_DIR)
+    if not os.path.isdir(checkpoint_dir):
+        return []
+    checkpoints = []
+    for de in os.scandir(checkpoint_dir):
+        if not de.name.endswith('.jsonl'):
+            continue
+        try:
+            with open(de.path) as f:
+                entry = json.loads(f.readline())
+        except (ValueError, OSError):
+            continue
+        if isinstance(entry, dict) and entry.get('type') == 'run':
+            checkpoints.append(dict(entry, path=de.path))
+    return checkpoints
@@ -0,0 +1,61 @@
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class ColumnMetric:
+    """
+    A user-defined column metric. Its aggregates are folded into the basic aggregate statement of the column, so the
+    metric is profiled by the same scan as the built-in metrics.
+    """
+
+    def __init__(self, name: str, aggregates: Callable[[ColumnElement], List[ColumnElement]],
+                 finalizer: Callable[[list, dict], Any] = None, types: List[str] = None, description: str = None):
+        self.name = name
+        self.aggregates = aggregates
+        self.finalizer = finalizer
+        self.types = types
+        self.description = description
+
+    def is_applicable(self, generic_type: str) -> bool:
+        return not self.types or generic_type in self.types
+
+    def finalize(self, values: list, result: dict):
+        if self.finalizer is None:
+            return values[0] if values else None
+        return self.finalizer(values, result)
+
+
+_column_metrics: Dict[str, ColumnMetric] = {}
+
+
+def register_column_metric(name: str, aggregates: Callable[[ColumnElement], List[ColumnElement]],
+                           finalizer: Callable[[list, dict], Any] = None, types: List[str] = None,
+                           description: str = None):
+    """
+    Register a user-defined column metric, usually by a module in the plugins directory.
+
+        register_column_metric(
+            'email_invalids_p',
+            lambda c: [func.count(case((c.notlike('%_@_%'), 1)))],
+            finalizer=lambda values, result: percentage(values[0], result['valids']),
+            types=['string'])
+
+    :param name: the name of the metric under 'metrics' of the column result, which could be asserted by the name
+    :param aggregates: build the sql aggregate expressions of the valid values of the column
+    :param finalizer: compute the metric by the aggregated values and the result of the built-in metrics. Without it,
+        the metric is the first aggregated value
+    :param types: the generic types of the columns to profile, e.g. ['string']. Default is all the types
+    """
+    if name in _column_metrics:
+        raise ValueError(f"column metric '{name}' has been registered")
+    _column_metrics[name] = ColumnMetric(name, aggregates, finalizer=finalizer, types=types, description=description)
+
+
+def unregister_column_metric(name: str):
+    _column_metrics.pop(name, None)
+
+
+def get_column_metrics(generic_type: Optional[str] = None) -> List[ColumnMetric]:
+    return [metric for metric in _column_metrics.values()
+            if generic_type is None or metric.is_applicable(generic_type)]
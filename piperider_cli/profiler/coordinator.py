@@ -0,0 +1,362 @@
+import copy
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from rich.console import Console
+
+from .event import DefaultProfilerEventHandler
+from .profiler import Profiler, ProfileSubject
+from ..assertion_engine import AssertionEngine
+from ..configuration import Configuration
+from ..datasource import DataSource
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_POLL_SECONDS = 2
+MAX_ATTEMPTS = 3
+
+TASK_PENDING = 'pending'
+TASK_RUNNING = 'running'
+TASK_DONE = 'done'
+TASK_FAILED = 'failed'
+
+
+def default_queue_path(configuration: Configuration, report_dir: str = None) -> str:
+    filesystem = configuration.activate_report_directory(report_dir=report_dir)
+    return os.path.join(filesystem.get_output_dir(), '.coordinator.sqlite')
+
+
+def default_worker_id() -> str:
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+@dataclass
+class Task:
+    name: str
+    subject: ProfileSubject
+    attempts: int
+    # the profiler config and the column priorities of the run, which the workers profile the table by
+    options: dict
+
+
+class WorkQueue:
+    """
+    WorkQueue is the table queue shared by the coordinator and the workers. It is a sqlite file, so the workers on the
+    same host or on the hosts sharing the filesystem could claim the tasks.
+
+    A claimed task holds a lease. The worker renews the lease while profiling, and the task of a crashed worker is
+    claimed again after the lease expires. A task fails after MAX_ATTEMPTS attempts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS run (
+                run_id TEXT NOT NULL,
+                datasource TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                name TEXT PRIMARY KEY,
+                subject TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                options TEXT
+            )''')
+        if 'options' not in [row[1] for row in conn.execute('PRAGMA table_info(tasks)')]:
+            # the queue created by an older version
+            conn.execute('ALTER TABLE tasks ADD COLUMN options TEXT')
+        return conn
+
+    def _transaction(self, func: Callable[[sqlite3.Connection], any]):
+        conn = self._connect()
+        try:
+            # lock the database for writing before reading the tasks
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = func(conn)
+                conn.execute('COMMIT')
+                return result
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+
+    def reset(self, run_id: str, datasource: str, subjects: List[ProfileSubject], options: Dict[str, dict] = None):
+        """
+        Start a run of the subjects. The options of a task are keyed by the subject name.
+        """
+        options = options or {}
+
+        def _reset(conn):
+            conn.execute('DELETE FROM run')
+            conn.execute('DELETE FROM tasks')
+            conn.execute('INSERT INTO run VALUES (?, ?, ?)', (run_id, datasource, time.time()))
+            conn.executemany('INSERT INTO tasks (name, subject, status, options) VALUES (?, ?, ?, ?)', [
+                (subject.name, json.dumps(subject.__dict__), TASK_PENDING, json.dumps(options.get(subject.name, {})))
+                for subject in subjects
+            ])
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._transaction(_reset)
+
+    def get_run(self) -> Optional[Tuple[str, str]]:
+        """
+        :return: (run_id, datasource) of the current run
+        """
+        if not os.path.exists(self.path):
+            return None
+        return self._transaction(lambda conn: conn.execute('SELECT run_id, datasource FROM run').fetchone())
+
+    def claim(self, worker: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> Optional[Task]:
+        def _claim(conn):
+            now = time.time()
+            # the task of a crashed worker fails if it has been attempted too many times
+            conn.execute('''
+                UPDATE tasks SET status = ?, error = ?
+                WHERE status = ? AND lease_expires < ? AND attempts >= ?''',
+                         (TASK_FAILED, 'lease expired', TASK_RUNNING, now, MAX_ATTEMPTS))
+            row = conn.execute('''
+                SELECT name, subject, attempts, options FROM tasks
+                WHERE status = ? OR (status = ? AND lease_expires < ?)
+                ORDER BY rowid LIMIT 1''', (TASK_PENDING, TASK_RUNNING, now)).fetchone()
+            if row is None:
+                return None
+            name, subject, attempts, options = row
+            conn.execute('''
+                UPDATE tasks SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE name = ?''', (TASK_RUNNING, worker, now + lease_seconds, name))
+            return Task(name, ProfileSubject(**json.loads(subject)), attempts + 1, json.loads(options or '{}'))
+
+        return self._transaction(_claim)
+
+    def renew(self, name: str, worker: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> bool:
+        def _renew(conn):
+            cursor = conn.execute('''
+                UPDATE tasks SET lease_expires = ?
+                WHERE name = ? AND worker = ? AND status = ?''', (time.time() + lease_seconds, name, worker, TASK_RUNNING))
+            return cursor.rowcount == 1
+
+        return self._transaction(_renew)
+
+    def complete(self, name: str, worker: str, result: dict) -> bool:
+        def _complete(conn):
+            cursor = conn.execute('''
+                UPDATE tasks SET status = ?, result = ?, error = NULL
+                WHERE name = ? AND worker = ? AND status = ?''', (TASK_DONE, json.dumps(result), name, worker, TASK_RUNNING))
+            return cursor.rowcount == 1
+
+        return self._transaction(_complete)
+
+    def fail(self, name: str, worker: str, error: str):
+        def _fail(conn):
+            conn.execute('''
+                UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?
+                WHERE name = ? AND worker = ? AND status = ?''',
+                         (MAX_ATTEMPTS, TASK_FAILED, TASK_PENDING, error, name, worker, TASK_RUNNING))
+
+        self._transaction(_fail)
+
+    def progress(self) -> Dict[str, int]:
+        def _progress(conn):
+            return {status: count for status, count in
+                    conn.execute('SELECT status, count(*) FROM tasks GROUP BY status').fetchall()}
+
+        return self._transaction(_progress)
+
+    def is_finished(self) -> bool:
+        progress = self.progress()
+        return progress.get(TASK_PENDING, 0) == 0 and progress.get(TASK_RUNNING, 0) == 0
+
+    def results(self) -> Dict[str, dict]:
+        def _results(conn):
+            return {name: json.loads(result) for name, result in
+                    conn.execute('SELECT name, result FROM tasks WHERE status = ?', (TASK_DONE,)).fetchall()}
+
+        return self._transaction(_results)
+
+    def failures(self) -> Dict[str, str]:
+        def _failures(conn):
+            return dict(conn.execute('SELECT name, error FROM tasks WHERE status = ?', (TASK_FAILED,)).fetchall())
+
+        return self._transaction(_failures)
+
+
+class Worker:
+    """
+    Worker claims the tables from the work queue and profiles them by the table profiler.
+    """
+
+    def __init__(self, queue: WorkQueue, data_source: DataSource, configuration: Configuration = None,
+                 worker_id: str = None, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+                 poll_seconds: float = DEFAULT_POLL_SECONDS, console: Console = None):
+        self.queue = queue
+        self.data_source = data_source
+        self.configuration = configuration
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.console = console
+
+    def _profile(self, subject: ProfileSubject, options: dict) -> dict:
+        configuration = self.configuration
+        if configuration is not None and 'profiler' in options:
+            # the profiler config of the coordinator, including the options given by its command line
+            configuration = copy.copy(configuration)
+            configuration.profiler_config = options['profiler']
+        profiler = Profiler(self.data_source, DefaultProfilerEventHandler(), configuration)
+        profiler.column_priorities = {subject.name: options.get('column_priorities') or {}}
+        result = profiler.profile([subject])
+        table_result = result['tables'].get(subject.name)
+        if table_result is None:
+            raise Exception(f"No such table '{subject.name}'")
+        return table_result
+
+    def _process(self, task: Task):
+        stopped = threading.Event()
+
+        def _renew_lease():
+            while not stopped.wait(self.lease_seconds / 3):
+                self.queue.renew(task.name, self.worker_id, self.lease_seconds)
+
+        renew_thread = threading.Thread(target=_renew_lease, daemon=True)
+        renew_thread.start()
+        try:
+            result = self._profile(task.subject, task.options)
+            stopped.set()
+            renew_thread.join()
+            if self.queue.complete(task.name, self.worker_id, result):
+                self._print(f'[[bold green] DONE [/bold green]] {task.name}')
+        except Exception as e:
+            stopped.set()
+            renew_thread.join()
+            self.queue.fail(task.name, self.worker_id, f'{type(e).__name__}: {e}')
+            self._print(f'[[bold red]FAILED[/bold red]] {task.name} (attempt {task.attempts}): {e}')
+
+    def _print(self, message):
+        if self.console:
+            self.console.print(message)
+
+    def run(self) -> int:
+        """
+        Process the tasks until the queue is finished. The worker keeps polling while other workers hold the leases,
+        so it could take over the tasks of a crashed worker.
+
+        :return: the number of processed tasks
+        """
+        processed = 0
+        while True:
+            task = self.queue.claim(self.worker_id, self.lease_seconds)
+            if task is not None:
+                self._process(task)
+                processed += 1
+                continue
+            if self.queue.is_finished():
+                break
+            time.sleep(self.poll_seconds)
+        return processed
+
+
+class Coordinator:
+    """
+    Coordinator partitions the profile subjects into the work queue, works on the queue as a local worker, and merges
+    the table results of all the workers. The tasks carry the profiler config and the column priorities of the
+    coordinator, so the workers profile the tables as the local run does. The total budgets of the run are not
+    supported, since the workers do not share the spent bytes and seconds.
+    """
+
+    def __init__(self, queue: WorkQueue, data_source: DataSource, configuration: Configuration = None,
+                 lease_seconds: int = DEFAULT_LEASE_SECONDS, console: Console = None):
+        self.queue = queue
+        self.data_source = data_source
+        self.configuration = configuration
+        self.lease_seconds = lease_seconds
+        self.console = console
+
+    def profile(self, run_id: str, profiler: Profiler, subjects: List[ProfileSubject]) -> dict:
+        """
+        Profile the subjects by the workers. The metadata must be collected by the profiler before.
+
+        :return: the profile results
+        """
+        # the tables not found by the metadata are skipped as the local run does
+        subjects = [subject for subject in subjects if subject.name in profiler.collected_metadata.map_name_tables]
+        profiler_config = profiler.config.profiler_config if profiler.config else None
+        options = {}
+        for subject in subjects:
+            options[subject.name] = dict(column_priorities=profiler.column_priorities.get(subject.name, {}))
+            if profiler_config is not None:
+                options[subject.name]['profiler'] = profiler_config
+        self.queue.reset(run_id, self.data_source.name, subjects, options)
+        if self.console:
+            self.console.print(f'Coordinating {len(subjects)} tables by the queue: {self.queue.path}')
+
+        Worker(self.queue, self.data_source, self.configuration, worker_id=f'coordinator-{default_worker_id()}',
+               lease_seconds=self.lease_seconds, console=self.console).run()
+
+        result = profiler.collected_metadata.result
+        results = self.queue.results()
+        result['tables'].update(results)
+        for name, table in results.items():
+            if table.get('status') in ['basic', 'skipped'] and not table.get('estimated'):
+                profiler.budget_decisions[name] = table['status']
+
+        # the failed tables keep their schema, so the report and the assertions see them
+        for name, error in self.queue.failures().items():
+            table = result['tables'].get(name) or {'name': name, 'columns': {}}
+            table['status'] = 'failed'
+            table['error'] = error
+            result['tables'][name] = table
+            if self.console:
+                self.console.print(f'[bold yellow]Warning:[/bold yellow] Failed to profile the table {name}: {error}')
+        return result
+
+
+class WorkerRunner:
+    @staticmethod
+    def exec(queue_path: str = None, report_dir: str = None, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+             worker_id: str = None):
+        console = Console()
+        configuration = Configuration.instance()
+        queue = WorkQueue(queue_path or default_queue_path(configuration, report_dir))
+
+        run = queue.get_run()
+        if run is None:
+            console.print(f'[bold red]Error:[/bold red] No coordinator run found in the queue: {queue.path}')
+            return 1
+
+        run_id, ds_name = run
+        datasources = {ds.name: ds for ds in configuration.dataSources}
+        if ds_name not in datasources:
+            console.print(f"[bold red]Error:[/bold red] datasource '{ds_name}' doesn't exist")
+            return 1
+
+        ds = datasources[ds_name]
+        err = ds.verify_connector()
+        if err:
+            console.print(f'[[bold red]FAILED[/bold red]] Failed to load the \'{ds.type_name}\' connector.')
+            raise err
+        ds.warm_up_pool()
+        # the plugins could register the column metrics, which are profiled with the built-in metrics
+        AssertionEngine(None).load_plugins()
+
+        worker = Worker(queue, ds, configuration, worker_id=worker_id, lease_seconds=lease_seconds, console=console)
+        console.print(f'[bold dark_orange]Worker:[/bold dark_orange] {worker.worker_id} (run {run_id})')
+        processed = worker.run()
+        console.print(f'{processed} tables processed')
+        console.print(f'[bold dark_orange]Connection pool:[/bold dark_orange] {ds.pool_statistics}')
+        return 0
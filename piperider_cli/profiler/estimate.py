@@ -0,0 +1,318 @@
+import math
+import re
+from bisect import bisect_right
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Table, func, inspect, select, text
+from sqlalchemy.engine import Connection
+
+from .profiler import percentage, histogram_bins, datetime_histogram_bins
+
+ESTIMATE_SUPPORTED_BACKENDS = ['postgresql', 'redshift', 'duckdb']
+
+_DUCKDB_MIN_MAX = re.compile(r'\[Min: (.*?), Max: (.*?)(?:, Has Unicode: .*)?\]\[')
+_DUCKDB_HAS_NULL = re.compile(r'Has Null: (true|false)')
+_DUCKDB_APPROX_UNIQUE = re.compile(r'Approx Unique: (\d+)')
+
+
+class ColumnStatistics:
+    """
+    The catalog statistics of a column. The fractions are of all the rows, and the values are in the text form of the
+    catalog.
+    """
+
+    def __init__(self, null_frac: float = None, distinct: float = None, common_values: List[str] = None,
+                 common_freqs: List[float] = None, histogram_bounds: List[str] = None, min: str = None,
+                 max: str = None):
+        self.null_frac = null_frac
+        # the number of the distinct values, or the negative fraction of the rows as 'n_distinct' of postgres
+        self.distinct = distinct
+        self.common_values = common_values or []
+        self.common_freqs = common_freqs or []
+        # the bounds of the buckets with the same number of rows, the common values are excluded
+        self.histogram_bounds = histogram_bounds or []
+        self.min = min
+        self.max = max
+
+
+def parse_array(literal: Optional[str]) -> List[Optional[str]]:
+    """
+    Parse the text form of a postgres array, e.g. '{1,"a, b",NULL}'
+    """
+    if not literal or not literal.startswith('{'):
+        return []
+    values = []
+    value = ''
+    quoted = escaped = False
+    in_quotes = False
+    for ch in literal[1:-1]:
+        if escaped:
+            value += ch
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif ch == '"':
+            in_quotes = not in_quotes
+            quoted = True
+        elif ch == ',' and not in_quotes:
+            values.append(None if value == 'NULL' and not quoted else value)
+            value = ''
+            quoted = False
+        else:
+            value += ch
+    if literal != '{}':
+        values.append(None if value == 'NULL' and not quoted else value)
+    return values
+
+
+def _get_schema(conn: Connection, table: Table) -> str:
+    return table.schema or inspect(conn).default_schema_name
+
+
+def _read_pg_stats(conn: Connection, schema: str, table_name: str) -> Dict[str, ColumnStatistics]:
+    stmt = text('SELECT attname, null_frac, n_distinct, most_common_vals::text, most_common_freqs::text, '
+                'histogram_bounds::text FROM pg_stats WHERE schemaname = :schema AND tablename = :table')
+    statistics = {}
+    for name, null_frac, n_distinct, common_values, common_freqs, bounds in conn.execute(
+            stmt, dict(schema=schema, table=table_name)):
+        statistics[name] = ColumnStatistics(
+            null_frac=float(null_frac) if null_frac is not None else None,
+            distinct=float(n_distinct) if n_distinct is not None else None,
+            common_values=parse_array(common_values),
+            common_freqs=[float(freq) for freq in parse_array(common_freqs)],
+            histogram_bounds=parse_array(bounds),
+        )
+    return statistics
+
+
+def _read_postgres(conn: Connection, table: Table) -> Tuple[Optional[int], Dict[str, ColumnStatistics]]:
+    schema = _get_schema(conn, table)
+    stmt = text('SELECT c.reltuples FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace '
+                'WHERE n.nspname = :schema AND c.relname = :table')
+    row = conn.execute(stmt, dict(schema=schema, table=table.name)).fetchone()
+    # reltuples is -1 if the table has never been analyzed
+    row_count = int(row[0]) if row is not None and row[0] is not None and row[0] >= 0 else None
+    return row_count, _read_pg_stats(conn, schema, table.name)
+
+
+def _read_redshift(conn: Connection, table: Table) -> Tuple[Optional[int], Dict[str, ColumnStatistics]]:
+    schema = _get_schema(conn, table)
+    stmt = text('SELECT tbl_rows FROM svv_table_info WHERE "schema" = :schema AND "table" = :table')
+    row = conn.execute(stmt, dict(schema=schema, table=table.name)).fetchone()
+    row_count = int(row[0]) if row is not None and row[0] is not None else None
+    return row_count, _read_pg_stats(conn, schema, table.name)
+
+
+def _read_duckdb(conn: Connection, table: Table) -> Tuple[Optional[int], Dict[str, ColumnStatistics]]:
+    schema = _get_schema(conn, table)
+    stmt = text('SELECT estimated_size FROM duckdb_tables() WHERE schema_name = :schema AND table_name = :table')
+    row = conn.execute(stmt, dict(schema=schema, table=table.name)).fetchone()
+    if row is None:
+        # e.g. the views of the csv and parquet files
+        return None, {}
+
+    # stats() returns the statistics of the column kept by the storage, the limit reads only the first vector
+    names = [column.name for column in table.columns]
+    stmt = select(*[func.stats(column) for column in table.columns]).select_from(table).limit(1)
+    values = conn.execute(stmt).fetchone() or []
+    statistics = {}
+    for name, value in zip(names, values):
+        min_max = _DUCKDB_MIN_MAX.search(value)
+        has_null = _DUCKDB_HAS_NULL.search(value)
+        approx_unique = _DUCKDB_APPROX_UNIQUE.search(value)
+        statistics[name] = ColumnStatistics(
+            # the number of the nulls is not kept, only whether there is any
+            null_frac=0.0 if has_null and has_null.group(1) == 'false' else None,
+            distinct=int(approx_unique.group(1)) if approx_unique else None,
+            min=min_max.group(1) if min_max else None,
+            max=min_max.group(2) if min_max else None,
+        )
+    return row[0], statistics
+
+
+_CATALOG_READERS = {
+    'postgresql': _read_postgres,
+    'redshift': _read_redshift,
+    'duckdb': _read_duckdb,
+}
+
+
+def fetch_catalog_statistics(conn: Connection, table: Table) -> Tuple[Optional[int], Dict[str, ColumnStatistics]]:
+    """
+    Read the row count and the column statistics of the table from the catalog without scanning the table.
+
+    :return: the row count, which is None if the table has no statistics, and the statistics by the column names
+    """
+    reader = _CATALOG_READERS[conn.engine.url.get_backend_name()]
+    return reader(conn, table)
+
+
+def _to_value(generic_type: str, value: Optional[str]):
+    if value is None:
+        return None
+    try:
+        if generic_type == 'integer':
+            return int(value)
+        elif generic_type == 'numeric':
+            return float(value)
+        elif generic_type == 'datetime':
+            return datetime.fromisoformat(value) if len(value) > 10 else date.fromisoformat(value)
+        elif generic_type == 'boolean':
+            return value.lower() in ['t', 'true']
+    except ValueError:
+        return None
+    return value
+
+
+def _to_number(value) -> float:
+    if isinstance(value, datetime):
+        return (value.replace(tzinfo=None) - datetime(1970, 1, 1)).total_seconds()
+    if isinstance(value, date):
+        return (datetime.combine(value, time()) - datetime(1970, 1, 1)).total_seconds()
+    return value
+
+
+def _get_segments(values: list, counts: List[int], bounds: list, non_nulls: int) -> List[Tuple]:
+    """
+    Model the distribution by the segments of (lower, upper, rows). The common values are the points, and the rows of
+    the others are spread evenly over the histogram buckets.
+    """
+    segments = [(value, value, count) for value, count in zip(values, counts) if value is not None]
+    if len(bounds) > 1:
+        rest = max(non_nulls - sum(count for _, _, count in segments), 0)
+        segments += [(bounds[i], bounds[i + 1], rest / (len(bounds) - 1)) for i in range(len(bounds) - 1)]
+    return sorted(segments)
+
+
+def _histogram_counts(segments: List[Tuple], edges: List[float]) -> List[int]:
+    counts = [0.0] * (len(edges) - 1)
+    for lower, upper, rows in segments:
+        if upper <= lower:
+            i = min(max(bisect_right(edges, lower) - 1, 0), len(counts) - 1)
+            counts[i] += rows
+            continue
+        for i in range(len(counts)):
+            overlap = min(upper, edges[i + 1]) - max(lower, edges[i])
+            if overlap > 0:
+                counts[i] += rows * overlap / (upper - lower)
+    # round the cumulative counts to keep the total
+    rounded = []
+    cumulative = 0
+    for count in counts:
+        rounded.append(round(cumulative + count) - round(cumulative))
+        cumulative += count
+    return rounded
+
+
+def _quantile(segments: List[Tuple], q: float):
+    target = q * sum(segment[2] for segment in segments)
+    cumulative = 0
+    for lower, upper, rows in segments:
+        if rows > 0 and cumulative + rows >= target:
+            return lower + (upper - lower) * (target - cumulative) / rows
+        cumulative += rows
+    return segments[-1][1]
+
+
+def estimate_column(generic_type: str, stats: Optional[ColumnStatistics], row_count: int) -> dict:
+    """
+    Estimate the metrics of a column from its catalog statistics. The metrics which need scanning the table, e.g. sum,
+    avg and duplicates, and the metrics not kept by the catalog are omitted.
+    """
+    result = _estimate_metrics(generic_type, stats, row_count)
+    return {key: value for key, value in result.items() if value is not None}
+
+
+def _estimate_metrics(generic_type: str, stats: Optional[ColumnStatistics], row_count: int) -> dict:
+    stats = stats or ColumnStatistics()
+    is_integer = generic_type == 'integer'
+    nulls = round(stats.null_frac * row_count) if stats.null_frac is not None else None
+    non_nulls = row_count - nulls if nulls is not None else None
+    result = {
+        'samples': row_count,
+        'non_nulls': non_nulls,
+        'non_nulls_p': percentage(non_nulls, row_count),
+        'nulls': nulls,
+        'nulls_p': percentage(nulls, row_count),
+        'valids': non_nulls,
+        'valids_p': percentage(non_nulls, row_count),
+        'invalids': 0 if non_nulls is not None else None,
+        'invalids_p': 0 if non_nulls is not None else None,
+    }
+
+    distinct = None
+    if stats.distinct is not None:
+        distinct = round(-stats.distinct * row_count if stats.distinct < 0 else stats.distinct)
+        if non_nulls is not None:
+            distinct = min(distinct, non_nulls)
+    result['distinct'] = distinct
+    result['distinct_p'] = percentage(distinct, non_nulls)
+
+    counts = [round(freq * row_count) for freq in stats.common_freqs]
+    if generic_type in ['string', 'integer'] and stats.common_values:
+        result['topk'] = {'values': stats.common_values, 'counts': counts}
+
+    values = [_to_value(generic_type, value) for value in stats.common_values]
+    if generic_type == 'boolean':
+        value_counts = dict(zip(values, counts))
+        trues, falses = value_counts.get(True), value_counts.get(False)
+        if non_nulls is not None:
+            # the other value is not common enough to be kept
+            if falses is None and trues is not None:
+                falses = non_nulls - trues
+            elif trues is None and falses is not None:
+                trues = non_nulls - falses
+        result.update({
+            'trues': trues,
+            'trues_p': percentage(trues, row_count),
+            'falses': falses,
+            'falses_p': percentage(falses, row_count),
+        })
+
+    if generic_type not in ['integer', 'numeric', 'datetime']:
+        return result
+
+    bounds = [_to_value(generic_type, value) for value in stats.histogram_bounds]
+    candidates = [v for v in values + bounds + [_to_value(generic_type, stats.min), _to_value(generic_type, stats.max)]
+                  if v is not None]
+    if not candidates:
+        return result
+    _min = _to_value(generic_type, stats.min) if stats.min is not None else min(candidates)
+    _max = _to_value(generic_type, stats.max) if stats.max is not None else max(candidates)
+    if _min is None or _max is None or _min > _max:
+        # e.g. the column has no values
+        return result
+    if generic_type != 'datetime' and not (math.isfinite(_min) and math.isfinite(_max)):
+        return result
+
+    if generic_type == 'datetime':
+        result['min'] = _min.isoformat()
+        result['max'] = _max.isoformat()
+    else:
+        result['min'] = _min
+        result['max'] = _max
+
+    if non_nulls is None or not (stats.common_values or len(bounds) > 1):
+        return result
+    segments = _get_segments([_to_number(v) for v in values], counts, [_to_number(v) for v in bounds], non_nulls)
+    if not segments:
+        return result
+
+    if generic_type == 'datetime':
+        _, _, labels, bin_edges = datetime_histogram_bins(_min, _max)
+        edges = [_to_number(date.fromisoformat(edge)) for edge in bin_edges]
+    else:
+        _, _, labels, bin_edges = histogram_bins(_min, _max, is_integer)
+        edges = bin_edges
+    result['histogram'] = {
+        'labels': labels,
+        'counts': _histogram_counts(segments, edges),
+        'bin_edges': bin_edges,
+    }
+
+    if generic_type != 'datetime':
+        for q in [5, 25, 50, 75, 95]:
+            value = _quantile(segments, q / 100)
+            result[f'p{q}'] = round(value) if is_integer else value
+    return result
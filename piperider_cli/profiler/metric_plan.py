@@ -0,0 +1,106 @@
+from typing import Dict, Iterable, Optional, Set
+
+# the groups of the column metrics profiled by the queries after the basic statement. The basic metrics, e.g. nulls,
+# distinct and min/max, are always profiled by the single scan of the basic statement.
+_GROUP_FIELDS = {
+    'duplicates': ['duplicates', 'duplicates_p', 'non_duplicates', 'non_duplicates_p'],
+    'topk': ['topk'],
+    'histogram': ['histogram', 'histogram_length'],
+    'quantiles': ['p5', 'p25', 'p50', 'p75', 'p95'],
+}
+_FIELD_GROUPS = {field: group for group, fields in _GROUP_FIELDS.items() for field in fields}
+
+# the metric groups read by the builtin assertion functions
+_ASSERTION_GROUPS = {
+    'assert_column_value': {'topk'},
+}
+
+
+def get_metric_groups(names: Iterable[str]) -> Set[str]:
+    """
+    Get the groups of the metric fields or the group names, e.g. ['p50', 'topk'] is {'quantiles', 'topk'}.
+    """
+    groups = set()
+    for name in names or []:
+        if name in _GROUP_FIELDS:
+            groups.add(name)
+        elif name in _FIELD_GROUPS:
+            groups.add(_FIELD_GROUPS[name])
+    return groups
+
+
+def _union(a: Optional[Set[str]], b: Optional[Set[str]]) -> Optional[Set[str]]:
+    # None is all the groups
+    if a is None or b is None:
+        return None
+    return a | b
+
+
+class MetricPlan:
+    """
+    The metric groups to profile the columns of a table. The groups of a column are None to profile all of them.
+    """
+
+    def __init__(self, groups: Optional[Set[str]], columns: Dict[str, Set[str]] = None,
+                 required: Dict[str, Optional[Set[str]]] = None):
+        self.groups = groups
+        self.columns = columns or {}
+        self.required = required or {}
+
+    def get(self, column_name: str) -> Optional[Set[str]]:
+        groups = self.columns.get(column_name, self.groups)
+        return _union(groups, self.required.get(column_name, set()))
+
+
+def compile_metric_plan(profiler_config: dict, table_name: str,
+                        required: Dict[Optional[str], Optional[Set[str]]] = None) -> Optional[MetricPlan]:
+    """
+    Compile the metric plan of the table from the 'metrics' of the profiler config. The groups required by the
+    assertions are always profiled.
+
+    :param required: the groups required by the columns, or by the whole table with the key None
+    :return: the plan, or None to profile all the metrics
+    """
+    config = (profiler_config or {}).get('metrics') or {}
+    selection = config.get('select', 'all')
+    table_config = (config.get('tables') or {}).get(table_name) or {}
+    required = required or {}
+
+    if selection != 'auto' and not table_config:
+        return None
+    if None in required and required[None] is None:
+        return None
+
+    if table_config.get('metrics') is not None:
+        groups = get_metric_groups(table_config.get('metrics'))
+    elif selection == 'auto':
+        groups = get_metric_groups(config.get('report'))
+    else:
+        groups = None
+    columns = {name: get_metric_groups(names) for name, names in (table_config.get('columns') or {}).items()}
+    return MetricPlan(groups, columns, required)
+
+
+def load_required_metrics() -> Dict[str, Dict[Optional[str], Optional[Set[str]]]]:
+    """
+    Derive the metric groups required by the assertions of the project, e.g. {'orders': {'amount': {'quantiles'}}}.
+    The groups are None for a custom assertion function, which could read any metric.
+    """
+    from piperider_cli.assertion_engine import AssertionEngine
+    from piperider_cli.assertion_engine.types import custom_registry, get_assertion
+
+    assertion_engine = AssertionEngine(None)
+    assertion_engine.load_all_assertions_for_validation()
+    required = {}
+    for assertion in assertion_engine.assertions:
+        if assertion.metric:
+            groups = get_metric_groups([assertion.metric])
+        else:
+            instance = custom_registry.get(assertion.name)
+            if instance is not None and instance.__class__.__module__.startswith(get_assertion.__module__):
+                groups = _ASSERTION_GROUPS.get(assertion.name, set())
+            else:
+                groups = None
+        table = required.setdefault(assertion.table, {})
+        table[assertion.column] = _union(table.get(assertion.column, set()), groups)
+    return required
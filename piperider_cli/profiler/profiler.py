@@ -1,28 +1,46 @@
 import asyncio
 import decimal
 import math
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, date, timezone
-from typing import Optional, Union, List, Tuple
+from typing import Dict, MutableMapping, Optional, Union, List, Set, Tuple
 
 import sentry_sdk
 from dateutil.relativedelta import relativedelta
 from sqlalchemy import MetaData, Table, Column, String, Integer, Numeric, Date, DateTime, Boolean, ARRAY, select, func, \
-    distinct, case, text, literal_column, inspect, JSON
+    distinct, case, text, literal_column, inspect, JSON, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.engine import Engine, Connection
-from sqlalchemy.sql import FromClause, Selectable
-from sqlalchemy.sql.elements import ColumnClause
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import FromClause, Select, Selectable
+from sqlalchemy.sql.elements import ColumnClause, ColumnElement
 from sqlalchemy.sql.expression import CTE, false, true, table as table_clause, column as column_clause
 from sqlalchemy.types import Float
 
+from .batching import QueryBatcher, fetchall, fetchone, fuse_non_duplicates, fuse_statements, split_fused_row
+from .checkpoint import RunCheckpoint
+from .column_metrics import ColumnMetric, get_column_metrics
 from .event import ProfilerEventHandler, DefaultProfilerEventHandler
+from .metric_plan import MetricPlan, compile_metric_plan, load_required_metrics
 from ..configuration import Configuration
 from ..datasource import DataSource
+from ..datasource.cancellation import is_timeout_error
+from ..datasource.cost import QueryCost
+from ..datasource.dialect import Dialect, get_dialect
+from ..datasource.explain import explain_query, sum_estimates
+from ..error import PipeRiderProfilerEngineError, PipeRiderProfilerModeError
+from ..tracing import Tracer
 
 HISTOGRAM_NUM_BUCKET = 50
+# the milliseconds a query waits for the other columns to be batched with
+DEFAULT_BATCH_WAIT_MILLI = 50
+# the priorities of the columns profiled within the time budget, the lower first
+PRIORITY_TESTED = 0
+PRIORITY_CHANGED = 1
+PRIORITY_DEFAULT = 2
 
 
 class ProfileSubject:
@@ -84,6 +102,101 @@ def percentage(number, total):
     return number / total
 
 
+# the placeholders of the statement templates, which are replaced by the column source at execution
+TEMPLATE_TABLE = '__piperider_table__'
+TEMPLATE_COLUMN = '__piperider_column__'
+_template_ctes = {}
+_template_lock = threading.Lock()
+
+
+class TemplateSource:
+    """
+    The column source of the statement templates. The compiled SQL of a template is shared by the columns, and the
+    source is defined as the CTE of the placeholder table in front of it, so only the prefix differs by the column.
+
+        WITH __piperider_table__ AS (SELECT "c1" AS __piperider_column__ FROM "t"), anon_1 AS (...) SELECT ...
+    """
+
+    def __init__(self, table: FromClause, column: ColumnClause):
+        self.table = table
+        self.column = column
+        self._definitions = {}
+
+    def _get_definition(self, dialect) -> str:
+        definition = self._definitions.get(dialect.name)
+        if definition is None:
+            preparer = dialect.identifier_preparer
+            if isinstance(self.table, Table):
+                # quoted by the dialect without compiling a statement per column
+                source = f'SELECT {preparer.quote(self.column.name)} AS {preparer.quote(TEMPLATE_COLUMN)} ' \
+                         f'FROM {preparer.format_table(self.table)}'
+            else:
+                stmt = select(self.column.label(TEMPLATE_COLUMN)).select_from(self.table)
+                source = str(stmt.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+            definition = self._definitions[dialect.name] = f'{preparer.quote(TEMPLATE_TABLE)} AS ({source})'
+        return definition
+
+    def bind(self, sql: str, dialect) -> str:
+        """
+        Bind the source to the compiled SQL of a template by the CTE of the placeholder table.
+        """
+        if dialect.identifier_preparer.quote(TEMPLATE_TABLE) not in sql:
+            return sql
+        definition = self._get_definition(dialect)
+        sql = sql.lstrip()
+        if sql[:5].upper() == 'WITH ':
+            return f'WITH {definition}, {sql[5:]}'
+        return f'WITH {definition} {sql}'
+
+
+def _bind_template_source(conn, cursor, statement, parameters, context, executemany):
+    source: Optional[TemplateSource] = context.execution_options.get('template_source') if context else None
+    if source is not None:
+        statement = source.bind(statement, conn.dialect)
+    return statement, parameters
+
+
+def listen_template_source(engine: Engine):
+    """
+    Bind the column source to the compiled SQL of the statement templates executed by the engine.
+    """
+    with _template_lock:
+        if not event.contains(engine, 'before_cursor_execute', _bind_template_source):
+            event.listen(engine, 'before_cursor_execute', _bind_template_source, retval=True)
+
+
+def _fetch_fused(conn: Connection, stmt: Select):
+    return conn.execute(stmt).fetchone()
+
+
+def _fetch_fused_rows(conn: Connection, stmt: Select):
+    return conn.execute(stmt).fetchall()
+
+
+def _is_non_duplicates_fusable(profiler: 'BaseColumnProfiler', grouping_sets: bool) -> bool:
+    if 'duplicates' not in profiler.groups or not profiler._is_planned('duplicates'):
+        return False
+    # the unpivoted values are compared as strings, which is not exact for the floating point numbers
+    return grouping_sets or not isinstance(profiler, NumericColumnProfiler) or profiler.is_integer
+
+
+def _get_query_options(config: Optional[dict]) -> dict:
+    """
+    The opt-in query plans of the profiler config, which are used only if the backend supports them.
+    """
+    return (config or {}).get('query') or {}
+
+
+def _get_sample_percent(dialect: Dialect, config: Optional[dict]) -> Optional[float]:
+    """
+    The percent of the rows sampled by the TABLESAMPLE clause, or None if the table is not sampled.
+    """
+    percent = _get_query_options(config).get('samplePercent')
+    if not dialect.tablesample or not percent or not 0 < percent < 100:
+        return None
+    return percent
+
+
 async def _run_in_executor(executor, func, *args):
     if executor:
         return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
@@ -114,11 +227,46 @@ class Profiler:
         self.event_handler = event_handler
         self.config = config
         self.collected_metadata: Optional[CollectedMetadata] = None
-        if self.data_source.threads > 1:
-            self.executor = ThreadPoolExecutor(max_workers=self.data_source.threads)
+        self.budget_decisions = {}
+        # the priorities of the columns by table, e.g. {'orders': {'id': PRIORITY_TESTED}}
+        self.column_priorities: Dict[str, Dict[str, int]] = {}
+        # the metric groups required by the assertions by table, which are loaded by the metric plans
+        self.required_metrics: Optional[Dict[str, dict]] = None
+        # the completed tables are appended to the checkpoint, and the tables in it are not profiled again
+        self.checkpoint: Optional[RunCheckpoint] = None
+        # the table results are stored in it instead of a dict as they complete, e.g. a TableSpool on the disk. The
+        # results read from it could be copies, so a modified result is stored back
+        self.table_spool: Optional[MutableMapping] = None
+        self._async_engines = {}
+        if self.data_source.use_async:
+            # the queries are awaited on the event loop by the asyncio driver
+            self.executor = None
+        elif self.data_source.max_threads > 1:
+            self.executor = ThreadPoolExecutor(max_workers=self.data_source.max_threads)
         else:
             self.executor = None
 
+    def _get_async_engine(self, database=None):
+        """
+        Get the async engine of the database. The async engines are bound to the running event loop.
+        """
+        if not self.data_source.use_async:
+            return None
+        engine = self._async_engines.get(database)
+        if engine is None:
+            engine = self.data_source.create_async_engine(database)
+            self._async_engines[database] = engine
+        return engine
+
+    async def _run_with_async_engines(self, coro):
+        try:
+            return await coro
+        finally:
+            engines = self._async_engines.values()
+            self._async_engines = {}
+            for engine in engines:
+                await engine.dispose()
+
     async def _fetch_metadata(self, subjects):
         futures = []
         map_name_tables = dict()
@@ -127,20 +275,29 @@ class Profiler:
 
         self.event_handler.handle_metadata_start()
         self.event_handler.handle_metadata_progress(total, completed)
+
+        def _reflect_table(connectable, subject):
+            schema = subject.schema.lower() if subject.schema is not None else None
+            return Table(subject.table, MetaData(), autoload_with=connectable, schema=schema)
+
+        async def _fetch_table_task(subject):
+            table = None
+            try:
+                async_engine = self._get_async_engine(subject.database)
+                if async_engine is not None:
+                    async with async_engine.connect() as conn:
+                        table = await conn.run_sync(_reflect_table, subject)
+                else:
+                    engine = self.data_source.get_engine_by_database(subject.database)
+                    table = await _run_in_executor(self.executor, _reflect_table, engine, subject)
+            except Exception as e:
+                # ignore the table metadata fetch error
+                sentry_sdk.capture_exception(e)
+                pass
+            return subject.name, table
+
         for subject in subjects:
-            def _fetch_table_task(subject):
-                engine = self.data_source.get_engine_by_database(subject.database)
-                schema = subject.schema.lower() if subject.schema is not None else None
-                table = None
-                try:
-                    table = Table(subject.table, MetaData(), autoload_with=engine, schema=schema)
-                except BaseException as e:
-                    # ignore the table metadata fetch error
-                    sentry_sdk.capture_exception(e)
-                    pass
-                return subject.name, table
-
-            future = _run_in_executor(self.executor, _fetch_table_task, subject)
+            future = _fetch_table_task(subject)
             futures.append(future)
 
         for future in asyncio.as_completed(futures):
@@ -184,16 +341,57 @@ class Profiler:
         if len(subjects) > 0:
             self.event_handler.handle_run_start(result)
             self.event_handler.handle_run_progress(result, table_count, table_index)
+            budget = (self.config.profiler_config.get('budget') if self.config else None) or {}
+            estimate_mode = self.config is not None and self.config.profiler_config.get('mode') == 'estimate'
+            spent_bytes = 0
+            run_deadline = None
+            if budget.get('maxSecondsTotal'):
+                run_deadline = time.perf_counter() + budget.get('maxSecondsTotal')
 
             for subject in subjects:
                 name = subject.name
                 table = map_name_tables.get(name)
                 if table is None:
                     continue
+                if self.checkpoint is not None and name in self.checkpoint.tables:
+                    # completed by the interrupted run
+                    profiled_tables[name] = self.checkpoint.tables[name]
+                    table_index = table_index + 1
+                    self.event_handler.handle_run_progress(result, table_count, table_index)
+                    continue
                 engine = self.data_source.get_engine_by_database(subject.database)
-                table_profiler = TableProfiler(engine, self.executor, subject, table, self.event_handler, self.config)
+                table_profiler = TableProfiler(self.data_source, engine, self.executor, subject, table,
+                                               self.event_handler, self.config,
+                                               async_engine=self._get_async_engine(subject.database))
+                table_profiler.metric_plan = self._get_metric_plan(name)
+                if estimate_mode:
+                    tresult = profiled_tables[name] = await table_profiler.estimate()
+                    self._save_checkpoint(name, tresult)
+                    table_index = table_index + 1
+                    self.event_handler.handle_run_progress(result, table_count, table_index)
+                    continue
+                if budget.get('maxBytesPerTable') or budget.get('maxBytesTotal'):
+                    estimate = await table_profiler.explain()
+                    decision = self._check_budget(budget, estimate, spent_bytes)
+                    self.budget_decisions[name] = decision
+                    if decision == 'skipped':
+                        skipped = profiled_tables.get(name) or {'name': name, 'columns': {}}
+                        skipped['status'] = 'skipped'
+                        profiled_tables[name] = skipped
+                        self._save_checkpoint(name, skipped)
+                        table_index = table_index + 1
+                        self.event_handler.handle_run_progress(result, table_count, table_index)
+                        continue
+                    table_profiler.basic = decision == 'basic'
+                    spent_bytes += estimate['basic_bytes' if table_profiler.basic else 'bytes'] or 0
+
+                table_profiler.deadline = self._get_deadline(budget, run_deadline)
+                table_profiler.column_priorities = self.column_priorities.get(name, {})
                 tresult = await table_profiler.profile()
+                if table_profiler.basic:
+                    tresult.setdefault('status', 'basic')
                 profiled_tables[name] = tresult
+                self._save_checkpoint(name, tresult)
                 table_index = table_index + 1
                 self.event_handler.handle_run_progress(result, table_count, table_index)
             self.event_handler.handle_run_end(result)
@@ -202,8 +400,64 @@ class Profiler:
 
         return result
 
+    def _save_checkpoint(self, name: str, result: dict):
+        if self.checkpoint is not None:
+            self.checkpoint.append(name, result)
+
+    def _get_metric_plan(self, name: str) -> Optional[MetricPlan]:
+        profiler_config = self.config.profiler_config if self.config else {}
+        if not profiler_config.get('metrics'):
+            return None
+        if self.required_metrics is None:
+            self.required_metrics = load_required_metrics()
+        return compile_metric_plan(profiler_config, name, self.required_metrics.get(name))
+
+    @staticmethod
+    def _get_deadline(budget: dict, run_deadline: Optional[float]) -> Optional[float]:
+        deadlines = [run_deadline] if run_deadline is not None else []
+        if budget.get('maxSecondsPerTable'):
+            deadlines.append(time.perf_counter() + budget.get('maxSecondsPerTable'))
+        return min(deadlines) if deadlines else None
+
+    @staticmethod
+    def _check_budget(budget: dict, estimate: dict, spent_bytes: int) -> str:
+        """
+        Decide how to profile the table within the scan budget.
+
+        :return: 'full', 'basic' to skip the expensive column metrics, or 'skipped'
+        """
+        limits = []
+        if budget.get('maxBytesPerTable'):
+            limits.append(budget.get('maxBytesPerTable'))
+        if budget.get('maxBytesTotal'):
+            limits.append(budget.get('maxBytesTotal') - spent_bytes)
+        if not limits or estimate['bytes'] is None or estimate['bytes'] <= min(limits):
+            return 'full'
+        if estimate['basic_bytes'] <= min(limits):
+            return 'basic'
+        return 'skipped'
+
+    async def _explain(self, subjects: List[ProfileSubject] = None, *,
+                       metadata_subjects: List[ProfileSubject] = None) -> dict:
+        if self.collected_metadata is None:
+            await self._collect_metadata(subjects, metadata_subjects)
+
+        map_name_tables = self.collected_metadata.map_name_tables
+        estimates = {}
+        for subject in self.collected_metadata.subjects:
+            table = map_name_tables.get(subject.name)
+            if table is None:
+                continue
+            engine = self.data_source.get_engine_by_database(subject.database)
+            table_profiler = TableProfiler(self.data_source, engine, self.executor, subject, table,
+                                           self.event_handler, self.config,
+                                           async_engine=self._get_async_engine(subject.database))
+            table_profiler.metric_plan = self._get_metric_plan(subject.name)
+            estimates[subject.name] = await table_profiler.explain()
+        return {'tables': estimates}
+
     async def _collect_metadata(self, subjects: List[ProfileSubject], metadata_subjects: List[ProfileSubject]):
-        profiled_tables = {}
+        profiled_tables = self.table_spool if self.table_spool is not None else {}
         result = {
             "tables": profiled_tables,
         }
@@ -227,7 +481,8 @@ class Profiler:
             table = map_name_tables.get(subject.name)
             if table is None:
                 continue
-            table_profiler = TableProfiler(engine, self.executor, subject, table, self.event_handler, self.config)
+            table_profiler = TableProfiler(self.data_source, engine, self.executor, subject, table,
+                                           self.event_handler, self.config)
             tresult = await table_profiler.fetch_schema()
             profiled_tables[subject.name] = tresult
 
@@ -238,11 +493,23 @@ class Profiler:
         return self.collected_metadata
 
     def collect_metadata(self, metadata_subjects: List[ProfileSubject], subjects: List[ProfileSubject]):
-        return asyncio.run(self._collect_metadata(subjects, metadata_subjects))
+        with Tracer().span('metadata'), self.data_source.query_registry.cancel_on_interrupt():
+            return asyncio.run(self._run_with_async_engines(self._collect_metadata(subjects, metadata_subjects)))
+
+    def explain(self, subjects: List[ProfileSubject] = None, *, metadata_subjects: List[ProfileSubject] = None) -> dict:
+        """
+        Estimate the bytes and rows scanned by profiling the tables without executing the profiling queries.
+        """
+        with self.data_source.query_registry.cancel_on_interrupt():
+            return asyncio.run(
+                self._run_with_async_engines(self._explain(subjects, metadata_subjects=metadata_subjects)))
 
     def profile(self, subjects: List[ProfileSubject] = None, *, metadata_subjects: List[ProfileSubject] = None) -> dict:
         def job():
-            return asyncio.run(self._profile(subjects, metadata_subjects=metadata_subjects))
+            # cancel the in-flight queries before the executor waits for its threads
+            with Tracer().span('profile'), self.data_source.query_registry.cancel_on_interrupt():
+                return asyncio.run(
+                    self._run_with_async_engines(self._profile(subjects, metadata_subjects=metadata_subjects)))
 
         if not self.executor:
             return job()
@@ -254,19 +521,46 @@ class TableProfiler:
 
     def __init__(
         self,
+        data_source: DataSource,
         engine: Engine,
         executor: ThreadPoolExecutor,
         subject: ProfileSubject,
         table: Table,
         event_handler: ProfilerEventHandler,
-        config: Configuration
+        config: Configuration,
+        async_engine: AsyncEngine = None
     ):
+        self.data_source = data_source
         self.engine = engine
+        self.async_engine = async_engine
+        listen_template_source(async_engine.sync_engine if async_engine is not None else engine)
+        self.limiter = data_source.get_limiter()
         self.executor = executor
         self.subject = subject
         self.table = table
         self.event_handler = event_handler
         self.config = config
+        # skip the expensive column metrics, which is set by the scan budget
+        self.basic = False
+        self.batcher = self._create_batcher()
+        # stop dispatching and cancel the column jobs after the deadline, and the priorities of the columns, which are
+        # set by the time budget
+        self.deadline: Optional[float] = None
+        self.column_priorities: Dict[str, int] = {}
+        # the sources of the leaves flattened from the repeated fields, which are set by the bigquery candidate columns
+        self.repeated_sources = set()
+        # the metric groups to profile the columns, which is set by the profiler
+        self.metric_plan: Optional[MetricPlan] = None
+
+    def _create_batcher(self) -> Optional[QueryBatcher]:
+        # the aggregate queries are batched across the columns running in the executor threads
+        if self.async_engine is not None or self.executor is None:
+            return None
+        batch = (self.config.profiler_config.get('batch') if self.config else None) or {}
+        size = batch.get('size', get_dialect(self.engine.url.get_backend_name()).batch_size)
+        if size <= 1:
+            return None
+        return QueryBatcher(size, batch.get('waitMilli', DEFAULT_BATCH_WAIT_MILLI) / 1000)
 
     def _get_candidate_columns(self) -> Tuple[Selectable, ColumnClause]:
         table = self.table
@@ -288,6 +582,7 @@ class TableProfiler:
 
         table = self.table
         cte_map = dict()
+        self.repeated_sources = set()
 
         cte_map[None] = select(
             text('*')
@@ -313,6 +608,7 @@ class TableProfiler:
                         text(f"unnest(`{selectable.name}`.`{name}`) as `{name}`")
                     ).cte("t_" + cte_name)
                     cte_map[cte_name] = stmt
+                    self.repeated_sources.add(stmt)
                 else:
                     # array cte
                     cte_name = '__'.join(comps)
@@ -335,76 +631,83 @@ class TableProfiler:
                     selectable
                 ).cte("t_" + cte_name)
                 cte_map[cte_name] = stmt
+                if selectable in self.repeated_sources:
+                    self.repeated_sources.add(stmt)
             else:
                 yield selectable, literal_column(f"`{selectable.name}`.`{name}`", column.type).label(column.name)
 
-    def _profile_table_metadata(self, result: dict):
+    def _profile_table_metadata(self, conn: Connection, result: dict):
         table = self.table
         row_count = created = last_altered = size_bytes = None
-        with self.engine.connect() as conn:
-            try:
-                if self.engine.url.get_backend_name() == 'snowflake':
-                    inspector = inspect(self.engine) if self.engine else None
-                    default_schema = inspector.default_schema_name
-                    metadata_table = table_clause('TABLES', column_clause("row_count"), column_clause("created"),
-                                                  column_clause("last_altered"), column_clause("bytes"),
-                                                  column_clause('table_schema'), column_clause('table_name'),
-                                                  schema='INFORMATION_SCHEMA')
-                    metadata_columns = {column.name: column for column in metadata_table.columns}
-                    stmt = select(
-                        metadata_columns['row_count'],
-                        func.convert_timezone('UTC', metadata_columns['created']),
-                        func.convert_timezone('UTC', metadata_columns['last_altered']),
-                        metadata_columns['bytes']
-                    ).select_from(metadata_table).where(metadata_columns['table_schema'] == str.upper(default_schema),
-                                                        metadata_columns['table_name'] == str.upper(table.name))
-                    row_count, created, last_altered, size_bytes = conn.execute(stmt).fetchone()
-                    # datetime object transformation
-                    created = created.isoformat()
-                    last_altered = last_altered.isoformat()
-                elif self.engine.url.get_backend_name() == 'bigquery':
-                    dataset = self.engine.url.database
-                    metadata_table = table_clause(f'{dataset}.__TABLES__', column_clause("row_count"),
-                                                  column_clause("creation_time"), column_clause("last_modified_time"),
-                                                  column_clause("size_bytes"), column_clause('table_id'))
-                    metadata_columns = {column.name: column for column in metadata_table.columns}
-                    stmt = select(
-                        metadata_columns['row_count'],
-                        metadata_columns['creation_time'],
-                        metadata_columns['last_modified_time'],
-                        metadata_columns['size_bytes']
-                    ).select_from(metadata_table).where(metadata_columns['table_id'] == table.name)
-                    row_count, created, last_altered, size_bytes = conn.execute(stmt).fetchone()
-                    # timestamp transformation
-                    created = datetime.fromtimestamp(created / 1000.0, timezone.utc).isoformat()
-                    last_altered = datetime.fromtimestamp(last_altered / 1000.0, timezone.utc).isoformat()
-                elif self.engine.url.get_backend_name() == 'redshift':
-                    metadata_table = table_clause('SVV_TABLE_INFO', column_clause("tbl_rows"),
-                                                  column_clause("size"), column_clause("table"))
-                    metadata_columns = {column.name: column for column in metadata_table.columns}
-                    stmt = select(
-                        metadata_columns['tbl_rows'],
-                        metadata_columns['size'],
-                    ).select_from(metadata_table).where(metadata_columns['table'] == table.name)
-                    row_count, size_mbytes = conn.execute(stmt).fetchone()
-                    row_count = int(row_count)
-                    size_bytes = size_mbytes * 1024
-            except Exception:
-                # table's metadata is optional except row_count
-                pass
-            finally:
-                if row_count is None:
-                    stmt = select(
-                        func.count(),
-                    ).select_from(table)
-                    row_count, = conn.execute(stmt).fetchone()
+        try:
+            if self.engine.url.get_backend_name() == 'snowflake':
+                inspector = inspect(self.engine) if self.engine else None
+                default_schema = inspector.default_schema_name
+                metadata_table = table_clause('TABLES', column_clause("row_count"), column_clause("created"),
+                                              column_clause("last_altered"), column_clause("bytes"),
+                                              column_clause('table_schema'), column_clause('table_name'),
+                                              schema='INFORMATION_SCHEMA')
+                metadata_columns = {column.name: column for column in metadata_table.columns}
+                stmt = select(
+                    metadata_columns['row_count'],
+                    func.convert_timezone('UTC', metadata_columns['created']),
+                    func.convert_timezone('UTC', metadata_columns['last_altered']),
+                    metadata_columns['bytes']
+                ).select_from(metadata_table).where(metadata_columns['table_schema'] == str.upper(default_schema),
+                                                    metadata_columns['table_name'] == str.upper(table.name))
+                row_count, created, last_altered, size_bytes = conn.execute(stmt).fetchone()
+                # datetime object transformation
+                created = created.isoformat()
+                last_altered = last_altered.isoformat()
+            elif self.engine.url.get_backend_name() == 'bigquery':
+                dataset = self.engine.url.database
+                metadata_table = table_clause(f'{dataset}.__TABLES__', column_clause("row_count"),
+                                              column_clause("creation_time"), column_clause("last_modified_time"),
+                                              column_clause("size_bytes"), column_clause('table_id'))
+                metadata_columns = {column.name: column for column in metadata_table.columns}
+                stmt = select(
+                    metadata_columns['row_count'],
+                    metadata_columns['creation_time'],
+                    metadata_columns['last_modified_time'],
+                    metadata_columns['size_bytes']
+                ).select_from(metadata_table).where(metadata_columns['table_id'] == table.name)
+                row_count, created, last_altered, size_bytes = conn.execute(stmt).fetchone()
+                # timestamp transformation
+                created = datetime.fromtimestamp(created / 1000.0, timezone.utc).isoformat()
+                last_altered = datetime.fromtimestamp(last_altered / 1000.0, timezone.utc).isoformat()
+            elif self.engine.url.get_backend_name() == 'redshift':
+                metadata_table = table_clause('SVV_TABLE_INFO', column_clause("tbl_rows"),
+                                              column_clause("size"), column_clause("table"))
+                metadata_columns = {column.name: column for column in metadata_table.columns}
+                stmt = select(
+                    metadata_columns['tbl_rows'],
+                    metadata_columns['size'],
+                ).select_from(metadata_table).where(metadata_columns['table'] == table.name)
+                row_count, size_mbytes = conn.execute(stmt).fetchone()
+                row_count = int(row_count)
+                size_bytes = size_mbytes * 1024
+        except Exception:
+            # table's metadata is optional except row_count
+            pass
+        finally:
+            if row_count is None:
+                stmt = select(
+                    func.count(),
+                ).select_from(table)
+                row_count, = conn.execute(stmt).fetchone()
 
         result['row_count'] = result['samples'] = row_count
         result['samples_p'] = 1
 
         if self.config:
+            percent = _get_sample_percent(get_dialect(self.engine.url.get_backend_name()),
+                                          self.config.profiler_config)
+            if percent is not None:
+                # each query samples the table by itself, so the number of the samples is estimated
+                result['samples'] = round(row_count * percent / 100)
+                result['samples_p'] = percent / 100
             limit = self.config.profiler_config.get('table', {}).get('limit', 0)
-            if row_count > limit > 0:
+            if result['samples'] > limit > 0:
                 result['samples'] = limit
                 result['samples_p'] = percentage(limit, row_count)
 
@@ -417,74 +720,200 @@ class TableProfiler:
         if size_bytes:
             result['bytes'] = size_bytes
 
-    def _profile_table_duplicate_rows(self, result: dict):
+    def _profile_table_duplicate_rows(self, conn: Connection, result: dict):
         table = self.table
         if not self.config:
             return
         if not self.config.profiler_config.get('table', {}).get('duplicateRows'):
             return
 
+        dialect = get_dialect(self.engine.url.get_backend_name())
+        percent = _get_sample_percent(dialect, self.config.profiler_config)
+        if percent is not None:
+            table = dialect.sample(table, percent)
+
         limit = self.config.profiler_config.get('table', {}).get('limit', 0)
         columns = [column.label(f'_{column.name}') for column in table.columns]
 
-        with self.engine.connect() as conn:
-            if self.engine.url.get_backend_name() == 'snowflake':
-                if limit <= 0:
-                    cte = select(func.hash(*columns).label('h')).select_from(table).cte()
-                else:
-                    cte = select(func.hash(*columns).label('h')).select_from(table).limit(limit).cte()
+        if dialect.hash_function:
+            if limit <= 0:
+                cte = select(dialect.row_hash(*columns).label('h')).select_from(table).cte()
+            else:
+                cte = select(dialect.row_hash(*columns).label('h')).select_from(table).limit(limit).cte()
 
+            cte = select(
+                cte.c.h,
+                func.count().label('c')
+            ).select_from(cte).group_by(cte.c.h).having(func.count() > 1).cte()
+            stmt = select(func.sum(cte.c.c)).select_from(cte)
+            duplicate_rows, = conn.execute(stmt).fetchone()
+        else:
+            if limit <= 0:
                 cte = select(
-                    cte.c.h,
+                    *columns,
                     func.count().label('c')
-                ).select_from(cte).group_by(cte.c.h).having(func.count() > 1).cte()
-                stmt = select(func.sum(cte.c.c)).select_from(cte)
-                duplicate_rows, = conn.execute(stmt).fetchone()
+                ).select_from(table).group_by(*columns).having(func.count() > 1).cte()
             else:
-                if limit <= 0:
-                    cte = select(
-                        *columns,
-                        func.count().label('c')
-                    ).select_from(table).group_by(*columns).having(func.count() > 1).cte()
-                else:
-                    cte = select(*columns).select_from(table).limit(limit).cte()
-                    columns = [column for column in cte.columns]
-                    cte = select(
-                        *columns,
-                        func.count().label('c')
-                    ).select_from(cte).group_by(*columns).having(func.count() > 1).cte()
+                cte = select(*columns).select_from(table).limit(limit).cte()
+                columns = [column for column in cte.columns]
+                cte = select(
+                    *columns,
+                    func.count().label('c')
+                ).select_from(cte).group_by(*columns).having(func.count() > 1).cte()
+
+            stmt = select(func.sum(cte.c.c)).select_from(cte)
+            duplicate_rows, = conn.execute(stmt).fetchone()
+
+        samples = result['samples']
+        duplicate_rows = duplicate_rows if duplicate_rows is not None else 0
 
-                stmt = select(func.sum(cte.c.c)).select_from(cte)
-                duplicate_rows, = conn.execute(stmt).fetchone()
+        result['duplicate_rows'] = duplicate_rows
+        result['duplicate_rows_p'] = percentage(duplicate_rows, samples)
 
-            samples = result['samples']
-            duplicate_rows = duplicate_rows if duplicate_rows is not None else 0
+    async def _run_with_connection(self, func, *args, cost: QueryCost = None):
+        """
+        Run the function with a connection. The async engine awaits it on the event loop, otherwise it runs in the
+        executor. The limiter adapts the number of in-flight queries, and the cost of the queries is added to 'cost'.
+        """
+        if self.limiter is not None:
+            return await self.limiter.run(lambda: self._execute_with_connection(func, *args, cost=cost))
+        return await self._execute_with_connection(func, *args, cost=cost)
+
+    async def _execute_with_connection(self, func, *args, cost: QueryCost = None):
+        cost_tracker = self.data_source.cost_tracker
+        if self.async_engine is not None:
+            async with self.async_engine.connect() as conn:
+                with cost_tracker.scope(conn.sync_connection, cost):
+                    # there is no executor queue to wait for. The statements are bounded by the server settings of
+                    # the session, and the asyncio driver cancels the query when the job is timed out
+                    return await asyncio.wait_for(conn.run_sync(func, *args), self.data_source.statement_timeout)
+
+        def _run():
+            # each statement is cancelled by the query registry when it runs longer than the statement timeout
+            with self.engine.connect() as conn, cost_tracker.scope(conn, cost):
+                return func(conn, *args)
+
+        return await _run_in_executor(self.executor, _run)
+
+    async def _resolve_costs(self, costs: List[QueryCost]):
+        """
+        Resolve the cost counters from the query history of the warehouse by a single lookup of the table.
+        """
+        if any(cost.query_ids for cost in costs):
+            try:
+                await self._run_with_connection(self.data_source.cost_tracker.resolve, costs)
+            except Exception as e:
+                if not is_timeout_error(e):
+                    raise
+
+    async def _profile_table(self, result, cost: QueryCost):
+        try:
+            await self._run_with_connection(self._profile_table_metadata, result, cost=cost)
+            await self._run_with_connection(self._profile_table_duplicate_rows, result, cost=cost)
+        except Exception as e:
+            if not is_timeout_error(e):
+                raise
+            result['status'] = 'timeout'
+
+    async def _prefetch_repeated_sources(self, candidate_columns, cost: QueryCost) -> Dict[str, dict]:
+        """
+        Fetch the basic metrics and the uniqueness of the leaves sharing the unnest of a repeated field by the fused
+        queries, so the repeated field is flattened and scanned once per query instead of once per leaf.
 
-            result['duplicate_rows'] = duplicate_rows
-            result['duplicate_rows_p'] = percentage(duplicate_rows, samples)
+        :return: the row of the basic statement and the non-duplicate count by the column names
+        """
+        groups = {}
+        for selectable, column in candidate_columns:
+            if selectable in self.repeated_sources:
+                groups.setdefault(selectable, []).append(column)
 
-    async def _profile_table(self, result):
-        await _run_in_executor(self.executor, self._profile_table_metadata, result)
-        await _run_in_executor(self.executor, self._profile_table_duplicate_rows, result)
+        profiler_config = self.config.profiler_config if self.config else {}
+        dialect = get_dialect(self.engine.url.get_backend_name())
+        grouping_sets = dialect.grouping_sets and bool(_get_query_options(profiler_config).get('groupingSets'))
+        prefetched = {}
+        for selectable, columns in groups.items():
+            if len(columns) < 2:
+                continue
+            profilers = [(await self._create_column_metadata_and_profiler(selectable, column))[1] for column in columns]
+            statements = [profiler._get_scan_statement() for profiler in profilers]
+            stmt = fuse_statements(statements, [profiler.column for profiler in profilers], selectable, TEMPLATE_TABLE)
+            if stmt is None:
+                continue
+            try:
+                with Tracer().span(selectable.name, 'fused'):
+                    row = await self._run_with_connection(_fetch_fused, stmt, cost=cost)
+            except Exception as e:
+                if not is_timeout_error(e):
+                    raise
+                # the leaves profile the basic metrics by themselves
+                continue
+            for column, column_row in zip(columns, split_fused_row(row, statements)):
+                prefetched[column.name] = {'basic': column_row}
 
-    async def _profile_column(self, result, table_name, table: Table, column: Column) -> dict:
+            profilers = [profiler for profiler in profilers if _is_non_duplicates_fusable(profiler, grouping_sets)]
+            if len(profilers) < 2:
+                continue
+            ctes = [profiler._get_template_cte() for profiler in profilers]
+            stmt = fuse_non_duplicates([cte.c.c for cte in ctes], [profiler.column for profiler in profilers],
+                                       selectable, TEMPLATE_TABLE, grouping_sets=grouping_sets)
+            if stmt is None:
+                continue
+            try:
+                with Tracer().span(selectable.name, 'fused'):
+                    rows = await self._run_with_connection(_fetch_fused_rows, stmt, cost=cost)
+            except Exception as e:
+                if not is_timeout_error(e):
+                    raise
+                continue
+            non_duplicates = dict(rows)
+            for i, profiler in enumerate(profilers):
+                prefetched[profiler.column.name]['non_duplicates'] = non_duplicates.get(i, 0)
+        return prefetched
+
+    async def _profile_column(self, result, table_name, table: Table, column: Column, cost: QueryCost,
+                              prefetched: dict = None) -> dict:
         column_name = column.name
         column_result, profiler = await self._create_column_metadata_and_profiler(table, column)
+        if prefetched is not None:
+            profiler.prefetched = prefetched.get('basic')
+            profiler.prefetched_non_duplicates = prefetched.get('non_duplicates')
 
         self.event_handler.handle_column_start(table_name, column_name)
 
         profile_start = time.perf_counter()
-        profile_result = await _run_in_executor(self.executor, profiler.profile)
+        try:
+            if self._is_budget_spent():
+                profile_result = {'status': 'skipped'}
+            else:
+                with Tracer().span(f'{table_name}.{column_name}', 'column', type=column_result['type']):
+                    profile_result = await self._run_with_connection(self._run_column, profiler, cost=cost)
+        except Exception as e:
+            if not is_timeout_error(e):
+                raise
+            # keep the partial result instead of aborting the run
+            profile_result = {'status': 'timeout'}
         profile_end = time.perf_counter()
         duration = profile_end - profile_start
 
         column_result.update(profile_result)
         column_result["profile_duration"] = f"{duration:.2f}"
         column_result["elapsed_milli"] = int(duration * 1000)
+        column_result["cost"] = cost.to_dict()
 
         self.event_handler.handle_column_end(table_name, column_name, column_result)
         result['columns'][column_name] = column_result
 
+    def _is_budget_spent(self) -> bool:
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def _run_column(self, conn: Connection, profiler: 'BaseColumnProfiler') -> dict:
+        # the time budget is checked again when the column job gets a connection
+        if self._is_budget_spent():
+            return {'status': 'skipped'}
+        # the statements still running when the time budget is spent are cancelled
+        with self.data_source.query_registry.deadline(conn, self.deadline):
+            return profiler.run(conn)
+
     async def _create_column_metadata_and_profiler(self, table, column):
         profiler_config = self.config.profiler_config if self.config else {}
         column_type = column.type
@@ -528,6 +957,14 @@ class TableProfiler:
         else:
             generic_type = "other"
             profiler = BaseColumnProfiler(self.engine, profiler_config, table, column)
+
+        if profiler_config.get('engine') == 'arrow':
+            profiler = self._create_arrow_column_profiler(profiler_config, table, column, generic_type) or profiler
+        profiler.basic = self.basic
+        profiler.batcher = self.batcher
+        profiler.metrics = get_column_metrics(generic_type)
+        profiler.plan = self.metric_plan.get(column.name) if self.metric_plan else None
+
         column_result = {
             "name": column.name,
             "type": generic_type,
@@ -535,7 +972,23 @@ class TableProfiler:
         }
         return column_result, profiler
 
+    def _create_arrow_column_profiler(self, profiler_config, table, column, generic_type):
+        try:
+            from .arrow import ArrowColumnProfiler, ARROW_SUPPORTED_BACKENDS, ARROW_SUPPORTED_TYPES
+        except ImportError as e:
+            raise PipeRiderProfilerEngineError('arrow', str(e))
+
+        if self.engine.url.get_backend_name() not in ARROW_SUPPORTED_BACKENDS:
+            return None
+        if generic_type not in ARROW_SUPPORTED_TYPES or isinstance(column.type, ARRAY):
+            return None
+        return ArrowColumnProfiler(self.engine, profiler_config, table, column, generic_type)
+
     async def profile(self) -> dict:
+        with Tracer().span(self.subject.name, 'table'):
+            return await self._profile()
+
+    async def _profile(self) -> dict:
         subject = self.subject
         name = subject.name
         self.event_handler.handle_table_start(name)
@@ -561,13 +1014,21 @@ class TableProfiler:
         self.event_handler.handle_table_progress(name, result, col_count, col_index)
 
         # Profile table
-        future = asyncio.create_task(self._profile_table(result))
+        table_cost = QueryCost()
+        future = asyncio.create_task(self._profile_table(result, table_cost))
         futures.append(future)
 
-        # Profile columns
+        # Profile columns, which are dispatched by the priorities
         for selectable, column in candidate_columns:
             columns[column.name] = None
-            future = asyncio.create_task(self._profile_column(result, name, selectable, column))
+        prefetched = await self._prefetch_repeated_sources(candidate_columns, table_cost)
+        candidate_columns.sort(key=lambda candidate: self.column_priorities.get(candidate[1].name, PRIORITY_DEFAULT))
+        column_costs = {}
+        for selectable, column in candidate_columns:
+            column_costs[column.name] = QueryCost()
+            future = asyncio.create_task(
+                self._profile_column(result, name, selectable, column, column_costs[column.name],
+                                     prefetched.get(column.name)))
             futures.append(future)
 
         total = len(futures)
@@ -583,14 +1044,109 @@ class TableProfiler:
             column_result['total'] = result['row_count']
             column_result['samples_p'] = result['samples_p']
 
+        await self._resolve_costs([table_cost] + list(column_costs.values()))
+        for column_name, cost in column_costs.items():
+            columns[column_name]['cost'] = cost.to_dict()
+
         profile_end = time.perf_counter()
         duration = profile_end - profile_start
         result["profile_duration"] = f"{duration:.2f}"
         result["elapsed_milli"] = int(duration * 1000)
+        result["cost"] = QueryCost.sum([table_cost.to_dict()] + [c.get('cost') for c in columns.values()])
+
+        self.event_handler.handle_table_end(name, result)
+        return result
+
+    async def estimate(self) -> dict:
+        """
+        Fill the profiling result from the catalog statistics of the table without scanning it. The result and its
+        columns are marked as 'estimated', and the table is 'skipped' if it has no statistics.
+        """
+        from .estimate import ESTIMATE_SUPPORTED_BACKENDS, fetch_catalog_statistics, estimate_column
+
+        backend = self.engine.url.get_backend_name()
+        if backend not in ESTIMATE_SUPPORTED_BACKENDS:
+            raise PipeRiderProfilerModeError('estimate', f"the catalog statistics of '{backend}' are not supported")
+
+        subject = self.subject
+        name = subject.name
+        self.event_handler.handle_table_start(name)
+        profile_start = time.perf_counter()
+        candidate_columns = list(self._get_candidate_columns())
+        columns = {}
+        result = {
+            "name": name,
+            "row_count": 0,
+            "samples": 0,
+            "samples_p": None,
+            "col_count": len(candidate_columns),
+            "duplicate_rows": None,
+            "duplicate_rows_p": None,
+            "columns": columns,
+            "estimated": True,
+        }
+        if subject.ref_id:
+            result['ref_id'] = subject.ref_id
 
+        cost = QueryCost()
+        with Tracer().span(name, 'table'):
+            row_count, statistics = await self._run_with_connection(fetch_catalog_statistics, self.table, cost=cost)
+        await self._resolve_costs([cost])
+        if row_count is None:
+            result['status'] = 'skipped'
+        else:
+            result['row_count'] = result['samples'] = row_count
+            result['samples_p'] = 1
+
+        for selectable, column in candidate_columns:
+            column_result, _ = await self._create_column_metadata_and_profiler(selectable, column)
+            if row_count is not None:
+                column_result['total'] = row_count
+                column_result.update(estimate_column(column_result['type'], statistics.get(column.name), row_count))
+                column_result['samples_p'] = 1
+                column_result['estimated'] = True
+            columns[column.name] = column_result
+
+        duration = time.perf_counter() - profile_start
+        result["profile_duration"] = f"{duration:.2f}"
+        result["elapsed_milli"] = int(duration * 1000)
+        result["cost"] = cost.to_dict()
         self.event_handler.handle_table_end(name, result)
         return result
 
+    async def explain(self) -> dict:
+        """
+        Estimate the bytes and rows scanned by profiling the table without executing the queries.
+
+        :return: the estimates of the table and its columns. 'basic_bytes' is the estimate without the expensive
+            column metrics
+        """
+        columns = {}
+        for selectable, column in self._get_candidate_columns():
+            column_result, profiler = await self._create_column_metadata_and_profiler(selectable, column)
+            estimate = await self._run_with_connection(explain_query, select(column).select_from(selectable))
+            columns[column.name] = {
+                'type': column_result['type'],
+                'scans': profiler.scans,
+                'bytes': estimate.bytes * profiler.scans if estimate.bytes is not None else None,
+                'basic_bytes': estimate.bytes,
+                'rows': estimate.rows,
+            }
+
+        table_estimates = [await self._run_with_connection(explain_query, select(func.count()).select_from(self.table))]
+        if self.config and self.config.profiler_config.get('table', {}).get('duplicateRows'):
+            table_estimates.append(
+                await self._run_with_connection(explain_query, select(*self.table.columns).select_from(self.table)))
+        table_bytes = sum_estimates([estimate.bytes for estimate in table_estimates])
+
+        return {
+            'name': self.subject.name,
+            'bytes': sum_estimates([table_bytes] + [c['bytes'] for c in columns.values()]),
+            'basic_bytes': sum_estimates([table_bytes] + [c['basic_bytes'] for c in columns.values()]),
+            'rows': table_estimates[0].rows,
+            'columns': columns,
+        }
+
     async def fetch_schema(self) -> dict:
         subject = self.subject
         name = subject.name
@@ -624,12 +1180,37 @@ class BaseColumnProfiler:
     """
     The base class of the column profiler. It will automatically profile the metrics according to the schema type
     """
+    # the metric groups profiled by the queries after the basic statement
+    groups: Tuple[str, ...] = ()
 
     def __init__(self, engine: Engine, config: dict, table: Table, column: Column):
         self.engine = engine
         self.config = config
         self.table = table
         self.column = column
+        # only profile the basic metrics by the first query, which is set by the scan budget
+        self.basic = False
+        # batch the aggregate queries with the other columns, which is set by the table profiler
+        self.batcher: Optional[QueryBatcher] = None
+        # the row of the basic statement and the non-duplicate count fetched by the fused queries of the columns on
+        # the same source
+        self.prefetched: Optional[tuple] = None
+        self.prefetched_non_duplicates: Optional[int] = None
+        # the user-defined metrics, which are set by the table profiler
+        self.metrics: List[ColumnMetric] = []
+        self._metric_values: Optional[tuple] = None
+        # the metric groups to profile, which is set by the metric plan of the table. None is all the groups
+        self.plan: Optional[Set[str]] = None
+
+    @property
+    def scans(self) -> int:
+        """
+        The number of queries scanning the column.
+        """
+        return 1 + len([group for group in self.groups if self._is_planned(group)])
+
+    def _is_planned(self, group: str) -> bool:
+        return not self.basic and (self.plan is None or group in self.plan)
 
     def _get_database_backend(self) -> str:
         """
@@ -638,9 +1219,49 @@ class BaseColumnProfiler:
         """
         return self.engine.url.get_backend_name()
 
+    def _get_dialect(self) -> Dialect:
+        return get_dialect(self._get_database_backend())
+
+    def _get_template_key(self) -> tuple:
+        limit = self.config.get('table', {}).get('limit', 0) if self.config else 0
+        approx_distinct = bool(_get_query_options(self.config).get('approxDistinct'))
+        return self._get_database_backend(), type(self).__name__, repr(self.column.type), limit, approx_distinct
+
+    def _get_template_cte(self) -> CTE:
+        """
+        Get the table CTE built on the placeholder table. It is built once per dialect, profiler type, column type and
+        row limit, so the statements on it share the compiled cache of the engine, and the column source is bound to
+        the compiled SQL.
+        """
+        key = self._get_template_key()
+        cte = _template_ctes.get(key)
+        if cte is None:
+            cte = _template_ctes.setdefault(key, self._get_table_cte())
+        return cte
+
+    def _bind_template(self, conn: Connection) -> Connection:
+        """
+        Bind the column source to the placeholder table of the statement templates executed by the connection.
+        """
+        table, column = self.table, self.column
+        percent = _get_sample_percent(self._get_dialect(), self.config)
+        if percent is not None and isinstance(table, Table):
+            table = self._get_dialect().sample(table, percent)
+            column = table.c[column.name]
+        return conn.execution_options(template_source=TemplateSource(table, column))
+
+    def _count_distinct(self, column) -> ColumnElement:
+        """
+        The distinct count of the column, which is approximated by the backend if 'query.approxDistinct' is enabled.
+        """
+        dialect = self._get_dialect()
+        if dialect.approx_distinct and _get_query_options(self.config).get('approxDistinct'):
+            return dialect.approx_count_distinct(column)
+        return func.count(distinct(column))
+
     def _get_limited_table_cte(self):
-        t = self.table
-        c = self.column
+        t = table_clause(TEMPLATE_TABLE, column_clause(TEMPLATE_COLUMN, self.column.type))
+        c = t.c[TEMPLATE_COLUMN]
         if not self.config:
             return t, c
 
@@ -682,34 +1303,92 @@ class BaseColumnProfiler:
 
         :return: the profiling result. The result dict is json serializable
         """
-
+        listen_template_source(self.engine)
         with self.engine.connect() as conn:
-            cte = self._get_table_cte()
-            stmt = select(
-                func.count().label("_total"),
-                func.count(cte.c.c).label("_non_nulls"),
-            )
-            result = conn.execute(stmt).fetchone()
-            _total, _non_nulls, = result
-            _nulls = _total - _non_nulls
-            _valid = _non_nulls
-
-            return {
-                'total': None,
-                'samples': _total,
-                'samples_p': None,
-                'non_nulls': _non_nulls,
-                'non_nulls_p': percentage(_non_nulls, _total),
-                'nulls': _nulls,
-                'nulls_p': percentage(_nulls, _total),
-                'valids': _valid,
-                'valids_p': percentage(_valid, _total),
-                'invalids': 0,
-                'invalids_p': 0
-            }
+            return self.run(conn)
+
+    def run(self, conn: Connection) -> dict:
+        """
+        Profile the column by the connection, which executes the statement templates on the column source
+        """
+        conn = self._bind_template(conn)
+        if self.batcher is None:
+            result = self._profile(conn)
+        else:
+            with self.batcher.participate():
+                result = self._profile(conn.execution_options(query_batcher=self.batcher))
+        if self.metrics and self._metric_values is not None:
+            result['metrics'] = self._finalize_metrics(result)
+        return result
+
+    def _get_basic_statement(self) -> Select:
+        """
+        Get the aggregate statement of the basic metrics, which is the first query of the column. It is a single row
+        aggregate on the table CTE, so it could be fused with the other columns on the same source.
+        """
+        cte = self._get_template_cte()
+        return select(
+            func.count().label("_total"),
+            func.count(cte.c.c).label("_non_nulls"),
+        )
+
+    def _get_scan_statement(self) -> Select:
+        """
+        Get the basic statement with the aggregates of the user-defined metrics on the valid values of the column.
+        """
+        stmt = self._get_basic_statement()
+        cte = self._get_template_cte()
+        aggregates = [aggregate for metric in self.metrics for aggregate in metric.aggregates(cte.c.c)]
+        return stmt.add_columns(*aggregates) if aggregates else stmt
+
+    def _fetch_basic(self, conn: Connection):
+        """
+        Fetch the row of the basic metrics, and keep the aggregated values of the user-defined metrics.
+        """
+        size = len(self._get_basic_statement().selected_columns)
+        row = self.prefetched if self.prefetched is not None else fetchone(conn, self._get_scan_statement())
+        self._metric_values = tuple(row[size:])
+        return tuple(row[:size])
+
+    def _fetch_non_duplicates(self, conn: Connection, cte: CTE) -> int:
+        if self.prefetched_non_duplicates is not None:
+            return self.prefetched_non_duplicates
+        return profile_non_duplicate(conn, cte, cte.c.c)
+
+    def _finalize_metrics(self, result: dict) -> dict:
+        metrics = {}
+        offset = 0
+        cte = self._get_template_cte()
+        for metric in self.metrics:
+            size = len(metric.aggregates(cte.c.c))
+            metrics[metric.name] = metric.finalize(list(self._metric_values[offset:offset + size]), result)
+            offset += size
+        return metrics
+
+    def _profile(self, conn: Connection) -> dict:
+        result = self._fetch_basic(conn)
+        _total, _non_nulls, = result
+        _nulls = _total - _non_nulls
+        _valid = _non_nulls
+
+        return {
+            'total': None,
+            'samples': _total,
+            'samples_p': None,
+            'non_nulls': _non_nulls,
+            'non_nulls_p': percentage(_non_nulls, _total),
+            'nulls': _nulls,
+            'nulls_p': percentage(_nulls, _total),
+            'valids': _valid,
+            'valids_p': percentage(_valid, _total),
+            'invalids': 0,
+            'invalids_p': 0
+        }
 
 
 class StringColumnProfiler(BaseColumnProfiler):
+    groups = ('duplicates', 'topk', 'histogram')
+
     def __init__(self, engine: Engine, config: dict, table: Table, column: Column):
         super().__init__(engine, config, table, column)
 
@@ -741,76 +1420,69 @@ class StringColumnProfiler(BaseColumnProfiler):
         ).select_from(cte).cte()
         return cte
 
-    def profile(self):
-        with self.engine.connect() as conn:
-            cte = self._get_table_cte()
-
-            columns = [
-                func.count().label("_total"),
-                func.count(cte.c.orig).label("_non_nulls"),
-                func.count(cte.c.c).label("_valids"),
-                func.count(cte.c.zero_length).label("_zero_length"),
-                func.count(distinct(cte.c.c)).label("_distinct"),
-                func.avg(cte.c.len).label("_avg"),
-                func.min(cte.c.len).label("_min"),
-                func.max(cte.c.len).label("_max"),
-            ]
-
-            if self._get_database_backend() == 'sqlite':
-                columns.append((func.count(cte.c.len) * func.sum(
-                    func.cast(cte.c.len, Float) * func.cast(cte.c.len, Float)) - func.sum(cte.c.len) * func.sum(
-                    cte.c.len)) / ((func.count(cte.c.len) - 1) * func.count(cte.c.len)).label('_variance'))
-                stmt = select(*columns)
-                result = conn.execute(stmt).fetchone()
-                _total, _non_nulls, _valids, _zero_length, _distinct, _avg, _min, _max, _variance = result
-                _stddev = None
-                if _variance is not None:
-                    _stddev = math.sqrt(_variance)
-            else:
-                columns.append(func.stddev(cte.c.len).label("_stddev"))
-                stmt = select(*columns)
-                result = conn.execute(stmt).fetchone()
-                _total, _non_nulls, _valids, _zero_length, _distinct, _avg, _min, _max, _stddev = result
-
-            _nulls = _total - _non_nulls
-            _invalids = _non_nulls - _valids
-            _non_zero_length = _valids - _zero_length
-            _min = dtof(_min)
-            _max = dtof(_max)
-            _avg = dtof(_avg)
-            _stddev = dtof(_stddev)
-
-            result = {
-                'total': None,
-                'samples': _total,
-                'samples_p': None,
-                'non_nulls': _non_nulls,
-                'non_nulls_p': percentage(_non_nulls, _total),
-                'nulls': _nulls,
-                'nulls_p': percentage(_nulls, _total),
-                'valids': _valids,
-                'valids_p': percentage(_valids, _total),
-                'invalids': _invalids,
-                'invalids_p': percentage(_invalids, _total),
-                'zero_length': _zero_length,
-                'zero_length_p': percentage(_zero_length, _total),
-                'non_zero_length': _non_zero_length,
-                'non_zero_length_p': percentage(_non_zero_length, _total),
-
-                'distinct': _distinct,
-                'distinct_p': percentage(_distinct, _valids),
-                'min': _min,
-                'min_length': _min,
-                'max': _max,
-                'max_length': _max,
-                'avg': _avg,
-                'avg_length': _avg,
-                'stddev': _stddev,
-                'stddev_length': _stddev,
-            }
+    def _get_basic_statement(self) -> Select:
+        cte = self._get_template_cte()
+        return select(
+            func.count().label("_total"),
+            func.count(cte.c.orig).label("_non_nulls"),
+            func.count(cte.c.c).label("_valids"),
+            func.count(cte.c.zero_length).label("_zero_length"),
+            self._count_distinct(cte.c.c).label("_distinct"),
+            func.avg(cte.c.len).label("_avg"),
+            func.min(cte.c.len).label("_min"),
+            func.max(cte.c.len).label("_max"),
+            self._get_dialect().stddev(cte.c.len).label("_stddev"),
+        )
+
+    def _profile(self, conn: Connection) -> dict:
+        cte = self._get_template_cte()
+        dialect = self._get_dialect()
+        result = self._fetch_basic(conn)
+        _total, _non_nulls, _valids, _zero_length, _distinct, _avg, _min, _max, _stddev = result
+        _stddev = dialect.stddev_value(_stddev)
+
+        _nulls = _total - _non_nulls
+        _invalids = _non_nulls - _valids
+        _non_zero_length = _valids - _zero_length
+        _min = dtof(_min)
+        _max = dtof(_max)
+        _avg = dtof(_avg)
+        _stddev = dtof(_stddev)
 
-            # uniqueness
-            _non_duplicates = profile_non_duplicate(conn, cte, cte.c.c)
+        result = {
+            'total': None,
+            'samples': _total,
+            'samples_p': None,
+            'non_nulls': _non_nulls,
+            'non_nulls_p': percentage(_non_nulls, _total),
+            'nulls': _nulls,
+            'nulls_p': percentage(_nulls, _total),
+            'valids': _valids,
+            'valids_p': percentage(_valids, _total),
+            'invalids': _invalids,
+            'invalids_p': percentage(_invalids, _total),
+            'zero_length': _zero_length,
+            'zero_length_p': percentage(_zero_length, _total),
+            'non_zero_length': _non_zero_length,
+            'non_zero_length_p': percentage(_non_zero_length, _total),
+
+            'distinct': _distinct,
+            'distinct_p': percentage(_distinct, _valids),
+            'min': _min,
+            'min_length': _min,
+            'max': _max,
+            'max_length': _max,
+            'avg': _avg,
+            'avg_length': _avg,
+            'stddev': _stddev,
+            'stddev_length': _stddev,
+        }
+        if self.basic:
+            return result
+
+        # uniqueness
+        if self._is_planned('duplicates'):
+            _non_duplicates = self._fetch_non_duplicates(conn, cte)
             _duplicates = _valids - _non_duplicates
             result.update({
                 "duplicates": _duplicates,
@@ -819,20 +1491,22 @@ class StringColumnProfiler(BaseColumnProfiler):
                 "non_duplicates_p": percentage(_non_duplicates, _valids),
             })
 
-            # top k
+        # top k
+        if self._is_planned('topk'):
             topk = None
             if _valids > 0:
                 topk = profile_topk(conn, cte.c.c)
             result['topk'] = topk
 
-            # histogram of string length
+        # histogram of string length
+        if self._is_planned('histogram'):
             histogram = None
             if _valids > 0:
                 histogram = profile_histogram(conn, cte, cte.c.len, _min, _max, True)
             result['histogram'] = histogram
             result['histogram_length'] = histogram
 
-            return result
+        return result
 
 
 class NumericColumnProfiler(BaseColumnProfiler):
@@ -841,6 +1515,8 @@ class NumericColumnProfiler(BaseColumnProfiler):
     def __init__(self, engine: Engine, config: dict, table: Table, column: Column, is_integer: bool):
         super().__init__(engine, config, table, column)
         self.is_integer = is_integer
+        self.groups = ('duplicates', 'histogram', 'quantiles', 'topk') if is_integer else \
+            ('duplicates', 'histogram', 'quantiles')
 
     def _get_table_cte(self) -> CTE:
         t, c = self._get_limited_table_cte()
@@ -866,78 +1542,71 @@ class NumericColumnProfiler(BaseColumnProfiler):
         ).select_from(cte).cte()
         return cte
 
-    def profile(self):
-        with self.engine.connect() as conn:
-            cte = self._get_table_cte()
-
-            columns = [
-                func.count().label("_total"),
-                func.count(cte.c.orig).label("_non_nulls"),
-                func.count(cte.c.c).label("_valids"),
-                func.count(cte.c.zero).label("_zeros"),
-                func.count(cte.c.negative).label("_negatives"),
-                func.count(distinct(cte.c.c)).label("_distinct"),
-                func.sum(func.cast(cte.c.c, Float)).label("_sum"),
-                func.avg(cte.c.c).label("_avg"),
-                func.min(cte.c.c).label("_min"),
-                func.max(cte.c.c).label("_max"),
-            ]
-
-            if self._get_database_backend() == 'sqlite':
-                columns.append((func.count(cte.c.c) * func.sum(
-                    func.cast(cte.c.c, Float) * func.cast(cte.c.c, Float)) - func.sum(cte.c.c) * func.sum(cte.c.c)) / (
-                                   (func.count(cte.c.c) - 1) * func.count(cte.c.c)).label('_variance'))
-                stmt = select(*columns)
-                result = conn.execute(stmt).fetchone()
-                _total, _non_nulls, _valids, _zeros, _negatives, _distinct, _sum, _avg, _min, _max, _variance = result
-                _stddev = None
-                if _variance is not None:
-                    _stddev = math.sqrt(_variance)
-            else:
-                columns.append(func.stddev(func.cast(cte.c.c, Float)).label("_stddev"))
-                stmt = select(*columns)
-                result = conn.execute(stmt).fetchone()
-                _total, _non_nulls, _valids, _zeros, _negatives, _distinct, _sum, _avg, _min, _max, _stddev = result
-
-            _nulls = _total - _non_nulls
-            _invalids = _non_nulls - _valids
-            _positives = _valids - _zeros - _negatives
-            _sum = dtof(_sum)
-            _min = dtof(_min)
-            _max = dtof(_max)
-            _avg = dtof(_avg)
-            _stddev = dtof(_stddev)
-
-            result = {
-                'total': None,
-                'samples': _total,
-                'samples_p': None,
-                'non_nulls': _non_nulls,
-                'non_nulls_p': percentage(_non_nulls, _total),
-                'nulls': _nulls,
-                'nulls_p': percentage(_nulls, _total),
-                'valids': _valids,
-                'valids_p': percentage(_valids, _total),
-                'invalids': _invalids,
-                'invalids_p': percentage(_invalids, _total),
-                'zeros': _zeros,
-                'zeros_p': percentage(_zeros, _total),
-                'negatives': _negatives,
-                'negatives_p': percentage(_negatives, _total),
-                'positives': _positives,
-                'positives_p': percentage(_positives, _total),
-
-                'distinct': _distinct,
-                'distinct_p': percentage(_distinct, _valids),
-                'min': _min,
-                'max': _max,
-                'sum': _sum,
-                'avg': _avg,
-                'stddev': _stddev,
-            }
+    def _get_basic_statement(self) -> Select:
+        cte = self._get_template_cte()
+        return select(
+            func.count().label("_total"),
+            func.count(cte.c.orig).label("_non_nulls"),
+            func.count(cte.c.c).label("_valids"),
+            func.count(cte.c.zero).label("_zeros"),
+            func.count(cte.c.negative).label("_negatives"),
+            self._count_distinct(cte.c.c).label("_distinct"),
+            func.sum(func.cast(cte.c.c, Float)).label("_sum"),
+            func.avg(cte.c.c).label("_avg"),
+            func.min(cte.c.c).label("_min"),
+            func.max(cte.c.c).label("_max"),
+            self._get_dialect().stddev(cte.c.c).label("_stddev"),
+        )
+
+    def _profile(self, conn: Connection) -> dict:
+        cte = self._get_template_cte()
+        dialect = self._get_dialect()
+        result = self._fetch_basic(conn)
+        _total, _non_nulls, _valids, _zeros, _negatives, _distinct, _sum, _avg, _min, _max, _stddev = result
+        _stddev = dialect.stddev_value(_stddev)
+
+        _nulls = _total - _non_nulls
+        _invalids = _non_nulls - _valids
+        _positives = _valids - _zeros - _negatives
+        _sum = dtof(_sum)
+        _min = dtof(_min)
+        _max = dtof(_max)
+        _avg = dtof(_avg)
+        _stddev = dtof(_stddev)
+
+        result = {
+            'total': None,
+            'samples': _total,
+            'samples_p': None,
+            'non_nulls': _non_nulls,
+            'non_nulls_p': percentage(_non_nulls, _total),
+            'nulls': _nulls,
+            'nulls_p': percentage(_nulls, _total),
+            'valids': _valids,
+            'valids_p': percentage(_valids, _total),
+            'invalids': _invalids,
+            'invalids_p': percentage(_invalids, _total),
+            'zeros': _zeros,
+            'zeros_p': percentage(_zeros, _total),
+            'negatives': _negatives,
+            'negatives_p': percentage(_negatives, _total),
+            'positives': _positives,
+            'positives_p': percentage(_positives, _total),
+
+            'distinct': _distinct,
+            'distinct_p': percentage(_distinct, _valids),
+            'min': _min,
+            'max': _max,
+            'sum': _sum,
+            'avg': _avg,
+            'stddev': _stddev,
+        }
+        if self.basic:
+            return result
 
-            # uniqueness
-            _non_duplicates = profile_non_duplicate(conn, cte, cte.c.c)
+        # uniqueness
+        if self._is_planned('duplicates'):
+            _non_duplicates = self._fetch_non_duplicates(conn, cte)
             _duplicates = _valids - _non_duplicates
             result.update({
                 "duplicates": _duplicates,
@@ -946,13 +1615,15 @@ class NumericColumnProfiler(BaseColumnProfiler):
                 "non_duplicates_p": percentage(_non_duplicates, _valids),
             })
 
-            # histogram
+        # histogram
+        if self._is_planned('histogram'):
             histogram = None
             if _valids > 0 and math.isfinite(_min) and math.isfinite(_max):
                 histogram = profile_histogram(conn, cte, cte.c.c, _min, _max, self.is_integer)
             result['histogram'] = histogram
 
-            # quantile
+        # quantile
+        if self._is_planned('quantiles'):
             quantile = {}
             if _valids > 0 and math.isfinite(_min) and math.isfinite(_max):
                 quantile = self._profile_quantile(conn, cte, cte.c.c, _valids)
@@ -964,14 +1635,14 @@ class NumericColumnProfiler(BaseColumnProfiler):
                 'p95': quantile.get('p95'),
             })
 
-            # top k (integer only)
-            if self.is_integer:
-                topk = None
-                if _valids > 0:
-                    topk = profile_topk(conn, cte.c.c)
-                result["topk"] = topk
+        # top k (integer only)
+        if self.is_integer and self._is_planned('topk'):
+            topk = None
+            if _valids > 0:
+                topk = profile_topk(conn, cte.c.c)
+            result["topk"] = topk
 
-            return result
+        return result
 
     def _profile_quantile_via_window_function(
         self,
@@ -1054,60 +1725,17 @@ class NumericColumnProfiler(BaseColumnProfiler):
         :param total:
         :return:
         """
-        backend = self._get_database_backend()
-
-        if backend == 'sqlite':
-            import sqlite3
-            version = sqlite3.sqlite_version.split(".")
-
-            major = int(version[0]) if len(version) >= 2 else 0
-            minor = int(version[1]) if len(version) >= 2 else 0
-
-            if major > 3 or (major == 3 and minor >= 25):
-                # use window function if sqlite version >= 3.25.0
-                # see https://www.sqlite.org/windowfunctions.html
+        dialect = self._get_dialect()
 
+        if not dialect.native_quantiles:
+            if dialect.window_functions:
                 return self._profile_quantile_via_window_function(conn, table, column, total)
             else:
                 return self._profile_quantile_via_query_one_by_one(conn, table, column, total)
-        elif backend == 'duckdb':
-            selects = [
-                func.approx_quantile(column, literal_column(f"{percentile}")) for percentile in
-                [0.05, 0.25, 0.5, 0.75, 0.95]
-            ]
-        elif backend == 'bigquery':
-            # BigQuery does not support WITHIN, change to use over
-            #   Ref: https://github.com/great-expectations/great_expectations/blob/develop/great_expectations/dataset/sqlalchemy_dataset.py#L1019:9
-            selects = [
-                func.percentile_disc(column, percentile).over() for percentile in [0.05, 0.25, 0.5, 0.75, 0.95]
-            ]
-        elif backend == 'redshift':
-            # ref: https://docs.aws.amazon.com/redshift/latest/dg/r_APPROXIMATE_PERCENTILE_DISC.html
-            selects = [
-                func.approximate_percentile_disc(percentile).within_group(column) for percentile in
-                [0.05, 0.25, 0.5, 0.75, 0.95]
-            ]
-        elif backend == 'awsathena':
-            selects = [
-                func.approx_percentile(column, percentile) for percentile in
-                [0.05, 0.25, 0.5, 0.75, 0.95]
-            ]
-        else:
-            # https://docs.sqlalchemy.org/en/14/core/functions.html#sqlalchemy.sql.functions.percentile_disc
-            #
-            # select
-            #     percentile_disc(0.05) within group (order by column),
-            #     percentile_disc(0.25) within group (order by column),
-            #     percentile_disc(0.5) within group (order by column),
-            #     percentile_disc(0.75) within group (order by column),
-            #     percentile_disc(0.95) within group (order by column)
-            # from table
-            selects = [
-                func.percentile_disc(percentile).within_group(column) for percentile in [0.05, 0.25, 0.5, 0.75, 0.95]
-            ]
 
+        selects = dialect.quantiles(column, [0.05, 0.25, 0.5, 0.75, 0.95])
         stmt = select(*selects).select_from(table)
-        result = conn.execute(stmt).fetchone()
+        result = fetchone(conn, stmt)
         return {
             'p5': dtof(result[0]),
             'p25': dtof(result[1]),
@@ -1204,6 +1832,8 @@ class NumericColumnProfiler(BaseColumnProfiler):
 
 
 class DatetimeColumnProfiler(BaseColumnProfiler):
+    groups = ('duplicates', 'histogram')
+
     def __init__(self, engine: Engine, config: dict, table: Table, column: Column):
         super().__init__(engine, config, table, column)
 
@@ -1226,51 +1856,55 @@ class DatetimeColumnProfiler(BaseColumnProfiler):
             ).select_from(t).cte()
         return cte
 
-    def profile(self):
-        with self.engine.connect() as conn:
-            cte = self._get_table_cte()
+    def _get_basic_statement(self) -> Select:
+        cte = self._get_template_cte()
+        return select(
+            func.count().label("_total"),
+            func.count(cte.c.orig).label("_non_nulls"),
+            func.count(cte.c.c).label("_valids"),
+            self._count_distinct(cte.c.c).label("_distinct"),
+            func.min(cte.c.c).label("_min"),
+            func.max(cte.c.c).label("_max"),
+        )
 
-            stmt = select(
-                func.count().label("_total"),
-                func.count(cte.c.orig).label("_non_nulls"),
-                func.count(cte.c.c).label("_valids"),
-                func.count(distinct(cte.c.c)).label("_distinct"),
-                func.min(cte.c.c).label("_min"),
-                func.max(cte.c.c).label("_max"),
-            )
-            result = conn.execute(stmt).fetchone()
-            _total, _non_nulls, _valids, _distinct, _min, _max = result
-            _nulls = _total - _non_nulls
-            _invalids = _non_nulls - _valids
-
-            if self._get_database_backend() == 'sqlite':
-                if isinstance(self.column.type, Date):
-                    _min = datetime.fromisoformat(_min).date() if isinstance(_min, str) else _min
-                    _max = datetime.fromisoformat(_max).date() if isinstance(_max, str) else _max
-                else:
-                    _min = datetime.fromisoformat(_min) if isinstance(_min, str) else _min
-                    _max = datetime.fromisoformat(_max) if isinstance(_max, str) else _max
-
-            result = {
-                'total': None,
-                'samples': _total,
-                'samples_p': None,
-                'non_nulls': _non_nulls,
-                'non_nulls_p': percentage(_non_nulls, _total),
-                'nulls': _nulls,
-                'nulls_p': percentage(_nulls, _total),
-                'valids': _valids,
-                'valids_p': percentage(_valids, _total),
-                'invalids': _invalids,
-                'invalids_p': percentage(_invalids, _total),
-                'distinct': _distinct,
-                'distinct_p': percentage(_distinct, _valids),
-                'min': _min.isoformat() if _min is not None else None,
-                'max': _max.isoformat() if _max is not None else None,
-            }
+    def _profile(self, conn: Connection) -> dict:
+        cte = self._get_template_cte()
+        result = self._fetch_basic(conn)
+        _total, _non_nulls, _valids, _distinct, _min, _max = result
+        _nulls = _total - _non_nulls
+        _invalids = _non_nulls - _valids
+
+        if self._get_database_backend() == 'sqlite':
+            if isinstance(self.column.type, Date):
+                _min = datetime.fromisoformat(_min).date() if isinstance(_min, str) else _min
+                _max = datetime.fromisoformat(_max).date() if isinstance(_max, str) else _max
+            else:
+                _min = datetime.fromisoformat(_min) if isinstance(_min, str) else _min
+                _max = datetime.fromisoformat(_max) if isinstance(_max, str) else _max
+
+        result = {
+            'total': None,
+            'samples': _total,
+            'samples_p': None,
+            'non_nulls': _non_nulls,
+            'non_nulls_p': percentage(_non_nulls, _total),
+            'nulls': _nulls,
+            'nulls_p': percentage(_nulls, _total),
+            'valids': _valids,
+            'valids_p': percentage(_valids, _total),
+            'invalids': _invalids,
+            'invalids_p': percentage(_invalids, _total),
+            'distinct': _distinct,
+            'distinct_p': percentage(_distinct, _valids),
+            'min': _min.isoformat() if _min is not None else None,
+            'max': _max.isoformat() if _max is not None else None,
+        }
+        if self.basic:
+            return result
 
-            # uniqueness
-            _non_duplicates = profile_non_duplicate(conn, cte, cte.c.c)
+        # uniqueness
+        if self._is_planned('duplicates'):
+            _non_duplicates = self._fetch_non_duplicates(conn, cte)
             _duplicates = _valids - _non_duplicates
             result.update({
                 "duplicates": _duplicates,
@@ -1279,14 +1913,15 @@ class DatetimeColumnProfiler(BaseColumnProfiler):
                 "non_duplicates_p": percentage(_non_duplicates, _valids),
             })
 
-            # histogram
+        # histogram
+        if self._is_planned('histogram'):
             histogram = None
             _type = None
             if _min and _max:
                 histogram, _type = self._profile_histogram(conn, cte, cte.c.c, _min, _max)
             result['histogram'] = histogram
 
-            return result
+        return result
 
     def _profile_histogram(
         self,
@@ -1317,56 +1952,15 @@ class DatetimeColumnProfiler(BaseColumnProfiler):
         #     if isinstance(max, datetime):
         #         max = max.date()
 
-        _type = None
         histogram = {
             "labels": [],
             "counts": [],
             "bin_edges": [],
         }
 
-        def date_trunc(*args):
-            if self._get_database_backend() == 'sqlite':
-                if args[0] == "YEAR":
-                    return func.strftime("%Y-01-01", args[1])
-                elif args[0] == "MONTH":
-                    return func.strftime("%Y-%m-01", args[1])
-                else:
-                    return func.strftime("%Y-%m-%d", args[1])
-            elif self._get_database_backend() == 'bigquery':
-                date_expression = args[1]
-                date_part = args[0]
-                return func.date_trunc(date_expression, text(date_part))
-            else:
-                return func.date_trunc(*args)
-
-        days_delta = (max - min).days
-        if days_delta > 365 * 4:
-            _type = "yearly"
-            dmin = date(min.year, 1, 1)
-            if max.year < 3000:
-                dmax = date(max.year, 1, 1) + relativedelta(years=+1)
-            else:
-                dmax = date(3000, 1, 1)
-            interval_years = math.ceil((dmax.year - dmin.year) / 50)
-            interval = relativedelta(years=+interval_years)
-            num_buckets = math.ceil((dmax.year - dmin.year) / interval.years)
-
-            cte = select(date_trunc("YEAR", column).label("d")).select_from(table).cte()
-        elif days_delta > 60:
-            _type = "monthly"
-            interval = relativedelta(months=+1)
-            dmin = date(min.year, min.month, 1)
-            dmax = date(max.year, max.month, 1) + interval
-            period = relativedelta(dmax, dmin)
-            num_buckets = (period.years * 12 + period.months)
-            cte = select(date_trunc("MONTH", column).label("d")).select_from(table).cte()
-        else:
-            _type = "daily"
-            interval = relativedelta(days=+1)
-            dmin = date(min.year, min.month, min.day)
-            dmax = date(max.year, max.month, max.day) + interval
-            num_buckets = (dmax - dmin).days
-            cte = select(date_trunc("DAY", column).label("d")).select_from(table).cte()
+        _type, num_buckets, labels, bin_edges = datetime_histogram_bins(min, max)
+        date_part = {"yearly": "YEAR", "monthly": "MONTH", "daily": "DAY"}[_type]
+        cte = select(self._get_dialect().date_trunc(date_part, column).label("d")).select_from(table).cte()
 
         stmt = select(
             cte.c.d,
@@ -1377,14 +1971,11 @@ class DatetimeColumnProfiler(BaseColumnProfiler):
             cte.c.d
         )
 
-        result = conn.execute(stmt)
+        result = fetchall(conn, stmt)
 
-        for i in range(num_buckets):
-            label = f"{dmin + i * interval} - {dmin + (i + 1) * interval}"
-            histogram["labels"].append(label)
-            histogram["bin_edges"].append(str(dmin + i * interval))
-            histogram["counts"].append(0)
-        histogram["bin_edges"].append(str(dmin + num_buckets * interval))
+        histogram["labels"] = labels
+        histogram["bin_edges"] = bin_edges
+        histogram["counts"] = [0] * num_buckets
 
         for row in result:
             date_truncated, v = row
@@ -1431,47 +2022,49 @@ class BooleanColumnProfiler(BaseColumnProfiler):
         ).select_from(cte).cte()
         return cte
 
-    def profile(self):
-        cte = self._get_table_cte()
+    def _get_basic_statement(self) -> Select:
+        cte = self._get_template_cte()
+        return select(
+            func.count().label("_total"),
+            func.count(cte.c.orig).label("_non_nulls"),
+            func.count(cte.c.c).label("_valids"),
+            func.count(cte.c.true_count).label("_trues"),
+            self._count_distinct(cte.c.c).label("_distinct"),
+        ).select_from(cte)
+
+    def _profile(self, conn: Connection) -> dict:
+        result = self._fetch_basic(conn)
+        _total, _non_nulls, _valids, _trues, _distinct = result
+        _nulls = _total - _non_nulls
+        _invalids = _non_nulls - _valids
+        _falses = _valids - _trues
 
-        with self.engine.connect() as conn:
-            stmt = select(
-                func.count().label("_total"),
-                func.count(cte.c.orig).label("_non_nulls"),
-                func.count(cte.c.c).label("_valids"),
-                func.count(cte.c.true_count).label("_trues"),
-                func.count(distinct(cte.c.c)).label("_distinct"),
-            ).select_from(cte)
-            result = conn.execute(stmt).fetchone()
-            _total, _non_nulls, _valids, _trues, _distinct = result
-            _nulls = _total - _non_nulls
-            _invalids = _non_nulls - _valids
-            _falses = _valids - _trues
-
-            result = {
-                'total': None,
-                'samples': _total,
-                'samples_p': None,
-                'non_nulls': _non_nulls,
-                'non_nulls_p': percentage(_non_nulls, _total),
-                'nulls': _nulls,
-                'nulls_p': percentage(_nulls, _total),
-                'valids': _valids,
-                'valids_p': percentage(_valids, _total),
-                'invalids': _invalids,
-                'invalids_p': percentage(_invalids, _total),
-                'trues': _trues,
-                'trues_p': percentage(_trues, _total),
-                'falses': _falses,
-                'falses_p': percentage(_falses, _total),
-                'distinct': _distinct,
-                'distinct_p': percentage(_distinct, _valids),
-            }
+        result = {
+            'total': None,
+            'samples': _total,
+            'samples_p': None,
+            'non_nulls': _non_nulls,
+            'non_nulls_p': percentage(_non_nulls, _total),
+            'nulls': _nulls,
+            'nulls_p': percentage(_nulls, _total),
+            'valids': _valids,
+            'valids_p': percentage(_valids, _total),
+            'invalids': _invalids,
+            'invalids_p': percentage(_invalids, _total),
+            'trues': _trues,
+            'trues_p': percentage(_trues, _total),
+            'falses': _falses,
+            'falses_p': percentage(_falses, _total),
+            'distinct': _distinct,
+            'distinct_p': percentage(_distinct, _valids),
+        }
 
-            return result
+        return result
 
 
 class UUIDColumnProfiler(BaseColumnProfiler):
+    groups = ('duplicates', 'topk')
+
     def __init__(self, engine: Engine, config: dict, table: Table, column: Column):
         super().__init__(engine, config, table, column)
 
@@ -1479,42 +2072,44 @@ class UUIDColumnProfiler(BaseColumnProfiler):
         t, c = self._get_limited_table_cte()
         return select(c.label("c")).select_from(t).cte()
 
-    def profile(self):
-        with self.engine.connect() as conn:
-            cte = self._get_table_cte()
-
-            columns = [
-                func.count().label("_total"),
-                func.count(cte.c.c).label("_non_nulls"),
-                func.count(distinct(cte.c.c)).label("_distinct"),
-            ]
-
-            stmt = select(*columns)
-            result = conn.execute(stmt).fetchone()
-            _total, _non_nulls, _distinct = result
-
-            _nulls = _total - _non_nulls
-            _valids = _non_nulls
-            _invalids = _non_nulls - _valids
-
-            result = {
-                'total': None,
-                'samples': _total,
-                'samples_p': None,
-                'non_nulls': _non_nulls,
-                'non_nulls_p': percentage(_non_nulls, _total),
-                'nulls': _nulls,
-                'nulls_p': percentage(_nulls, _total),
-                'valids': _valids,
-                'valids_p': percentage(_valids, _total),
-                'invalids': _invalids,
-                'invalids_p': percentage(_invalids, _total),
-                'distinct': _distinct,
-                'distinct_p': percentage(_distinct, _valids),
-            }
+    def _get_basic_statement(self) -> Select:
+        cte = self._get_template_cte()
+        return select(
+            func.count().label("_total"),
+            func.count(cte.c.c).label("_non_nulls"),
+            self._count_distinct(cte.c.c).label("_distinct"),
+        )
+
+    def _profile(self, conn: Connection) -> dict:
+        cte = self._get_template_cte()
+        result = self._fetch_basic(conn)
+        _total, _non_nulls, _distinct = result
+
+        _nulls = _total - _non_nulls
+        _valids = _non_nulls
+        _invalids = _non_nulls - _valids
 
-            # uniqueness
-            _non_duplicates = profile_non_duplicate(conn, cte, cte.c.c)
+        result = {
+            'total': None,
+            'samples': _total,
+            'samples_p': None,
+            'non_nulls': _non_nulls,
+            'non_nulls_p': percentage(_non_nulls, _total),
+            'nulls': _nulls,
+            'nulls_p': percentage(_nulls, _total),
+            'valids': _valids,
+            'valids_p': percentage(_valids, _total),
+            'invalids': _invalids,
+            'invalids_p': percentage(_invalids, _total),
+            'distinct': _distinct,
+            'distinct_p': percentage(_distinct, _valids),
+        }
+        if self.basic:
+            return result
+
+        # uniqueness
+        if self._is_planned('duplicates'):
+            _non_duplicates = self._fetch_non_duplicates(conn, cte)
             _duplicates = _valids - _non_duplicates
             result.update({
                 "duplicates": _duplicates,
@@ -1523,13 +2118,14 @@ class UUIDColumnProfiler(BaseColumnProfiler):
                 "non_duplicates_p": percentage(_non_duplicates, _valids),
             })
 
-            # top k
+        # top k
+        if self._is_planned('topk'):
             topk = None
             if _valids > 0:
                 topk = profile_topk(conn, func.cast(cte.c.c, String))
             result['topk'] = topk
 
-            return result
+        return result
 
 
 def profile_topk(conn, expr, k=50) -> dict:
@@ -1558,15 +2154,17 @@ def profile_topk(conn, expr, k=50) -> dict:
     return topk
 
 
-def profile_histogram(
-    conn: Connection,
-    table: FromClause,
-    column: ColumnClause,
+def histogram_bins(
     min: Union[int, float],
     max: Union[int, float],
     is_integer: bool,
     num_buckets: int = HISTOGRAM_NUM_BUCKET
-) -> dict:
+) -> Tuple[Union[int, float], int, List[str], List[Union[int, float]]]:
+    """
+    Get the bins of the histogram
+
+    :return: (interval, num_buckets, labels, bin_edges)
+    """
     if is_integer:
         # min=0, max=50, num_buckets=50  => interval=1, num_buckets=51
         # min=0, max=70, num_buckets=50  => interval=2, num_buckets=36
@@ -1576,35 +2174,6 @@ def profile_histogram(
     else:
         interval = (max - min) / num_buckets if max > min else 1
 
-    cases = []
-    for i in range(num_buckets):
-        bound = min + interval * (i + 1)
-        if i != num_buckets - 1:
-            cases += [(column < bound, i)]
-        else:
-            cases += [(column < bound + interval / 100, i)]
-
-    cte_with_bucket = select(
-        column.label("c"),
-        case(*cases, else_=None).label("bucket")
-    ).select_from(
-        table
-    ).where(
-        column.isnot(None)
-    ).cte()
-
-    stmt = select(
-        cte_with_bucket.c.bucket,
-        func.count().label("_count")
-    ).group_by(
-        cte_with_bucket.c.bucket
-    ).order_by(
-        cte_with_bucket.c.bucket
-    )
-
-    result = conn.execute(stmt)
-
-    counts = []
     labels = []
     bin_edges = []
     for i in range(num_buckets):
@@ -1626,11 +2195,57 @@ def profile_histogram(
             label = f"{format_float(start)} _ {format_float(end)}"
 
         labels.append(label)
-        counts.append(0)
         bin_edges.append(start)
         if i == num_buckets - 1:
             bin_edges.append(end)
+    return interval, num_buckets, labels, bin_edges
 
+
+def profile_histogram(
+    conn: Connection,
+    table: FromClause,
+    column: ColumnClause,
+    min: Union[int, float],
+    max: Union[int, float],
+    is_integer: bool,
+    num_buckets: int = HISTOGRAM_NUM_BUCKET
+) -> dict:
+    interval, num_buckets, labels, bin_edges = histogram_bins(min, max, is_integer, num_buckets)
+
+    dialect = get_dialect(conn.engine.url.get_backend_name())
+    if dialect.width_bucket:
+        bucket = dialect.bucket(column, min, min + interval * num_buckets, num_buckets)
+    else:
+        cases = []
+        for i in range(num_buckets):
+            bound = min + interval * (i + 1)
+            if i != num_buckets - 1:
+                cases += [(column < bound, i)]
+            else:
+                cases += [(column < bound + interval / 100, i)]
+        bucket = case(*cases, else_=None)
+
+    cte_with_bucket = select(
+        column.label("c"),
+        bucket.label("bucket")
+    ).select_from(
+        table
+    ).where(
+        column.isnot(None)
+    ).cte()
+
+    stmt = select(
+        cte_with_bucket.c.bucket,
+        func.count().label("_count")
+    ).group_by(
+        cte_with_bucket.c.bucket
+    ).order_by(
+        cte_with_bucket.c.bucket
+    )
+
+    result = fetchall(conn, stmt)
+
+    counts = [0] * num_buckets
     for row in result:
         _bucket, v = row
         if _bucket is None:
@@ -1643,6 +2258,49 @@ def profile_histogram(
     }
 
 
+def datetime_histogram_bins(
+    min: Union[date, datetime],
+    max: Union[date, datetime]
+) -> Tuple[str, int, List[str], List[str]]:
+    """
+    Get the bins of the datetime histogram. The bins are yearly, monthly or daily according to the range.
+
+    :return: (type, num_buckets, labels, bin_edges)
+    """
+    days_delta = (max - min).days
+    if days_delta > 365 * 4:
+        _type = "yearly"
+        dmin = date(min.year, 1, 1)
+        if max.year < 3000:
+            dmax = date(max.year, 1, 1) + relativedelta(years=+1)
+        else:
+            dmax = date(3000, 1, 1)
+        interval_years = math.ceil((dmax.year - dmin.year) / 50)
+        interval = relativedelta(years=+interval_years)
+        num_buckets = math.ceil((dmax.year - dmin.year) / interval.years)
+    elif days_delta > 60:
+        _type = "monthly"
+        interval = relativedelta(months=+1)
+        dmin = date(min.year, min.month, 1)
+        dmax = date(max.year, max.month, 1) + interval
+        period = relativedelta(dmax, dmin)
+        num_buckets = (period.years * 12 + period.months)
+    else:
+        _type = "daily"
+        interval = relativedelta(days=+1)
+        dmin = date(min.year, min.month, min.day)
+        dmax = date(max.year, max.month, max.day) + interval
+        num_buckets = (dmax - dmin).days
+
+    labels = []
+    bin_edges = []
+    for i in range(num_buckets):
+        labels.append(f"{dmin + i * interval} - {dmin + (i + 1) * interval}")
+        bin_edges.append(str(dmin + i * interval))
+    bin_edges.append(str(dmin + num_buckets * interval))
+    return _type, num_buckets, labels, bin_edges
+
+
 def profile_non_duplicate(
     conn: Connection,
     table: FromClause,
@@ -1670,5 +2328,5 @@ def profile_non_duplicate(
     ).cte()
 
     stmt = select(func.count(cte.c.non_duplicates)).select_from(cte)
-    non_duplicates, = conn.execute(stmt).fetchone()
+    non_duplicates, = fetchone(conn, stmt)
     return non_duplicates
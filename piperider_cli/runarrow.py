@@ -0,0 +1,267 @@
+import importlib.util
+import itertools
+import json
+import os
+from typing import Iterable, List, Optional, Tuple
+
+from piperider_cli.error import PipeRiderRunFormatError
+
+RUN_ARROW = 'run.arrow'
+
+_METADATA_KEY = b'piperider.run'
+
+# the type codes of the 'value' union: the markers of a table, a column or the 'columns' member of a table, then the
+# values by their types
+_TABLE, _COLUMN, _COLUMNS, _NULL, _BOOL, _INT, _FLOAT, _STR, _INTS, _FLOATS, _STRS, _JSON = range(12)
+_CODE_NAMES = ['table', 'column', 'columns', 'null', 'bool', 'int', 'float', 'str', 'ints', 'floats', 'strs', 'json']
+_INT64_RANGE = (-(1 << 63), (1 << 63) - 1)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute  # noqa: F401
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise PipeRiderRunFormatError('arrow', str(e))
+    return pyarrow
+
+
+def get_run_arrow_path(run_json_path: str) -> str:
+    return os.path.join(os.path.dirname(run_json_path), RUN_ARROW)
+
+
+def find_run_arrow(run_json_path: str) -> Optional[str]:
+    """
+    Find the Arrow IPC file of a run, unless it is older than the run.json, e.g. the run.json is patched by the cloud
+    upload, or pyarrow is not installed.
+    """
+    if importlib.util.find_spec('pyarrow') is None:
+        return None
+    path = get_run_arrow_path(run_json_path)
+    if not os.path.exists(path) or not os.path.exists(run_json_path):
+        return None
+    if os.stat(path).st_mtime < os.stat(run_json_path).st_mtime:
+        return None
+    return path
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and _INT64_RANGE[0] <= value <= _INT64_RANGE[1]
+
+
+def _type_code(value) -> int:
+    # the lists are kept as the list types only if their items are of the same JSON type, so the values are loaded as
+    # they were written, e.g. the integer bin edges are not loaded as floats
+    if value is None:
+        return _NULL
+    if isinstance(value, bool):
+        return _BOOL
+    if _is_int(value):
+        return _INT
+    if isinstance(value, float):
+        return _FLOAT
+    if isinstance(value, str):
+        return _STR
+    if isinstance(value, list) and value:
+        if all(_is_int(v) for v in value):
+            return _INTS
+        if all(isinstance(v, float) for v in value):
+            return _FLOATS
+        if all(isinstance(v, str) for v in value):
+            return _STRS
+    return _JSON
+
+
+class _RowWriter:
+    def __init__(self):
+        self.tables = []
+        self.columns = []
+        self.metrics = []
+        self.fields = []
+        self.type_codes = []
+        self.offsets = []
+        self.children = [[] for _ in _CODE_NAMES]
+
+    def append(self, table, column, metric, field, type_code, value=None):
+        self.tables.append(table)
+        self.columns.append(column)
+        self.metrics.append(metric)
+        self.fields.append(field)
+        self.type_codes.append(type_code)
+        child = self.children[type_code]
+        self.offsets.append(len(child))
+        child.append(json.dumps(value) if type_code == _JSON else value)
+
+    def append_member(self, table, column, metric, value):
+        # a member of the scalars and the arrays, e.g. the histogram or the top-k, is split into its fields
+        if isinstance(value, dict) and value and all(not isinstance(v, dict) for v in value.values()):
+            for field, v in value.items():
+                self.append(table, column, metric, field, _type_code(v), v)
+        else:
+            self.append(table, column, metric, None, _type_code(value), value)
+
+
+def write_run_arrow(path: str, run_result: dict):
+    """
+    Write the run result as an Arrow IPC file, one row per (table, column, metric). The value is a union of the
+    scalars and the arrays, e.g. the counts of a histogram, and the members other than the tables are kept as JSON in
+    the schema metadata.
+    """
+    pa = _import_pyarrow()
+
+    rows = _RowWriter()
+    for table_name, table in (run_result.get('tables') or {}).items():
+        if not isinstance(table, dict):
+            rows.append(table_name, None, None, None, _JSON, table)
+            continue
+        rows.append(table_name, None, None, None, _TABLE)
+        columns = None
+        for key, member in table.items():
+            if key == 'columns' and isinstance(member, dict):
+                rows.append(table_name, None, key, None, _COLUMNS)
+                columns = member
+            else:
+                rows.append_member(table_name, None, key, member)
+        # the columns follow the members of the table, so the rows of a table or a column are contiguous
+        for column_name, column in (columns or {}).items():
+            if not isinstance(column, dict):
+                rows.append(table_name, column_name, None, None, _JSON, column)
+                continue
+            rows.append(table_name, column_name, None, None, _COLUMN)
+            for metric, value in column.items():
+                rows.append_member(table_name, column_name, metric, value)
+
+    child_types = [pa.null(), pa.null(), pa.null(), pa.null(), pa.bool_(), pa.int64(), pa.float64(), pa.string(),
+                   pa.list_(pa.int64()), pa.list_(pa.float64()), pa.list_(pa.string()), pa.string()]
+    children = [pa.nulls(len(c)) if t == pa.null() else pa.array(c, type=t) for c, t in zip(rows.children, child_types)]
+    value = pa.UnionArray.from_dense(pa.array(rows.type_codes, type=pa.int8()), pa.array(rows.offsets, type=pa.int32()),
+                                     children, _CODE_NAMES)
+    members = {key: value for key, value in run_result.items() if key != 'tables'}
+    metadata = {_METADATA_KEY: json.dumps(dict(keys=list(run_result.keys()), members=members))}
+    table = pa.table({
+        'table': pa.array(rows.tables, type=pa.string()).dictionary_encode(),
+        'column': pa.array(rows.columns, type=pa.string()),
+        'metric': pa.array(rows.metrics, type=pa.string()).dictionary_encode(),
+        'field': pa.array(rows.fields, type=pa.string()).dictionary_encode(),
+        'value': value,
+    }).replace_schema_metadata(metadata)
+
+    tmp_path = os.path.join(os.path.dirname(path), f'.tmp-{os.path.basename(path)}')
+    with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_run_arrow(path: str, tables: Iterable[str] = None):
+    """
+    Read the Arrow table of a run. The file is memory-mapped, and the record batches are read without copying. Only
+    the rows of the given tables are kept if 'tables' is given.
+    """
+    pa = _import_pyarrow()
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    if tables is not None:
+        table = table.filter(pa.compute.is_in(table.column('table'), value_set=pa.array(list(tables), pa.string())))
+    return table
+
+
+def _to_pylist(column) -> list:
+    pa = _import_pyarrow()
+    if not pa.types.is_dictionary(column.type):
+        return column.to_pylist()
+    # decode the dictionary arrays by the indices, which is much faster than converting the scalars one by one
+    values = []
+    for chunk in column.chunks:
+        dictionary = chunk.dictionary.to_pylist()
+        values.extend([None if i is None else dictionary[i] for i in chunk.indices.to_pylist()])
+    return values
+
+
+def _values_to_pylist(column) -> list:
+    values = []
+    for chunk in column.chunks:
+        children = [chunk.field(i).to_pylist() for i in range(len(_CODE_NAMES))]
+        children[_JSON] = [json.loads(v) for v in children[_JSON]]
+        # a new dict for each marker of the tables, the columns and the 'columns' members of the tables
+        for code in [_TABLE, _COLUMN, _COLUMNS]:
+            children[code] = [{} for _ in children[code]]
+        values.extend([children[code][offset] for code, offset in
+                       zip(chunk.type_codes.to_pylist(), chunk.offsets.to_pylist())])
+    return values
+
+
+def load_run_arrow(path: str, tables: Iterable[str] = None) -> dict:
+    """
+    Load the run result of an Arrow IPC file, which is the same dict as the run.json. Only the given tables are loaded
+    if 'tables' is given.
+    """
+    pa = _import_pyarrow()
+    table = read_run_arrow(path, tables=tables)
+    metadata = json.loads(table.schema.metadata[_METADATA_KEY])
+
+    table_names = _to_pylist(table.column('table'))
+    column_names = table.column('column').to_pylist()
+    metrics = _to_pylist(table.column('metric'))
+    values = _values_to_pylist(table.column('value'))
+
+    # merge the fields into the members, e.g. the counts and the bin edges into the histogram
+    field_column = table.column('field')
+    if field_column.null_count < len(field_column):
+        fields = _to_pylist(field_column)
+        keep = [True] * len(fields)
+        owner = last = None
+        for i in pa.compute.indices_nonzero(pa.compute.is_valid(field_column)).to_pylist():
+            if owner is not None and i == last + 1 and metrics[i] == metrics[owner]:
+                values[owner][fields[i]] = values[i]
+                keep[i] = False
+            else:
+                owner = i
+                values[i] = {fields[i]: values[i]}
+            last = i
+        table_names, column_names, metrics, values = [list(itertools.compress(c, keep)) for c in
+                                                      [table_names, column_names, metrics, values]]
+
+    # the rows of a table or a column follow its marker row, and they are built as a dict at once
+    run_tables = {}
+    markers = [i for i, metric in enumerate(metrics) if metric is None]
+    for start, end in zip(markers, markers[1:] + [len(metrics)]):
+        member = values[start]
+        if end - start > 1:
+            member.update(zip(metrics[start + 1:end], values[start + 1:end]))
+        if column_names[start] is None:
+            run_tables[table_names[start]] = member
+        else:
+            run_tables[table_names[start]]['columns'][column_names[start]] = member
+
+    run_result = {}
+    for key in metadata['keys']:
+        run_result[key] = run_tables if key == 'tables' else metadata['members'][key]
+    return run_result
+
+
+def read_run_scalars(path: str) -> Tuple[dict, List[tuple]]:
+    """
+    Read the members of a run other than the tables, and the scalars of the tables and the columns as
+    (table, column, metric, value), without building the dicts of the tables. The column is None for the table scalars.
+    """
+    pa = _import_pyarrow()
+    pc = pa.compute
+    table = read_run_arrow(path)
+    metadata = json.loads(table.schema.metadata[_METADATA_KEY])
+
+    scalars = []
+    for batch in table.to_batches():
+        value = batch.column('value')
+        no_field = pc.is_null(batch.column('field'))
+        for code in [_BOOL, _INT, _FLOAT, _STR]:
+            mask = pc.and_(pc.equal(value.type_codes, code), no_field)
+            if not pc.any(mask).as_py():
+                continue
+            selected = batch.filter(mask)
+            values = pc.take(value.field(code), pc.filter(value.offsets, mask))
+            scalars.extend(zip(_to_pylist(pa.chunked_array([selected.column('table')])),
+                               selected.column('column').to_pylist(),
+                               _to_pylist(pa.chunked_array([selected.column('metric')])),
+                               values.to_pylist()))
+    return metadata['members'], scalars
@@ -0,0 +1,298 @@
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime, timedelta
+from typing import List, Optional
+from urllib.request import pathname2url
+
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
+from piperider_cli import datetime_to_str, str_to_datetime
+from piperider_cli.blobstore import BLOB_REF, default_blob_dir, is_blob_ref
+from piperider_cli.configuration import Configuration
+from piperider_cli.error import PipeRiderCompressionError, PipeRiderConflictOptionsError
+from piperider_cli.profiler.checkpoint import list_checkpoints
+from piperider_cli.runjson import find_run_json, open_run_json
+
+INDEX_FILE = '.runs.sqlite'
+
+_COLUMNS = ['dir', 'path', 'mtime', 'run_id', 'name', 'created_at', 'table_count', 'pass_count', 'fail_count',
+            'project_id', 'cloud', 'blobs']
+
+
+def default_index_path(output_dir: str) -> str:
+    return os.path.join(output_dir, INDEX_FILE)
+
+
+def summarize_run(run_result: dict) -> dict:
+    """
+    The summary of a run to list and select the runs without loading them.
+    """
+    tests = run_result.get('tests', [])
+    pass_count = len([test for test in tests if test.get('status') == 'passed'])
+    dbt = run_result.get('dbt')
+    blobs = [value[BLOB_REF] for value in dbt.values() if is_blob_ref(value)] if isinstance(dbt, dict) else []
+    return dict(
+        run_id=run_result.get('id'),
+        name=run_result['datasource']['name'],
+        created_at=run_result['created_at'],
+        table_count=len(run_result.get('tables', {}).keys()),
+        pass_count=pass_count,
+        fail_count=len(tests) - pass_count,
+        project_id=run_result.get('project_id'),
+        cloud=run_result.get('cloud'),
+        blobs=blobs,
+    )
+
+
+class RunIndex:
+    """
+    RunIndex keeps the summaries of the runs in a sqlite file of the outputs directory, so the runs could be listed
+    and selected without loading every run.json. The run is added by 'piperider run'. A run written without the index,
+    e.g. by an older version, or a run.json rewritten later, e.g. by the cloud upload, is found by the modified time
+    and indexed again when the runs are listed.
+    """
+
+    def __init__(self, output_dir: str, path: str = None):
+        self.output_dir = output_dir
+        self.path = path or default_index_path(output_dir)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS runs (
+                dir TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                run_id TEXT,
+                name TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                table_count INTEGER NOT NULL,
+                pass_count INTEGER NOT NULL,
+                fail_count INTEGER NOT NULL,
+                project_id TEXT,
+                cloud TEXT,
+                blobs TEXT NOT NULL
+            )''')
+        return conn
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, run_json_path: str, run_result: dict):
+        summary = summarize_run(run_result)
+        row = dict(summary,
+                   dir=os.path.basename(os.path.dirname(run_json_path)),
+                   path=os.path.basename(run_json_path),
+                   mtime=os.stat(run_json_path).st_mtime,
+                   cloud=json.dumps(summary['cloud']) if summary['cloud'] is not None else None,
+                   blobs=json.dumps(summary['blobs']))
+        conn.execute(f'INSERT OR REPLACE INTO runs ({", ".join(_COLUMNS)}) VALUES ({", ".join("?" * len(_COLUMNS))})',
+                     [row[c] for c in _COLUMNS])
+
+    def _entry(self, row) -> dict:
+        entry = dict(zip(_COLUMNS, row))
+        entry['path'] = os.path.join(self.output_dir, entry['dir'], entry['path'])
+        entry['cloud'] = json.loads(entry['cloud']) if entry['cloud'] is not None else None
+        entry['blobs'] = json.loads(entry['blobs'])
+        return entry
+
+    def _sync(self, conn: sqlite3.Connection):
+        indexed = {d: (path, mtime) for d, path, mtime in conn.execute('SELECT dir, path, mtime FROM runs')}
+        found = set()
+        for de in os.scandir(self.output_dir):
+            if de.name == 'latest' or de.name.startswith('.') or not de.is_dir(follow_symlinks=False):
+                continue
+            run_json = find_run_json(de.path)
+            if run_json is None:
+                continue
+            found.add(de.name)
+            if indexed.get(de.name) == (os.path.basename(run_json), os.stat(run_json).st_mtime):
+                continue
+            try:
+                with open_run_json(run_json) as f:
+                    run_result = json.load(f)
+                self._upsert(conn, run_json, run_result)
+            except (ValueError, KeyError, TypeError, OSError):
+                # not a run
+                found.discard(de.name)
+            except PipeRiderCompressionError as e:
+                # e.g. a run.json.zst copied from another machine without zstandard
+                Console().print(f'[bold yellow]Warning:[/bold yellow] Skip the run {de.name}: {e.message}')
+                found.discard(de.name)
+        for d in set(indexed.keys()) - found:
+            conn.execute('DELETE FROM runs WHERE dir = ?', (d,))
+
+    def add(self, run_json_path: str, run_result: dict):
+        """
+        Add a run of the outputs directory, which is written by 'piperider run'.
+        """
+        conn = self._connect()
+        try:
+            self._upsert(conn, run_json_path, run_result)
+        finally:
+            conn.close()
+
+    def list(self, datasource: str = None) -> List[dict]:
+        """
+        List the summaries of the runs, ordered by the datasource name and the created time, both descending.
+        """
+        if not os.path.isdir(self.output_dir):
+            return []
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            self._sync(conn)
+            conn.execute('COMMIT')
+            sql = f'SELECT {", ".join(_COLUMNS)} FROM runs'
+            params = []
+            if datasource:
+                sql += ' WHERE name = ?'
+                params.append(datasource)
+            sql += ' ORDER BY name DESC, created_at DESC'
+            return [self._entry(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def find_project_id(self) -> Optional[str]:
+        """
+        Find the project id of the latest indexed run. The index is only read, so it neither creates the index nor
+        indexes the runs written without it.
+        """
+        if not os.path.exists(self.path):
+            return None
+        conn = sqlite3.connect(f'file:{pathname2url(os.path.abspath(self.path))}?mode=ro', uri=True, timeout=60)
+        try:
+            row = conn.execute('SELECT project_id FROM runs WHERE project_id IS NOT NULL '
+                               'ORDER BY name DESC, created_at DESC LIMIT 1').fetchone()
+        except sqlite3.Error:
+            return None
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the index from the run.json files of the outputs directory.
+
+        :return: the number of the indexed runs
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        return len(self.list())
+
+    def prune(self, keep_last: int = None, older_than_days: float = None, datasource: str = None,
+              dry_run: bool = False) -> List[dict]:
+        """
+        Remove the runs beyond the last runs of each datasource, or created before the days. The run pointed by the
+        'latest' symlink is kept, and the blobs no longer referred by any run are removed. The checkpoints of the
+        written runs, or created before the days, are removed as well.
+
+        :return: the removed runs
+        """
+        now = datetime.utcnow()
+        latest = os.path.realpath(os.path.join(self.output_dir, 'latest'))
+        pruned = []
+        kept = {}
+        for entry in self.list():
+            kept.setdefault(entry['name'], 0)
+            if datasource and entry['name'] != datasource:
+                continue
+            run_dir = os.path.join(self.output_dir, entry['dir'])
+            expired = older_than_days is not None and \
+                str_to_datetime(entry['created_at']) < now - timedelta(days=older_than_days)
+            exceeded = keep_last is not None and kept[entry['name']] >= keep_last
+            if (expired or exceeded) and os.path.realpath(run_dir) != latest:
+                pruned.append(entry)
+            else:
+                kept[entry['name']] += 1
+
+        if dry_run:
+            return pruned
+        self._prune_checkpoints(older_than_days, datasource)
+        if not pruned:
+            return pruned
+
+        conn = self._connect()
+        try:
+            for entry in pruned:
+                shutil.rmtree(os.path.join(self.output_dir, entry['dir']), ignore_errors=True)
+                conn.execute('DELETE FROM runs WHERE dir = ?', (entry['dir'],))
+            referred = set()
+            for blobs, in conn.execute('SELECT blobs FROM runs'):
+                referred.update(json.loads(blobs))
+        finally:
+            conn.close()
+
+        # a running run stores its blobs before its run.json is written
+        blob_dir = default_blob_dir(self.output_dir)
+        if os.path.isdir(blob_dir):
+            for de in os.scandir(blob_dir):
+                if de.name.startswith('.') or de.name in referred:
+                    continue
+                if datetime.fromtimestamp(de.stat().st_mtime) < datetime.now() - timedelta(hours=1):
+                    os.remove(de.path)
+        return pruned
+
+    def _prune_checkpoints(self, older_than_days: float = None, datasource: str = None):
+        """
+        Remove the checkpoints left by the runs, i.e. the run is written or it is older than the days. The other
+        checkpoints could be resumed.
+        """
+        run_ids = set(entry['run_id'] for entry in self.list())
+        expired_at = datetime.utcnow() - timedelta(days=older_than_days) if older_than_days is not None else None
+        for checkpoint in list_checkpoints(self.output_dir):
+            if datasource and checkpoint.get('datasource') != datasource:
+                continue
+            expired = expired_at is not None and str_to_datetime(checkpoint['created_at']) < expired_at
+            if checkpoint.get('id') in run_ids or expired:
+                os.remove(checkpoint['path'])
+
+
+class RunIndexCommand:
+    @staticmethod
+    def _print_runs(console: Console, entries: List[dict], title: str = None):
+        table = Table(title=title, show_header=True, show_edge=True, header_style="bold magenta", box=box.SIMPLE)
+        table.add_column('Datasource', justify='left', style='cyan')
+        table.add_column('Run', justify='left')
+        table.add_column('#Table', justify='right')
+        table.add_column('#Pass', justify='right')
+        table.add_column('#Fail', justify='right')
+        table.add_column('Created At', justify='left')
+        for entry in entries:
+            created_at = datetime_to_str(str_to_datetime(entry['created_at']), to_tzlocal=True)
+            table.add_row(entry['name'], entry['dir'], str(entry['table_count']), str(entry['pass_count']),
+                          str(entry['fail_count']), created_at)
+        console.print(table)
+
+    @staticmethod
+    def list(report_dir: str = None, datasource: str = None):
+        console = Console()
+        filesystem = Configuration.instance().activate_report_directory(report_dir=report_dir)
+        RunIndexCommand._print_runs(console, RunIndex(filesystem.get_output_dir()).list(datasource))
+        return 0
+
+    @staticmethod
+    def rebuild(report_dir: str = None):
+        console = Console()
+        filesystem = Configuration.instance().activate_report_directory(report_dir=report_dir)
+        count = RunIndex(filesystem.get_output_dir()).rebuild()
+        console.print(f'Indexed {count} runs in {filesystem.get_output_dir()}')
+        return 0
+
+    @staticmethod
+    def prune(report_dir: str = None, keep_last: int = None, older_than: float = None, datasource: str = None,
+              dry_run: bool = False):
+        console = Console()
+        if keep_last is None and older_than is None:
+            raise PipeRiderConflictOptionsError('Nothing to prune',
+                                                hint='Please specify "--keep-last" or "--older-than".')
+        filesystem = Configuration.instance().activate_report_directory(report_dir=report_dir)
+        index = RunIndex(filesystem.get_output_dir())
+        pruned = index.prune(keep_last=keep_last, older_than_days=older_than, datasource=datasource, dry_run=dry_run)
+        if dry_run:
+            RunIndexCommand._print_runs(console, pruned, title='Runs to remove')
+        else:
+            console.print(f'Removed {len(pruned)} runs')
+        return 0
@@ -0,0 +1,205 @@
+import gzip
+import json
+import os
+import re
+import tempfile
+import threading
+from collections.abc import MutableMapping
+from typing import IO, Dict, Optional, Tuple
+
+from piperider_cli.error import PipeRiderCompressionError
+
+RUN_JSON = 'run.json'
+# the suffixes of the compressed run.json
+COMPRESSIONS = {'zstd': '.zst', 'gzip': '.gz'}
+RUN_JSON_NAMES = [RUN_JSON] + [RUN_JSON + suffix for suffix in COMPRESSIONS.values()]
+
+# the tokens of a JSON document without the whitespace: a string, the literals between the strings, or an
+# unterminated string at the end of a chunk
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[^"\s]+|".*\Z', re.DOTALL)
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+_CHUNK_SIZE = 1 << 20
+
+
+def get_run_json_name(compression: Optional[str] = None) -> str:
+    if compression is None:
+        return RUN_JSON
+    if compression not in COMPRESSIONS:
+        raise PipeRiderCompressionError(compression, f'supported compressions are {", ".join(COMPRESSIONS)}')
+    return RUN_JSON + COMPRESSIONS[compression]
+
+
+def get_compression(path: str) -> Optional[str]:
+    for compression, suffix in COMPRESSIONS.items():
+        if path.endswith(suffix):
+            return compression
+    return None
+
+
+def find_run_json(directory: str) -> Optional[str]:
+    """
+    Find the run.json of a run directory, which could be compressed.
+    """
+    for name in RUN_JSON_NAMES:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def open_run_json(path: str, mode: str = 'r') -> IO:
+    """
+    Open a run.json, or a compressed one by the suffix of the path, e.g. run.json.zst. The text modes, "r" or "w",
+    are UTF-8.
+    """
+    compression = get_compression(path)
+    binary = 'b' in mode
+    if compression == 'gzip':
+        if binary:
+            return gzip.open(path, mode, compresslevel=6)
+        return gzip.open(path, mode + 't', compresslevel=6, encoding='utf-8')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError as e:
+            raise PipeRiderCompressionError(compression, str(e))
+        if binary:
+            return zstandard.open(path, mode)
+        return zstandard.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode) if binary else open(path, mode, encoding='utf-8')
+
+
+class RawJsonFile:
+    """
+    A JSON document on the disk, e.g. the dbt manifest, which is copied into run.json without being parsed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+
+class TableSpool(MutableMapping):
+    """
+    The table results of a run spooled to a temporary JSONL file as they complete, so they are not kept in memory
+    until run.json is written. Each line is the compact JSON of a table, which is loaded when the table is read and
+    copied into run.json as it is. A table set again is appended as a new line.
+    """
+
+    def __init__(self, directory: str = None):
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        # removed by the system when it is closed or the process exits
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def _read(self, name: str) -> bytes:
+        offset, size = self._offsets[name]
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(size)
+
+    def __getitem__(self, name: str) -> dict:
+        return json.loads(self._read(name))
+
+    def __setitem__(self, name: str, result: dict):
+        line = json.dumps(result, separators=(',', ':')).encode('ascii')
+        with self._lock:
+            offset = self._file.seek(0, os.SEEK_END)
+            self._file.write(line + b'\n')
+            self._offsets[name] = (offset, len(line))
+
+    def __delitem__(self, name: str):
+        del self._offsets[name]
+
+    def __contains__(self, name) -> bool:
+        return name in self._offsets
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def copy_json(self, name: str, dst: IO[str]):
+        """
+        Copy the compact JSON of a table, which is the same as json.dumps(table, separators=(',', ':')).
+        """
+        dst.write(self._read(name).decode('ascii'))
+
+    def close(self):
+        self._file.close()
+
+
+def _escape_non_ascii(match) -> str:
+    # the same escapes as json.dumps with ensure_ascii
+    n = ord(match.group())
+    if n < 0x10000:
+        return '\\u{0:04x}'.format(n)
+    n -= 0x10000
+    return '\\u{0:04x}\\u{1:04x}'.format(0xd800 | ((n >> 10) & 0x3ff), 0xdc00 | (n & 0x3ff))
+
+
+def copy_compact_json(src: IO[str], dst: IO[str]):
+    """
+    Copy a JSON document chunk by chunk without the whitespace between the tokens, and escape the non-ASCII
+    characters. A document written by python json is copied as the same bytes as json.dumps(json.load(src),
+    separators=(',', ':')).
+    """
+    carry = ''
+    while True:
+        chunk = src.read(_CHUNK_SIZE)
+        text = carry + chunk
+        tokens = _TOKEN.findall(text)
+        carry = ''
+        if chunk and tokens:
+            # the last token could continue in the next chunk
+            last = tokens.pop()
+            carry = text[text.rindex(last):]
+        output = ''.join(tokens)
+        dst.write(output if output.isascii() else _NON_ASCII.sub(_escape_non_ascii, output))
+        if not chunk:
+            if tokens and tokens[-1][0] == '"' and not _STRING.fullmatch(tokens[-1]):
+                raise ValueError(f'Invalid JSON document: {tokens[-1][:20]}')
+            break
+
+
+def write_run_json(f: IO[str], run_result: dict, depth: int = 2):
+    """
+    Write the run result as the same compact JSON as json.dumps(run_result, separators=(',', ':')) by a stream. The
+    tables and the other members are encoded one by one instead of the whole document, and the raw JSON files and the
+    spooled tables are copied from the disk.
+    """
+    encoder = json.JSONEncoder(separators=(',', ':'))
+
+    def _write(value, level):
+        if isinstance(value, RawJsonFile):
+            with open(value.path) as src:
+                copy_compact_json(src, f)
+        elif isinstance(value, TableSpool):
+            f.write('{')
+            for i, name in enumerate(value):
+                if i > 0:
+                    f.write(',')
+                f.write(encoder.encode(name))
+                f.write(':')
+                value.copy_json(name, f)
+            f.write('}')
+        elif isinstance(value, dict) and level < depth:
+            f.write('{')
+            for i, (key, member) in enumerate(value.items()):
+                if i > 0:
+                    f.write(',')
+                f.write(encoder.encode(key))
+                f.write(':')
+                _write(member, level + 1)
+            f.write('}')
+        else:
+            f.write(encoder.encode(value))
+
+    _write(run_result, 0)
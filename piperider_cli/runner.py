@@ -1,13 +1,15 @@
+import importlib.util
 import json
 import math
 import os
 import shlex
 import shutil
+import sqlite3
 import subprocess
 import sys
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from rich import box
 from rich.color import Color
@@ -21,15 +23,26 @@ from sqlalchemy.exc import NoSuchTableError
 
 import piperider_cli.dbtutil as dbtutil
 from piperider_cli import clone_directory, convert_to_tzlocal, datetime_to_str, event, \
-    raise_exception_when_directory_not_writable
+    raise_exception_when_directory_not_writable, str_to_datetime
 from piperider_cli.assertion_engine import AssertionEngine
 from piperider_cli.assertion_engine.recommender import RECOMMENDED_ASSERTION_TAG
+from piperider_cli.blobstore import BlobStore, blob_ref, default_blob_dir, export_run_arrow, export_run_json
 from piperider_cli.configuration import Configuration, FileSystem, ReportDirectory
 from piperider_cli.datasource import DataSource
+from piperider_cli.datasource.cost import QueryCost, cost_rank
+from piperider_cli.error import PipeRiderRunFormatError
 from piperider_cli.exitcode import EC_ERR_TEST_FAILED
+from piperider_cli.history import HistoryStore
 from piperider_cli.metrics_engine import MetricEngine, MetricEventHandler
 from piperider_cli.profiler import ProfileSubject, Profiler, ProfilerEventHandler
+from piperider_cli.profiler.checkpoint import RunCheckpoint, default_checkpoint_path
+from piperider_cli.profiler.profiler import PRIORITY_CHANGED, PRIORITY_TESTED
+from piperider_cli.runarrow import RUN_ARROW, get_run_arrow_path, write_run_arrow
+from piperider_cli.runindex import RunIndex
+from piperider_cli.runjson import TableSpool, find_run_json, get_run_json_name, open_run_json, write_run_json
+from piperider_cli.profiler.coordinator import Coordinator, WorkQueue, default_queue_path
 from piperider_cli.statistics import Statistics
+from piperider_cli.tracing import Tracer
 
 
 class RunEventPayload:
@@ -204,6 +217,126 @@ def _execute_assertions(console: Console, engine, ds_name: str, output, profiler
     return results, exceptions
 
 
+def _format_estimate(value):
+    return '-' if value is None else f'{value:,}'
+
+
+def _show_explain_result(explain_result, metric_results):
+    console = Console()
+    ascii_table = Table(show_header=True, show_edge=True, header_style='bold magenta',
+                        box=box.SIMPLE, title='Estimated scans')
+    ascii_table.add_column('Table', style='bold yellow')
+    ascii_table.add_column('Column', style='bold blue')
+    ascii_table.add_column('Type', style='bold')
+    ascii_table.add_column('Scans', justify='right')
+    ascii_table.add_column('Est. bytes', justify='right', style='cyan')
+    ascii_table.add_column('Est. rows', justify='right')
+
+    for name, estimate in explain_result.get('tables', {}).items():
+        ascii_table.add_row(name, '', '', '', _format_estimate(estimate['bytes']), _format_estimate(estimate['rows']))
+        for column_name, column in estimate['columns'].items():
+            ascii_table.add_row('', column_name, column['type'], str(column['scans']),
+                                _format_estimate(column['bytes']), _format_estimate(column['rows']))
+    for metric in metric_results:
+        ascii_table.add_row(f'[green]{metric["name"]}[/green]', '', 'metric', '1',
+                            _format_estimate(metric['bytes']), _format_estimate(metric['rows']))
+    console.print(ascii_table)
+
+    total_bytes = sum(estimate['bytes'] or 0 for estimate in explain_result.get('tables', {}).values())
+    total_bytes += sum(metric['bytes'] or 0 for metric in metric_results)
+    console.print(f'[bold dark_orange]Total estimated bytes:[/bold dark_orange] {total_bytes:,}')
+
+
+def _show_cost_summary(run_result: dict, limit=20):
+    console = Console()
+    columns = []
+    for table_name, table in run_result.get('tables', {}).items():
+        for column_name, column in table.get('columns', {}).items():
+            if column and column.get('cost'):
+                columns.append((table_name, column_name, column['cost']))
+    if not columns:
+        return
+    columns = sorted(columns, key=lambda c: cost_rank(c[2]), reverse=True)[:limit]
+
+    ascii_table = Table(show_header=True, show_edge=True, header_style='bold magenta',
+                        box=box.SIMPLE, title=f'Top {len(columns)} expensive columns')
+    ascii_table.add_column('Column', style='bold')
+    ascii_table.add_column('Queries', justify='right')
+    ascii_table.add_column('Elapsed (ms)', justify='right')
+    ascii_table.add_column('Rows', justify='right')
+    ascii_table.add_column('Bytes scanned', justify='right', style='cyan')
+    ascii_table.add_column('Bytes billed', justify='right', style='cyan')
+    ascii_table.add_column('Slot (ms)', justify='right')
+    for table_name, column_name, cost in columns:
+        ascii_table.add_row(f'[yellow]{table_name}[/yellow].[blue]{column_name}[/blue]', str(cost['queries']),
+                            _format_estimate(cost['elapsed_milli']), _format_estimate(cost.get('rows')),
+                            _format_estimate(cost.get('bytes_scanned')), _format_estimate(cost.get('bytes_billed')),
+                            _format_estimate(cost.get('slot_milli')))
+    console.print(ascii_table)
+
+    cost = run_result.get('cost', {})
+    summary = ', '.join(f'{key}={value:,}' for key, value in cost.items())
+    console.print(f'[bold dark_orange]Query cost:[/bold dark_orange] {summary}')
+
+
+def _show_budget_decisions(decisions: dict, tables: dict):
+    console = Console()
+    for name, decision in decisions.items():
+        if decision == 'basic':
+            console.print(f'[bold yellow]Budget:[/bold yellow] table \'{name}\' is profiled with the basic metrics')
+        elif decision == 'skipped':
+            console.print(f'[bold yellow]Budget:[/bold yellow] table \'{name}\' is skipped')
+    for name, table in tables.items():
+        columns = table.get('columns') or {}
+        skipped = [c for c in columns.values() if c and c.get('status') == 'skipped']
+        if skipped:
+            console.print(f'[bold yellow]Budget:[/bold yellow] {len(skipped)} of {len(columns)} columns of table '
+                          f'\'{name}\' are skipped by the time budget')
+
+
+def _load_last_run(filesystem: ReportDirectory) -> Optional[dict]:
+    path = find_run_json(os.path.join(filesystem.get_output_dir(), 'latest'))
+    if path is None:
+        return None
+    try:
+        with open_run_json(path) as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _get_column_priorities(subjects: List[ProfileSubject], profiled_tables: dict, dbt_manifest: Optional[dict],
+                           last_run: Optional[dict]) -> Dict[str, Dict[str, int]]:
+    """
+    The priorities of the columns profiled within the time budget. The columns referenced by the assertions or the dbt
+    tests come first, then the columns added or changed type since the last run.
+    """
+    priorities = {}
+    last_tables = (last_run or {}).get('tables', {})
+    for name, table in profiled_tables.items():
+        last_columns = (last_tables.get(name) or {}).get('columns')
+        if not last_columns:
+            continue
+        for column_name, column in (table.get('columns') or {}).items():
+            last_column = last_columns.get(column_name)
+            if last_column is None or last_column.get('schema_type') != (column or {}).get('schema_type'):
+                priorities.setdefault(name, {})[column_name] = PRIORITY_CHANGED
+
+    assertion_engine = AssertionEngine(None)
+    assertion_engine.load_all_assertions_for_validation()
+    tested = [(assertion.table, assertion.column) for assertion in assertion_engine.assertions if assertion.column]
+    names = {subject.ref_id: subject.name for subject in subjects if subject.ref_id}
+    for node in (dbt_manifest or {}).get('nodes', {}).values():
+        if node.get('resource_type') != 'test' or not node.get('column_name'):
+            continue
+        ref_id = node.get('attached_node') or next(iter(node.get('depends_on', {}).get('nodes', [])), None)
+        if ref_id in names:
+            tested.append((names[ref_id], node.get('column_name')))
+    for name, column_name in tested:
+        priorities.setdefault(name, {})[column_name] = PRIORITY_TESTED
+    return priorities
+
+
 def _show_dbt_test_result(dbt_test_results, title=None, failed_only=False):
     console = Console()
     ascii_table = Table(show_header=True, show_edge=True, header_style='bold magenta',
@@ -405,17 +538,18 @@ def _append_descriptions_from_assertion(profile_result):
         if table_name not in profile_result['tables'] or table_v is None:
             continue
         table_desc = table_v.get('description', '')
+        table_result = profile_result['tables'][table_name]
         if table_desc:
-            profile_result['tables'][table_name]['description'] = f'{table_desc}'
+            table_result['description'] = f'{table_desc}'
 
         columns_content = table_v.get('columns') if table_v.get('columns') else {}
         for column_name, column_v in columns_content.items():
-            if column_name not in profile_result['tables'][table_name]['columns'] or column_v is None:
+            if column_name not in table_result['columns'] or column_v is None:
                 continue
             column_desc = column_v.get('description', '')
             if column_desc:
-                profile_result['tables'][table_name]['columns'][column_name][
-                    'description'] = f'{column_desc}'
+                table_result['columns'][column_name]['description'] = f'{column_desc}'
+        profile_result['tables'][table_name] = table_result
 
 
 def _analyse_and_log_run_event(profiled_result, assertion_results, dbt_test_results):
@@ -603,13 +737,23 @@ class Runner():
     @staticmethod
     def exec(datasource=None, table=None, output=None, skip_report=False, dbt_target_path: str = None,
              dbt_resources: Optional[dict] = None, dbt_select: tuple = None, dbt_state: str = None,
-             report_dir: str = None):
+             report_dir: str = None, coordinator: bool = False, queue: str = None, explain: bool = False,
+             estimate: bool = False, max_bytes_per_table: int = None, max_bytes_total: int = None, max_seconds_per_table: float = None,
+             max_seconds_total: float = None, resume: str = None, compression: str = None, arrow: bool = False):
         console = Console()
 
         raise_exception_when_directory_not_writable(output)
-
-        configuration = Configuration.instance()
-        filesystem = configuration.activate_report_directory(report_dir=report_dir)
+        if resume and coordinator:
+            console.print("[bold red]Error:[/bold red] '--resume' is not supported with '--coordinator'")
+            return 1
+        if arrow and importlib.util.find_spec('pyarrow') is None:
+            raise PipeRiderRunFormatError('arrow', "No module named 'pyarrow'")
+
+        tracer = Tracer()
+        tracer.reset()
+        with tracer.span('config'):
+            configuration = Configuration.instance()
+            filesystem = configuration.activate_report_directory(report_dir=report_dir)
         datasources = {}
         datasource_names = []
         for ds in configuration.dataSources:
@@ -634,6 +778,20 @@ class Runner():
 
         ds = datasources[ds_name]
 
+        budget_options = dict(maxBytesPerTable=max_bytes_per_table, maxBytesTotal=max_bytes_total,
+                              maxSecondsPerTable=max_seconds_per_table, maxSecondsTotal=max_seconds_total)
+        for key, value in budget_options.items():
+            if value:
+                configuration.profiler_config.setdefault('budget', {})[key] = value
+        if estimate:
+            configuration.profiler_config['mode'] = 'estimate'
+        budget = configuration.profiler_config.get('budget') or {}
+        if coordinator and (budget.get('maxBytesTotal') or budget.get('maxSecondsTotal')):
+            # the workers do not share the spent bytes and seconds of the run
+            console.print("[bold red]Error:[/bold red] The total budgets of the run, i.e. '--max-bytes-total' and "
+                          "'--max-seconds-total', are not supported with '--coordinator'")
+            return 1
+
         passed, reasons = ds.validate()
         if not passed:
             console.print(f"[bold red]Error:[/bold red] The credential of '{ds.name}' is not configured.")
@@ -656,11 +814,14 @@ class Runner():
             raise err
 
         try:
-            ds.verify_connection()
+            with tracer.span('connect'):
+                ds.verify_connection()
         except Exception as err:
             console.print(
                 f'[[bold red]FAILED[/bold red]] Failed to connect the \'{ds.name}\' data source.')
             raise err
+        with tracer.span('warm_up_pool'):
+            ds.warm_up_pool()
         stop_runner = _validate_assertions(console)
         if stop_runner:
             console.print('\n\n[bold red]ERROR:[/bold red] Stop profiling, please fix the syntax errors above.')
@@ -679,8 +840,9 @@ class Runner():
             if err_msg:
                 console.print(err_msg)
                 return sys.exit(1)
-            dbt_manifest = dbtutil.get_dbt_manifest(dbt_target_path)
-            dbt_run_results = dbtutil.get_dbt_run_results(dbt_target_path)
+            # the artifacts are stored in the blob store from the disk without being loaded
+            dbt_manifest = dbtutil.get_dbt_manifest_file(dbt_target_path)
+            dbt_run_results = dbtutil.get_dbt_run_results_file(dbt_target_path)
             if dbt_select:
                 # If the dbt_resources were already provided by environment variable PIPERIDER_DBT_RESOURCES, skip the dbt select
                 dbt_resources = dbt_resources if dbt_resources else dbtutil.load_dbt_resources(dbt_target_path,
@@ -693,6 +855,23 @@ class Runner():
         created_at = datetime.utcnow()
         engine = ds.get_engine_by_database()
 
+        checkpoint = None
+        if resume:
+            checkpoint = RunCheckpoint.load(default_checkpoint_path(filesystem.get_output_dir(), resume))
+            if checkpoint is None:
+                console.print(f"[bold red]Error:[/bold red] No checkpoint of the run '{resume}'")
+                return 1
+            if checkpoint.datasource != ds.name:
+                console.print(f"[bold red]Error:[/bold red] The run '{resume}' is of the datasource "
+                              f"'{checkpoint.datasource}'")
+                return 1
+            run_id = checkpoint.run_id
+            created_at = str_to_datetime(checkpoint.created_at)
+            console.print(f'Resuming the run {run_id} with {len(checkpoint.tables)} completed tables')
+        elif not explain and not coordinator:
+            checkpoint = RunCheckpoint.create(default_checkpoint_path(filesystem.get_output_dir(), run_id), run_id,
+                                              datetime_to_str(created_at), ds.name)
+
         subjects: List[ProfileSubject]
         dbt_metadata_subjects: List[ProfileSubject] = None
         dbt_test_results = None
@@ -730,17 +909,50 @@ class Runner():
         run_result = {}
 
         statistics = Statistics()
+        # the plugins could register the column metrics, which are profiled with the built-in metrics
+        AssertionEngine(None).load_plugins()
         profiler = Profiler(ds, RichProfilerEventHandler([subject.name for subject in subjects]), configuration)
+        profiler.checkpoint = checkpoint
+        if not explain:
+            # the tables are spooled to the disk as they complete, and copied into run.json from it
+            profiler.table_spool = TableSpool(filesystem.get_output_dir())
         try:
             profiler.collect_metadata(dbt_metadata_subjects, subjects)
+            budget = configuration.profiler_config.get('budget') or {}
+            if budget.get('maxSecondsPerTable') or budget.get('maxSecondsTotal'):
+                profiler.column_priorities = _get_column_priorities(subjects,
+                                                                    profiler.collected_metadata.profiled_tables,
+                                                                    dbt_manifest.load() if dbt_manifest else None,
+                                                                    _load_last_run(filesystem))
+
+            if explain:
+                console.rule('Explain')
+                explain_result = profiler.explain(subjects, metadata_subjects=dbt_metadata_subjects)
+                metric_results = []
+                if dbt_config:
+                    metrics = dbtutil.get_dbt_state_metrics(dbt_target_path, dbt_config.get('tag', 'piperider'),
+                                                            dbt_resources)
+                    metric_results = MetricEngine(ds, metrics).explain()
+                _show_explain_result(explain_result, metric_results)
+                return 0
 
             console.rule('Profile statistics')
-            profiler_result = profiler.profile(subjects, metadata_subjects=dbt_metadata_subjects)
+            if coordinator:
+                work_queue = WorkQueue(queue or default_queue_path(configuration, report_dir))
+                profiler_result = Coordinator(work_queue, ds, configuration, console=console).profile(
+                    run_id, profiler, subjects)
+            else:
+                profiler_result = profiler.profile(subjects, metadata_subjects=dbt_metadata_subjects)
             run_result.update(profiler_result)
+            _show_budget_decisions(profiler.budget_decisions, run_result.get('tables', {}))
         except NoSuchTableError as e:
             console.print(f"[bold red]Error:[/bold red] No such table '{str(e)}'")
             return 1
-        except Exception as e:
+        except (Exception, KeyboardInterrupt) as e:
+            if checkpoint is not None and checkpoint.tables:
+                console.print(f'The completed tables are saved. Resume the run by "piperider run --resume {run_id}"')
+            if isinstance(e, KeyboardInterrupt):
+                raise
             raise Exception(f'Profiler Exception: {type(e).__name__}(\'{e}\')')
 
         statistics.reset()
@@ -750,16 +962,30 @@ class Runner():
 
         console.rule('Query metrics')
         statistics.display_statistic('query', 'metric')
+        metric_cost = None
         if metrics:
-            run_result['metrics'] = MetricEngine(
+            metric_engine = MetricEngine(
                 ds,
                 metrics,
                 RichMetricEventHandler([m.label for m in metrics])
-            ).execute()
+            )
+            run_result['metrics'] = metric_engine.execute()
+            metric_cost = metric_engine.cost.to_dict()
+
+        run_result['cost'] = QueryCost.sum([t.get('cost') for t in run_result['tables'].values()] + [metric_cost])
+        _show_cost_summary(run_result)
+
+        console.print(f'[bold dark_orange]Connection pool:[/bold dark_orange] {ds.pool_statistics}')
+        limiter = ds.get_limiter()
+        if limiter:
+            console.print(f'[bold dark_orange]Concurrency:[/bold dark_orange] {limiter}')
+            for decision in limiter.decisions:
+                console.print(f'    {decision}')
 
         # TODO: refactor input unused arguments
-        assertion_results, assertion_exceptions = _execute_assertions(console, engine, ds.name, output,
-                                                                      profiler_result, created_at)
+        with tracer.span('assertions'):
+            assertion_results, assertion_exceptions = _execute_assertions(console, engine, ds.name, output,
+                                                                          profiler_result, created_at)
 
         run_result['tests'] = []
         if assertion_results or dbt_test_results:
@@ -774,16 +1000,27 @@ class Runner():
                 _show_assertion_result(assertion_results, assertion_exceptions)
                 run_result['tests'].extend([r.to_result_entry() for r in assertion_results])
 
+        # the dbt artifacts are stored once in the blob store, and run.json refers to them
+        blob_store = BlobStore(default_blob_dir(filesystem.get_output_dir()))
+        dbt_blobs = {}
+        if dbt_config:
+            with tracer.span('blobs'):
+                for file, artifact in [('manifest.json', dbt_manifest), ('run_results.json', dbt_run_results)]:
+                    if artifact:
+                        dbt_blobs[file] = blob_store.put(artifact.path)
+
         if not table:
             if dbt_config:
                 run_result['dbt'] = dict()
                 if dbt_manifest:
-                    run_result['dbt']['manifest'] = dbt_manifest
+                    run_result['dbt']['manifest'] = blob_ref(dbt_blobs['manifest.json'])
                 if dbt_run_results:
-                    run_result['dbt']['run_results'] = dbt_run_results
+                    run_result['dbt']['run_results'] = blob_ref(dbt_blobs['run_results.json'])
 
-        for t in run_result['tables']:
-            _clean_up_profile_null_properties(run_result['tables'][t])
+        # the tables could be spooled, so the modified ones are stored back
+        for t, table_result in run_result['tables'].items():
+            _clean_up_profile_null_properties(table_result)
+            run_result['tables'][t] = table_result
 
         if dbt_config:
             dbtutil.append_descriptions(run_result, dbt_target_path)
@@ -797,10 +1034,25 @@ class Runner():
         decorate_with_metadata(run_result)
 
         output_path = prepare_default_output_path(filesystem, created_at, ds)
-        output_file = os.path.join(output_path, 'run.json')
-
-        with open(output_file, 'w') as f:
-            f.write(json.dumps(run_result, separators=(',', ':')))
+        output_file = os.path.join(output_path, get_run_json_name(compression))
+
+        with tracer.span('write'), open_run_json(output_file, 'w') as f:
+            write_run_json(f, run_result)
+        if arrow:
+            # written after the run.json, so it is not older than the run.json
+            with tracer.span('write'):
+                write_run_arrow(get_run_arrow_path(output_file), run_result)
+        # the checkpoint is kept until the run is written, the orphaned ones are removed by pruning the runs
+        if checkpoint is not None:
+            checkpoint.remove()
+        try:
+            with tracer.span('index'):
+                RunIndex(filesystem.get_output_dir()).add(output_file, run_result)
+                HistoryStore(filesystem.get_output_dir()).add(output_file, run_result)
+        except sqlite3.Error as e:
+            # the run is indexed when the runs are listed
+            console.print(f'[bold yellow]Warning:[/bold yellow] Failed to index the run: {e}')
+        tracer.write(os.path.join(output_path, 'trace.json'))
 
         if dbt_config:
             abs_dir = os.path.abspath(dbt_target_path)
@@ -808,6 +1060,9 @@ class Runner():
             dbt_output_dir = os.path.join(output_path, 'dbt')
             os.makedirs(dbt_output_dir, exist_ok=True)
             for file in dbt_state_files:
+                if file in dbt_blobs:
+                    blob_store.link(dbt_blobs[file], os.path.join(dbt_output_dir, file))
+                    continue
                 abs_file_path = os.path.join(abs_dir, file)
                 if not os.path.exists(abs_file_path):
                     continue
@@ -815,11 +1070,16 @@ class Runner():
 
         if output:
             clone_directory(output_path, output)
+            # the copy is read without the blob store
+            export_run_json(output_file, os.path.join(output, os.path.basename(output_file)))
+            if arrow:
+                export_run_arrow(output_file, os.path.join(output, RUN_ARROW))
 
         if skip_report:
             console.print(f'Results saved to {output if output else output_path}')
 
         _analyse_and_log_run_event(run_result, assertion_results, dbt_test_results)
+        profiler.table_spool.close()
 
         if not _check_assertion_status(assertion_results, assertion_exceptions):
             return EC_ERR_TEST_FAILED
@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def sql_hash(statement: str) -> str:
+    return hashlib.sha1(statement.encode('utf-8')).hexdigest()[:12]
+
+
+class Tracer:
+    """
+    Tracer records the spans of a run in the Chrome trace event format, which could be opened by chrome://tracing or
+    Perfetto. The spans in an event loop are async events, since the tasks interleave on the same thread.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.reset()
+        return cls._instance
+
+    def reset(self):
+        self.events = []
+        self.path: Optional[str] = None
+        self._origin = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._threads: Dict[int, str] = {}
+        self._started: Dict[Connection, float] = {}
+        self._lock = threading.Lock()
+
+    def _timestamp(self, moment: float) -> int:
+        # microseconds since the run started
+        return int((moment - self._origin) * 1000000)
+
+    def add_span(self, name: str, category: str, start: float, end: float, args: dict = None):
+        thread = threading.current_thread()
+        base = dict(name=name, cat=category, pid=os.getpid(), tid=thread.ident, args=args or {})
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            if _in_event_loop():
+                span_id = next(self._ids)
+                self.events.append(dict(base, ph='b', id=span_id, ts=self._timestamp(start)))
+                self.events.append(dict(base, ph='e', id=span_id, ts=self._timestamp(end)))
+            else:
+                self.events.append(dict(base, ph='X', ts=self._timestamp(start),
+                                        dur=self._timestamp(end) - self._timestamp(start)))
+
+    @contextmanager
+    def span(self, name: str, category: str = 'run', **args):
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add_span(name, category, start, time.perf_counter(), args)
+
+    def track(self, engine: Engine):
+        """
+        Record a span for each SQL statement executed by the engine.
+        """
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+        event.listen(engine, 'after_cursor_execute', self._on_executed)
+        event.listen(engine, 'handle_error', self._on_error)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self._started[conn] = time.perf_counter()
+
+    def _on_executed(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            start = self._started.pop(conn, None)
+        if start is not None:
+            self.add_span('sql', 'sql', start, time.perf_counter(), {'sql_hash': sql_hash(statement)})
+
+    def _on_error(self, exception_context):
+        with self._lock:
+            start = self._started.pop(exception_context.connection, None)
+        if start is not None:
+            args = {'sql_hash': sql_hash(exception_context.statement or ''),
+                    'error': type(exception_context.original_exception).__name__}
+            self.add_span('sql', 'sql', start, time.perf_counter(), args)
+
+    def write(self, path: str = None):
+        """
+        Write the trace events to the path. Without a path, the trace is rewritten to the last written path.
+        """
+        path = path or self.path
+        if path is None:
+            return
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+        metadata = [dict(name='thread_name', ph='M', pid=os.getpid(), tid=tid, args={'name': name})
+                    for tid, name in threads.items()]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f, separators=(',', ':'))
+        self.path = path
@@ -74,6 +74,17 @@ setup(name='piperider',
           'duckdb': duckdb_require_packages,
           'csv': duckdb_require_packages,
           'parquet': duckdb_require_packages,
+          'arrow': [
+              'pyarrow',
+              'numpy',
+          ],
+          'async': [
+              'asyncpg',
+              'aiosqlite',
+          ],
+          'zstd': [
+              'zstandard',
+          ],
           'dev': [
               'pytest>=4.6',
               'pytest-flake8',
@@ -82,6 +93,7 @@ setup(name='piperider',
               'pytest-cov',
               'twine',
               'jsonschema',
+              'moto[s3]>=5',
           ],
       },
       project_urls={
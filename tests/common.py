@@ -1,9 +1,13 @@
+import tempfile
 from datetime import date, datetime
 from sqlalchemy import *
 from typing import List
+from unittest import TestCase
 
 from sqlalchemy.engine import Engine
 
+from piperider_cli.datasource.sqlite import SqliteDataSource
+
 
 def create_table(engine: Engine, table_name: str, data: List[tuple], columns=None, metadata=None):
     header = data[0]
@@ -47,3 +51,15 @@ def create_table(engine: Engine, table_name: str, data: List[tuple], columns=Non
             conn.execute(stmt)
 
     return table
+
+
+def create_sqlite_data_source(db_path: str, **credential) -> SqliteDataSource:
+    open(db_path, 'w').close()
+    return SqliteDataSource('test', credential={'dbpath': db_path, **credential})
+
+
+def create_temp_dir(test: TestCase) -> str:
+    # removed when the test is finished
+    root = tempfile.TemporaryDirectory()
+    test.addCleanup(root.cleanup)
+    return root.name
@@ -0,0 +1,18 @@
+import itertools
+
+import pytest
+
+from tests.common import create_sqlite_data_source
+
+
+@pytest.fixture
+def sqlite_data_source(tmp_path):
+    """
+    The factory of the data sources on the empty sqlite databases in the temporary directory of the test
+    """
+    counter = itertools.count()
+
+    def _create(**credential):
+        return create_sqlite_data_source(str(tmp_path / f'test{next(counter)}.db'), **credential)
+
+    return _create
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import tempfile
+from unittest import TestCase
+
+from piperider_cli.datasource.concurrency import AdaptiveConcurrencyLimiter, is_throttling_error
+from piperider_cli.datasource.sqlite import SqliteDataSource
+from piperider_cli.profiler import Profiler
+from tests.common import create_table, create_sqlite_data_source
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class TestAdaptiveConcurrencyLimiter(TestCase):
+
+    def run_queries(self, limiter, latencies):
+        peak = 0
+
+        async def _query(latency):
+            nonlocal peak
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(latency)
+            # sampled by the cursor hooks of the data source
+            limiter.on_success(latency)
+            return latency
+
+        async def _run():
+            return await asyncio.gather(*[limiter.run(lambda latency=latency: _query(latency))
+                                          for latency in latencies])
+
+        return asyncio.run(_run()), peak
+
+    def test_increase_while_latency_flat(self):
+        limiter = AdaptiveConcurrencyLimiter(2, max_limit=6)
+        results, peak = self.run_queries(limiter, [0.01] * 60)
+        self.assertEqual(60, len(results))
+        self.assertEqual(6, limiter.limit)
+        self.assertLessEqual(peak, 6)
+        self.assertTrue(all(d.new_limit > d.old_limit for d in limiter.decisions))
+
+    def test_decrease_on_latency_spike(self):
+        limiter = AdaptiveConcurrencyLimiter(8, max_limit=8)
+        limiter.on_success(0.1)
+        for _ in range(7):
+            limiter.on_success(0.1)
+        self.assertEqual(8, limiter.limit)
+
+        for _ in range(8):
+            limiter.on_success(1.0)
+        self.assertEqual(4, limiter.limit)
+        self.assertIn('latency spike', limiter.decisions[-1].reason)
+
+    def test_retry_throttled_query(self):
+        limiter = AdaptiveConcurrencyLimiter(4, max_limit=8, retry_delay=0)
+        attempts = []
+
+        async def _query():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RateLimitExceeded('Exceeded rate limits: too many table update operations')
+            return 'ok'
+
+        self.assertEqual('ok', asyncio.run(limiter.run(_query)))
+        self.assertEqual(3, len(attempts))
+        self.assertEqual(1, limiter.limit)
+        self.assertEqual(0, limiter.in_flight)
+
+    def test_raise_other_errors(self):
+        limiter = AdaptiveConcurrencyLimiter(4, max_limit=8)
+
+        async def _query():
+            raise ValueError('syntax error')
+
+        with self.assertRaises(ValueError):
+            asyncio.run(limiter.run(_query))
+        self.assertEqual(4, limiter.limit)
+        self.assertEqual(0, limiter.in_flight)
+
+    def test_is_throttling_error(self):
+        self.assertTrue(is_throttling_error(Exception('403 rateLimitExceeded: Exceeded rate limits')))
+        self.assertTrue(is_throttling_error(Exception('Query (1234) cancelled by WLM abort action')))
+        self.assertTrue(is_throttling_error(Exception('Statement reached its statement timeout while queued')))
+        self.assertFalse(is_throttling_error(Exception('column "x" does not exist')))
+
+
+class TestDataSourceLimiter(TestCase):
+
+    def test_profile_with_limiter(self):
+        with tempfile.TemporaryDirectory() as root:
+            ds = create_sqlite_data_source(os.path.join(root, 'test.db'), threads=2, max_threads=4)
+            data = [("a", "b", "c")] + [(i, str(i), i / 2) for i in range(10)]
+            create_table(ds.get_engine_by_database(), 'test', data)
+
+            limiter = ds.get_limiter()
+            self.assertIs(limiter, ds.get_limiter())
+            self.assertEqual(2, limiter.limit)
+            self.assertEqual(4, ds.max_threads)
+
+            latencies = []
+            on_success = limiter.on_success
+            limiter.on_success = lambda latency: (latencies.append(latency), on_success(latency))
+            ds.cost_tracker.on_statement = limiter.on_success
+
+            result = Profiler(ds).profile()
+            self.assertEqual(10, result['tables']['test']['row_count'])
+            self.assertEqual(0, limiter.in_flight)
+
+            # sampled per statement, not per column job
+            columns = len(result['tables']['test']['columns'])
+            self.assertGreater(len(latencies), columns * 2)
+
+        self.assertIsNone(SqliteDataSource('test', credential={'threads': 2}).get_limiter())
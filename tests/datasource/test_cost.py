@@ -0,0 +1,130 @@
+import itertools
+import os
+import tempfile
+from unittest import TestCase
+
+from sqlalchemy import text
+
+from piperider_cli.datasource.cost import CostTracker, QueryCost, cost_rank
+from piperider_cli.profiler import Profiler
+from tests.common import create_table, create_sqlite_data_source
+
+
+class TestQueryCost(TestCase):
+
+    def test_add(self):
+        cost = QueryCost()
+        cost.add({'queries': 1, 'elapsed_milli': 10, 'bytes_billed': 100, 'rows': None})
+        cost.add({'queries': 1, 'elapsed_milli': 5, 'bytes_billed': 50, 'slot_milli': 7, 'query_id': 'q1'})
+        self.assertEqual({'queries': 2, 'elapsed_milli': 15, 'bytes_billed': 150, 'slot_milli': 7}, cost.to_dict())
+        self.assertEqual(['q1'], cost.query_ids)
+
+        self.assertEqual({'queries': 3, 'elapsed_milli': 16, 'bytes_billed': 150, 'slot_milli': 7},
+                         QueryCost.sum([cost.to_dict(), None, {'queries': 1, 'elapsed_milli': 1}]))
+
+    def test_rank(self):
+        costs = [{'elapsed_milli': 100}, {'elapsed_milli': 1, 'bytes_billed': 10}, {'elapsed_milli': 50}]
+        self.assertEqual([costs[1], costs[0], costs[2]], sorted(costs, key=cost_rank, reverse=True))
+
+
+class TestCostTracker(TestCase):
+
+    def test_scope(self):
+        resolved = []
+        query_ids = iter(['q1', 'q2', 'q3'])
+
+        def _resolve(conn, ids):
+            resolved.append(ids)
+            return {query_id: {'bytes_scanned': 1000} for query_id in ids}
+
+        with tempfile.TemporaryDirectory() as root:
+            ds = create_sqlite_data_source(os.path.join(root, 'test.db'))
+            ds.cost_tracker = tracker = CostTracker(
+                lambda dbapi_connection, cursor: {'query_id': next(query_ids), 'rows': 3}, _resolve)
+            engine = ds.get_engine_by_database()
+
+            cost, other = QueryCost(), QueryCost()
+            with engine.connect() as conn:
+                with tracker.scope(conn, cost):
+                    conn.execute(text('SELECT 1')).fetchall()
+                    conn.execute(text('SELECT 2')).fetchall()
+                with tracker.scope(conn, other):
+                    conn.execute(text('SELECT 3')).fetchall()
+                # not attributed out of the scope
+                conn.execute(text('SELECT 4')).fetchall()
+
+                # not resolved when the scopes exit
+                self.assertEqual([], resolved)
+                tracker.resolve(conn, [cost, other])
+
+            # a single lookup for all the scopes
+            self.assertEqual([['q1', 'q2', 'q3']], resolved)
+            self.assertEqual(2, cost.queries)
+            self.assertEqual(6, cost.counters['rows'])
+            self.assertEqual(2000, cost.counters['bytes_scanned'])
+            self.assertEqual(1000, other.counters['bytes_scanned'])
+            self.assertEqual([], cost.query_ids)
+
+    def test_scope_label(self):
+        labels = []
+
+        def _label(dbapi_connection, label):
+            labels.append(label)
+            return True
+
+        with tempfile.TemporaryDirectory() as root:
+            ds = create_sqlite_data_source(os.path.join(root, 'test.db'))
+            ds.cost_tracker = tracker = CostTracker(
+                lambda dbapi_connection, cursor: {},
+                lambda conn, ids: {query_id: {'bytes_scanned': 100} for query_id in ids}, _label)
+            engine = ds.get_engine_by_database()
+
+            cost = QueryCost()
+            with engine.connect() as conn:
+                with tracker.scope(conn, cost):
+                    conn.execute(text('SELECT 1')).fetchall()
+                    conn.execute(text('SELECT 2')).fetchall()
+                tracker.resolve(conn, [cost])
+
+            # the queries of the scope are resolved exactly by its label, which is cleared when the scope exits
+            self.assertEqual(2, len(labels))
+            self.assertIsNone(labels[1])
+            self.assertEqual([], cost.query_ids)
+            self.assertEqual(2, cost.queries)
+            self.assertEqual(100, cost.counters['bytes_scanned'])
+
+    def test_profile_cost(self):
+        with tempfile.TemporaryDirectory() as root:
+            ds = create_sqlite_data_source(os.path.join(root, 'test.db'))
+            data = [("a", "b")] + [(i, str(i)) for i in range(10)]
+            create_table(ds.get_engine_by_database(), 'test', data)
+
+            table = Profiler(ds).profile()['tables']['test']
+            columns = [column['cost'] for column in table['columns'].values()]
+            self.assertTrue(all(cost['queries'] > 0 for cost in columns))
+            self.assertGreater(table['cost']['queries'], sum(cost['queries'] for cost in columns))
+
+    def test_resolve_per_table(self):
+        resolved = []
+        query_ids = itertools.count()
+
+        def _resolve(conn, ids):
+            resolved.append(ids)
+            return {query_id: {'bytes_scanned': 10} for query_id in ids}
+
+        with tempfile.TemporaryDirectory() as root:
+            ds = create_sqlite_data_source(os.path.join(root, 'test.db'))
+            ds.cost_tracker = CostTracker(lambda dbapi_connection, cursor: {'query_id': f'q{next(query_ids)}'},
+                                          _resolve)
+            data = [("a", "b")] + [(i, str(i)) for i in range(10)]
+            create_table(ds.get_engine_by_database(), 'test', data)
+            create_table(ds.get_engine_by_database(), 'test2', data)
+
+            tables = Profiler(ds).profile()['tables']
+
+        # one lookup per table instead of per column
+        self.assertEqual(2, len(resolved))
+        for table in tables.values():
+            self.assertEqual(table['cost']['queries'] * 10, table['cost']['bytes_scanned'])
+            for column in table['columns'].values():
+                self.assertEqual(column['cost']['queries'] * 10, column['cost']['bytes_scanned'])
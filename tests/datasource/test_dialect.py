@@ -0,0 +1,72 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from sqlalchemy import Float, Integer, create_engine, func, select
+from sqlalchemy.sql.expression import column, table
+
+from piperider_cli.datasource.dialect import Dialect, SqliteDialect, get_dialect, register_dialect
+from piperider_cli.profiler import Profiler
+from tests.common import create_table, create_sqlite_data_source
+
+
+class ArithmeticBucketDialect(SqliteDialect):
+    width_bucket = True
+
+    def bucket(self, c, lower, upper, num_buckets: int):
+        bucket = func.cast((func.cast(c, Float) - lower) * num_buckets / (upper - lower), Integer)
+        return func.min(bucket, num_buckets - 1)
+
+
+class TestDialect(TestCase):
+
+    def test_registry(self):
+        self.assertFalse(get_dialect('sqlite').native_stddev)
+        self.assertIs(get_dialect('athena'), get_dialect('awsathena'))
+        self.assertIs(get_dialect('postgres'), get_dialect('postgresql'))
+        self.assertEqual(Dialect, type(get_dialect('unknown')))
+
+    def test_duckdb_primitives(self):
+        dialect = get_dialect('duckdb')
+        engine = create_engine('duckdb:///:memory:')
+        with engine.connect() as conn:
+            conn.exec_driver_sql('CREATE TABLE t AS SELECT range AS i, range % 10 AS j FROM range(1000)')
+            t = table('t', column('i'), column('j'))
+
+            p5, p50, p95 = conn.execute(select(*dialect.quantiles(t.c.i, [0.05, 0.5, 0.95]))).fetchone()
+            self.assertTrue(p5 < p50 < p95)
+
+            distinct, = conn.execute(select(dialect.approx_count_distinct(t.c.j))).fetchone()
+            self.assertEqual(10, distinct)
+
+            hashes, = conn.execute(select(func.count(func.distinct(dialect.row_hash(t.c.i, t.c.j))))).fetchone()
+            self.assertEqual(1000, hashes)
+
+            sampled, = conn.execute(select(func.count()).select_from(dialect.sample(t, 50))).fetchone()
+            self.assertTrue(0 < sampled < 1000)
+
+            grouped = conn.execute(select(t.c.j, func.count()).group_by(func.grouping_sets(t.c.i, t.c.j))).fetchall()
+            self.assertEqual(1010, len(grouped))
+
+    def test_row_hash(self):
+        self.assertEqual('xxhash64(a, b)', str(get_dialect('databricks').row_hash(column('a'), column('b'))))
+        self.assertEqual('hash(a, b)', str(get_dialect('snowflake').row_hash(column('a'), column('b'))))
+        self.assertIsNone(get_dialect('bigquery').hash_function)
+
+    def test_register_dialect(self):
+        with tempfile.TemporaryDirectory() as root:
+            ds = create_sqlite_data_source(os.path.join(root, 'test.db'))
+            data = [("i", "f")] + [(i, i / 7) for i in range(100)]
+            create_table(ds.get_engine_by_database(), 'test', data)
+
+            expected = Profiler(ds).profile()['tables']['test']['columns']
+            sqlite = get_dialect('sqlite')
+            register_dialect('sqlite', ArithmeticBucketDialect())
+            try:
+                actual = Profiler(ds).profile()['tables']['test']['columns']
+            finally:
+                register_dialect('sqlite', sqlite)
+
+        for name in ['i', 'f']:
+            self.assertEqual(expected[name]['histogram'], actual[name]['histogram'])
+            self.assertEqual(expected[name]['stddev'], actual[name]['stddev'])
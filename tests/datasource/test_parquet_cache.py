@@ -0,0 +1,228 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from piperider_cli.datasource.remote_cache import RemoteBlockCache, HttpRemoteObject, S3RemoteObject  # noqa: E402
+
+
+class _RangeRequestHandler(SimpleHTTPRequestHandler):
+    requests = []
+    # act as a server ignoring the range header, and advertising neither the ranges nor the length
+    ignore_range = False
+    omit_length = False
+    omit_etag = False
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return None
+        size = os.path.getsize(path)
+        range_header = self.headers.get('Range')
+        _RangeRequestHandler.requests.append((self.command, range_header))
+        f = open(path, 'rb')
+        if range_header and not self.ignore_range:
+            start, end = range_header.replace('bytes=', '').split('-')
+            start, end = int(start), min(int(end), size - 1)
+            f.seek(start)
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.send_header('Content-Length', str(end - start + 1))
+            self.range_length = end - start + 1
+        else:
+            self.send_response(200)
+            if not (self.omit_length and self.command == 'HEAD'):
+                self.send_header('Content-Length', str(size))
+            self.range_length = size
+        if not self.omit_length:
+            self.send_header('Accept-Ranges', 'bytes')
+        if not self.omit_etag:
+            self.send_header('ETag', f'"{int(os.path.getmtime(path) * 1000)}-{size}"')
+        self.end_headers()
+        return f
+
+    def copyfile(self, source, outputfile):
+        outputfile.write(source.read(self.range_length))
+
+
+def _write_parquet(path, rows=1000):
+    table = pa.table({'id': list(range(rows)), 'name': [f'name-{i}' for i in range(rows)]})
+    pq.write_table(table, path)
+
+
+class TestHttpBlockCache(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.serve_dir = os.path.join(self.root, 'serve')
+        self.cache_dir = os.path.join(self.root, 'cache')
+        os.makedirs(self.serve_dir)
+        self.parquet_path = os.path.join(self.serve_dir, 'data.parquet')
+        _write_parquet(self.parquet_path)
+
+        serve_dir = self.serve_dir
+
+        class Handler(_RangeRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=serve_dir, **kwargs)
+
+        _RangeRequestHandler.requests = []
+        _RangeRequestHandler.ignore_range = False
+        _RangeRequestHandler.omit_length = False
+        _RangeRequestHandler.omit_etag = False
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/data.parquet'
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.root)
+
+    def test_fetch_by_blocks(self):
+        cache = RemoteBlockCache(cache_dir=self.cache_dir, block_size=1024, max_workers=4)
+        local_path = cache.fetch(HttpRemoteObject(self.url))
+
+        with open(self.parquet_path, 'rb') as a, open(local_path, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+        size = os.path.getsize(self.parquet_path)
+        range_requests = [r for r in _RangeRequestHandler.requests if r[0] == 'GET']
+        self.assertEqual((size + 1023) // 1024, len(range_requests))
+        self.assertEqual(1000, pq.read_table(local_path).num_rows)
+
+    def test_reuse_cached_blocks(self):
+        cache = RemoteBlockCache(cache_dir=self.cache_dir, block_size=1024)
+        first = cache.fetch(HttpRemoteObject(self.url))
+        _RangeRequestHandler.requests = []
+
+        second = cache.fetch(HttpRemoteObject(self.url))
+        self.assertEqual(first, second)
+        self.assertEqual([], [r for r in _RangeRequestHandler.requests if r[0] == 'GET'])
+
+    def test_resume_partial_entry(self):
+        cache = RemoteBlockCache(cache_dir=self.cache_dir, block_size=1024)
+        local_path = cache.fetch(HttpRemoteObject(self.url))
+        manifest_path = local_path[:-len('.parquet')] + '.json'
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        manifest['ranges'] = manifest['ranges'][1:]
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+
+        _RangeRequestHandler.requests = []
+        cache.fetch(HttpRemoteObject(self.url))
+        self.assertEqual([('GET', 'bytes=0-1023')], [r for r in _RangeRequestHandler.requests if r[0] == 'GET'])
+
+    def test_invalidate_by_etag(self):
+        cache = RemoteBlockCache(cache_dir=self.cache_dir, block_size=1024)
+        first = cache.fetch(HttpRemoteObject(self.url))
+
+        _write_parquet(self.parquet_path, rows=2000)
+        os.utime(self.parquet_path, (0, 1))
+        second = cache.fetch(HttpRemoteObject(self.url))
+        self.assertNotEqual(first, second)
+        self.assertEqual(2000, pq.read_table(second).num_rows)
+
+    def test_without_range_requests(self):
+        _RangeRequestHandler.ignore_range = True
+        for omit_length in [False, True]:
+            _RangeRequestHandler.omit_length = omit_length
+            _RangeRequestHandler.requests = []
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            cache = RemoteBlockCache(cache_dir=self.cache_dir, block_size=1024, max_workers=4)
+            local_path = cache.fetch(HttpRemoteObject(self.url))
+
+            with open(self.parquet_path, 'rb') as a, open(local_path, 'rb') as b:
+                self.assertEqual(a.read(), b.read())
+            # the whole content is downloaded once and serves all the blocks
+            self.assertEqual(1, len([r for r in _RangeRequestHandler.requests if r[0] == 'GET']))
+
+    def test_skip_uncacheable_objects(self):
+        # the object of unknown size is not downloaded beyond the limit
+        _RangeRequestHandler.ignore_range = True
+        _RangeRequestHandler.omit_length = True
+        size = os.path.getsize(self.parquet_path)
+        cache = RemoteBlockCache(cache_dir=self.cache_dir, size_limit_mb=(size - 1) / 1024 / 1024)
+        self.assertIsNone(cache.fetch(HttpRemoteObject(self.url)))
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+        # the changed object could not be told without the etag
+        _RangeRequestHandler.omit_etag = True
+        _RangeRequestHandler.requests = []
+        cache = RemoteBlockCache(cache_dir=self.cache_dir)
+        self.assertIsNone(cache.fetch(HttpRemoteObject(self.url)))
+        self.assertEqual([], [r for r in _RangeRequestHandler.requests if r[0] == 'GET'])
+
+    def test_evict_by_size_limit(self):
+        cache = RemoteBlockCache(cache_dir=self.cache_dir, size_limit_mb=0)
+        self.assertIsNone(cache.fetch(HttpRemoteObject(self.url)))
+
+        size = os.path.getsize(self.parquet_path)
+        for name in ['a', 'b', 'c']:
+            shutil.copy(self.parquet_path, os.path.join(self.serve_dir, f'{name}.parquet'))
+        # room for two entries
+        cache = RemoteBlockCache(cache_dir=self.cache_dir, size_limit_mb=2.5 * size / 1024 / 1024)
+        paths = []
+        for i, name in enumerate(['a', 'b', 'c']):
+            paths.append(cache.fetch(HttpRemoteObject(self.url.replace('data.parquet', f'{name}.parquet'))))
+            manifest_path = paths[-1][:-len('.parquet')] + '.json'
+            os.utime(manifest_path, (1000 + i, 1000 + i))
+
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertTrue(os.path.exists(paths[1]))
+        self.assertTrue(os.path.exists(paths[2]))
+
+    def test_parquet_datasource(self):
+        from piperider_cli.datasource.duckdb import ParquetDataSource
+        from sqlalchemy import text
+
+        ds = ParquetDataSource('unittest', credential={'path': self.url, 'cache_dir': self.cache_dir})
+        engine = ds.create_engine()
+        with engine.connect() as conn:
+            self.assertEqual(1000, conn.execute(text('select count(*) from data')).scalar())
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+
+class TestS3BlockCache(TestCase):
+
+    def setUp(self) -> None:
+        mock_aws = pytest.importorskip('moto').mock_aws
+        self.mock = mock_aws()
+        self.mock.start()
+
+        import boto3
+        self.client = boto3.client('s3', region_name='us-east-1')
+        self.client.create_bucket(Bucket='piperider')
+
+        self.root = tempfile.mkdtemp()
+        self.parquet_path = os.path.join(self.root, 'data.parquet')
+        _write_parquet(self.parquet_path)
+        self.client.upload_file(self.parquet_path, 'piperider', 'data/data.parquet')
+
+    def tearDown(self) -> None:
+        self.mock.stop()
+        shutil.rmtree(self.root)
+
+    def test_fetch_by_blocks(self):
+        cache = RemoteBlockCache(cache_dir=os.path.join(self.root, 'cache'), block_size=1024)
+        remote = S3RemoteObject('s3://piperider/data/data.parquet', client=self.client)
+        local_path = cache.fetch(remote)
+
+        with open(self.parquet_path, 'rb') as a, open(local_path, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+        self.client.put_object(Bucket='piperider', Key='data/data.parquet', Body=b'changed')
+        self.assertNotEqual(local_path, cache.fetch(remote))
@@ -0,0 +1,60 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import duckdb
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool, SingletonThreadPool
+
+from piperider_cli.datasource.duckdb import DuckDBDataSource
+from piperider_cli.datasource.sqlite import SqliteDataSource
+
+
+class TestConnectionPool(TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.root.name, 'test.duckdb')
+        duckdb.connect(self.db_path).close()
+
+    def tearDown(self) -> None:
+        self.root.cleanup()
+
+    def test_pool_size_by_threads(self):
+        ds = DuckDBDataSource('unittest', credential={'path': self.db_path, 'threads': 8})
+        pool = ds.get_engine_by_database().pool
+        self.assertIsInstance(pool, QueuePool)
+        self.assertEqual(8, pool.size())
+        self.assertFalse(pool._pre_ping)
+        self.assertEqual(8, ds.threads)
+
+    def test_pool_settings_by_credential(self):
+        ds = DuckDBDataSource('unittest', credential={'path': self.db_path, 'pool_pre_ping': True,
+                                                      'pool_recycle': 600})
+        pool = ds.get_engine_by_database().pool
+        self.assertEqual(5, pool.size())
+        self.assertTrue(pool._pre_ping)
+        self.assertEqual(600, pool._recycle)
+
+    def test_warm_up_and_statistics(self):
+        ds = DuckDBDataSource('unittest', credential={'path': self.db_path, 'threads': 3})
+        self.assertEqual(3, ds.warm_up_pool())
+        self.assertEqual(3, ds.pool_statistics.connects)
+
+        engine = ds.get_engine_by_database()
+        for _ in range(5):
+            with engine.connect() as conn:
+                conn.execute(text('select 1'))
+
+        stats = ds.pool_statistics.to_dict()
+        self.assertEqual(3, stats['connects'])
+        self.assertEqual(8, stats['checkouts'])
+        self.assertGreaterEqual(stats['max_wait'], stats['avg_wait'])
+        self.assertIn('checkouts=8', str(ds.pool_statistics))
+
+    def test_singleton_pool_unchanged(self):
+        ds = SqliteDataSource('unittest')
+        pool = ds.get_engine_by_database().pool
+        self.assertIsInstance(pool, SingletonThreadPool)
+        self.assertEqual(0, ds.warm_up_pool())
+        self.assertEqual(1, ds.threads)
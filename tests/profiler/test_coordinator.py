@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+import time
+
+from sqlalchemy import text
+
+from piperider_cli.configuration import Configuration
+from piperider_cli.datasource.sqlite import SqliteDataSource
+from piperider_cli.profiler import Profiler, ProfileSubject
+from piperider_cli.profiler.coordinator import WorkQueue, Worker, Coordinator, MAX_ATTEMPTS
+from tests.common import create_table
+
+
+def _run_worker(queue_path, db_path, worker_id):
+    data_source = SqliteDataSource('test', credential={'dbpath': db_path})
+    Worker(WorkQueue(queue_path), data_source, worker_id=worker_id, poll_seconds=0.1).run()
+
+
+class TestWorkQueue:
+
+    def test_claim_and_complete(self, tmp_path):
+        queue = WorkQueue(str(tmp_path / 'queue.sqlite'))
+        queue.reset('run', 'ds', [ProfileSubject('t1'), ProfileSubject('t2', schema='s')])
+        assert queue.get_run() == ('run', 'ds')
+
+        task1 = queue.claim('w1')
+        task2 = queue.claim('w2')
+        assert task1.name == 't1'
+        assert task2.subject.schema == 's'
+        assert queue.claim('w3') is None
+        assert not queue.is_finished()
+
+        assert queue.complete('t1', 'w1', {'name': 't1'})
+        assert not queue.complete('t2', 'w1', {'name': 't2'})
+        queue.fail('t2', 'w2', 'error')
+        assert queue.progress() == {'done': 1, 'pending': 1}
+
+        task2 = queue.claim('w3')
+        assert task2.attempts == 2
+        assert task2.options == {}
+        assert queue.complete('t2', 'w3', {'name': 't2'})
+        assert queue.is_finished()
+        assert queue.results() == {'t1': {'name': 't1'}, 't2': {'name': 't2'}}
+
+    def test_lease_expiry(self, tmp_path):
+        queue = WorkQueue(str(tmp_path / 'queue.sqlite'))
+        queue.reset('run', 'ds', [ProfileSubject('t1')])
+
+        # the crashed worker never renews the lease
+        assert queue.claim('crashed', lease_seconds=0).name == 't1'
+        time.sleep(0.01)
+        task = queue.claim('w1')
+        assert task.name == 't1'
+        assert not queue.renew('t1', 'crashed')
+        assert queue.renew('t1', 'w1')
+
+    def test_max_attempts(self, tmp_path):
+        queue = WorkQueue(str(tmp_path / 'queue.sqlite'))
+        queue.reset('run', 'ds', [ProfileSubject('t1')])
+
+        for i in range(MAX_ATTEMPTS):
+            queue.claim(f'w{i}', lease_seconds=0)
+            time.sleep(0.01)
+        assert queue.claim('w') is None
+        assert queue.failures() == {'t1': 'lease expired'}
+        assert queue.is_finished()
+
+
+class TestCoordinator:
+
+    def create_data_source(self, sqlite_data_source):
+        data_source = sqlite_data_source()
+        engine = data_source.get_engine_by_database()
+        data = [
+            ("user_id", "user_name", "age"),
+            (1, "bob", 23),
+            (2, "alice", 25),
+        ]
+        for i in range(6):
+            create_table(engine, f"test{i}", data)
+        return data_source, data_source.credential['dbpath']
+
+    def test_coordinator(self, tmp_path, sqlite_data_source):
+        data_source, db_path = self.create_data_source(sqlite_data_source)
+        subjects = [ProfileSubject(f"test{i}") for i in range(6)] + [ProfileSubject("not_existed")]
+
+        profiler = Profiler(data_source)
+        profiler.collect_metadata(None, subjects)
+        queue = WorkQueue(str(tmp_path / 'queue.sqlite'))
+        result = Coordinator(queue, data_source).profile('run', profiler, subjects)
+
+        expected = Profiler(data_source).profile([ProfileSubject("test0")])['tables']['test0']
+        for i in range(6):
+            table_result = result['tables'][f'test{i}']
+            assert table_result['row_count'] == 2
+            assert table_result['columns']['age'] == {**expected['columns']['age'],
+                                                      'profile_duration': table_result['columns']['age'][
+                                                          'profile_duration'],
+                                                      'elapsed_milli': table_result['columns']['age'][
+                                                          'elapsed_milli'],
+                                                      'cost': table_result['columns']['age']['cost']}
+        # skipped as the local run does
+        assert 'not_existed' not in result['tables']
+        assert queue.failures() == {}
+
+    def test_options(self, tmp_path, sqlite_data_source):
+        data_source, db_path = self.create_data_source(sqlite_data_source)
+        subjects = [ProfileSubject("test0")]
+
+        config = Configuration([], profiler={'budget': {'maxSecondsPerTable': 0.000001}})
+        profiler = Profiler(data_source, config=config)
+        profiler.column_priorities = {'test0': {'age': 0}}
+        profiler.collect_metadata(None, subjects)
+        queue = WorkQueue(str(tmp_path / 'queue.sqlite'))
+        # the worker of the coordinator is configured without the budget
+        result = Coordinator(queue, data_source, Configuration([])).profile('run', profiler, subjects)
+
+        assert all(column['status'] == 'skipped' for column in result['tables']['test0']['columns'].values())
+        queue.reset('run', 'test', subjects, {'test0': {'column_priorities': {'age': 0}}})
+        assert queue.claim('w1').options == {'column_priorities': {'age': 0}}
+
+    def test_failed_table(self, tmp_path, sqlite_data_source):
+        data_source, db_path = self.create_data_source(sqlite_data_source)
+        subjects = [ProfileSubject("test0"), ProfileSubject("test1")]
+
+        profiler = Profiler(data_source)
+        profiler.collect_metadata(None, subjects)
+        # dropped after the metadata is collected
+        with data_source.get_engine_by_database().connect() as conn:
+            conn.execute(text('DROP TABLE test1'))
+        queue = WorkQueue(str(tmp_path / 'queue.sqlite'))
+        result = Coordinator(queue, data_source).profile('run', profiler, subjects)
+
+        assert result['tables']['test0']['row_count'] == 2
+        assert result['tables']['test1']['status'] == 'failed'
+        assert 'No such table' in result['tables']['test1']['error']
+        assert list(result['tables']['test1']['columns'].keys()) == ['user_id', 'user_name', 'age']
+
+    def test_multiple_workers(self, tmp_path, sqlite_data_source):
+        data_source, db_path = self.create_data_source(sqlite_data_source)
+        subjects = [ProfileSubject(f"test{i}") for i in range(6)]
+        queue_path = str(tmp_path / 'queue.sqlite')
+        queue = WorkQueue(queue_path)
+        queue.reset('run', 'test', subjects)
+
+        # a crashed worker leaves an expired lease
+        queue.claim('crashed', lease_seconds=0)
+
+        ctx = multiprocessing.get_context('spawn')
+        workers = [ctx.Process(target=_run_worker, args=(queue_path, db_path, f'w{i}')) for i in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+            assert worker.exitcode == 0
+
+        assert queue.is_finished()
+        assert sorted(queue.results().keys()) == [f'test{i}' for i in range(6)]
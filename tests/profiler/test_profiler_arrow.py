@@ -0,0 +1,144 @@
+import math
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import *
+
+from piperider_cli.configuration import Configuration
+from piperider_cli.datasource.duckdb import DuckDBDataSource
+from piperider_cli.datasource.sqlite import SqliteDataSource
+from piperider_cli.profiler import Profiler
+from tests.common import create_table
+
+pytest.importorskip('pyarrow')
+pytest.importorskip('numpy')
+
+IGNORED_FIELDS = ['profile_duration', 'elapsed_milli', 'cost']
+
+
+def assert_same_result(expected, actual, ignored_fields=None):
+    ignored_fields = IGNORED_FIELDS + (ignored_fields or [])
+    assert list(expected.keys()) == list(actual.keys())
+    for key in expected.keys():
+        if key in ignored_fields:
+            continue
+        x, y = expected[key], actual[key]
+        if key == 'topk' and x is not None:
+            assert dict(zip(x['values'], x['counts'])) == dict(zip(y['values'], y['counts']))
+        elif isinstance(x, dict):
+            assert_same_result(x, y, ignored_fields)
+        elif isinstance(x, list):
+            assert len(x) == len(y), key
+            for a, b in zip(x, y):
+                assert a == b or math.isclose(a, b, rel_tol=1e-6), key
+        elif isinstance(x, float) and y is not None:
+            assert math.isclose(x, y, rel_tol=1e-6), key
+        else:
+            assert x == y, key
+
+
+class TestArrowProfiler:
+
+    def profile(self, data_source, engine, **profiler_config):
+        sql_result = Profiler(data_source, config=Configuration([], profiler=dict(profiler_config)))
+        arrow_result = Profiler(data_source, config=Configuration([], profiler=dict(engine=engine, **profiler_config)))
+        return sql_result.profile()["tables"]["test"], arrow_result.profile()["tables"]["test"]
+
+    def create_sqlite_data_source(self):
+        self.data_source = SqliteDataSource("test")
+        self.engine = self.data_source.get_engine_by_database()
+        return self.data_source
+
+    def test_sqlite_metrics(self):
+        data_source = self.create_sqlite_data_source()
+        data = [
+            ("i", "f", "s", "d", "dt", "b"),
+            (0, 1.5, "hello", date(2021, 1, 1), datetime(2021, 1, 1, 10), True),
+            (20, -2.25, "hello", date(2021, 3, 10), datetime(2021, 1, 1, 10), False),
+            (20, 0.0, "", date(2022, 12, 31), datetime(2021, 1, 5, 23, 59), True),
+            (-3, 100.0, "hello world", date(1990, 5, 1), datetime(2021, 1, 20), None),
+            (None, None, None, None, None, None),
+        ]
+        create_table(self.engine, "test", data, columns=[
+            Column("i", Integer), Column("f", Float), Column("s", String), Column("d", Date),
+            Column("dt", DateTime), Column("b", Boolean)
+        ])
+
+        expected, actual = self.profile(data_source, 'arrow')
+        assert_same_result(expected, actual)
+
+    def test_sqlite_invalid(self):
+        data_source = self.create_sqlite_data_source()
+        create_table(self.engine, "test", [("i", "s", "dt", "b")], columns=[
+            Column("i", Integer), Column("s", String), Column("dt", DateTime), Column("b", Boolean)
+        ])
+        with self.engine.connect() as conn:
+            conn.execute(text("PRAGMA ignore_check_constraints = 1"))
+            conn.execute(text("insert into test values (1, 'abc', '2021-02-13', 1)"))
+            conn.execute(text("insert into test values ('abc', 123, 0, 0)"))
+            conn.execute(text("insert into test values (x'A1B2', x'A1B2', 1.3, 2.3)"))
+            conn.execute(text("insert into test values (2.0, 'abc', 'abc', '1')"))
+            conn.execute(text("insert into test values (NULL, NULL, x'A1B2', x'A1B2')"))
+
+        expected, actual = self.profile(data_source, 'arrow')
+        assert_same_result(expected, actual)
+
+    def test_sqlite_limit(self):
+        data_source = self.create_sqlite_data_source()
+        data = [("num",)] + [(float(i),) for i in range(10)]
+        create_table(self.engine, "test", data)
+
+        expected, actual = self.profile(data_source, 'arrow', table={'limit': 3})
+        assert_same_result(expected, actual)
+        assert actual['columns']['num']['samples'] == 3
+        assert actual['columns']['num']['max'] == 2.0
+
+    def test_sqlite_empty_table(self):
+        data_source = self.create_sqlite_data_source()
+        create_table(self.engine, "test", [("i", "s")], columns=[Column("i", Integer), Column("s", String)])
+
+        expected, actual = self.profile(data_source, 'arrow')
+        assert_same_result(expected, actual)
+
+    def test_duckdb_metrics(self, tmp_path):
+        import duckdb
+        db_path = str(tmp_path / 'test.duckdb')
+        duckdb.connect(db_path).close()
+        data_source = DuckDBDataSource("test", credential={'path': db_path})
+        engine = data_source.get_engine_by_database()
+
+        random.seed(0)
+        data = [("i", "f", "s", "d", "dt", "b")]
+        for i in range(1000):
+            data.append((
+                random.randint(-100, 100),
+                random.random() * 1000,
+                random.choice(["a", "bb", "ccc", ""]) * random.randint(0, 3),
+                date(2000, 1, 1) + timedelta(days=random.randint(0, 10000)),
+                datetime(2022, 1, 1) + timedelta(minutes=random.randint(0, 60 * 24 * 30)),
+                random.choice([True, False, None]),
+            ))
+        data.append((None, None, None, None, None, None))
+        create_table(engine, "test", data, columns=[
+            Column("i", Integer), Column("f", Float), Column("s", String), Column("d", Date),
+            Column("dt", DateTime), Column("b", Boolean)
+        ])
+
+        # duckdb approximates the quantiles
+        expected, actual = self.profile(data_source, 'arrow')
+        assert_same_result(expected, actual, ignored_fields=['p5', 'p25', 'p50', 'p75', 'p95'])
+
+    def test_duckdb_sample_percent(self, tmp_path):
+        import duckdb
+        db_path = str(tmp_path / 'test.duckdb')
+        conn = duckdb.connect(db_path)
+        conn.execute("CREATE TABLE test AS SELECT range AS i, (range % 10)::VARCHAR AS s FROM range(10000)")
+        conn.close()
+        data_source = DuckDBDataSource("test", credential={'path': db_path})
+
+        config = Configuration([], profiler={'engine': 'arrow', 'query': {'samplePercent': 50}})
+        table = Profiler(data_source, config=config).profile()['tables']['test']
+        assert table['samples_p'] == 0.5
+        assert 0 < table['columns']['i']['samples'] < 10000
+        assert table['columns']['s']['distinct'] == 10
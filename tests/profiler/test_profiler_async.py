@@ -0,0 +1,58 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import *
+
+from piperider_cli.configuration import Configuration
+from piperider_cli.datasource.sqlite import SqliteDataSource
+from piperider_cli.profiler import Profiler, ProfileSubject
+from tests.common import create_table
+
+pytest.importorskip('aiosqlite')
+
+
+def _strip_durations(result):
+    if isinstance(result, dict):
+        return {k: _strip_durations(v) for k, v in result.items() if k not in ['profile_duration', 'elapsed_milli']}
+    return result
+
+
+class TestAsyncProfiler:
+
+    def create_data_source(self, sqlite_data_source, **credential):
+        data_source = sqlite_data_source(**credential)
+        engine = data_source.get_engine_by_database()
+        data = [
+            ("i", "f", "s", "d", "dt", "b"),
+            (0, 1.5, "hello", date(2021, 1, 1), datetime(2021, 1, 1, 10), True),
+            (20, -2.25, "hello", date(2021, 3, 10), datetime(2021, 1, 1, 10), False),
+            (20, 0.0, "", date(2022, 12, 31), datetime(2021, 1, 5, 23, 59), True),
+            (None, None, None, None, None, None),
+        ]
+        for table_name in ["test", "test2"]:
+            create_table(engine, table_name, data, columns=[
+                Column("i", Integer), Column("f", Float), Column("s", String), Column("d", Date),
+                Column("dt", DateTime), Column("b", Boolean)
+            ])
+        return data_source
+
+    def test_use_async(self, sqlite_data_source):
+        assert not SqliteDataSource('test', credential={'async': True}).use_async
+        assert not self.create_data_source(sqlite_data_source).use_async
+        assert self.create_data_source(sqlite_data_source, **{'async': True}).use_async
+
+    def test_profile(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        async_data_source = SqliteDataSource('test', credential={**data_source.credential, 'async': True})
+        config = Configuration([], profiler={'table': {'duplicateRows': True}})
+
+        expected = Profiler(data_source, config=config).profile()
+        actual = Profiler(async_data_source, config=config).profile()
+        assert _strip_durations(expected) == _strip_durations(actual)
+        assert actual['tables']['test']['row_count'] == 4
+        assert actual['tables']['test']['duplicate_rows'] == 0
+
+    def test_profile_not_existed_table(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source, **{'async': True})
+        result = Profiler(data_source).profile([ProfileSubject("test"), ProfileSubject("not_existed")])
+        assert list(result['tables'].keys()) == ['test']
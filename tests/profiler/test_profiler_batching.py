@@ -0,0 +1,97 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import Column, Float, String, event, func, select, table, column, text
+
+from piperider_cli.configuration import Configuration
+from piperider_cli.profiler import Profiler
+from piperider_cli.profiler.batching import QueryBatcher, fetchall, fetchone
+from tests.common import create_table
+
+IGNORED_FIELDS = ['profile_duration', 'elapsed_milli', 'cost']
+
+
+class TestProfilerBatching:
+
+    def create_data_source(self, sqlite_data_source):
+        data_source = sqlite_data_source(threads=8)
+        names = [f's{i}' for i in range(4)] + [f'n{i}' for i in range(4)]
+        data = [tuple(names)] + [tuple([f'v{j % 7}'] * 4 + [j * 1.5] * 4) for j in range(100)]
+        columns = [Column(name, String) for name in names[:4]] + [Column(name, Float) for name in names[4:]]
+        create_table(data_source.get_engine_by_database(), 'batch', data, columns=columns)
+        return data_source
+
+    def profile(self, data_source, config=None):
+        statements = []
+
+        def _on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = data_source.get_engine_by_database()
+        event.listen(engine, 'before_cursor_execute', _on_execute)
+        columns = Profiler(data_source, config=config).profile()['tables']['batch']['columns']
+        event.remove(engine, 'before_cursor_execute', _on_execute)
+        for result in columns.values():
+            for field in IGNORED_FIELDS:
+                result.pop(field, None)
+        return columns, statements
+
+    def test_profile_batched(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        expected, statements = self.profile(data_source)
+        actual, batched_statements = self.profile(data_source, Configuration([], profiler={'batch': {'size': 10}}))
+
+        assert actual == expected
+        assert any('piperider_batch' in statement for statement in batched_statements)
+        assert len(batched_statements) < len(statements)
+
+    def test_fallback(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        engine = data_source.get_engine_by_database()
+        t = table('batch', column('n0'), column('s0'))
+        statements = [
+            select(func.count(), func.max(t.c.n0)),
+            select(t.c.s0, func.count()).group_by(t.c.s0),
+            # the batch fails by the unknown function, then each query runs by itself
+            select(func.unknown_function(t.c.n0)),
+        ]
+        batcher = QueryBatcher(3, 1)
+        barrier = threading.Barrier(3)
+
+        def _fetch(i):
+            with engine.connect() as conn, batcher.participate():
+                barrier.wait()
+                conn = conn.execution_options(query_batcher=batcher)
+                if i == 0:
+                    return fetchone(conn, statements[i])
+                return fetchall(conn, statements[i])
+
+        with ThreadPoolExecutor(3) as executor:
+            futures = [executor.submit(_fetch, i) for i in range(3)]
+        assert tuple(futures[0].result()) == (100, 148.5)
+        assert len(futures[1].result()) == 7
+        assert futures[2].exception() is not None
+        assert batcher.batches == 0
+
+    def test_batch(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        engine = data_source.get_engine_by_database()
+        t = table('batch', column('n0'), column('s0'))
+        batcher = QueryBatcher(2, 1)
+        barrier = threading.Barrier(2)
+
+        def _fetch(stmt):
+            with engine.connect() as conn, batcher.participate():
+                barrier.wait()
+                return fetchall(conn.execution_options(query_batcher=batcher), stmt)
+
+        with ThreadPoolExecutor(2) as executor:
+            count = executor.submit(_fetch, select(func.count(t.c.n0)))
+            groups = executor.submit(_fetch, select(t.c.s0, func.count()).group_by(t.c.s0).order_by(t.c.s0))
+        assert [tuple(row) for row in count.result()] == [(100,)]
+        assert sorted(tuple(row) for row in groups.result()) == [(f'v{i}', 15 if i < 2 else 14) for i in range(7)]
+        assert batcher.batches == 1
+
+        with engine.connect() as conn:
+            # without a batcher
+            assert conn.execute(text('SELECT 1')).fetchone() == fetchone(conn, select(text('1')))
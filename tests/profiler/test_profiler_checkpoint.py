@@ -0,0 +1,77 @@
+import os
+
+from piperider_cli.profiler import Profiler
+from piperider_cli.profiler.checkpoint import RunCheckpoint, default_checkpoint_path
+from piperider_cli.runjson import TableSpool
+from tests.common import create_table
+
+
+class TestProfilerCheckpoint:
+
+    def create_data_source(self, sqlite_data_source):
+        data_source = sqlite_data_source()
+        engine = data_source.get_engine_by_database()
+        create_table(engine, 'first', [('a',), (1,), (2,)])
+        create_table(engine, 'second', [('b',), ('x',), ('y',), ('z',)])
+        return data_source
+
+    def test_checkpoint(self, tmp_path):
+        path = default_checkpoint_path(str(tmp_path), 'run1')
+        checkpoint = RunCheckpoint.create(path, 'run1', '2022-01-01T00:00:00.000000Z', 'test')
+        # written by the first completed table
+        assert not os.path.exists(path)
+        checkpoint.append('first', {'name': 'first', 'row_count': 2})
+        with open(path, 'a') as f:
+            # torn by a crash
+            f.write('{"type": "table", "name": "sec')
+
+        checkpoint = RunCheckpoint.load(path)
+        assert checkpoint.run_id == 'run1'
+        assert checkpoint.created_at == '2022-01-01T00:00:00.000000Z'
+        assert checkpoint.tables == {'first': {'name': 'first', 'row_count': 2}}
+
+        checkpoint.append('second', {'name': 'second', 'row_count': 3})
+        assert checkpoint.tables['second'] == {'name': 'second', 'row_count': 3}
+        assert list(RunCheckpoint.load(path).tables.keys()) == ['first', 'second']
+
+        checkpoint.remove()
+        assert RunCheckpoint.load(path) is None
+
+    def test_resume(self, tmp_path, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        path = default_checkpoint_path(str(tmp_path), 'run1')
+
+        profiler = Profiler(data_source)
+        profiler.checkpoint = RunCheckpoint.create(path, 'run1', '2022-01-01T00:00:00.000000Z', 'test')
+        result = profiler.profile()
+        checkpoint = RunCheckpoint.load(path)
+        assert checkpoint.tables == result['tables']
+
+        # the interrupted run completed the first table only
+        checkpoint = RunCheckpoint.create(path, 'run1', '2022-01-01T00:00:00.000000Z', 'test')
+        checkpoint.append('first', dict(result['tables']['first'], row_count=100))
+
+        profiler = Profiler(data_source)
+        profiler.checkpoint = RunCheckpoint.load(path)
+        resumed = profiler.profile()
+        assert resumed['tables']['first']['row_count'] == 100
+        assert resumed['tables']['second']['row_count'] == 3
+        assert list(RunCheckpoint.load(path).tables.keys()) == ['first', 'second']
+
+    def test_table_spool(self, tmp_path, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        expected = Profiler(data_source).profile()['tables']
+
+        path = default_checkpoint_path(str(tmp_path), 'run1')
+        checkpoint = RunCheckpoint.create(path, 'run1', '2022-01-01T00:00:00.000000Z', 'test')
+        checkpoint.append('first', expected['first'])
+
+        profiler = Profiler(data_source)
+        profiler.checkpoint = RunCheckpoint.load(path)
+        profiler.table_spool = TableSpool(str(tmp_path))
+        tables = profiler.profile()['tables']
+        assert tables is profiler.table_spool
+        assert list(tables.keys()) == ['first', 'second']
+        assert tables['first'] == expected['first']
+        assert tables['second']['row_count'] == 3
+        tables.close()
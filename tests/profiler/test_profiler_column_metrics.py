@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import Column, Float, String, case, event, func
+
+from piperider_cli.assertion_engine import AssertionContext
+from piperider_cli.assertion_engine.types.assert_metrics import AssertMetric
+from piperider_cli.profiler import Profiler, register_column_metric
+from piperider_cli.profiler.column_metrics import unregister_column_metric
+from tests.common import create_table
+
+
+class TestProfilerColumnMetrics:
+
+    def setup_method(self):
+        register_column_metric(
+            'email_invalids',
+            lambda c: [func.count(case((c.notlike('%_@_%'), 1)))],
+            types=['string'])
+        register_column_metric(
+            'email_invalids_p',
+            lambda c: [func.count(case((c.notlike('%_@_%'), 1))), func.count(c)],
+            finalizer=lambda values, result: values[0] / values[1] if values[1] else None,
+            types=['string'],
+            description='invalid email percentage')
+
+    def teardown_method(self):
+        unregister_column_metric('email_invalids')
+        unregister_column_metric('email_invalids_p')
+
+    def create_data_source(self, sqlite_data_source):
+        data_source = sqlite_data_source()
+        data = [('email', 'score'), ('a@b.com', 1.0), ('c@d.com', 2.0), ('invalid', 3.0), (None, 4.0)]
+        create_table(data_source.get_engine_by_database(), 'users', data,
+                     columns=[Column('email', String), Column('score', Float)])
+        return data_source
+
+    def profile(self, data_source):
+        statements = []
+
+        def _on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = data_source.get_engine_by_database()
+        event.listen(engine, 'before_cursor_execute', _on_execute)
+        result = Profiler(data_source).profile()
+        event.remove(engine, 'before_cursor_execute', _on_execute)
+        return result, statements
+
+    def test_column_metrics(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        result, statements = self.profile(data_source)
+        columns = result['tables']['users']['columns']
+
+        assert columns['email']['metrics'] == {'email_invalids': 1, 'email_invalids_p': 1 / 3}
+        assert 'metrics' not in columns['score']
+        assert columns['email']['valids'] == 3
+
+        # the metrics are in the scan of the basic metrics
+        self.teardown_method()
+        _, builtin_statements = self.profile(data_source)
+        assert len(statements) == len(builtin_statements)
+
+    def test_duplicate_metric(self):
+        with pytest.raises(ValueError):
+            register_column_metric('email_invalids', lambda c: [func.count(c)])
+
+    def test_assert_column_metric(self, sqlite_data_source):
+        result, _ = self.profile(self.create_data_source(sqlite_data_source))
+        assertion = AssertMetric()
+        assert assertion.mapping.is_exist('email_invalids_p')
+
+        context = AssertionContext('users', 'email', {'metric': 'email_invalids', 'assert': {'lte': 1}},
+                                   profiler_result=result)
+        assert assertion.execute(context)._success is True
+
+        context = AssertionContext('users', 'email', {'metric': 'email_invalids_p', 'assert': {'lt': 0.2}},
+                                   profiler_result=result)
+        assert assertion.execute(context)._success is False
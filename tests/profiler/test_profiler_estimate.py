@@ -0,0 +1,72 @@
+import duckdb
+import pytest
+
+from piperider_cli.configuration import Configuration
+from piperider_cli.datasource.duckdb import DuckDBDataSource
+from piperider_cli.error import PipeRiderProfilerModeError
+from piperider_cli.profiler import Profiler
+from piperider_cli.profiler.estimate import ColumnStatistics, estimate_column, parse_array
+from tests.common import create_table
+
+
+class TestProfilerEstimate:
+
+    def test_parse_array(self):
+        assert parse_array('{}') == []
+        assert parse_array(None) == []
+        assert parse_array('{1,2,NULL}') == ['1', '2', None]
+        assert parse_array('{"a, b","NULL","say \\"hi\\""}') == ['a, b', 'NULL', 'say "hi"']
+
+    def test_estimate_pg_stats(self):
+        # n_distinct is negative as the fraction of the rows, the histogram bounds exclude the common values
+        stats = ColumnStatistics(null_frac=0.1, distinct=-0.5, common_values=['5', '7'], common_freqs=[0.3, 0.1],
+                                 histogram_bounds=['0', '10', '20', '100'])
+        result = estimate_column('integer', stats, 1000)
+
+        assert result['nulls'] == 100
+        assert result['non_nulls'] == 900
+        assert result['distinct'] == 500
+        assert result['topk'] == {'values': ['5', '7'], 'counts': [300, 100]}
+        assert result['min'] == 0 and result['max'] == 100
+        assert sum(result['histogram']['counts']) == 900
+        assert result['p25'] == 5
+        assert result['p5'] <= result['p25'] <= result['p50'] <= result['p75'] <= result['p95'] <= 100
+        assert 'sum' not in result and 'avg' not in result
+
+        stats = ColumnStatistics(null_frac=0.0, distinct=2, common_values=['t'], common_freqs=[0.75])
+        result = estimate_column('boolean', stats, 100)
+        assert result['trues'] == 75 and result['falses'] == 25
+
+        stats = ColumnStatistics(null_frac=0.0, histogram_bounds=['2021-01-01', '2021-01-05', '2021-01-09'])
+        result = estimate_column('datetime', stats, 8)
+        assert result['min'] == '2021-01-01' and result['max'] == '2021-01-09'
+        assert sum(result['histogram']['counts']) == 8
+
+    def test_estimate_duckdb(self, tmp_path):
+        db_path = str(tmp_path / 'test.duckdb')
+        conn = duckdb.connect(db_path)
+        conn.execute("CREATE TABLE test AS SELECT range AS i, (range % 10)::VARCHAR AS s, "
+                     "CASE WHEN range % 3 = 0 THEN NULL ELSE range END AS n FROM range(1000)")
+        conn.close()
+        data_source = DuckDBDataSource('test', credential={'path': db_path})
+        config = Configuration([], profiler={'mode': 'estimate'})
+        table = Profiler(data_source, config=config).profile()['tables']['test']
+
+        assert table['estimated'] is True
+        assert table['row_count'] == 1000
+        assert table['duplicate_rows'] is None
+        i = table['columns']['i']
+        assert i['estimated'] is True
+        assert i['total'] == 1000
+        assert i['nulls'] == 0
+        assert i['min'] == 0 and i['max'] == 999
+        assert 0 < i['distinct'] <= 1000
+        assert table['columns']['s']['distinct'] == 10
+        # duckdb only keeps whether the column has nulls
+        assert 'nulls' not in table['columns']['n']
+
+    def test_estimate_not_supported(self, sqlite_data_source):
+        data_source = sqlite_data_source()
+        create_table(data_source.get_engine_by_database(), 'test', [('a',), (1,)])
+        with pytest.raises(PipeRiderProfilerModeError):
+            Profiler(data_source, config=Configuration([], profiler={'mode': 'estimate'})).profile()
@@ -0,0 +1,47 @@
+from piperider_cli.configuration import Configuration
+from piperider_cli.profiler import Profiler, ProfileSubject
+from tests.common import create_table
+
+
+class TestProfilerExplain:
+
+    def create_data_source(self, sqlite_data_source):
+        data_source = sqlite_data_source()
+        engine = data_source.get_engine_by_database()
+        create_table(engine, 'small', [("num", "str"), (1, "a"), (2, "b")])
+        create_table(engine, 'large', [("num", "str")] + [(i, f'value {i}' * 10) for i in range(5000)])
+        return data_source
+
+    def test_explain(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        result = Profiler(data_source).explain([ProfileSubject('small'), ProfileSubject('large')])
+
+        small = result['tables']['small']
+        large = result['tables']['large']
+        assert small['bytes'] < large['bytes']
+        assert small['basic_bytes'] < small['bytes']
+        assert large['columns']['num']['type'] == 'integer'
+        assert large['columns']['num']['scans'] == 5
+        assert large['columns']['str']['scans'] == 4
+        assert large['columns']['str']['bytes'] == large['columns']['str']['basic_bytes'] * 4
+
+    def test_budget(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        estimates = Profiler(data_source).explain([ProfileSubject('small'), ProfileSubject('large')])['tables']
+        large = estimates['large']
+
+        budget = {'maxBytesPerTable': (large['bytes'] + large['basic_bytes']) // 2}
+        profiler = Profiler(data_source, config=Configuration([], profiler={'budget': budget}))
+        result = profiler.profile([ProfileSubject('small'), ProfileSubject('large')])
+        assert profiler.budget_decisions == {'small': 'full', 'large': 'basic'}
+        assert 'status' not in result['tables']['small']
+        assert result['tables']['large']['status'] == 'basic'
+        assert result['tables']['large']['columns']['num']['nulls'] == 0
+        assert 'histogram' not in result['tables']['large']['columns']['num']
+        assert 'histogram' in result['tables']['small']['columns']['num']
+
+        budget = {'maxBytesPerTable': estimates['small']['bytes']}
+        profiler = Profiler(data_source, config=Configuration([], profiler={'budget': budget}))
+        result = profiler.profile([ProfileSubject('small'), ProfileSubject('large')])
+        assert profiler.budget_decisions == {'small': 'full', 'large': 'skipped'}
+        assert result['tables']['large']['status'] == 'skipped'
@@ -0,0 +1,150 @@
+import asyncio
+from datetime import date
+
+import duckdb
+
+from sqlalchemy import Boolean, Column, Date, Float, Integer, MetaData, String, Table, event, select
+
+from piperider_cli.configuration import Configuration
+from piperider_cli.datasource.duckdb import DuckDBDataSource
+from piperider_cli.profiler import ProfileSubject, DefaultProfilerEventHandler
+from piperider_cli.profiler.batching import fuse_non_duplicates, fuse_statements, split_fused_row
+from piperider_cli.profiler.profiler import TEMPLATE_TABLE, TableProfiler, listen_template_source
+from tests.common import create_table
+
+IGNORED_FIELDS = ['profile_duration', 'elapsed_milli', 'cost']
+
+
+class RepeatedTableProfiler(TableProfiler):
+    """
+    Profile the columns on a CTE of the table as the leaves of a repeated field
+    """
+
+    def _get_candidate_columns(self):
+        cte = select(self.table).cte('t_repeated')
+        self.repeated_sources = {cte}
+        for column in cte.columns:
+            yield cte, column.label(column.name)
+
+
+class TestProfilerFused:
+
+    def create_data_source(self, sqlite_data_source):
+        data_source = sqlite_data_source()
+        self.create_events(data_source)
+        return data_source
+
+    def create_duckdb_data_source(self, tmp_path):
+        db_path = str(tmp_path / 'test.duckdb')
+        duckdb.connect(db_path).close()
+        data_source = DuckDBDataSource('test', credential={'path': db_path})
+        self.create_events(data_source)
+        return data_source
+
+    def create_events(self, data_source):
+        data = [
+            ('i', 'f', 's', 'b', 'd'),
+            (1, 1.5, 'a', True, date(2020, 1, 1)),
+            (2, None, 'bb', False, date(2021, 1, 1)),
+            (2, -3.0, '', None, None),
+            (None, 3.0, None, True, date(2021, 6, 1)),
+        ]
+        columns = [Column('i', Integer), Column('f', Float), Column('s', String), Column('b', Boolean),
+                   Column('d', Date)]
+        create_table(data_source.get_engine_by_database(), 'events', data, columns=columns)
+
+    def profile(self, data_source, table_profiler_class, config=None):
+        engine = data_source.get_engine_by_database()
+        table = Table('events', MetaData(), autoload_with=engine)
+        statements = []
+
+        def _on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', _on_execute)
+        table_profiler = table_profiler_class(data_source, engine, None, ProfileSubject('events'), table,
+                                              DefaultProfilerEventHandler(), config)
+        result = asyncio.run(table_profiler.profile())
+        event.remove(engine, 'before_cursor_execute', _on_execute)
+        for column_result in result['columns'].values():
+            for field in IGNORED_FIELDS:
+                column_result.pop(field, None)
+        return result['columns'], statements
+
+    def test_fuse_statements(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        engine = data_source.get_engine_by_database()
+        listen_template_source(engine)
+        table = Table('events', MetaData(), autoload_with=engine)
+        table_profiler = TableProfiler(data_source, engine, None, ProfileSubject('events'), table, None, None)
+        profilers = [asyncio.run(table_profiler._create_column_metadata_and_profiler(table, column))[1]
+                     for column in table.columns]
+        statements = [profiler._get_basic_statement() for profiler in profilers]
+        stmt = fuse_statements(statements, list(table.columns), table, TEMPLATE_TABLE)
+
+        with engine.connect() as conn:
+            rows = split_fused_row(conn.execute(stmt).fetchone(), statements)
+            for profiler, row in zip(profilers, rows):
+                expected = profiler._bind_template(conn).execute(profiler._get_basic_statement()).fetchone()
+                assert row == tuple(expected)
+
+        # the limited rows are not a row-wise transform of the source
+        profilers[0].config = {'table': {'limit': 1}}
+        assert fuse_statements([profilers[0]._get_basic_statement()], [table.c.i], table, TEMPLATE_TABLE) is None
+
+    def test_profile_repeated_sources(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        expected, statements = self.profile(data_source, TableProfiler)
+        actual, fused_statements = self.profile(data_source, RepeatedTableProfiler)
+
+        assert actual == expected
+        assert len([statement for statement in fused_statements if 'f4_0' in statement]) == 1
+        # the uniqueness of the integer, string and date leaves is counted by a single query
+        assert len([statement for statement in fused_statements if 'keys.k' in statement]) == 1
+        assert len(fused_statements) == len(statements) - len(expected) + 1 - 2
+
+    def test_fuse_non_duplicates(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        engine = data_source.get_engine_by_database()
+        table = Table('events', MetaData(), autoload_with=engine)
+        table_profiler = TableProfiler(data_source, engine, None, ProfileSubject('events'), table, None, None)
+        profilers = [asyncio.run(table_profiler._create_column_metadata_and_profiler(table, table.c[name]))[1]
+                     for name in ['i', 's', 'd']]
+        stmt = fuse_non_duplicates([profiler._get_template_cte().c.c for profiler in profilers],
+                                   [profiler.column for profiler in profilers], table, TEMPLATE_TABLE)
+
+        with engine.connect() as conn:
+            non_duplicates = dict(conn.execute(stmt).fetchall())
+        # i: 1 once and 2 twice, s: 'a', 'bb' and '' once, d: three dates once
+        assert [non_duplicates.get(k, 0) for k in range(3)] == [1, 3, 3]
+
+    def test_fuse_non_duplicates_by_grouping_sets(self, tmp_path):
+        data_source = self.create_duckdb_data_source(tmp_path)
+        engine = data_source.get_engine_by_database()
+        table = Table('events', MetaData(), autoload_with=engine)
+        table_profiler = TableProfiler(data_source, engine, None, ProfileSubject('events'), table, None, None)
+        profilers = [asyncio.run(table_profiler._create_column_metadata_and_profiler(table, table.c[name]))[1]
+                     for name in ['i', 's', 'd', 'f']]
+        stmt = fuse_non_duplicates([profiler._get_template_cte().c.c for profiler in profilers],
+                                   [profiler.column for profiler in profilers], table, TEMPLATE_TABLE,
+                                   grouping_sets=True)
+
+        with engine.connect() as conn:
+            non_duplicates = dict(conn.execute(stmt).fetchall())
+        # f: 1.5, -3.0 and 3.0 once
+        assert [non_duplicates.get(k, 0) for k in range(4)] == [1, 3, 3, 3]
+
+    def test_profile_repeated_sources_by_grouping_sets(self, tmp_path):
+        data_source = self.create_duckdb_data_source(tmp_path)
+        config = Configuration([], profiler={'query': {'groupingSets': True}})
+        expected, _ = self.profile(data_source, TableProfiler)
+        actual, fused_statements = self.profile(data_source, RepeatedTableProfiler, config=config)
+
+        assert actual == expected
+        fused = [statement for statement in fused_statements if 'GROUPING SETS' in statement.upper()]
+        assert len(fused) == 1
+
+        # the grouping sets are off by default, and the uniqueness of the float leaf is counted by itself
+        _, unpivoted_statements = self.profile(data_source, RepeatedTableProfiler)
+        assert not [statement for statement in unpivoted_statements if 'GROUPING SETS' in statement.upper()]
+        assert len(unpivoted_statements) == len(fused_statements) + 1
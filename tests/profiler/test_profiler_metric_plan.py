@@ -0,0 +1,83 @@
+from sqlalchemy import Column, Float, Integer, String, event
+
+from piperider_cli.configuration import Configuration
+from piperider_cli.profiler import Profiler
+from piperider_cli.profiler.metric_plan import compile_metric_plan, get_metric_groups
+from tests.common import create_table
+
+
+class TestProfilerMetricPlan:
+
+    def create_data_source(self, sqlite_data_source):
+        data_source = sqlite_data_source()
+        data = [('i', 'n', 's')] + [(j % 5, j * 1.5, f'v{j % 3}') for j in range(20)]
+        create_table(data_source.get_engine_by_database(), 'plan', data,
+                     columns=[Column('i', Integer), Column('n', Float), Column('s', String)])
+        return data_source
+
+    def profile(self, data_source, metrics: dict, required: dict = None):
+        statements = []
+
+        def _on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = data_source.get_engine_by_database()
+        event.listen(engine, 'before_cursor_execute', _on_execute)
+        profiler = Profiler(data_source, config=Configuration([], profiler={'metrics': metrics}))
+        profiler.required_metrics = required or {}
+        columns = profiler.profile()['tables']['plan']['columns']
+        event.remove(engine, 'before_cursor_execute', _on_execute)
+        return columns, statements
+
+    def test_select_all(self, sqlite_data_source):
+        columns, _ = self.profile(self.create_data_source(sqlite_data_source), {'select': 'all'})
+        assert columns['i']['p50'] is not None
+        assert columns['i']['topk'] is not None
+        assert columns['s']['duplicates'] == 20
+
+    def test_select_auto(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        _, full_statements = self.profile(data_source, {'select': 'all'})
+        columns, statements = self.profile(data_source, {'select': 'auto'}, {'plan': {'n': {'quantiles'}}})
+
+        assert columns['i']['nulls_p'] == 0
+        assert columns['i']['distinct'] == 5
+        assert 'topk' not in columns['i']
+        assert 'histogram' not in columns['i']
+        assert 'duplicates' not in columns['s']
+        assert columns['n']['p50'] is not None
+        assert 'histogram' not in columns['n']
+        assert len(statements) < len(full_statements)
+
+    def test_select_by_table_and_column(self, sqlite_data_source):
+        metrics = {'tables': {'plan': {'metrics': ['duplicates_p'], 'columns': {'s': ['topk']}}}}
+        columns, _ = self.profile(self.create_data_source(sqlite_data_source), metrics, {'plan': {'i': {'histogram'}}})
+
+        assert columns['n']['duplicates'] == 0
+        assert 'p50' not in columns['n']
+        assert columns['i']['histogram'] is not None
+        assert columns['i']['duplicates'] == 20
+        assert columns['s']['topk'] is not None
+        assert 'duplicates' not in columns['s']
+
+    def test_explain_scans(self, sqlite_data_source):
+        profiler = Profiler(self.create_data_source(sqlite_data_source),
+                            config=Configuration([], profiler={'metrics': {'select': 'auto', 'report': ['topk']}}))
+        profiler.required_metrics = {}
+        columns = profiler.explain()['tables']['plan']['columns']
+        assert columns['i']['scans'] == 2
+        assert columns['n']['scans'] == 1
+        assert columns['s']['scans'] == 2
+
+    def test_compile_metric_plan(self):
+        assert get_metric_groups(['p50', 'topk', 'nulls_p']) == {'quantiles', 'topk'}
+        assert compile_metric_plan({}, 't') is None
+
+        config = {'metrics': {'select': 'auto'}}
+        plan = compile_metric_plan(config, 't', {'c1': {'histogram'}, 'c2': None})
+        assert plan.get('c0') == set()
+        assert plan.get('c1') == {'histogram'}
+        assert plan.get('c2') is None
+
+        # a custom table assertion could read any metric of the table
+        assert compile_metric_plan(config, 't', {None: None}) is None
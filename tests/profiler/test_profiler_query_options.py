@@ -0,0 +1,77 @@
+import duckdb
+from sqlalchemy import event
+
+from piperider_cli.configuration import Configuration
+from piperider_cli.datasource.duckdb import DuckDBDataSource
+from piperider_cli.profiler import Profiler
+from tests.common import create_table
+
+
+class TestProfilerQueryOptions:
+
+    def create_data_source(self, tmp_path):
+        db_path = str(tmp_path / 'test.duckdb')
+        conn = duckdb.connect(db_path)
+        conn.execute("CREATE TABLE test AS SELECT range AS i, (range % 10)::VARCHAR AS s FROM range(10000)")
+        conn.close()
+        return DuckDBDataSource('test', credential={'path': db_path})
+
+    def profile(self, data_source, profiler_config):
+        engine = data_source.get_engine_by_database()
+        statements = []
+
+        def _on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        # the column source is bound to the templates before the cursor executes them
+        event.listen(engine, 'after_cursor_execute', _on_execute)
+        try:
+            config = Configuration([], profiler=profiler_config)
+            table = Profiler(data_source, config=config).profile()['tables']['test']
+        finally:
+            event.remove(engine, 'after_cursor_execute', _on_execute)
+        return table, statements
+
+    def test_exact_by_default(self, tmp_path):
+        data_source = self.create_data_source(tmp_path)
+        table, statements = self.profile(data_source, {'table': {'duplicateRows': True}})
+
+        assert table['samples'] == 10000 and table['samples_p'] == 1
+        assert table['columns']['i']['distinct'] == 10000
+        assert not [statement for statement in statements if 'approx_count_distinct' in statement]
+        assert not [statement for statement in statements if 'TABLESAMPLE' in statement.upper()]
+
+    def test_approx_distinct(self, tmp_path):
+        data_source = self.create_data_source(tmp_path)
+        table, statements = self.profile(data_source, {'query': {'approxDistinct': True}})
+
+        assert [statement for statement in statements if 'approx_count_distinct' in statement]
+        assert table['columns']['s']['distinct'] == 10
+        assert abs(table['columns']['i']['distinct'] - 10000) < 1000
+        assert table['columns']['i']['samples'] == 10000
+
+    def test_sample_percent(self, tmp_path):
+        data_source = self.create_data_source(tmp_path)
+        profiler_config = {'query': {'samplePercent': 50}, 'table': {'duplicateRows': True}}
+        table, statements = self.profile(data_source, profiler_config)
+
+        assert table['row_count'] == 10000
+        assert table['samples'] == 5000 and table['samples_p'] == 0.5
+        assert table['duplicate_rows'] == 0
+        i = table['columns']['i']
+        assert 0 < i['samples'] < 10000
+        assert i['total'] == 10000 and i['samples_p'] == 0.5
+        assert table['columns']['s']['distinct'] == 10
+        sampled = [statement for statement in statements if 'TABLESAMPLE' in statement.upper()]
+        # the duplicate rows and every query of the columns
+        assert len(sampled) > 1 + len(table['columns'])
+
+    def test_sample_percent_not_supported(self, sqlite_data_source):
+        data_source = sqlite_data_source()
+        create_table(data_source.get_engine_by_database(), 'test', [('i',)] + [(i,) for i in range(100)])
+        config = Configuration([], profiler={'query': {'samplePercent': 50, 'approxDistinct': True}})
+        table = Profiler(data_source, config=config).profile()['tables']['test']
+
+        assert table['samples'] == 100 and table['samples_p'] == 1
+        assert table['columns']['i']['samples'] == 100
+        assert table['columns']['i']['distinct'] == 100
@@ -0,0 +1,84 @@
+import time
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, event
+
+from piperider_cli.configuration import Configuration
+from piperider_cli.profiler import Profiler
+from piperider_cli.profiler.batching import fuse_statements
+from piperider_cli.profiler.profiler import TEMPLATE_TABLE, StringColumnProfiler, TemplateSource
+from tests.common import create_table
+
+
+class TestProfilerTemplate:
+
+    def create_data_source(self, sqlite_data_source, names):
+        data_source = sqlite_data_source(threads=1)
+        data = [tuple(names)] + [tuple([f'v{i}'] * (len(names) - 1) + [i]) for i in range(5)]
+        columns = [Column(name, String) for name in names[:-1]] + [Column(names[-1], Integer)]
+        create_table(data_source.get_engine_by_database(), 'test', data, columns=columns)
+        return data_source
+
+    def profile(self, data_source, config=None):
+        statements = []
+        compiled = []
+
+        def _on_executed(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+            compiled.append(context.compiled)
+
+        engine = data_source.get_engine_by_database()
+        event.listen(engine, 'after_cursor_execute', _on_executed)
+        result = Profiler(data_source, config=config).profile()
+        event.remove(engine, 'after_cursor_execute', _on_executed)
+        return result['tables']['test'], statements, {id(c) for c in compiled if c is not None}
+
+    def test_bind_template(self, sqlite_data_source):
+        narrow, _, narrow_compiled = self.profile(self.create_data_source(sqlite_data_source, ['s0', 'n']))
+        names = [f's{i}' for i in range(20)] + ['n']
+        wide, statements, wide_compiled = self.profile(self.create_data_source(sqlite_data_source, names))
+
+        assert wide['columns']['s19'] == {**narrow['columns']['s0'], 'name': 's19',
+                                          'profile_duration': wide['columns']['s19']['profile_duration'],
+                                          'elapsed_milli': wide['columns']['s19']['elapsed_milli'],
+                                          'cost': wide['columns']['s19']['cost']}
+        # the string columns share the compiled templates, which are bound to each column by the source CTE
+        assert len(wide_compiled) == len(narrow_compiled)
+        assert [statement for statement in statements
+                if statement.startswith(f'WITH {TEMPLATE_TABLE} AS (SELECT s19 AS __piperider_column__ FROM test)')]
+
+    def test_bind_batched(self, sqlite_data_source):
+        config = Configuration([], profiler={'batch': {'size': 4}})
+        table, statements, _ = self.profile(self.create_data_source(sqlite_data_source, ['s0', 's1', 'n']), config)
+        assert table['columns']['s1']['distinct'] == 5
+        assert [statement for statement in statements if f'{TEMPLATE_TABLE} AS (SELECT s1 AS' in statement]
+
+    def test_compile_benchmark(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source, [f's{i}' for i in range(200)] + ['n'])
+        engine = data_source.get_engine_by_database()
+        dialect = engine.dialect
+        table = Table('test', MetaData(), autoload_with=engine)
+        profilers = [StringColumnProfiler(engine, {}, table, column) for column in list(table.columns)[:-1]]
+        statement = profilers[0]._get_basic_statement()
+
+        # each column compiles its own statement
+        statements = [fuse_statements([statement], [p.column], table, TEMPLATE_TABLE) for p in profilers]
+        start = time.perf_counter()
+        per_column = [str(stmt.compile(dialect=dialect)) for stmt in statements]
+        per_column_seconds = time.perf_counter() - start
+
+        # the template is compiled once and bound to each column
+        start = time.perf_counter()
+        sql = str(statement.compile(dialect=dialect))
+        bound = [TemplateSource(table, p.column).bind(sql, dialect) for p in profilers]
+        template_seconds = time.perf_counter() - start
+
+        assert len(per_column) == len(bound) == 200
+        assert bound[199].startswith(f'WITH {TEMPLATE_TABLE} AS (SELECT s199 AS __piperider_column__ FROM test)')
+        assert template_seconds < per_column_seconds
+
+    def test_bind_quoted_names(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source, ['my column', 'Upper"Case', 'select'])
+        table, _, _ = self.profile(data_source, Configuration([], profiler={'table': {'limit': 3}}))
+        assert table['columns']['my column']['samples'] == 3
+        assert table['columns']['Upper"Case']['distinct'] == 3
+        assert table['columns']['select']['max'] == 2
@@ -0,0 +1,85 @@
+import time
+
+from sqlalchemy import event, text
+
+from piperider_cli.configuration import Configuration
+from piperider_cli.profiler import Profiler, ProfileSubject, DefaultProfilerEventHandler
+from piperider_cli.profiler.profiler import PRIORITY_CHANGED, PRIORITY_TESTED
+from piperider_cli.runner import _get_column_priorities
+from tests.common import create_table
+
+
+def _slow(value):
+    time.sleep(0.1)
+    return value
+
+
+class ColumnOrderEventHandler(DefaultProfilerEventHandler):
+
+    def __init__(self):
+        self.columns = []
+
+    def handle_column_start(self, table_name, column_name):
+        self.columns.append(column_name)
+
+
+class TestProfilerTimeBudget:
+
+    def create_data_source(self, sqlite_data_source):
+        data_source = sqlite_data_source(threads=1)
+        data = [tuple(f'c{i}' for i in range(10))] + [tuple(range(10)) for _ in range(5)]
+        create_table(data_source.get_engine_by_database(), 'wide', data)
+        return data_source
+
+    def test_column_priorities(self, sqlite_data_source):
+        event_handler = ColumnOrderEventHandler()
+        profiler = Profiler(self.create_data_source(sqlite_data_source), event_handler=event_handler)
+        profiler.column_priorities = {'wide': {'c7': PRIORITY_CHANGED, 'c9': PRIORITY_TESTED}}
+        result = profiler.profile()
+
+        assert event_handler.columns[:2] == ['c9', 'c7']
+        # the columns are recorded by the table order
+        assert list(result['tables']['wide']['columns'].keys()) == [f'c{i}' for i in range(10)]
+
+    def test_time_budget(self, sqlite_data_source):
+        config = Configuration([], profiler={'budget': {'maxSecondsPerTable': 0.000001}})
+        table = Profiler(self.create_data_source(sqlite_data_source), config=config).profile()['tables']['wide']
+
+        assert table['row_count'] == 5
+        assert all(column['status'] == 'skipped' for column in table['columns'].values())
+        assert 'distinct' not in table['columns']['c0']
+
+    def test_cancel_on_time_budget(self, sqlite_data_source):
+        data_source = sqlite_data_source(threads=1)
+        engine = data_source.get_engine_by_database()
+        event.listen(engine, 'connect',
+                     lambda dbapi_connection, record: dbapi_connection.create_function('slow', 1, _slow))
+        engine.dispose()
+        create_table(engine, 'fast', [('num',)] + [(i,) for i in range(20)])
+        with engine.connect() as conn:
+            # scanning a column takes 2 seconds
+            conn.execute(text('CREATE VIEW slow AS SELECT CAST(slow(num) AS INTEGER) AS num FROM fast'))
+
+        config = Configuration([], profiler={'budget': {'maxSecondsPerTable': 0.5}})
+        start = time.perf_counter()
+        table = Profiler(data_source, config=config).profile([ProfileSubject('slow')])['tables']['slow']
+
+        # the running column is cancelled when the budget is spent instead of finishing its queries
+        assert time.perf_counter() - start < 1.5
+        assert table['row_count'] == 20
+        assert table['columns']['num']['status'] == 'timeout'
+        assert data_source.query_registry.running() == 0
+
+    def test_get_column_priorities(self):
+        profiled_tables = {'wide': {'columns': {'c0': {'schema_type': 'INTEGER'}, 'c1': {'schema_type': 'TEXT'},
+                                                'c2': {'schema_type': 'INTEGER'}}}}
+        last_run = {'tables': {'wide': {'columns': {'c0': {'schema_type': 'INTEGER'},
+                                                    'c1': {'schema_type': 'INTEGER'}}}}}
+        manifest = {'nodes': {
+            'test.not_null_wide_c0': {'resource_type': 'test', 'column_name': 'c0', 'attached_node': 'model.wide'},
+            'model.wide': {'resource_type': 'model'},
+        }}
+        subjects = [ProfileSubject('wide', name='wide', ref_id='model.wide')]
+
+        priorities = _get_column_priorities(subjects, profiled_tables, manifest, last_run)
+        assert priorities == {'wide': {'c0': PRIORITY_TESTED, 'c1': PRIORITY_CHANGED, 'c2': PRIORITY_CHANGED}}
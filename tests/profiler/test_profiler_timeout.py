@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from piperider_cli.datasource.cancellation import is_timeout_error
+from piperider_cli.profiler import Profiler, ProfileSubject
+from tests.common import create_table
+
+SLOW_VIEW = '''
+CREATE VIEW slow AS
+WITH RECURSIVE seq(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM seq WHERE x < 100000000)
+SELECT x AS num, 'v' || (x % 100) AS str FROM seq
+'''
+
+# sleeps 0.03 seconds per row
+SLEEP_ROWS = '''
+WITH RECURSIVE seq(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM seq WHERE x < {rows})
+SELECT count(sleep(0.03)) FROM seq
+'''
+
+
+class TestProfilerTimeout:
+
+    def create_data_source(self, sqlite_data_source, **credential):
+        data_source = sqlite_data_source(**credential)
+        engine = data_source.get_engine_by_database()
+        create_table(engine, 'fast', [("num", "str"), (1, "a"), (2, "b")])
+        with engine.connect() as conn:
+            conn.execute(text(SLOW_VIEW))
+        return data_source
+
+    def test_timeout_columns(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source, threads=4, statement_timeout=0.5)
+
+        start = time.perf_counter()
+        result = Profiler(data_source).profile([ProfileSubject('fast'), ProfileSubject('slow')])
+        assert time.perf_counter() - start < 30
+
+        fast = result['tables']['fast']
+        assert 'status' not in fast
+        assert fast['columns']['num']['nulls'] == 0
+
+        slow = result['tables']['slow']
+        assert slow['status'] == 'timeout'
+        for column in slow['columns'].values():
+            assert column['status'] == 'timeout'
+            assert 'nulls' not in column
+        assert data_source.query_registry.running() == 0
+
+    def test_timeout_per_statement(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source, statement_timeout=0.5)
+        engine = data_source.get_engine_by_database()
+
+        with engine.connect() as conn:
+            conn.connection.create_function('sleep', 1, time.sleep)
+            # the timer starts over with each statement
+            for _ in range(3):
+                conn.execute(text(SLEEP_ROWS.format(rows=10))).fetchall()
+
+            with pytest.raises(Exception) as e:
+                conn.execute(text(SLEEP_ROWS.format(rows=40))).fetchall()
+            assert is_timeout_error(e.value)
+        assert data_source.query_registry.running() == 0
+        # the statements are timed by a single watchdog thread
+        assert len([thread for thread in threading.enumerate() if thread.name == 'piperider-watchdog']) <= 1
+
+    def test_is_timeout_error(self):
+        assert is_timeout_error(Exception('canceling statement due to statement timeout'))
+        assert is_timeout_error(Exception('Statement reached its statement or warehouse timeout of 1 second(s)'))
+        assert not is_timeout_error(Exception('connection timed out'))
+        assert not is_timeout_error(Exception('interrupted system call'))
+
+    def test_cancel_on_interrupt(self, sqlite_data_source):
+        data_source = self.create_data_source(sqlite_data_source)
+        engine = data_source.get_engine_by_database()
+        errors = []
+
+        def _query():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT count(*) FROM slow')).fetchall()
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=_query)
+        thread.start()
+        while data_source.query_registry.running() == 0:
+            time.sleep(0.01)
+
+        try:
+            with data_source.query_registry.cancel_on_interrupt():
+                raise KeyboardInterrupt()
+        except KeyboardInterrupt:
+            pass
+        thread.join(30)
+
+        assert not thread.is_alive()
+        assert len(errors) == 1 and is_timeout_error(errors[0])
+        assert data_source.query_registry.running() == 0
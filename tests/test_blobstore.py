@@ -0,0 +1,56 @@
+import json
+import os
+from unittest import TestCase
+
+from piperider_cli.blobstore import BlobStore, blob_ref, default_blob_dir, export_run_json, resolve_blob_refs
+from piperider_cli.compare_report import RunOutput
+from piperider_cli.error import PipeRiderBlobNotFoundError
+from tests.common import create_temp_dir
+
+
+class TestBlobStore(TestCase):
+
+    def setUp(self):
+        self.output_dir = create_temp_dir(self)
+        self.store = BlobStore(default_blob_dir(self.output_dir))
+        self.manifest_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_dbt_data', 'manifest.json')
+        with open(self.manifest_path) as f:
+            self.manifest = json.load(f)
+
+    def write_run(self, name: str, digest: str) -> str:
+        run_dir = os.path.join(self.output_dir, name)
+        os.makedirs(run_dir)
+        path = os.path.join(run_dir, 'run.json')
+        with open(path, 'w') as f:
+            json.dump({'id': name, 'created_at': '2022-01-01T00:00:00.000000Z', 'datasource': {'name': 'test'},
+                       'tables': {}, 'dbt': {'manifest': blob_ref(digest)}}, f)
+        return path
+
+    def test_put(self):
+        digest = self.store.put(self.manifest_path)
+        self.assertEqual(digest, self.store.put(self.manifest_path))
+        self.assertEqual([digest], os.listdir(self.store.root))
+        self.assertEqual(self.manifest, self.store.get(digest).load())
+
+        dest = os.path.join(self.output_dir, 'manifest.json')
+        self.store.link(digest, dest)
+        self.assertEqual(self.manifest, json.load(open(dest)))
+
+    def test_resolve(self):
+        digest = self.store.put(self.manifest_path)
+        run1 = self.write_run('run1', digest)
+        run2 = self.write_run('run2', digest)
+
+        self.assertEqual(self.manifest, RunOutput(run1).load()['dbt']['manifest'])
+        self.assertEqual(self.manifest, RunOutput(run2).load()['dbt']['manifest'])
+
+        # the exported run.json is read without the blob store
+        dest = os.path.join(create_temp_dir(self), 'run.json')
+        export_run_json(run1, dest)
+        with open(dest) as f:
+            self.assertEqual(self.manifest, json.load(f)['dbt']['manifest'])
+
+    def test_missing_blob(self):
+        run_result = {'dbt': {'manifest': blob_ref('0' * 64)}}
+        with self.assertRaises(PipeRiderBlobNotFoundError):
+            resolve_blob_refs(run_result, self.store)
@@ -0,0 +1,50 @@
+import json
+import os
+import time
+from unittest import TestCase
+
+from piperider_cli.history import HistoryStore
+from piperider_cli.runindex import RunIndex
+from tests.common import create_temp_dir
+
+
+class TestHistoryStore(TestCase):
+
+    def setUp(self):
+        self.output_dir = create_temp_dir(self)
+
+    def write_run(self, name: str, created_at: str, nulls_p: float) -> str:
+        run_dir = os.path.join(self.output_dir, name)
+        os.makedirs(run_dir, exist_ok=True)
+        path = os.path.join(run_dir, 'run.json')
+        run_result = dict(id=name, created_at=created_at, datasource={'name': 'ds'}, tables={
+            'orders': {'name': 'orders', 'row_count': 10, 'col_count': 1, 'columns': {
+                'customer_id': {'name': 'customer_id', 'type': 'integer', 'schema_type': 'INTEGER', 'nulls_p': nulls_p,
+                                'nulls': int(nulls_p * 10), 'topk': {'values': [1], 'counts': [2]}, 'min': 'a'}
+            }}
+        })
+        with open(path, 'w') as f:
+            json.dump(run_result, f)
+        return path
+
+    def test_query(self):
+        store = HistoryStore(self.output_dir)
+        path = self.write_run('ds-1', '2022-01-01T00:00:00.000000Z', 0.1)
+        store.add(path, json.load(open(path)))
+        # written without the history store
+        self.write_run('ds-2', '2022-01-02T00:00:00.000000Z', 0.2)
+        self.write_run('ds-3', '2022-01-03T00:00:00.000000Z', 0.3)
+
+        values = store.query('nulls_p', 'orders', 'customer_id')
+        self.assertEqual(['ds-1', 'ds-2', 'ds-3'], [v['dir'] for v in values])
+        self.assertEqual([0.1, 0.2, 0.3], [v['value'] for v in values])
+        self.assertEqual([0.2, 0.3], [v['value'] for v in store.query('nulls_p', 'orders', 'customer_id', last=2)])
+        self.assertEqual([10, 10, 10], [v['value'] for v in store.query('row_count', 'orders')])
+        self.assertEqual(['nulls', 'nulls_p'], store.list_metrics('orders', 'customer_id'))
+
+        # a modified run is ingested again, and a pruned run is removed
+        time.sleep(0.01)
+        self.write_run('ds-3', '2022-01-03T00:00:00.000000Z', 0.5)
+        RunIndex(self.output_dir).prune(keep_last=2)
+        values = store.query('nulls_p', 'orders', 'customer_id')
+        self.assertEqual([0.2, 0.5], [v['value'] for v in values])
@@ -0,0 +1,95 @@
+import json
+import os
+import time
+from unittest import TestCase, skipIf
+
+from piperider_cli.compare_report import RunOutput
+from piperider_cli.history import HistoryStore
+from tests.common import create_temp_dir
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+if pyarrow is not None:
+    from piperider_cli.runarrow import find_run_arrow, get_run_arrow_path, load_run_arrow, read_run_scalars, \
+        write_run_arrow
+
+
+def _column(name, nulls_p):
+    return {'name': name, 'type': 'numeric', 'schema_type': 'DOUBLE', 'total': 10, 'nulls': 1, 'nulls_p': nulls_p,
+            'is_key': True, 'min': 1.5, 'max': None,
+            'histogram': {'labels': ['1-2', '2-3'], 'counts': [3, 7], 'bin_edges': [1, 2, 3.5]},
+            'topk': {'values': ['a', 'b'], 'counts': [2, 1]},
+            'quantiles': {'p50': {'value': 2}}, 'samples': []}
+
+
+@skipIf(pyarrow is None, 'pyarrow is not installed')
+class TestRunArrow(TestCase):
+
+    def setUp(self):
+        self.output_dir = create_temp_dir(self)
+        self.run_dir = os.path.join(self.output_dir, 'ds-1')
+        os.makedirs(self.run_dir)
+        self.run_json = os.path.join(self.run_dir, 'run.json')
+        self.run_result = {
+            'tables': {
+                'orders': {'name': 'orders', 'row_count': 10, 'col_count': 2,
+                           'columns': {'id': _column('id', 0.1), 'amount': _column('amount', 0.2),
+                                       'broken': None},
+                           'assertions': [{'name': 'row_count'}]},
+                'customers': {'name': 'customers', 'row_count': 3, 'columns': {}},
+                'skipped': None,
+            },
+            'id': 'run-1',
+            'created_at': '2022-01-01T00:00:00.000000Z',
+            'datasource': {'name': 'ds'},
+            'tests': [{'id': 't1', 'status': 'passed'}],
+        }
+        with open(self.run_json, 'w') as f:
+            json.dump(self.run_result, f)
+        time.sleep(0.01)
+        write_run_arrow(get_run_arrow_path(self.run_json), self.run_result)
+
+    def test_round_trip(self):
+        run_result = load_run_arrow(get_run_arrow_path(self.run_json))
+        self.assertEqual(json.dumps(self.run_result), json.dumps(run_result))
+
+        orders = load_run_arrow(get_run_arrow_path(self.run_json), tables=['orders'])
+        self.assertEqual(['orders'], list(orders['tables'].keys()))
+        self.assertEqual(self.run_result['tables']['orders'], orders['tables']['orders'])
+        self.assertEqual(self.run_result['tests'], orders['tests'])
+
+    def test_find_run_arrow(self):
+        self.assertEqual(get_run_arrow_path(self.run_json), find_run_arrow(self.run_json))
+
+        # rewritten after the run.arrow, e.g. by the cloud upload
+        time.sleep(0.01)
+        with open(self.run_json, 'w') as f:
+            json.dump(self.run_result, f)
+        self.assertIsNone(find_run_arrow(self.run_json))
+
+    def test_read_run_scalars(self):
+        members, scalars = read_run_scalars(get_run_arrow_path(self.run_json))
+        self.assertEqual('run-1', members['id'])
+        self.assertIn(('orders', None, 'row_count', 10), scalars)
+        self.assertIn(('orders', 'amount', 'nulls_p', 0.2), scalars)
+        self.assertIn(('orders', 'id', 'is_key', True), scalars)
+        self.assertNotIn('histogram', [metric for _, _, metric, _ in scalars])
+
+        # the history reads the run.arrow instead of the run.json
+        self.run_result['tables']['orders']['columns']['amount']['nulls_p'] = 0.3
+        write_run_arrow(get_run_arrow_path(self.run_json), self.run_result)
+        store = HistoryStore(self.output_dir)
+        self.assertEqual(['min', 'nulls', 'nulls_p', 'total'], store.list_metrics('orders', 'amount'))
+        self.assertEqual([0.3], [v['value'] for v in store.query('nulls_p', 'orders', 'amount')])
+        self.assertEqual([3], [v['value'] for v in store.query('row_count', 'customers')])
+
+    def test_load_tables(self):
+        run = RunOutput(self.run_json)
+        self.assertEqual(self.run_result, run.load())
+        self.assertEqual(['customers'], list(run.load(tables=['customers', 'payments'])['tables'].keys()))
+
+        os.remove(get_run_arrow_path(self.run_json))
+        self.assertEqual(['customers'], list(run.load(tables=['customers', 'payments'])['tables'].keys()))
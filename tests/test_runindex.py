@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from unittest import TestCase, mock
+
+from piperider_cli import datetime_to_str
+from piperider_cli.blobstore import BlobStore, blob_ref, default_blob_dir
+from piperider_cli.compare_report import CompareReport
+from piperider_cli.profiler.checkpoint import RunCheckpoint, default_checkpoint_path, list_checkpoints
+from piperider_cli.runindex import RunIndex, default_index_path
+from tests.common import create_temp_dir
+
+
+class TestRunIndex(TestCase):
+
+    def setUp(self):
+        self.output_dir = create_temp_dir(self)
+
+    def write_run(self, name: str, datasource: str, created_at: str, **kwargs) -> str:
+        run_dir = os.path.join(self.output_dir, name)
+        os.makedirs(run_dir, exist_ok=True)
+        path = os.path.join(run_dir, 'run.json')
+        run_result = dict(id=name, created_at=created_at, datasource={'name': datasource}, tables={'t1': {}},
+                          tests=[{'status': 'passed'}, {'status': 'failed'}], **kwargs)
+        with open(path, 'w') as f:
+            json.dump(run_result, f)
+        return path
+
+    def test_list(self):
+        index = RunIndex(self.output_dir)
+        path = self.write_run('a-1', 'a', '2022-01-01T00:00:00.000000Z')
+        index.add(path, json.load(open(path)))
+        # written without the index
+        self.write_run('a-2', 'a', '2022-01-02T00:00:00.000000Z')
+        self.write_run('b-1', 'b', '2022-01-01T00:00:00.000000Z', project_id='p1')
+
+        # read only, the runs are indexed when they are listed
+        self.assertIsNone(index.find_project_id())
+
+        entries = index.list()
+        self.assertEqual(['b-1', 'a-2', 'a-1'], [e['dir'] for e in entries])
+        self.assertEqual((1, 1, 1), (entries[0]['table_count'], entries[0]['pass_count'], entries[0]['fail_count']))
+        self.assertEqual(['a-2', 'a-1'], [e['dir'] for e in index.list('a')])
+        self.assertEqual('p1', index.find_project_id())
+
+        # rewritten by the cloud upload
+        time.sleep(0.01)
+        self.write_run('a-1', 'a', '2022-01-01T00:00:00.000000Z', cloud={'run_id': 1})
+        self.assertEqual({'run_id': 1}, index.list('a')[1]['cloud'])
+
+        outputs = CompareReport(self.output_dir, datasource='a').list_existing_outputs()
+        self.assertEqual(['a-2', 'a-1'], [os.path.basename(os.path.dirname(o.path)) for o in outputs])
+        self.assertEqual({'run_id': 1}, outputs[1].cloud)
+
+        os.remove(default_index_path(self.output_dir))
+        self.assertEqual(3, index.rebuild())
+
+    def test_skip_unreadable_runs(self):
+        self.write_run('a-1', 'a', '2022-01-01T00:00:00.000000Z')
+        os.makedirs(os.path.join(self.output_dir, 'a-2'))
+        with open(os.path.join(self.output_dir, 'a-2', 'run.json.zst'), 'wb') as f:
+            f.write(b'\x28\xb5\x2f\xfd')
+
+        # zstandard is not installed
+        with mock.patch.dict(sys.modules, {'zstandard': None}):
+            self.assertEqual(['a-1'], [e['dir'] for e in RunIndex(self.output_dir).list()])
+
+    def test_find_project_id(self):
+        self.write_run('a-1', 'a', '2022-01-01T00:00:00.000000Z', project_id='p1')
+        index = RunIndex(self.output_dir)
+        self.assertIsNone(index.find_project_id())
+        self.assertFalse(os.path.exists(default_index_path(self.output_dir)))
+
+        index.list()
+        self.assertEqual('p1', index.find_project_id())
+
+    def test_prune_checkpoints(self):
+        self.write_run('a-1', 'a', '2022-01-01T00:00:00.000000Z')
+        for run_id, datasource, created_at in [('a-1', 'a', '2022-01-01T00:00:00.000000Z'),
+                                               ('a-2', 'a', '2022-01-02T00:00:00.000000Z'),
+                                               ('b-1', 'b', '2022-01-01T00:00:00.000000Z'),
+                                               ('b-2', 'b', datetime_to_str(datetime.utcnow()))]:
+            checkpoint = RunCheckpoint.create(default_checkpoint_path(self.output_dir, run_id), run_id, created_at,
+                                              datasource)
+            checkpoint.append('t1', {})
+
+        index = RunIndex(self.output_dir)
+        index.prune(keep_last=1, dry_run=True)
+        self.assertEqual(4, len(list_checkpoints(self.output_dir)))
+
+        # the checkpoint of the written run is left by the run
+        index.prune(keep_last=1)
+        self.assertEqual(['a-2', 'b-1', 'b-2'], sorted(c['id'] for c in list_checkpoints(self.output_dir)))
+
+        index.prune(older_than_days=1, datasource='b')
+        self.assertEqual(['a-2', 'b-2'], sorted(c['id'] for c in list_checkpoints(self.output_dir)))
+
+    def test_prune(self):
+        manifest_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_dbt_data', 'manifest.json')
+        store = BlobStore(default_blob_dir(self.output_dir))
+        digest = store.put(manifest_path)
+        old = time.time() - 7200
+        os.utime(store.path(digest), (old, old))
+
+        self.write_run('a-1', 'a', '2022-01-01T00:00:00.000000Z', dbt={'manifest': blob_ref(digest)})
+        self.write_run('a-2', 'a', '2022-01-02T00:00:00.000000Z')
+        self.write_run('a-3', 'a', '2022-01-03T00:00:00.000000Z')
+        self.write_run('b-1', 'b', '2022-01-01T00:00:00.000000Z')
+        os.symlink(os.path.join(self.output_dir, 'a-1'), os.path.join(self.output_dir, 'latest'))
+
+        index = RunIndex(self.output_dir)
+        pruned = index.prune(keep_last=1, dry_run=True)
+        # a-1 is the latest run
+        self.assertEqual(['a-2'], [e['dir'] for e in pruned])
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, 'a-2')))
+
+        index.prune(keep_last=1)
+        self.assertEqual(['b-1', 'a-3', 'a-1'], [e['dir'] for e in index.list()])
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'a-2')))
+        self.assertTrue(os.path.exists(store.path(digest)))
+
+        os.remove(os.path.join(self.output_dir, 'latest'))
+        index.prune(older_than_days=1, datasource='a')
+        self.assertEqual(['b-1'], [e['dir'] for e in index.list()])
+        self.assertFalse(os.path.exists(store.path(digest)))
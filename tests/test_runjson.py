@@ -0,0 +1,99 @@
+import importlib.util
+import io
+import json
+import os
+from unittest import TestCase, skipIf
+
+from piperider_cli import get_run_json_path, runjson
+from piperider_cli.compare_report import RunOutput
+from piperider_cli.runjson import RawJsonFile, TableSpool, copy_compact_json, find_run_json, get_run_json_name, \
+    open_run_json, write_run_json
+from tests.common import create_temp_dir
+
+
+class TestRunJson(TestCase):
+
+    def setUp(self):
+        self.manifest_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_dbt_data', 'manifest.json')
+
+    def test_copy_compact_json(self):
+        document = {'a': [1, 2.5, None, True], 'b': {'c': 'x y\t"z"\\', 'd': 'café \U0001f600'}, 'e': ''}
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+
+        for src in [json.dumps(document, indent=2, ensure_ascii=False), json.dumps(manifest, indent=4)]:
+            expected = json.dumps(json.loads(src), separators=(',', ':'))
+            for chunk_size in [1, 7, 1 << 20]:
+                runjson._CHUNK_SIZE = chunk_size
+                try:
+                    dst = io.StringIO()
+                    copy_compact_json(io.StringIO(src), dst)
+                finally:
+                    runjson._CHUNK_SIZE = 1 << 20
+                self.assertEqual(expected, dst.getvalue())
+
+    def test_write_run_json(self):
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        run_result = {
+            'tables': {'t1': {'columns': {'c': {'nulls': 0, 'p50': 1.5}}}, 't2': {'columns': {}}},
+            'id': 'abc',
+            'dbt': {'manifest': RawJsonFile(self.manifest_path), 'run_results': RawJsonFile(self.manifest_path)},
+        }
+        f = io.StringIO()
+        write_run_json(f, run_result)
+
+        run_result['dbt'] = {'manifest': manifest, 'run_results': manifest}
+        self.assertEqual(json.dumps(run_result, separators=(',', ':')), f.getvalue())
+
+    def test_table_spool(self):
+        spool = TableSpool(create_temp_dir(self))
+        self.addCleanup(spool.close)
+        spool['t1'] = {'columns': {'c': {'nulls': 0, 'p50': 1.5, 'description': 'café'}}}
+        spool['t2'] = {'columns': {}}
+        # a modified table is stored again
+        spool['t1'] = dict(spool['t1'], description='orders')
+
+        self.assertEqual(['t1', 't2'], list(spool))
+        self.assertEqual('orders', spool['t1']['description'])
+        self.assertEqual('café', spool['t1']['columns']['c']['description'])
+        self.assertIn('t2', spool)
+        self.assertNotIn('t3', spool)
+
+        f = io.StringIO()
+        write_run_json(f, {'id': 'abc', 'tables': spool})
+        self.assertEqual(json.dumps({'id': 'abc', 'tables': dict(spool)}, separators=(',', ':')), f.getvalue())
+
+    def test_invalid_document(self):
+        path = os.path.join(create_temp_dir(self), 'invalid.json')
+        with open(path, 'w') as f:
+            f.write('{"a": "unterminated}')
+        with self.assertRaises(ValueError):
+            write_run_json(io.StringIO(), {'a': RawJsonFile(path)})
+
+    def write_compressed_run(self, compression: str) -> str:
+        run_dir = os.path.join(create_temp_dir(self), 'run1')
+        os.makedirs(run_dir)
+        path = os.path.join(run_dir, get_run_json_name(compression))
+        with open_run_json(path, 'w') as f:
+            write_run_json(f, {'id': 'run1', 'created_at': '2022-01-01T00:00:00.000000Z',
+                               'datasource': {'name': 'test'}, 'tables': {'t1': {'columns': {}}}})
+        return path
+
+    def test_gzip(self):
+        path = self.write_compressed_run('gzip')
+        with open(path, 'rb') as f:
+            self.assertEqual(b'\x1f\x8b', f.read(2))
+
+        run_dir = os.path.dirname(path)
+        self.assertEqual(path, find_run_json(run_dir))
+        self.assertEqual(path, get_run_json_path(os.path.dirname(run_dir), run_dir))
+        output = RunOutput(path)
+        self.assertEqual(('test', 1), (output.name, output.table_count))
+        self.assertEqual(['t1'], list(output.load()['tables'].keys()))
+
+    @skipIf(importlib.util.find_spec('zstandard') is None, 'zstandard is not installed')
+    def test_zstd(self):
+        path = self.write_compressed_run('zstd')
+        self.assertTrue(path.endswith('run.json.zst'))
+        self.assertEqual('run1', RunOutput(path).load()['id'])
@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from piperider_cli.profiler import Profiler
+from piperider_cli.tracing import Tracer, sql_hash
+from tests.common import create_table, create_sqlite_data_source
+
+
+class TestTracer(TestCase):
+
+    def setUp(self):
+        self.tracer = Tracer()
+        self.tracer.reset()
+
+    def test_span(self):
+        with self.tracer.span('config'):
+            pass
+        event, = self.tracer.events
+        self.assertEqual('X', event['ph'])
+        self.assertEqual('config', event['name'])
+        self.assertGreaterEqual(event['dur'], 0)
+
+    def test_profile_trace(self):
+        with tempfile.TemporaryDirectory() as root:
+            ds = create_sqlite_data_source(os.path.join(root, 'test.db'))
+            create_table(ds.get_engine_by_database(), 'test', [("a", "b"), (1, "x"), (2, "y")])
+            self.tracer.reset()
+
+            Profiler(ds).profile()
+            trace_path = os.path.join(root, 'trace.json')
+            self.tracer.write(trace_path)
+            with open(trace_path) as f:
+                events = json.load(f)['traceEvents']
+
+        spans = {(e['cat'], e['name']) for e in events if e['ph'] in ('X', 'b')}
+        self.assertIn(('run', 'profile'), spans)
+        self.assertIn(('table', 'test'), spans)
+        self.assertIn(('column', 'test.a'), spans)
+        self.assertIn(('column', 'test.b'), spans)
+
+        # the queries run in the executor threads
+        sql = [e for e in events if e.get('cat') == 'sql']
+        self.assertTrue(sql)
+        self.assertTrue(all(len(e['args']['sql_hash']) == 12 for e in sql))
+        self.assertTrue(any(e['ph'] == 'X' for e in sql))
+        self.assertTrue(any(e['ph'] == 'M' and e['args']['name'].startswith('ThreadPoolExecutor') for e in events))
+
+        # the table and column spans interleave on the event loop
+        begins = [e for e in events if e['ph'] == 'b']
+        ends = {e['id']: e for e in events if e['ph'] == 'e'}
+        self.assertTrue(all(ends[e['id']]['ts'] >= e['ts'] for e in begins))
+
+    def test_sql_hash(self):
+        self.assertEqual(sql_hash('SELECT 1'), sql_hash('SELECT 1'))
+        self.assertNotEqual(sql_hash('SELECT 1'), sql_hash('SELECT 2'))